@@ -4,20 +4,51 @@ Gestion centralisée des sessions applicatives.
 Responsabilités :
 - gérer le cookie sid (signé)
 - créer / restaurer une session Redis
-- fournir ensure_session() utilisé par toutes les routes
+- charger la session une seule fois par requête (request.state.session)
+- fournir current_session (dépendance FastAPI) utilisé par toutes les routes
+- session_fields(...) : ne lire que certains champs (layout Redis "hash")
+- réécrire la session en fin de requête, seulement si elle a changé
+  (layout "hash" : uniquement les champs modifiés)
+- mode session_backend="cookie" : session chiffrée dans un second cookie,
+  repli automatique sur Redis quand elle dépasse la taille d'un cookie
 """
 
 from __future__ import annotations
 
+import base64
+import logging
 import secrets
 import time
-from typing import Optional, cast
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    cast,
+)
 
+from cryptography.fernet import Fernet, InvalidToken
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
 from fastapi import HTTPException, Request, Response
 from itsdangerous import BadSignature, URLSafeSerializer
 
+from app.core import codec
 from app.core.config import settings
-from app.core.redis import delete_session, get_session, set_session
+from app.core.redis import (
+    delete_session,
+    get_session,
+    get_session_fields,
+    set_session,
+    update_session_fields,
+)
+
+logger = logging.getLogger(__name__)
 
 
 # -------------------------------------------------------------------
@@ -58,47 +89,382 @@ def delete_sid_cookie(response: Response) -> None:
     response.delete_cookie("sid", path="/")
 
 
-def ensure_session(request: Request, response: Response) -> str:
+# -------------------------------------------------------------------
+# Encrypted session cookie (session_backend="cookie")
+# -------------------------------------------------------------------
+
+DATA_COOKIE = "sdata"
+
+
+def _derive_fernet(secret: str) -> Fernet:
+    # dedicated key: the sid / OAuth state serializers sign with the raw secret
+    key = HKDF(
+        algorithm=hashes.SHA256(), length=32, salt=None, info=b"session-cookie"
+    ).derive(secret.encode("utf-8"))
+    return Fernet(base64.urlsafe_b64encode(key))
+
+
+_session_fernet = _derive_fernet(settings.app_secret_key)
+
+
+def encrypt_session(sid: str, data: Dict[str, Any]) -> str:
+    """Encrypt and authenticate `data`, bound to `sid` (Fernet token)."""
+    payload = codec.encode({"sid": sid, "data": data}).encode("utf-8")
+    return _session_fernet.encrypt(payload).decode("ascii")
+
+
+def decrypt_session(sid: str, token: str) -> Optional[Tuple[Dict[str, Any], int]]:
+    """Return (data, issued_at) or None if the token is invalid or expired.
+
+    A token issued for another sid is rejected, so the data cookie cannot be
+    replayed next to a different sid cookie.
     """
-    Garantit l'existence d'une session Redis valide ET du cookie sid côté client.
-    Retourne toujours un sid valide.
+    try:
+        raw = _session_fernet.decrypt(token, ttl=settings.session_max_age_seconds)
+        doc = codec.decode(raw.decode("utf-8"))
+    except (InvalidToken, ValueError):
+        return None
+    if not isinstance(doc, dict) or doc.get("sid") != sid:
+        return None
+    issued_at = _session_fernet.extract_timestamp(token)
+    return cast(Dict[str, Any], doc.get("data") or {}), issued_at
+
+
+def _cookie_needs_refresh(issued_at: int) -> bool:
+    # sliding expiration, same rule as the Redis TTL refresh
+    max_age = settings.session_max_age_seconds
+    remaining = max_age - (time.time() - issued_at)
+    return remaining < max_age * settings.session_ttl_refresh_ratio
+
+
+def set_data_cookie(response: Response, token: str) -> None:
+    response.set_cookie(
+        key=DATA_COOKIE,
+        value=token,
+        httponly=True,
+        samesite=settings.cookie_samesite,
+        secure=settings.cookie_secure,
+        path="/",
+        max_age=settings.session_max_age_seconds,
+    )
+
+
+def delete_data_cookie(response: Response) -> None:
+    response.delete_cookie(DATA_COOKIE, path="/")
+
+
+# -------------------------------------------------------------------
+# Request-scoped session
+# -------------------------------------------------------------------
+
+
+class RequestSession(Dict[str, Any]):
+    """Session dict loaded once per request, with dirty-tracking.
+
+    Top-level writes (``session[k] = v``, ``pop``, ``update``...) mark the key
+    as dirty; ``commit_request_session`` persists the session only if at least
+    one key changed. In-place mutation of a nested value is not detected: call
+    ``mark_dirty(key)`` or re-assign the key.
+    """
+
+    def __init__(
+        self,
+        sid: str,
+        data: Optional[Dict[str, Any]] = None,
+        *,
+        is_new: bool = False,
+        restored: bool = True,
+    ) -> None:
+        super().__init__(data or {})
+        self.sid = sid
+        self.is_new = is_new  # sid minted during this request (cookie to set)
+        self.restored = restored  # data found in the store
+        self.loaded: Optional[Set[str]] = None
+        self.in_cookie = False  # data read from the encrypted cookie
+        self._dirty: Set[str] = set()
+
+    @property
+    def modified(self) -> bool:
+        return bool(self._dirty)
+
+    @property
+    def dirty_keys(self) -> Set[str]:
+        return set(self._dirty)
+
+    def mark_dirty(self, *keys: str) -> None:
+        self._dirty.update(keys or self.keys())
+
+    def mark_clean(self) -> None:
+        self._dirty.clear()
+
+    @property
+    def partial_maps(self) -> Set[str]:
+        """Flattened maps of which only some entries were loaded."""
+        if self.loaded is None:
+            return set()
+        maps = {f.partition(":")[0] for f in self.loaded if ":" in f}
+        return maps - self.loaded
+
+    def _is_loaded(self, field: str) -> bool:
+        assert self.loaded is not None
+        return field in self.loaded or field.partition(":")[0] in self.loaded
+
+    async def load_fields(self, *fields: str) -> None:
+        """Fetch fields not loaded yet (no-op for a fully loaded session).
+
+        Without arguments, the rest of the session is loaded. Keys already
+        present locally are kept (they may have been modified).
+        """
+        if self.loaded is None:
+            return
+        missing = [f for f in fields if not self._is_loaded(f)]
+        if fields and not missing:
+            return
+        if fields:
+            data = await get_session_fields(self.sid, missing)
+        else:
+            data = await get_session(self.sid)
+        for key, value in (data or {}).items():
+            current = dict.get(self, key)
+            if key not in self:
+                dict.__setitem__(self, key, value)
+            elif (
+                isinstance(current, dict)
+                and isinstance(value, dict)
+                and key not in self._dirty
+            ):
+                for sub, entry in value.items():
+                    current.setdefault(sub, entry)
+        if fields:
+            self.loaded.update(missing)
+        else:
+            self.loaded = None
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        super().__setitem__(key, value)
+        self._dirty.add(key)
+
+    def __delitem__(self, key: str) -> None:
+        super().__delitem__(key)
+        self._dirty.add(key)
+
+    def pop(self, key: str, *default: Any) -> Any:
+        if key in self:
+            self._dirty.add(key)
+        return super().pop(key, *default)
+
+    def popitem(self) -> Any:
+        item = super().popitem()
+        self._dirty.add(item[0])
+        return item
+
+    def setdefault(self, key: str, default: Any = None) -> Any:
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def update(self, *args: Any, **kwargs: Any) -> None:
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def clear(self) -> None:
+        self._dirty.update(self.keys())
+        super().clear()
+
+
+async def load_request_session(
+    request: Request, fields: Optional[Sequence[str]] = None
+) -> RequestSession:
+    """Load the session at most once per request and cache it on request.state.
+
+    A missing or invalid cookie mints a new sid; a sid whose data is gone from
+    the store gets a fresh session. In both cases the session is marked dirty
+    so it is persisted when the response is sent.
+
+    `fields` restricts the read to those fields when the hash layout is in
+    use; otherwise the whole session is loaded.
     """
+    cached = cast(Optional[RequestSession], getattr(request.state, "session", None))
+    if cached is not None:
+        await cached.load_fields(*(fields or ()))
+        return cached
+
     sid = get_sid(request)
+    token = request.cookies.get(DATA_COOKIE)
+    if sid and token and settings.session_backend == "cookie":
+        decrypted = decrypt_session(sid, token)
+        if decrypted is not None:
+            session = RequestSession(sid, decrypted[0])
+            session.in_cookie = True
+            if _cookie_needs_refresh(decrypted[1]):
+                session.mark_dirty()
+            request.state.session = session
+            return session
+
+    partial = bool(fields) and settings.session_layout == "hash"
+    data: Optional[Dict[str, Any]] = None
+    if sid and partial:
+        data = await get_session_fields(sid, cast(Sequence[str], fields))
+    elif sid:
+        data = await get_session(sid)
+    # a partial read of an existing session may legitimately be empty
+    found = data is not None if partial else bool(data)
 
     if not sid:
-        sid = _new_session_id()
-        set_session(sid, {"created_at": time.time()})
-        set_sid_cookie(response, sid)
-        return sid
+        session = RequestSession(_new_session_id(), is_new=True, restored=False)
+    else:
+        session = RequestSession(sid, data, restored=found)
+        if partial:
+            session.loaded = set(cast(Sequence[str], fields))
 
-    # cookie présent => s'assurer que Redis existe
-    session = get_session(sid)
-    if not session:
-        set_session(sid, {"created_at": time.time()})
+    if not found:
+        session["created_at"] = time.time()
 
-    # Optionnel : refresh cookie (sliding expiration) si tu veux
-    # set_sid_cookie(response, sid)
+    request.state.session = session
+    return session
 
-    return sid
+
+async def current_session(request: Request, response: Response) -> RequestSession:
+    """Dépendance FastAPI : session de la requête courante (chargée une fois).
+
+    Pose le cookie sid sur `response` quand un nouveau sid vient d'être créé.
+    """
+    session = await load_request_session(request)
+    if session.is_new:
+        set_sid_cookie(response, session.sid)
+    return session
+
+
+def session_fields(*fields: str) -> Callable[..., Awaitable[RequestSession]]:
+    """Dépendance FastAPI : comme current_session, mais ne lit que `fields`.
+
+    Avec le layout "hash", seuls ces champs sont lus (HMGET) ; la route peut en
+    demander d'autres via ``await session.load_fields(...)``. Avec le layout
+    "blob", toute la session est chargée.
+    """
+
+    async def dependency(request: Request, response: Response) -> RequestSession:
+        session = await load_request_session(request, fields)
+        if session.is_new:
+            set_sid_cookie(response, session.sid)
+        return session
+
+    return dependency
+
+
+async def _commit_to_cookie(
+    request: Request, response: Response, session: RequestSession
+) -> bool:
+    """Store the session in the data cookie; False if it does not fit."""
+    await session.load_fields()  # the cookie always carries the whole session
+    token = encrypt_session(session.sid, dict(session))
+    if len(token) > settings.session_cookie_max_bytes:
+        if DATA_COOKIE in request.cookies:
+            delete_data_cookie(response)
+        return False
+    set_data_cookie(response, token)
+    if session.restored and not session.in_cookie:
+        await delete_session(session.sid)  # moved out of Redis
+    session.in_cookie = True
+    return True
+
+
+async def commit_request_session(
+    request: Request, response: Optional[Response] = None
+) -> bool:
+    """Write the request session back to the store if it changed.
+
+    Called once per request by the app middleware, after the endpoint ran.
+    Returns True if a write happened. With session_backend="cookie", the
+    session goes to the encrypted cookie of `response` when it fits, to Redis
+    otherwise.
+    """
+    session = cast(Optional[RequestSession], getattr(request.state, "session", None))
+    if session is None or not session.modified:
+        return False
+    if settings.session_backend == "cookie" and response is not None:
+        if await _commit_to_cookie(request, response, session):
+            session.mark_clean()
+            return True
+    if session.in_cookie:
+        # too large for the cookie now: the whole session moves to Redis
+        await set_session(session.sid, dict(session))
+        session.in_cookie = False
+    elif settings.session_layout == "hash":
+        dirty = session.dirty_keys
+        await update_session_fields(
+            session.sid,
+            {k: session[k] for k in dirty if k in session},
+            [k for k in dirty if k not in session],
+            partial=session.partial_maps,
+        )
+    else:
+        await set_session(session.sid, dict(session))
+    session.mark_clean()
+    return True
+
+
+async def commit_after_body(
+    request: Request, body: AsyncIterator[Any]
+) -> AsyncIterator[Any]:
+    """Stream `body`, then write back session changes made while it ran.
+
+    A streamed endpoint (StreamingResponse) produces its body after the app
+    middleware committed the session, so later changes are saved here. The
+    headers are gone by then: a session kept in the encrypted cookie cannot be
+    updated and its late changes are dropped (logged).
+    """
+    try:
+        async for chunk in body:
+            yield chunk
+    finally:
+        session = cast(
+            Optional[RequestSession], getattr(request.state, "session", None)
+        )
+        if session is not None and session.modified:
+            if session.in_cookie:
+                logger.warning(
+                    "Session changed while streaming a response: not saved "
+                    "(cookie already sent)"
+                )
+            else:
+                await commit_request_session(request)
+
+
+async def ensure_session(request: Request, response: Response) -> str:
+    """
+    Garantit l'existence d'une session valide ET du cookie sid côté client.
+    Retourne toujours un sid valide.
+
+    À utiliser pour les routes qui renvoient leur propre Response (redirect,
+    HTML) : le cookie est posé sur cette réponse-là.
+    """
+    session = await current_session(request, response)
+    return session.sid
 
 
-def require_session(request: Request) -> str:
+async def require_session(request: Request) -> str:
     sid = get_sid(request)
     if not sid:
         raise HTTPException(401, "Pas de session (cookie sid absent).")
 
-    session = get_session(sid)
-    if not session:
+    session = await load_request_session(request)
+    if not session.restored:
+        # ne pas persister une session vide pour une requête refusée
+        session.mark_clean()
         raise HTTPException(401, "Session expirée ou introuvable.")
 
     return sid
 
 
-def destroy_session(request: Request, response: Response) -> None:
+async def destroy_session(request: Request, response: Response) -> None:
     """
     Logout clean: supprime la session Redis + cookie.
     """
     sid = get_sid(request)
     if sid:
-        delete_session(sid)
+        await delete_session(sid)
+    # nothing left to write back for this request
+    request.state.session = None
     delete_sid_cookie(response)
+    delete_data_cookie(response)
@@ -0,0 +1,217 @@
+"""
+Rafraîchissement des tokens OAuth Atlassian (refresh_token, scope
+`offline_access`).
+
+`token_entry(session, cloud_id)` renvoie l'entrée `tokens_by_cloud` à utiliser
+pour un appel Jira :
+
+- plus de `oauth_refresh_margin_seconds` de validité : telle quelle
+- dans la marge : telle quelle, un rafraîchissement part en tâche de fond
+- moins de `oauth_refresh_blocking_seconds` (ou expirée) : la requête attend
+  le rafraîchissement
+
+Un seul appel au endpoint token par refresh_token et par worker : les requêtes
+simultanées d'une même session partagent la tâche en cours (verrou local au
+processus ; les tokens ne transitent jamais par un verrou ou un canal Redis).
+La réponse est gardée sous le hash de l'ancien refresh_token, chiffrée avec la
+clé Fernet des sessions dans Redis (sinon en mémoire locale) : la requête
+suivante de la session, sur n'importe quel worker, l'applique à sa session, y
+compris après un rafraîchissement fait en tâche de fond. Les
+refresh_tokens Atlassian sont rotatifs : toutes les entrées qui partagent
+l'ancien sont mises à jour ensemble.
+
+Sans refresh_token (anciennes sessions, scope sans offline_access), rien ne
+change : l'expiration renvoie vers /login.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import time
+from typing import Any, Dict, Optional, Tuple, cast
+
+import httpx
+
+from app.auth.session_store import RequestSession, decrypt_session, encrypt_session
+from app.core.config import settings
+from app.core.redis import (
+    _count_commands,
+    _ensure_async_redis_available,
+    _mark_redis_unavailable,
+    async_redis_client,
+)
+
+logger = logging.getLogger(__name__)
+
+TOKEN_URL = f"{settings.atlassian_auth_base_url.rstrip('/')}/oauth/token"
+
+
+class TokenRefreshStats:
+    def __init__(self) -> None:
+        self.refreshed = 0  # token endpoint calls that succeeded
+        self.failed = 0
+        self.background = 0  # refreshes started ahead of expiry
+        self.reused = 0  # results applied from an earlier refresh
+
+
+stats = TokenRefreshStats()
+
+# hash du refresh_token -> rafraîchissement en cours (partagé par les requêtes)
+_pending: Dict[str, "asyncio.Task[Optional[Dict[str, Any]]]"] = {}
+# repli sans Redis : hash -> (expiration, réponse token)
+_local_results: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+
+
+def _hash(refresh_token: str) -> str:
+    return hashlib.sha256(refresh_token.encode("utf-8")).hexdigest()
+
+
+def _result_key(token_hash: str) -> str:
+    return f"oauth_refresh:{token_hash}"
+
+
+def expiry_fields(tok: Dict[str, Any]) -> Dict[str, Any]:
+    """Champs d'une entrée tokens_by_cloud issus d'une réponse token."""
+    fields: Dict[str, Any] = {"access_token": tok["access_token"]}
+    if tok.get("refresh_token"):
+        fields["refresh_token"] = tok["refresh_token"]
+    if tok.get("expires_in"):
+        fields["expires_at"] = time.time() + float(tok["expires_in"])
+    return fields
+
+
+async def _load_result(token_hash: str) -> Optional[Dict[str, Any]]:
+    if await _ensure_async_redis_available():
+        try:
+            _count_commands()
+            raw = cast(
+                Optional[str], await async_redis_client.get(_result_key(token_hash))
+            )
+            # chiffré et lié au hash : illisible sans app_secret_key
+            opened = decrypt_session(token_hash, raw) if raw else None
+            return opened[0] if opened else None
+        except Exception:
+            _mark_redis_unavailable()
+    expires, tok = _local_results.get(token_hash, (0.0, {}))
+    return tok if expires > time.time() else None
+
+
+async def _save_result(token_hash: str, tok: Dict[str, Any]) -> None:
+    # gardé le temps d'une session : ses autres requêtes l'appliqueront
+    ttl = settings.session_max_age_seconds
+    if await _ensure_async_redis_available():
+        try:
+            _count_commands()
+            await async_redis_client.set(
+                _result_key(token_hash), encrypt_session(token_hash, tok), ex=ttl
+            )
+            return
+        except Exception:
+            _mark_redis_unavailable()
+    now = time.time()
+    for h in [h for h, (exp, _) in _local_results.items() if exp <= now]:
+        del _local_results[h]
+    _local_results[token_hash] = (now + ttl, tok)
+
+
+async def _post_refresh(refresh_token: str) -> httpx.Response:
+    payload = {
+        "grant_type": "refresh_token",
+        "client_id": settings.atlassian_client_id,
+        "client_secret": settings.atlassian_client_secret,
+        "refresh_token": refresh_token,
+    }
+    async with httpx.AsyncClient(timeout=30) as client:
+        return await client.post(
+            TOKEN_URL, json=payload, headers={"Accept": "application/json"}
+        )
+
+
+async def _refresh(refresh_token: str) -> Optional[Dict[str, Any]]:
+    """Nouveaux champs de l'entrée (access / refresh token, expiration)."""
+    token_hash = _hash(refresh_token)
+    done = await _load_result(token_hash)
+    if done is not None:
+        stats.reused += 1
+        return done
+    try:
+        r = await _post_refresh(refresh_token)
+        tok = r.json() if r.status_code < 400 else {}
+    except Exception:
+        logger.warning("Refresh token Atlassian en échec", exc_info=True)
+        tok = {}
+    if not tok.get("access_token"):
+        stats.failed += 1
+        return None
+    stats.refreshed += 1
+    fields = expiry_fields(tok)
+    await _save_result(token_hash, fields)
+    return fields
+
+
+def _shared_refresh(refresh_token: str) -> "asyncio.Task[Optional[Dict[str, Any]]]":
+    token_hash = _hash(refresh_token)
+    task = _pending.get(token_hash)
+    if task is None:
+        task = asyncio.ensure_future(_refresh(refresh_token))
+        _pending[token_hash] = task
+        task.add_done_callback(lambda _: _pending.pop(token_hash, None))
+    return task
+
+
+async def _apply(
+    session: Dict[str, Any], refresh_token: str, fields: Dict[str, Any]
+) -> None:
+    """Met à jour toutes les entrées de la session qui partagent `refresh_token`."""
+    if isinstance(session, RequestSession):
+        await session.load_fields("cloud_ids", "access_token")
+        cloud_ids = session.get("cloud_ids") or []
+        await session.load_fields(*(f"tokens_by_cloud:{c}" for c in cloud_ids))
+    tokens_by_cloud = session.get("tokens_by_cloud") or {}
+    old_access = None
+    for entry in tokens_by_cloud.values():
+        if entry.get("refresh_token") == refresh_token:
+            old_access = entry.get("access_token")
+            entry.update(fields, updated_at=time.time())
+    session["tokens_by_cloud"] = tokens_by_cloud
+    if old_access and session.get("access_token") == old_access:
+        session["access_token"] = fields["access_token"]
+
+
+def _entry(session: Dict[str, Any], cloud_id: str) -> Optional[Dict[str, Any]]:
+    return cast(
+        Optional[Dict[str, Any]], (session.get("tokens_by_cloud") or {}).get(cloud_id)
+    )
+
+
+async def token_entry(
+    session: Dict[str, Any], cloud_id: str
+) -> Optional[Dict[str, Any]]:
+    """Entrée tokens_by_cloud de `cloud_id`, rafraîchie si elle expire."""
+    entry = _entry(session, cloud_id)
+    if not entry or not entry.get("refresh_token") or not entry.get("expires_at"):
+        return entry
+    refresh_token = entry["refresh_token"]
+    remaining = float(entry["expires_at"]) - time.time()
+    if remaining > settings.oauth_refresh_margin_seconds:
+        return entry
+
+    token_hash = _hash(refresh_token)
+    if remaining > settings.oauth_refresh_blocking_seconds:
+        # encore valide : rafraîchi en fond, appliqué dès qu'il est disponible
+        done = await _load_result(token_hash)
+        if done is None:
+            if token_hash not in _pending:
+                stats.background += 1
+            _shared_refresh(refresh_token)
+            return entry
+        stats.reused += 1
+        fields: Optional[Dict[str, Any]] = done
+    else:
+        fields = await asyncio.shield(_shared_refresh(refresh_token))
+    if fields is None:
+        return entry  # expiré : le 401 renverra vers /login
+    await _apply(session, refresh_token, fields)
+    return _entry(session, cloud_id)
@@ -1,9 +1,30 @@
 from __future__ import annotations
+import asyncio
+import re
 from fastapi import HTTPException, Request
-from typing import Any, Dict, Optional, cast
+from typing import (
+    Any,
+    AsyncGenerator,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    cast,
+)
 
 import httpx
 
+from app.core import http_pool, jira_cache, jira_fields, rate_limit, single_flight
+from app.core.jira_fields import FieldProfile
+from app.core.config import settings
+
+_ISSUE_KEY = re.compile(r"^[A-Za-z][A-Za-z0-9_]*-[0-9]+$")
+
+# Safe to retry after a 429 / 503 (the search POSTs only read)
+_IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+_READ_ONLY_POSTS = frozenset({"/search/jql", "/search"})
+
 
 class JiraClient:
     """Thin async client for the Atlassian Jira Cloud REST API (ex/jira).
@@ -11,15 +32,31 @@ class JiraClient:
     The implementation is intentionally small: it provides a thin wrapper
     around httpx.AsyncClient and normalizes HTTP error handling into
     application-level exceptions used by the routes.
+
+    Instances are cheap per-request views (token + cloud id) over the
+    application-wide pooled client (app.core.http_pool). `timeout` overrides
+    the pool default for this client's requests.
     """
 
-    def __init__(self, access_token: str, cloud_id: str, timeout: int = 30):
+    def __init__(
+        self,
+        access_token: str,
+        cloud_id: str,
+        timeout: Optional[float] = None,
+        *,
+        client: Optional[httpx.AsyncClient] = None,
+    ):
         self.access_token = access_token
         self.cloud_id = cloud_id
-        self._client = httpx.AsyncClient(timeout=timeout)
+        self.timeout = timeout
+        self._client = client or http_pool.shared_client()
+        # set once /search/jql answered 404/410: go to /search directly
+        self._legacy_search = False
 
     async def aclose(self) -> None:
-        await self._client.aclose()
+        # the shared pool lives as long as the app
+        if not http_pool.is_shared(self._client):
+            await self._client.aclose()
 
     @property
     def _headers(self) -> Dict[str, str]:
@@ -30,32 +67,53 @@ class JiraClient:
 
     @property
     def _ex_base_url(self) -> str:
-        return f"https://api.atlassian.com/ex/jira/{self.cloud_id}/rest/api/3"
+        base = settings.atlassian_api_base_url.rstrip("/")
+        return f"{base}/ex/jira/{self.cloud_id}/rest/api/3"
 
-    async def _request(
+    async def _send(
         self,
         method: str,
         path: str,
         *,
         params: Optional[Dict[str, Any]] = None,
         json_body: Optional[Dict[str, Any]] = None,
-    ) -> Any:
+        headers: Optional[Dict[str, str]] = None,
+    ) -> httpx.Response:
         """Perform an HTTP request to the Jira Ex API and normalize errors.
 
-        Returns parsed JSON on success. Raises PermissionError on 401 or
-        propagates an httpx.HTTPStatusError with a short snippet for other
-        HTTP error responses.
-        """
-        url = f"{self._ex_base_url}{path}"
+        Returns the response (2xx, or 304 for a conditional request). Raises
+        PermissionError on 401 or propagates an httpx.HTTPStatusError with a
+        short snippet for other HTTP error responses.
 
-        r = await self._client.request(
-            method=method,
-            url=url,
-            headers=self._headers,
-            params=params,
-            json=json_body,
-        )
+        Reads (GET, search POSTs) identical to one already in flight share
+        its response (app.core.single_flight).
+        """
+        if settings.jira_single_flight != "off" and (
+            method == "GET" or path in _READ_ONLY_POSTS
+        ):
+            key = single_flight.request_key(
+                self.cloud_id,
+                self.access_token,
+                method,
+                path,
+                params,
+                json_body,
+                headers,
+            )
+            r = await single_flight.jira.do(
+                key,
+                lambda: self._fetch(
+                    method, path, params=params, json_body=json_body, headers=headers
+                ),
+            )
+        else:
+            r = await self._fetch(
+                method, path, params=params, json_body=json_body, headers=headers
+            )
 
+        profile = jira_fields.current()
+        if profile is not None and r.status_code < 400:
+            profile.observe(len(r.content))
         if r.status_code == 401:
             raise PermissionError("Token Jira refusé ou expiré")
 
@@ -68,22 +126,93 @@ class JiraClient:
                 response=r,
             )
 
+        return r
+
+    async def _fetch(
+        self,
+        method: str,
+        path: str,
+        *,
+        params: Optional[Dict[str, Any]] = None,
+        json_body: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> httpx.Response:
+        """Send the request as is (no error handling).
+
+        Every attempt takes a token from the cloud's shared budget
+        (app.core.rate_limit). Idempotent calls answered 429 / 503 are retried
+        after `Retry-After`, or with jittered backoff, up to `jira_max_retries`.
+        """
+        url = f"{self._ex_base_url}{path}"
+        extra: Dict[str, Any] = {}
+        if self.timeout is not None:
+            extra["timeout"] = self.timeout
+        retryable = method in _IDEMPOTENT_METHODS or path in _READ_ONLY_POSTS
+
+        attempt = 0
+        while True:
+            await rate_limit.acquire(self.cloud_id)
+            r = await self._client.request(
+                method=method,
+                url=url,
+                headers={**self._headers, **(headers or {})},
+                params=params,
+                json=json_body,
+                **extra,
+            )
+            if r.status_code not in (429, 503):
+                break
+            rate_limit.stats.throttled += 1
+            delay = rate_limit.retry_after(r.headers)
+            if delay is not None:
+                # Atlassian asked every client of this cloud to hold off
+                await rate_limit.pause(self.cloud_id, delay)
+            else:
+                delay = rate_limit.backoff(attempt)
+            if (
+                not retryable
+                or attempt >= settings.jira_max_retries
+                or delay > settings.jira_retry_max_seconds
+            ):
+                break
+            attempt += 1
+            rate_limit.stats.retries += 1
+            await asyncio.sleep(delay)
+        return r
+
+    async def _request(
+        self,
+        method: str,
+        path: str,
+        *,
+        params: Optional[Dict[str, Any]] = None,
+        json_body: Optional[Dict[str, Any]] = None,
+    ) -> Any:
+        """Same as `_send`, returning the parsed JSON body."""
+        r = await self._send(method, path, params=params, json_body=json_body)
         return r.json()
 
+    async def _cached_get(
+        self, path: str, params: Optional[Dict[str, Any]] = None
+    ) -> Any:
+        """GET through the shared response cache (app.core.jira_cache)."""
+        if not settings.jira_cache_enabled:
+            return await self._request("GET", path, params=params)
+        return await jira_cache.cached_get(self, path, params)
+
     async def get_issue(
         self,
         issue_key: str,
         *,
         expand: Optional[str] = None,
+        profile: Optional[FieldProfile] = None,
     ) -> Any:
-        params: Optional[Dict[str, Any]] = None
+        """Fetch one issue: all fields, or only those of `profile`."""
+        params: Dict[str, Any] = profile.params() if profile else {}
         if expand:
-            params = {"expand": expand}
-        return await self._request(
-            "GET",
-            f"/issue/{issue_key}",
-            params=params,
-        )
+            params["expand"] = expand
+        with jira_fields.using(profile):
+            return await self._cached_get(f"/issue/{issue_key}", params or None)
 
     async def get_issue_comments(
         self,
@@ -91,10 +220,8 @@ class JiraClient:
         max_results: int = 20,
     ) -> Any:
         max_results = max(1, min(max_results, 50))
-        return await self._request(
-            "GET",
-            f"/issue/{issue_key}/comment",
-            params={"maxResults": max_results},
+        return await self._cached_get(
+            f"/issue/{issue_key}/comment", {"maxResults": max_results}
         )
 
     async def search_jql(
@@ -102,36 +229,148 @@ class JiraClient:
         jql: str,
         max_results: int = 20,
         next_page_token: Optional[str] = None,
+        start_at: Optional[int] = None,
+        profile: Optional[FieldProfile] = None,
     ) -> Any:
+        """One page of results; `start_at` only applies to the legacy /search.
+
+        Issues carry the fields of `profile` (default: issue-card).
+        """
+        profile = profile or jira_fields.ISSUE_CARD
         max_results = max(1, min(max_results, 50))
         body: Dict[str, Any] = {
             "jql": jql,
             "maxResults": max_results,
-            "fields": [
-                "summary",
-                "status",
-                "issuetype",
-                "project",
-                "assignee",
-                "updated",
-                "created",
-            ],
+            "fields": list(profile.fields),
             "fieldsByKeys": True,
         }
+        if profile.expand:
+            body["expand"] = profile.expand
+        legacy_body = dict(body)
+        if start_at:
+            legacy_body["startAt"] = start_at
         if next_page_token:
             body["nextPageToken"] = next_page_token
+        with jira_fields.using(profile):
+            if not self._legacy_search:
+                try:
+                    return await self._request("POST", "/search/jql", json_body=body)
+                except httpx.HTTPStatusError as e:
+                    if e.response is None or e.response.status_code not in (404, 410):
+                        raise
+                    self._legacy_search = True
+            return await self._request("POST", "/search", json_body=legacy_body)
+
+    async def iter_search(
+        self,
+        jql: str,
+        *,
+        page_size: int = 50,
+        limit: Optional[int] = None,
+        deadline: Optional[float] = None,
+        profile: Optional[FieldProfile] = None,
+    ) -> AsyncGenerator[Dict[str, Any], None]:
+        """Yield every issue matching `jql`, walking the pages.
+
+        Follows `nextPageToken` (/search/jql) or `startAt` / `total` (legacy
+        /search). The next page is requested while the current one is being
+        consumed. Iteration stops after `limit` issues, or once `deadline`
+        seconds have elapsed while waiting for a page.
+        """
+        loop = asyncio.get_running_loop()
+        stop_at = None if deadline is None else loop.time() + deadline
+        requested = 0
+        yielded = 0
+
+        def fetch(
+            token: Optional[str], start_at: Optional[int]
+        ) -> "asyncio.Future[Any]":
+            nonlocal requested
+            size = page_size if limit is None else min(page_size, limit - requested)
+            requested += size
+            kwargs: Dict[str, Any] = {"start_at": start_at} if start_at else {}
+            if profile is not None:
+                kwargs["profile"] = profile
+            return asyncio.ensure_future(
+                self.search_jql(jql, max_results=size, next_page_token=token, **kwargs)
+            )
+
+        pending: Optional["asyncio.Future[Any]"] = fetch(None, None)
         try:
-            return await self._request("POST", "/search/jql", json_body=body)
-        except httpx.HTTPStatusError as e:
-            if e.response is not None and e.response.status_code in (404, 410):
-                return await self._request("POST", "/search", json_body=body)
-            raise
+            while pending is not None:
+                timeout = None if stop_at is None else max(stop_at - loop.time(), 0)
+                try:
+                    page = await asyncio.wait_for(pending, timeout)
+                except asyncio.TimeoutError:
+                    pending = None
+                    return
+                page = page if isinstance(page, dict) else {}
+                issues = page.get("issues") or []
+                cursor = _next_page(page, len(issues))
+                more = limit is None or requested < limit
+                pending = fetch(*cursor) if cursor and issues and more else None
+                for issue in issues:
+                    if limit is not None and yielded >= limit:
+                        return
+                    yielded += 1
+                    yield issue
+        finally:
+            if pending is not None:
+                pending.cancel()
+
+    async def get_issues_bulk(
+        self,
+        issue_keys: Iterable[str],
+        profile: FieldProfile = jira_fields.LINKED_ISSUE,
+    ) -> Dict[str, Dict[str, Any]]:
+        """Fetch many issues with `key in (...)` searches, by key.
+
+        Keys are de-duplicated and searched in chunks of 50 (one page each),
+        concurrently, with the fields of `profile`. Keys that do not look like
+        issue keys, or that the token cannot see, are absent from the result.
+        """
+        keys = list(dict.fromkeys(k for k in issue_keys if _ISSUE_KEY.match(k)))
+        chunks: List[List[str]] = []
+        for key in keys:
+            if not chunks or len(chunks[-1]) == 50:
+                chunks.append([])
+            chunks[-1].append(key)
+        pages = await asyncio.gather(
+            *(
+                self.search_jql(
+                    f"key in ({', '.join(chunk)})",
+                    max_results=len(chunk),
+                    profile=profile,
+                )
+                for chunk in chunks
+            )
+        )
+        out: Dict[str, Dict[str, Any]] = {}
+        for page in pages:
+            for issue in (page or {}).get("issues") or []:
+                if issue.get("key"):
+                    out[issue["key"]] = issue
+        return out
 
     async def get_current_user(self) -> Any:
         """Fetch the current user's profile from Jira /myself endpoint."""
         return await self._request("GET", "/myself")
 
 
+def _next_page(
+    page: Dict[str, Any], count: int
+) -> Optional[Tuple[Optional[str], Optional[int]]]:
+    """(next_page_token, start_at) of the page after `page`, None if last."""
+    token = page.get("nextPageToken")
+    if token and not page.get("isLast"):
+        return token, None
+    if "total" in page:  # legacy /search
+        start_at = int(page.get("startAt") or 0) + count
+        if start_at < int(page["total"]):
+            return None, start_at
+    return None
+
+
 def select_cloud_id(session: Dict[str, Any], request: Request) -> str:
     """
     Détermine quelle instance Jira utiliser pour la requête courante.
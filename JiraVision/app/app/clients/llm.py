@@ -2,11 +2,13 @@ from __future__ import annotations
 
 import json
 import logging
-from typing import Any
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, cast
 
 import httpx
 from fastapi import HTTPException
 
+from app.core import llm_cache
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
@@ -68,15 +70,12 @@ class LLMClient:
     async def aclose(self) -> None:
         await self._client.aclose()
 
-    async def chat_json(self, *, system: str, user: str) -> Any:
-        messages = [
-            {"role": "system", "content": system},
-            {"role": "user", "content": user},
-        ]
-
+    def _json_request(
+        self, messages: List[Dict[str, str]]
+    ) -> Tuple[str, Dict[str, Any]]:
+        """URL and payload of a JSON-mode chat call."""
         if self._provider == "ollama":
-            url = f"{self.api_base}/api/chat"
-            payload = {
+            return f"{self.api_base}/api/chat", {
                 "model": self.model,
                 "stream": False,
                 "format": "json",
@@ -87,83 +86,21 @@ class LLMClient:
                     "num_ctx": 2048,
                 },
             }
-
-            logger.debug("[LLM] POST %s", url)
-
-            try:
-                r = await self._client.post(url, json=payload)
-                r.raise_for_status()
-                data = r.json()
-            except httpx.HTTPStatusError as e:
-                _log_http_status(e)
-                raise HTTPException(
-                    status_code=502,
-                    detail="LLM error (HTTP)",
-                )
-            except httpx.RequestError as e:
-                logger.warning("[LLM] unreachable %s: %s", url, e)
-                raise HTTPException(
-                    status_code=502,
-                    detail="LLM unreachable",
-                )
-
-            content = (data.get("message") or {}).get("content") or ""
-            try:
-                return json.loads(content)
-            except Exception:
-                logger.warning("[LLM] invalid JSON returned (len=%d)", len(content))
-                raise HTTPException(status_code=502, detail="LLM returned invalid JSON")
-
-        else:  # openai
-            url = f"{self.base_url}/chat/completions"
-            payload = {
-                "model": self.model,
-                "messages": messages,
-                "temperature": 0.2,
-                "max_tokens": 2048,
-            }
-
-            logger.debug("[LLM] POST %s", url)
-
-            try:
-                r = await self._client.post(url, json=payload)
-                r.raise_for_status()
-                data = r.json()
-            except httpx.HTTPStatusError as e:
-                _log_http_status(e)
-                raise HTTPException(status_code=502, detail="LLM error (HTTP)")
-            except httpx.RequestError as e:
-                logger.warning("[LLM] unreachable %s: %s", url, e)
-                raise HTTPException(status_code=502, detail="LLM unreachable")
-
-            # OpenAI returns choices -> message -> content
-            choices = data.get("choices") or []
-            if not choices:
-                raise HTTPException(
-                    status_code=502,
-                    detail="LLM returned empty response",
-                )
-            content = (choices[0].get("message") or {}).get("content") or ""
-            try:
-                return json.loads(content)
-            except Exception:
-                logger.warning("[LLM] invalid JSON returned (len=%d)", len(content))
-                raise HTTPException(
-                    status_code=502,
-                    detail="LLM returned invalid JSON",
-                )
-
-    async def chat_text(self, *, system: str, user: str) -> str:
-        messages = [
-            {"role": "system", "content": system},
-            {"role": "user", "content": user},
-        ]
-
+        return f"{self.base_url}/chat/completions", {
+            "model": self.model,
+            "messages": messages,
+            "temperature": 0.2,
+            "max_tokens": 2048,
+        }
+
+    def _text_request(
+        self, messages: List[Dict[str, str]], *, stream: bool
+    ) -> Tuple[str, Dict[str, Any]]:
+        """URL and payload of a plain-text chat call."""
         if self._provider == "ollama":
-            url = f"{self.api_base}/api/chat"
-            payload = {
+            return f"{self.api_base}/api/chat", {
                 "model": self.model,
-                "stream": False,
+                "stream": stream,
                 "messages": messages,
                 "options": {
                     "temperature": 0.2,
@@ -171,66 +108,162 @@ class LLMClient:
                     "num_ctx": 2048,
                 },
             }
+        payload: Dict[str, Any] = {
+            "model": self.model,
+            "messages": messages,
+            "temperature": 0.2,
+            "max_tokens": 2048,
+        }
+        if stream:
+            payload["stream"] = True
+        return f"{self.base_url}/chat/completions", payload
+
+    async def _complete(self, url: str, payload: Dict[str, Any]) -> str:
+        """Message content of a non-streamed chat call ("" if none)."""
+        logger.debug("[LLM] POST %s", url)
+
+        try:
+            r = await self._client.post(url, json=payload)
+            r.raise_for_status()
+            data = r.json()
+        except httpx.HTTPStatusError as e:
+            _log_http_status(e)
+            raise HTTPException(status_code=502, detail="LLM error (HTTP)")
+        except httpx.RequestError as e:
+            logger.warning("[LLM] unreachable %s: %s", url, e)
+            raise HTTPException(status_code=502, detail="LLM unreachable")
 
-            logger.debug("[LLM] POST %s", url)
-
-            try:
-                r = await self._client.post(url, json=payload)
-                r.raise_for_status()
-                data = r.json()
-            except httpx.HTTPStatusError as e:
-                _log_http_status(e)
-                raise HTTPException(
-                    status_code=502,
-                    detail="LLM error (HTTP)",
-                )
-            except httpx.RequestError as e:
-                logger.warning("[LLM] unreachable %s: %s", url, e)
-                raise HTTPException(
-                    status_code=502,
-                    detail="LLM unreachable",
-                )
-
-            content = (data.get("message") or {}).get("content") or ""
-            if not content:
-                raise HTTPException(
-                    status_code=502,
-                    detail="LLM returned empty response",
-                )
-            return content
-
-        else:  # openai
-            url = f"{self.base_url}/chat/completions"
-            payload = {
-                "model": self.model,
-                "messages": messages,
-                "temperature": 0.2,
-                "max_tokens": 2048,
-            }
+        if self._provider == "ollama":
+            return str((data.get("message") or {}).get("content") or "")
+        # OpenAI returns choices -> message -> content
+        choices = data.get("choices") or []
+        if not choices:
+            raise HTTPException(
+                status_code=502,
+                detail="LLM returned empty response",
+            )
+        return str((choices[0].get("message") or {}).get("content") or "")
+
+    async def _chat_json(self, url: str, payload: Dict[str, Any]) -> Any:
+        content = await self._complete(url, payload)
+        try:
+            return json.loads(content)
+        except Exception:
+            logger.warning("[LLM] invalid JSON returned (len=%d)", len(content))
+            raise HTTPException(status_code=502, detail="LLM returned invalid JSON")
+
+    async def _chat_text(self, url: str, payload: Dict[str, Any]) -> str:
+        content = await self._complete(url, payload)
+        if not content:
+            raise HTTPException(
+                status_code=502,
+                detail="LLM returned empty response",
+            )
+        return content
 
-            logger.debug("[LLM] POST %s", url)
+    async def chat_json(self, *, system: str, user: str) -> Any:
+        messages = [
+            {"role": "system", "content": system},
+            {"role": "user", "content": user},
+        ]
+        url, payload = self._json_request(messages)
+        # identical calls are answered from the shared cache (app/core/llm_cache.py)
+        return await llm_cache.cached(
+            self._provider, "json", payload, lambda: self._chat_json(url, payload)
+        )
 
-            try:
-                r = await self._client.post(url, json=payload)
+    async def chat_text(self, *, system: str, user: str) -> str:
+        messages = [
+            {"role": "system", "content": system},
+            {"role": "user", "content": user},
+        ]
+        url, payload = self._text_request(messages, stream=False)
+        return cast(
+            str,
+            await llm_cache.cached(
+                self._provider, "text", payload, lambda: self._chat_text(url, payload)
+            ),
+        )
+
+    async def chat_stream(self, *, system: str, user: str) -> AsyncIterator[str]:
+        """Same as `chat_text`, yielding the text as the model generates it.
+
+        Ollama streams NDJSON lines (`message.content` per line, `done` at the
+        end), OpenAI SSE `data:` lines (`choices[0].delta.content`, then
+        `[DONE]`). Errors before the first chunk raise the same HTTPException
+        as `chat_text`; a stream that yields no text is an empty response. A
+        response cached for `chat_text` is yielded as a single chunk.
+        """
+        messages = [
+            {"role": "system", "content": system},
+            {"role": "user", "content": user},
+        ]
+        url, payload = self._text_request(messages, stream=True)
+        # cached under the same entry as the chat_text call with these prompts
+        _, text_payload = self._text_request(messages, stream=False)
+        cached = await llm_cache.lookup(self._provider, "text", text_payload)
+        if cached:
+            yield cached
+            return
+
+        logger.debug("[LLM] POST %s (stream)", url)
+
+        started = time.perf_counter()
+        parts: List[str] = []
+        try:
+            async with self._client.stream("POST", url, json=payload) as r:
+                if r.status_code >= 400:
+                    await r.aread()
                 r.raise_for_status()
-                data = r.json()
-            except httpx.HTTPStatusError as e:
-                _log_http_status(e)
-                raise HTTPException(status_code=502, detail="LLM error (HTTP)")
-            except httpx.RequestError as e:
-                logger.warning("[LLM] unreachable %s: %s", url, e)
-                raise HTTPException(status_code=502, detail="LLM unreachable")
-
-            choices = data.get("choices") or []
-            if not choices:
-                raise HTTPException(
-                    status_code=502,
-                    detail="LLM returned empty response",
-                )
-            content = (choices[0].get("message") or {}).get("content") or ""
-            if not content:
-                raise HTTPException(
-                    status_code=502,
-                    detail="LLM returned empty response",
-                )
-            return content
+                async for line in r.aiter_lines():
+                    chunk = self._stream_chunk(line)
+                    if chunk is None:
+                        break
+                    if chunk:
+                        parts.append(chunk)
+                        yield chunk
+        except httpx.HTTPStatusError as e:
+            _log_http_status(e)
+            raise HTTPException(status_code=502, detail="LLM error (HTTP)")
+        except httpx.RequestError as e:
+            logger.warning("[LLM] unreachable %s: %s", url, e)
+            raise HTTPException(status_code=502, detail="LLM unreachable")
+
+        if not parts:
+            raise HTTPException(
+                status_code=502,
+                detail="LLM returned empty response",
+            )
+        await llm_cache.store(
+            self._provider,
+            "text",
+            text_payload,
+            "".join(parts),
+            time.perf_counter() - started,
+        )
+
+    def _stream_chunk(self, line: str) -> Optional[str]:
+        """Text of one streamed line ("" if none), None at the end of stream."""
+        line = line.strip()
+        if self._provider == "openai":
+            if not line.startswith("data:"):
+                return ""  # blank separators, comments
+            line = line[len("data:"):].strip()
+            if line == "[DONE]":
+                return None
+        if not line:
+            return ""
+        try:
+            data = json.loads(line)
+        except ValueError:
+            logger.warning("[LLM] invalid stream line (len=%d)", len(line))
+            return ""
+        if data.get("error"):
+            logger.warning("[LLM] stream error: %s", str(data["error"])[:300])
+            raise HTTPException(status_code=502, detail="LLM error (stream)")
+        if self._provider == "ollama":
+            content = (data.get("message") or {}).get("content") or ""
+            return None if data.get("done") and not content else content
+        choices = data.get("choices") or []
+        delta = (choices[0].get("delta") or {}) if choices else {}
+        return delta.get("content") or ""
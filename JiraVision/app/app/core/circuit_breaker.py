@@ -0,0 +1,95 @@
+"""Circuit breaker guarding the Redis-backed stores.
+
+closed     Redis is used; a failed command opens the breaker.
+open       Redis is skipped (in-memory fallback) until `cooldown_seconds`
+           have elapsed since the last failure.
+half_open  one caller is let through to probe Redis; success closes the
+           breaker, failure re-opens it for another cool-down. Other callers
+           keep using the fallback meanwhile. A probe that never reports
+           back (its request was cancelled) is replaced by a new one after
+           `cooldown_seconds`.
+
+Every breaker registers itself by name; state and transition counters are
+exported on /metrics.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# name -> breaker, for the /metrics collector
+_registry: Dict[str, "CircuitBreaker"] = {}
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        name: str,
+        *,
+        cooldown_seconds: float,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.name = name
+        self.cooldown_seconds = cooldown_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.state = CLOSED
+        self.opened_at = 0.0
+        # (from_state, to_state) -> count
+        self.transitions: Dict[Tuple[str, str], int] = {}
+        _registry[name] = self
+
+    def _move(self, to: str) -> None:
+        # lock held
+        if to == self.state:
+            return
+        key = (self.state, to)
+        self.transitions[key] = self.transitions.get(key, 0) + 1
+        if to == OPEN:
+            logger.warning("%s unavailable, using the in-memory fallback", self.name)
+        elif to == CLOSED:
+            logger.info("%s is back", self.name)
+        self.state = to
+
+    def allow(self) -> bool:
+        """True if the caller may use Redis (in half-open: the single probe)."""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            now = self._clock()
+            if now - self.opened_at >= self.cooldown_seconds:
+                self.opened_at = now  # half-open: when the probe started
+                self._move(HALF_OPEN)
+                return True
+            return False
+
+    @property
+    def probing(self) -> bool:
+        return self.state == HALF_OPEN
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._move(CLOSED)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.opened_at = self._clock()
+            self._move(OPEN)
+
+    def reset(self) -> None:
+        """Force the closed state (tests / admin)."""
+        with self._lock:
+            self._move(CLOSED)
+
+
+def breakers() -> List[CircuitBreaker]:
+    return list(_registry.values())
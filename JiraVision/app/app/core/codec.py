@@ -0,0 +1,66 @@
+"""Versioned codec for the JSON documents stored in Redis (sessions, PO data).
+
+Stored formats (values are str: the Redis clients use decode_responses=True):
+
+    {...}            legacy: plain `json.dumps` output, still read transparently
+    j1:{...}         v1: JSON encoded with orjson (stdlib json if not installed)
+    z1:<base64>      v1, zlib-compressed: used once the JSON exceeds
+                     `codec_compress_min_bytes`
+
+`settings.codec_version = "legacy"` keeps writing plain JSON, e.g. while a
+rolling deploy still runs workers that only understand the old format.
+"""
+
+from __future__ import annotations
+
+import base64
+import json
+import zlib
+from typing import Any, Callable
+
+from app.core.config import settings
+
+try:  # optional speed-up
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None  # type: ignore[assignment]
+
+JSON_PREFIX = "j1:"
+ZLIB_PREFIX = "z1:"
+
+_dumps: Callable[[Any], bytes]
+_loads: Callable[[Any], Any]
+
+if orjson is not None:
+    _dumps = orjson.dumps
+    _loads = orjson.loads
+else:  # pragma: no cover - depends on the environment
+
+    def _dumps(obj: Any) -> bytes:
+        return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+    _loads = json.loads
+
+
+def encode(obj: Any) -> str:
+    if settings.codec_version == "legacy":
+        return json.dumps(obj)
+    data = _dumps(obj)
+    if len(data) >= settings.codec_compress_min_bytes:
+        packed = zlib.compress(data, settings.codec_compress_level)
+        return ZLIB_PREFIX + base64.b64encode(packed).decode("ascii")
+    return JSON_PREFIX + data.decode("utf-8")
+
+
+def decode(raw: str) -> Any:
+    """Decode any supported format; raises ValueError on invalid data."""
+    prefix, body = raw[:3], raw[3:]
+    if prefix == JSON_PREFIX:
+        return _loads(body)
+    if prefix == ZLIB_PREFIX:
+        try:
+            data = zlib.decompress(base64.b64decode(body))
+        except zlib.error as exc:
+            raise ValueError(f"invalid compressed value: {exc}") from exc
+        return _loads(data)
+    return json.loads(raw)
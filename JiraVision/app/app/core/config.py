@@ -14,14 +14,115 @@ class Settings(BaseSettings):
     atlassian_client_secret: str
     atlassian_redirect_uri: str | None = None
     atlassian_scopes: str
+    # Atlassian endpoints: point both at scripts/fake_atlassian.py for load tests
+    atlassian_api_base_url: str = "https://api.atlassian.com"
+    atlassian_auth_base_url: str = "https://auth.atlassian.com"
+
+    # OAuth refresh (app/auth/token_refresh.py, needs the offline_access scope):
+    # refreshed in the background within the margin, inline within the
+    # blocking window (or once expired).
+    oauth_refresh_margin_seconds: int = 300
+    oauth_refresh_blocking_seconds: int = 30
 
     app_secret_key: str
 
     # Sessions / cookies
     session_max_age_seconds: int = 60 * 60 * 8  # 8h
+    # Sliding expiration: the TTL is only pushed back once the remaining TTL
+    # drops below this fraction of session_max_age_seconds. 1.0 = every read
+    # (single GETEX).
+    session_ttl_refresh_ratio: float = 0.5
+    # "blob": one JSON string per session; "hash": one Redis hash field per
+    # key (field-level reads / partial updates). Blob sessions are migrated
+    # to the hash layout on first read.
+    session_layout: Literal["blob", "hash"] = "blob"
+    # In-process near-cache of sessions, invalidated by Redis ("tracking":
+    # client-side caching broadcast, "keyspace": keyspace notifications).
+    session_near_cache: Literal["off", "tracking", "keyspace"] = "off"
+    session_near_cache_ttl_seconds: int = 30  # safety net for lost messages
+    session_near_cache_max_entries: int = 10_000
+    # "redis": session data in Redis, only the signed sid in the cookie.
+    # "cookie": the session travels encrypted in a second cookie (no Redis
+    # round-trip); sessions whose cookie would exceed session_cookie_max_bytes
+    # fall back to Redis automatically.
+    session_backend: Literal["redis", "cookie"] = "redis"
+    session_cookie_max_bytes: int = 3800  # browsers cap a cookie at ~4 KB
     cookie_secure: bool = False  # True en prod (HTTPS)
     cookie_samesite: Literal["lax", "strict", "none"] = "lax"  # "lax" ou "none"
 
+    # Redis connection pool (session + PO stores). Timeouts are in seconds; a
+    # hung Redis fails fast and the in-memory fallback takes over.
+    redis_max_connections: int = 50
+    redis_pool_timeout: float = 1.0  # max wait for a free pooled connection
+    redis_socket_timeout: float = 2.0
+    redis_socket_connect_timeout: float = 2.0
+    redis_retry_on_timeout: bool = False
+    redis_health_check_interval: int = 30  # PING idle connections before reuse
+    # After a Redis failure, stay on the in-memory fallback this long before
+    # probing Redis again (circuit breaker half-open state).
+    redis_breaker_cooldown_seconds: float = 10.0
+
+    # Shared HTTP client for the Atlassian API (keep-alive across requests).
+    # Timeouts in seconds; jira_http2 needs the optional `h2` package.
+    jira_http_max_connections: int = 100
+    jira_http_max_keepalive: int = 20
+    jira_http_keepalive_expiry: float = 30.0
+    jira_http_timeout: float = 30.0
+    jira_http_pool_timeout: float = 5.0  # max wait for a free connection
+    jira_http2: bool = False
+
+    # Per-cloud Atlassian request budget shared by all workers (token bucket)
+    # and retries of idempotent calls answered 429 / 503.
+    jira_rate_limit_per_second: float = 10.0
+    jira_rate_limit_burst: int = 20
+    jira_max_retries: int = 3
+    jira_retry_base_seconds: float = 0.5
+    jira_retry_max_seconds: float = 30.0  # longer Retry-After: give up
+
+    # Redis cache of Jira issue / comment reads (see app/core/jira_cache.py)
+    jira_cache_enabled: bool = True
+    jira_cache_ttl_seconds: int = 60  # served without asking Jira
+    jira_cache_max_age_seconds: int = 24 * 3600  # kept for revalidation
+
+    # Jira webhooks (app/routes/webhooks.py): HMAC secret shared with Jira;
+    # unset = route disabled. With webhooks on, jira_cache_ttl_seconds and
+    # jira_index_refresh_seconds can be raised: changes invalidate entries.
+    jira_webhook_secret: str | None = None
+
+    # Identical concurrent Jira reads share one request (app/core/single_flight.py):
+    # "local" within a worker, "redis" also across workers.
+    jira_single_flight: Literal["off", "local", "redis"] = "local"
+    jira_single_flight_wait_seconds: float = 10.0  # follower wait for a leader
+
+    # Cap of /jira/search/stream (issues walked across all pages)
+    jira_search_stream_max_issues: int = 1000
+
+    # Local issue index (app/core/issue_index.py): searches on indexed projects
+    # are answered from SQLite, kept fresh by incremental `updated >=` pulls.
+    jira_index_enabled: bool = False
+    jira_index_path: str = str(BASE_DIR / "issue_index.sqlite3")
+    jira_index_refresh_seconds: float = 60.0  # max staleness of a local answer
+    jira_index_full_sync_seconds: float = 6 * 60 * 60  # also drops deleted issues
+    jira_index_max_projects: int = 20  # per user and cloud
+    jira_index_max_issues_per_project: int = 5000  # bigger projects stay live
+
+    # Retrieval of an analysed ticket (app/core/retrieval.py): issue, comments
+    # and dependencies fetched concurrently, each within its own deadline.
+    # Past it, comments / dependency details are left out (partial analysis).
+    analysis_fetch_concurrency: int = 4
+    analysis_issue_timeout_seconds: float = 15.0
+    analysis_comments_timeout_seconds: float = 8.0
+    analysis_links_timeout_seconds: float = 8.0
+
+    # Encoding of the documents stored in Redis (see app/core/codec.py)
+    codec_version: Literal["legacy", "v1"] = "v1"
+    codec_compress_min_bytes: int = 4096  # sessions (~3 KB) stay uncompressed
+    codec_compress_level: int = 6
+
+    # In-memory fallback when Redis is unreachable (per store, per worker)
+    local_store_max_entries: int = 10_000
+    local_store_max_bytes: int = 32 * 1024 * 1024  # 32 MiB
+
     openai_api_key: str | None = None
     openai_model: str = "gpt-4.1-mini"
 
@@ -34,6 +135,13 @@ class Settings(BaseSettings):
     llm_model: str = "qwen2.5:3b"
     llm_timeout: int = 600
 
+    # Redis cache of LLM responses (see app/core/llm_cache.py), shared with the
+    # ai-service. Past max_entries the oldest responses are evicted.
+    llm_cache_enabled: bool = True
+    llm_cache_ttl_seconds: int = 7 * 24 * 3600
+    llm_cache_max_entries: int = 5000
+    llm_cache_max_entry_bytes: int = 256 * 1024  # bigger responses are not stored
+
     ai_service_url: str | None = None
     ai_auth_enabled: bool = False
     ai_shared_secret: str = "dev-shared-secret"
@@ -0,0 +1,120 @@
+"""Application-wide pooled HTTP client for the Atlassian API.
+
+A single `httpx.AsyncClient` is shared by every `JiraClient`: connections to
+api.atlassian.com are kept alive across requests (no TLS handshake per call)
+and bounded by `jira_http_max_connections`; a caller waits at most
+`jira_http_pool_timeout` seconds for a free connection. HTTP/2 is used when
+`jira_http2` is set and the `h2` package is installed.
+
+The client is opened by the app lifespan and closed on shutdown. Code running
+outside the app (scripts, tests) gets one lazily, bound to the running event
+loop. Request / connection counters are exported on /metrics.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import importlib.util
+import logging
+from typing import Any, Dict, Optional
+
+import httpx
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class HttpPoolStats:
+    """Requests sent and connections opened through the shared client."""
+
+    def __init__(self) -> None:
+        self.requests = 0
+        self.connections_opened = 0
+        self.tls_handshakes = 0
+
+    async def trace(self, event: str, info: Dict[str, Any]) -> None:
+        # httpcore trace callback: only fires for new connections
+        if event == "connection.connect_tcp.complete":
+            self.connections_opened += 1
+        elif event == "connection.start_tls.complete":
+            self.tls_handshakes += 1
+
+
+stats = HttpPoolStats()
+
+_client: Optional[httpx.AsyncClient] = None
+_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+async def _on_request(request: httpx.Request) -> None:
+    stats.requests += 1
+    request.extensions["trace"] = stats.trace
+
+
+def _http2_enabled() -> bool:
+    if not settings.jira_http2:
+        return False
+    if importlib.util.find_spec("h2") is None:
+        logger.warning("JIRA_HTTP2 is set but h2 is not installed, using HTTP/1.1")
+        return False
+    return True
+
+
+def _build_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        http2=_http2_enabled(),
+        limits=httpx.Limits(
+            max_connections=settings.jira_http_max_connections,
+            max_keepalive_connections=settings.jira_http_max_keepalive,
+            keepalive_expiry=settings.jira_http_keepalive_expiry,
+        ),
+        timeout=httpx.Timeout(
+            settings.jira_http_timeout, pool=settings.jira_http_pool_timeout
+        ),
+        event_hooks={"request": [_on_request]},
+    )
+
+
+def _running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+def shared_client() -> httpx.AsyncClient:
+    """The pooled client (created on first use / for a new event loop)."""
+    global _client, _loop
+    loop = _running_loop()
+    moved = loop is not None and loop is not _loop
+    if _client is None or _client.is_closed or moved:
+        # connections cannot move between event loops: start a fresh pool
+        _client = _build_client()
+        _loop = loop
+    return _client
+
+
+def is_shared(client: Any) -> bool:
+    return client is not None and client is _client
+
+
+async def open_shared_client() -> httpx.AsyncClient:
+    return shared_client()
+
+
+async def close_shared_client() -> None:
+    global _client, _loop
+    client, _client, _loop = _client, None, None
+    if client is not None:
+        await client.aclose()
+
+
+def connection_counts() -> Dict[str, int]:
+    """Open / idle connections of the shared pool (0 before first use)."""
+    # httpx does not expose the pool: read it from the default transport
+    transport = getattr(_client, "_transport", None)
+    pool = getattr(transport, "_pool", None)
+    connections = list(getattr(pool, "connections", []) or [])
+    idle = sum(1 for conn in connections if conn.is_idle())
+    return {"open": len(connections), "idle": idle}
@@ -0,0 +1,594 @@
+"""Local SQLite index of the issues of the projects searched most.
+
+Optional (`jira_index_enabled`). Issues are indexed per cloud and per user
+scope (Jira account, or token hash): a user is only ever served issues
+pulled with their own token.
+
+indexing     the first search on a project schedules a full pull of it in the
+             background (`project = X`, at most
+             `jira_index_max_issues_per_project` issues; bigger projects are
+             never served locally); that search goes to Jira
+refresh      a search on projects synced more than `jira_index_refresh_seconds`
+             ago first pulls what changed since (`updated >= -Nm`, relative so
+             the user's Jira time zone does not matter)
+full sync    every `jira_index_full_sync_seconds` a project is pulled again
+             in full, which drops deleted issues
+
+Searches served locally: AND-ed clauses on indexed projects (`project = / in`
+on project keys is required; names and ids go to Jira) plus key, status,
+statusCategory, type, assignee, reporter, priority (=, !=, in, not in;
+currentUser(); assignee / reporter is [not] EMPTY) and labels (=, in), ORDER
+BY updated, created or key. Anything else (OR, text search, functions, other
+fields or sort keys) goes to Jira. Without ORDER BY, local results are
+sorted by creation date, newest first.
+
+Local / live searches and pulled issues are exported on /metrics.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import re
+import sqlite3
+import time
+from contextlib import closing
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Set, Tuple
+
+from app.core import jira_fields
+from app.core.config import settings
+from app.core.jira_fields import FieldProfile
+
+if TYPE_CHECKING:  # pragma: no cover
+    from app.clients.jira import JiraClient
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS issues (
+    cloud_id TEXT NOT NULL,
+    scope TEXT NOT NULL,
+    id TEXT NOT NULL,
+    key TEXT NOT NULL COLLATE NOCASE,
+    key_num INTEGER NOT NULL,
+    project TEXT NOT NULL COLLATE NOCASE,
+    status TEXT COLLATE NOCASE,
+    status_category TEXT COLLATE NOCASE,
+    issuetype TEXT COLLATE NOCASE,
+    assignee TEXT,
+    reporter TEXT,
+    priority TEXT COLLATE NOCASE,
+    labels TEXT NOT NULL,
+    created TEXT,
+    updated TEXT,
+    body TEXT NOT NULL,
+    PRIMARY KEY (cloud_id, scope, id)
+);
+CREATE INDEX IF NOT EXISTS issues_project ON issues (cloud_id, scope, project);
+CREATE TABLE IF NOT EXISTS projects (
+    cloud_id TEXT NOT NULL,
+    scope TEXT NOT NULL,
+    project TEXT NOT NULL COLLATE NOCASE,
+    complete INTEGER NOT NULL,
+    synced_at REAL NOT NULL,
+    full_sync_at REAL NOT NULL,
+    PRIMARY KEY (cloud_id, scope, project)
+);
+"""
+
+
+class IssueIndexStats:
+    def __init__(self) -> None:
+        self.local = 0  # searches served from the index
+        self.live = 0  # searches sent to Jira
+        self.full_pulls = 0
+        self.incremental_pulls = 0
+        self.pulled_issues = 0
+
+
+stats = IssueIndexStats()
+
+_initialized: Set[str] = set()  # database paths with the schema in place
+_inflight: Dict[Tuple[str, str, str], "asyncio.Task[None]"] = {}
+# (cloud, scope, projects) -> incremental refresh in progress, shared by searches
+_refreshing: Dict[Tuple[str, str, str], "asyncio.Task[bool]"] = {}
+
+
+# (cloud, value) of `project =` values that turned out to be project names
+_not_keys: Set[Tuple[str, str]] = set()
+_MAX_NOT_KEYS = 10_000
+
+# token hash -> Jira account id (tokens rotate, the account's index stays)
+_accounts: Dict[str, str] = {}
+_MAX_ACCOUNTS = 10_000
+
+
+def _token_hash(access_token: str) -> str:
+    return hashlib.sha256(access_token.encode("utf-8")).hexdigest()[:16]
+
+
+async def _account_id(client: "JiraClient", known: Optional[str]) -> Optional[str]:
+    """Jira account of the client's token (GET /myself once per token)."""
+    token = _token_hash(client.access_token)
+    if known:
+        return _accounts.setdefault(token, known)
+    if token in _accounts:
+        return _accounts[token]
+    try:
+        me = await client.get_current_user()
+    except Exception:
+        return None
+    account_id = me.get("accountId") if isinstance(me, dict) else None
+    if account_id:
+        if len(_accounts) >= _MAX_ACCOUNTS:
+            _accounts.clear()
+        _accounts[token] = str(account_id)
+    return account_id
+
+
+def scope_for(account_id: Optional[str], access_token: str) -> str:
+    if account_id:
+        return f"account:{account_id}"
+    return f"token:{_token_hash(access_token)}"
+
+
+def _connect() -> sqlite3.Connection:
+    path = settings.jira_index_path
+    conn = sqlite3.connect(path, timeout=5)
+    if path not in _initialized:
+        conn.execute("PRAGMA journal_mode=WAL")  # readers do not block a pull
+        conn.executescript(_SCHEMA)
+        _initialized.add(path)
+    return conn
+
+
+# ---------------------------------------------------------------------------
+# JQL subset
+# ---------------------------------------------------------------------------
+
+_CLAUSE = re.compile(
+    r"^\s*(\w+)\s+(not\s+in|in|is\s+not|is)\s+(.+?)\s*$"
+    r"|^\s*(\w+)\s*(!=|=)\s*(.+?)\s*$",
+    re.IGNORECASE | re.DOTALL,
+)
+_ORDER = re.compile(r"^\s*(\w+)(?:\s+(asc|desc))?\s*$", re.IGNORECASE)
+_PROJECT_KEY = re.compile(r"^[A-Z][A-Z0-9_]*$")  # names and ids go to Jira
+_VALUE = re.compile(r'^(?:"([^"]*)"|\'([^\']*)\'|([\w.@:-]+(?:\(\))?))$')
+_COLUMNS = {
+    "project": "project",
+    "key": "key",
+    "issuekey": "key",
+    "status": "status",
+    "statuscategory": "status_category",
+    "type": "issuetype",
+    "issuetype": "issuetype",
+    "assignee": "assignee",
+    "reporter": "reporter",
+    "priority": "priority",
+    "labels": "labels",
+}
+_USER_COLUMNS = {"assignee", "reporter"}
+_SORT_COLUMNS = {
+    "updated": ("updated",),
+    "created": ("created",),
+    "key": ("project", "key_num"),
+    "issuekey": ("project", "key_num"),
+}
+
+
+class Query:
+    """A JQL search the index can answer (see `parse`)."""
+
+    def __init__(
+        self, projects: List[str], where: List[str], args: List[Any], order: str
+    ) -> None:
+        self.projects = projects
+        self.where = where
+        self.args = args
+        self.order = order
+
+
+def _split_values(raw: str) -> Optional[List[str]]:
+    raw = raw.strip()
+    if raw.startswith("(") and raw.endswith(")"):
+        items = [v.strip() for v in raw[1:-1].split(",")]
+    else:
+        items = [raw]
+    values = []
+    for item in items:
+        match = _VALUE.match(item)
+        if not match:
+            return None
+        values.append(next(g for g in match.groups() if g is not None))
+    return values
+
+
+def _clause(
+    text: str, account_id: Optional[str]
+) -> Optional[Tuple[str, str, List[str]]]:
+    """(column, SQL condition, arguments) of one JQL clause, None if unsupported."""
+    match = _CLAUSE.match(text)
+    if not match:
+        return None
+    groups = match.groups()
+    field, op, raw = groups[:3] if groups[0] else groups[3:]
+    column = _COLUMNS.get(field.lower())
+    op = " ".join(op.lower().split())
+    if column is None:
+        return None
+    if op in ("is", "is not"):
+        if column not in _USER_COLUMNS or raw.strip().lower() not in ("empty", "null"):
+            return None
+        return column, f"{column} IS {'NOT ' if op == 'is not' else ''}NULL", []
+    values = _split_values(raw)
+    if not values:
+        return None
+    resolved = []
+    for value in values:
+        if value.lower() == "currentuser()":
+            if column not in _USER_COLUMNS or not account_id:
+                return None
+            value = account_id
+        elif value.endswith("()"):
+            return None  # other JQL functions
+        resolved.append(value)
+    negate = op in ("!=", "not in")
+    if column == "labels":
+        if negate:
+            return None
+        likes = " OR ".join("labels LIKE ?" for _ in resolved)
+        return column, f"({likes})", [f"%|{v}|%" for v in resolved]
+    marks = ", ".join("?" for _ in resolved)
+    return column, f"{column} {'NOT IN' if negate else 'IN'} ({marks})", resolved
+
+
+def parse(jql: str, account_id: Optional[str] = None) -> Optional[Query]:
+    """The index query for `jql`, or None when Jira has to answer it."""
+    parts = re.split(r"\border\s+by\b", jql, flags=re.IGNORECASE)
+    if len(parts) > 2:
+        return None
+    where_text = parts[0]
+    # OR, negated groups, text search, history: out of scope (even when the
+    # word sits inside a quoted value: Jira then answers)
+    if re.search(r"\bor\b|\bnot\s*\(|~|\bwas\b|\bchanged\b", where_text, re.I):
+        return None
+    projects: List[str] = []
+    where: List[str] = []
+    args: List[Any] = []
+    for text in re.split(r"\band\b", where_text, flags=re.IGNORECASE):
+        if not text.strip():
+            return None
+        clause = _clause(text, account_id)
+        if clause is None:
+            return None
+        column, condition, values = clause
+        if column == "project":
+            if "NOT IN" in condition or projects:
+                return None  # one positive project clause only
+            projects = [v.upper() for v in values]
+            if not all(_PROJECT_KEY.match(p) for p in projects):
+                return None
+        where.append(condition)
+        args.extend(values)
+    if not projects:
+        return None
+
+    order: List[str] = []
+    for item in (parts[1].split(",") if len(parts) == 2 else []):
+        match = _ORDER.match(item)
+        if not match or match.group(1).lower() not in _SORT_COLUMNS:
+            return None
+        direction = (match.group(2) or "asc").upper()
+        order.extend(f"{c} {direction}" for c in _SORT_COLUMNS[match.group(1).lower()])
+    order = order or ["created DESC"]
+    order.append("id DESC")  # stable pages
+    return Query(projects, where, args, ", ".join(order))
+
+
+# ---------------------------------------------------------------------------
+# Storage
+# ---------------------------------------------------------------------------
+
+
+def _project_key(issue: Dict[str, Any]) -> str:
+    f = issue.get("fields") or {}
+    key = str(issue.get("key") or "")
+    return str((f.get("project") or {}).get("key") or key.rsplit("-", 1)[0]).upper()
+
+
+def _row(cloud_id: str, scope: str, issue: Dict[str, Any]) -> Tuple[Any, ...]:
+    f = issue.get("fields") or {}
+    key = str(issue.get("key") or "")
+    status = f.get("status") or {}
+    labels = f.get("labels") or []
+    return (
+        cloud_id,
+        scope,
+        str(issue.get("id") or key),
+        key,
+        int(key.rsplit("-", 1)[-1]) if key.rsplit("-", 1)[-1].isdigit() else 0,
+        _project_key(issue),
+        status.get("name"),
+        (status.get("statusCategory") or {}).get("name"),
+        (f.get("issuetype") or {}).get("name"),
+        (f.get("assignee") or {}).get("accountId"),
+        (f.get("reporter") or {}).get("accountId"),
+        (f.get("priority") or {}).get("name"),
+        "|" + "|".join(labels) + "|" if labels else "",
+        f.get("created"),
+        f.get("updated"),
+        json.dumps(issue, ensure_ascii=False),
+    )
+
+
+def _store(
+    cloud_id: str,
+    scope: str,
+    issues: Sequence[Dict[str, Any]],
+    *,
+    replace: Sequence[str] = (),
+    synced: Sequence[str] = (),
+    complete: bool = True,
+    now: float,
+) -> None:
+    """Upsert `issues`; `replace`: projects whose rows are dropped first."""
+    with closing(_connect()) as conn, conn:
+        for project in replace:
+            conn.execute(
+                "DELETE FROM issues WHERE cloud_id = ? AND scope = ? AND project = ?",
+                (cloud_id, scope, project),
+            )
+        conn.executemany(
+            "INSERT OR REPLACE INTO issues VALUES "
+            "(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [_row(cloud_id, scope, issue) for issue in issues],
+        )
+        for project in replace:
+            conn.execute(
+                "INSERT OR REPLACE INTO projects VALUES (?, ?, ?, ?, ?, ?)",
+                (cloud_id, scope, project, int(complete), now, now),
+            )
+        for project in synced:
+            conn.execute(
+                "UPDATE projects SET synced_at = ? "
+                "WHERE cloud_id = ? AND scope = ? AND project = ?",
+                (now, cloud_id, scope, project),
+            )
+
+
+def _projects(
+    cloud_id: str, scope: str, projects: Sequence[str]
+) -> Dict[str, Tuple[bool, float, float]]:
+    """project -> (complete, synced_at, full_sync_at) for the indexed ones."""
+    marks = ", ".join("?" for _ in projects)
+    with closing(_connect()) as conn:
+        rows = conn.execute(
+            "SELECT project, complete, synced_at, full_sync_at FROM projects "
+            f"WHERE cloud_id = ? AND scope = ? AND project IN ({marks})",
+            (cloud_id, scope, *projects),
+        ).fetchall()
+    return {p.upper(): (bool(c), s, f) for p, c, s, f in rows}
+
+
+def _count_projects(cloud_id: str, scope: str) -> int:
+    with closing(_connect()) as conn:
+        row = conn.execute(
+            "SELECT COUNT(*) FROM projects WHERE cloud_id = ? AND scope = ?",
+            (cloud_id, scope),
+        ).fetchone()
+    return int(row[0])
+
+
+def _select(
+    cloud_id: str, scope: str, query: Query, limit: int
+) -> Tuple[List[Dict[str, Any]], int]:
+    where = " AND ".join(["cloud_id = ?", "scope = ?", *query.where])
+    args = [cloud_id, scope, *query.args]
+    with closing(_connect()) as conn:
+        total = conn.execute(f"SELECT COUNT(*) FROM issues WHERE {where}", args)
+        count = int(total.fetchone()[0])
+        rows = conn.execute(
+            f"SELECT body FROM issues WHERE {where} ORDER BY {query.order} LIMIT ?",
+            [*args, limit],
+        ).fetchall()
+    return [json.loads(body) for (body,) in rows], count
+
+
+def forget(cloud_id: str, keys: Sequence[str] = (), ids: Sequence[str] = ()) -> int:
+    """Drop issues from every scope of `cloud_id` (by key or id)."""
+    if not keys and not ids:
+        return 0
+    key_marks = ", ".join("?" for _ in keys) or "NULL"
+    id_marks = ", ".join("?" for _ in ids) or "NULL"
+    with closing(_connect()) as conn, conn:
+        cur = conn.execute(
+            "DELETE FROM issues WHERE cloud_id = ? "
+            f"AND (key IN ({key_marks}) OR id IN ({id_marks}))",
+            (cloud_id, *keys, *ids),
+        )
+        return int(cur.rowcount)
+
+
+def mark_stale(cloud_id: str, projects: Sequence[str]) -> None:
+    """Make the next search on `projects` (every scope) pull changes first."""
+    if not projects:
+        return
+    marks = ", ".join("?" for _ in projects)
+    stale = time.time() - settings.jira_index_refresh_seconds - 1
+    with closing(_connect()) as conn, conn:
+        conn.execute(
+            "UPDATE projects SET synced_at = MIN(synced_at, ?) "
+            f"WHERE cloud_id = ? AND project IN ({marks})",
+            (stale, cloud_id, *projects),
+        )
+
+
+# ---------------------------------------------------------------------------
+# Pulls from Jira
+# ---------------------------------------------------------------------------
+
+
+async def _pull(client: "JiraClient", jql: str, limit: int) -> List[Dict[str, Any]]:
+    issues = [
+        issue
+        async for issue in client.iter_search(
+            jql, limit=limit, profile=jira_fields.ISSUE_INDEX
+        )
+    ]
+    stats.pulled_issues += len(issues)
+    return issues
+
+
+async def _full_pull(client: "JiraClient", scope: str, project: str) -> None:
+    cap = settings.jira_index_max_issues_per_project
+    started = time.time()
+    try:
+        issues = await _pull(client, f'project = "{project}" ORDER BY key ASC', cap + 1)
+    except Exception:
+        logger.warning("issue index: full pull of %s failed", project, exc_info=True)
+        return
+    stats.full_pulls += 1
+    # rows and the projects entry live under the key Jira returned: a project
+    # name shaped like a key (`project = PLATFORM` for PLT) is never served
+    keys = sorted({_project_key(issue) for issue in issues}) or [project]
+    if keys != [project]:
+        if len(_not_keys) >= _MAX_NOT_KEYS:
+            _not_keys.clear()
+        _not_keys.add((client.cloud_id, project))
+    await asyncio.to_thread(
+        _store,
+        client.cloud_id,
+        scope,
+        issues[:cap],
+        replace=keys,
+        complete=len(issues) <= cap,
+        now=started,
+    )
+
+
+def _schedule_full_pull(client: "JiraClient", scope: str, project: str) -> None:
+    key = (client.cloud_id, scope, project)
+    if key in _inflight:
+        return
+    task = asyncio.ensure_future(_full_pull(client, scope, project))
+    _inflight[key] = task
+    task.add_done_callback(lambda _: _inflight.pop(key, None))
+
+
+async def _refresh(
+    client: "JiraClient", scope: str, projects: Sequence[str], since: float
+) -> bool:
+    """Pull what changed in `projects` since `since`; False if Jira failed."""
+    started = time.time()
+    minutes = math.ceil((started - since) / 60) + 1  # JQL dates are per minute
+    names = ", ".join(f'"{p}"' for p in projects)
+    jql = f'project in ({names}) AND updated >= "-{minutes}m" ORDER BY updated ASC'
+    cap = settings.jira_index_max_issues_per_project
+    try:
+        issues = await _pull(client, jql, cap)
+    except Exception:
+        logger.warning("issue index: refresh of %s failed", names, exc_info=True)
+        return False
+    stats.incremental_pulls += 1
+    await asyncio.to_thread(
+        _store, client.cloud_id, scope, issues, synced=projects, now=started
+    )
+    if len(issues) >= cap:  # too much changed to trust the delta
+        for project in projects:
+            _schedule_full_pull(client, scope, project)
+    return True
+
+
+async def _shared_refresh(
+    client: "JiraClient", scope: str, projects: Sequence[str], since: float
+) -> bool:
+    key = (client.cloud_id, scope, ",".join(sorted(projects)))
+    task = _refreshing.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_refresh(client, scope, projects, since))
+        _refreshing[key] = task
+        task.add_done_callback(lambda _: _refreshing.pop(key, None))
+    return await asyncio.shield(task)
+
+
+# ---------------------------------------------------------------------------
+# Search
+# ---------------------------------------------------------------------------
+
+
+def _servable(profile: FieldProfile) -> bool:
+    indexed = set(jira_fields.ISSUE_INDEX.fields)
+    return not profile.expand and set(profile.fields) <= indexed
+
+
+async def search(
+    client: "JiraClient",
+    jql: str,
+    *,
+    max_results: int,
+    profile: FieldProfile,
+    account_id: Optional[str] = None,
+) -> Optional[Dict[str, Any]]:
+    """A /search/jql-shaped page from the index, or None: ask Jira."""
+    if not settings.jira_index_enabled:
+        return None
+    query = None
+    if _servable(profile):
+        account_id = await _account_id(client, account_id)
+        query = parse(jql, account_id)
+    if query is None:
+        stats.live += 1
+        return None
+    max_results = max(1, min(max_results, 50))  # as search_jql
+    scope = scope_for(account_id, client.access_token)
+    cloud_id = client.cloud_id
+    if any((cloud_id, p) in _not_keys for p in query.projects):
+        stats.live += 1
+        return None
+    try:
+        state = await asyncio.to_thread(_projects, cloud_id, scope, query.projects)
+    except sqlite3.Error:
+        logger.warning("issue index unavailable", exc_info=True)
+        stats.live += 1
+        return None
+
+    now = time.time()
+    missing = [p for p in query.projects if p not in state]
+    if missing:
+        indexed = await asyncio.to_thread(_count_projects, cloud_id, scope)
+        room = settings.jira_index_max_projects - indexed
+        for project in missing[: max(room, 0)]:
+            _schedule_full_pull(client, scope, project)
+        stats.live += 1
+        return None
+    if not all(complete for complete, _, _ in state.values()):
+        stats.live += 1
+        return None
+    for project, (_, _, full_sync_at) in state.items():
+        if now - full_sync_at > settings.jira_index_full_sync_seconds:
+            _schedule_full_pull(client, scope, project)  # meanwhile: incremental
+    since = min(synced_at for _, synced_at, _ in state.values())
+    if now - since > settings.jira_index_refresh_seconds:
+        if not await _shared_refresh(client, scope, query.projects, since):
+            stats.live += 1
+            return None
+
+    try:
+        issues, total = await asyncio.to_thread(
+            _select, cloud_id, scope, query, max_results
+        )
+    except sqlite3.Error:
+        logger.warning("issue index unavailable", exc_info=True)
+        stats.live += 1
+        return None
+    stats.local += 1
+    return {
+        "issues": issues,
+        "total": total,
+        "startAt": 0,
+        "maxResults": max_results,
+        "isLast": total <= max_results,
+    }
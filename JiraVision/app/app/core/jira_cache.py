@@ -0,0 +1,189 @@
+"""Shared response cache for Jira issue / comment reads.
+
+Entries live in Redis (shared by every worker), keyed by cloud, token scope
+(hash of the access token: a user never sees a response fetched with someone
+else's permissions), path and query parameters.
+
+fresh        younger than `jira_cache_ttl_seconds`: served without calling Jira
+stale        revalidated with If-None-Match / If-Modified-Since when Jira sent
+             an ETag / Last-Modified (a 304 costs no payload), re-fetched
+             otherwise
+gone         after `jira_cache_max_age_seconds` Redis drops the entry
+
+Each entry is tagged with its issue (key and id, see `_tags`) so that
+`invalidate_issue` drops every cached read of an issue, whatever the token
+scope, when a Jira webhook reports a change (app/routes/webhooks.py).
+
+The cache is skipped while Redis is unavailable (no in-memory fallback: the
+payloads are large and the call can always go to Jira). Hit / revalidation /
+miss counters and the payload bytes not downloaded are exported on /metrics.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import re
+import time
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Optional, Set, cast
+from urllib.parse import urlencode
+
+from app.core import codec
+from app.core.config import settings
+from app.core.redis import (
+    _count_commands,
+    _ensure_async_redis_available,
+    _mark_redis_unavailable,
+    async_redis_client,
+)
+
+if TYPE_CHECKING:  # pragma: no cover
+    from app.clients.jira import JiraClient
+
+
+class JiraCacheStats:
+    def __init__(self) -> None:
+        self.hits = 0  # fresh entry, no call to Jira
+        self.revalidated = 0  # stale entry confirmed by a 304
+        self.misses = 0
+        self.bytes_saved = 0  # payload bytes served from the cache
+        self.invalidated = 0  # entries dropped on a webhook event
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.revalidated + self.misses
+        return (self.hits + self.revalidated) / total if total else 0.0
+
+
+stats = JiraCacheStats()
+
+# /issue/{key or id} and /issue/{key or id}/comment
+_ISSUE_PATH = re.compile(r"^/issue/([^/?]+)(?:/comment)?$")
+
+
+def cache_key(
+    cloud_id: str, access_token: str, path: str, params: Optional[Dict[str, Any]]
+) -> str:
+    scope = hashlib.sha256(access_token.encode("utf-8")).hexdigest()[:16]
+    query = urlencode(sorted((params or {}).items()))
+    return f"jira_cache:{cloud_id}:{scope}:{path}?{query}"
+
+
+async def _load(key: str) -> Optional[Dict[str, Any]]:
+    try:
+        _count_commands()
+        raw = cast(Optional[str], await async_redis_client.get(key))
+    except Exception:
+        _mark_redis_unavailable()
+        raise
+    return cast(Dict[str, Any], codec.decode(raw)) if raw else None
+
+
+def tag_key(cloud_id: str, issue: str) -> str:
+    return f"jira_cache_tag:{cloud_id}:{issue.upper()}"
+
+
+def _tags(path: str, body: Any) -> Set[str]:
+    """Issues an entry belongs to: the one in its path, plus its key and id."""
+    match = _ISSUE_PATH.match(path)
+    if not match:
+        return set()
+    tags = {match.group(1)}
+    if isinstance(body, dict):
+        tags.update(str(body[k]) for k in ("id", "key") if body.get(k))
+    return tags
+
+
+async def _save(
+    key: str, entry: Dict[str, Any], cloud_id: str, tags: Set[str]
+) -> None:
+    max_age = settings.jira_cache_max_age_seconds
+    try:
+        _count_commands(1 + 2 * len(tags))
+        async with async_redis_client.pipeline(transaction=False) as pipe:
+            pipe.set(key, codec.encode(entry), ex=max_age)
+            for tag in tags:
+                pipe.sadd(tag_key(cloud_id, tag), key)
+                pipe.expire(tag_key(cloud_id, tag), max_age)
+            await pipe.execute()
+    except Exception:
+        _mark_redis_unavailable()
+
+
+async def invalidate_issue(cloud_id: str, issues: Iterable[str]) -> int:
+    """Drop every cached read of `issues` (keys or ids); number of entries."""
+    tags = [tag_key(cloud_id, issue) for issue in issues if issue]
+    if not tags or not await _ensure_async_redis_available():
+        return 0
+    try:
+        _count_commands(len(tags))
+        async with async_redis_client.pipeline(transaction=False) as pipe:
+            for tag in tags:
+                pipe.smembers(tag)
+            members = await pipe.execute()
+        keys = set().union(*members)
+        _count_commands(2 if keys else 1)
+        async with async_redis_client.pipeline(transaction=False) as pipe:
+            if keys:
+                pipe.delete(*keys)
+            pipe.delete(*tags)
+            deleted = await pipe.execute()
+    except Exception:
+        _mark_redis_unavailable()
+        return 0
+    dropped = int(deleted[0]) if keys else 0  # entries may have expired
+    stats.invalidated += dropped
+    return dropped
+
+
+def _validators(entry: Dict[str, Any]) -> Dict[str, str]:
+    headers: Dict[str, str] = {}
+    if entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+    return headers
+
+
+async def cached_get(
+    client: "JiraClient", path: str, params: Optional[Dict[str, Any]] = None
+) -> Any:
+    """GET `path` for `client`, through the cache when Redis is usable."""
+    if not await _ensure_async_redis_available():
+        return await client._request("GET", path, params=params)
+    key = cache_key(client.cloud_id, client.access_token, path, params)
+    try:
+        entry = await _load(key)
+    except Exception:
+        return await client._request("GET", path, params=params)
+
+    now = time.time()
+    ttl = settings.jira_cache_ttl_seconds
+    if entry is not None and now - entry["fetched_at"] < ttl:
+        stats.hits += 1
+        stats.bytes_saved += entry["size"]
+        return entry["body"]
+
+    conditional = _validators(entry) if entry is not None else {}
+    r = await client._send("GET", path, params=params, headers=conditional)
+    if entry is not None and r.status_code == 304:
+        stats.revalidated += 1
+        stats.bytes_saved += entry["size"]
+        entry["fetched_at"] = now
+        await _save(key, entry, client.cloud_id, _tags(path, entry["body"]))
+        return entry["body"]
+
+    stats.misses += 1
+    body = r.json()
+    await _save(
+        key,
+        {
+            "etag": r.headers.get("etag"),
+            "last_modified": r.headers.get("last-modified"),
+            "fetched_at": now,
+            "size": len(r.content),
+            "body": body,
+        },
+        client.cloud_id,
+        _tags(path, body),
+    )
+    return body
@@ -0,0 +1,150 @@
+"""Jira change events (webhooks) and what they invalidate.
+
+`IssueEvent.from_payload` reads an issue, comment or issue-link webhook;
+`publish` then applies it:
+
+response cache   cached issue / comment reads of the issues involved are
+                 dropped (app/core/jira_cache.py), for every token scope
+issue index      issue changes mark the project stale (the next search pulls
+                 the changes), deletions and moves drop the rows
+                 (app/core/issue_index.py)
+PO projects      a change on an issue reported by a known PO user flags their
+                 project list for a resync on next read
+listeners        callables registered with `subscribe` (e.g. a cache of
+                 analyses) receive every event
+
+Invalidation is idempotent: a redelivered event costs a few Redis commands.
+Events are counted by kind and exported on /metrics.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from app.core import issue_index, jira_cache, po_project_store
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# webhookEvent -> kind
+_KINDS = {
+    "jira:issue_created": "issue_created",
+    "jira:issue_updated": "issue_updated",
+    "jira:issue_deleted": "issue_deleted",
+    "comment_created": "comment",
+    "comment_updated": "comment",
+    "comment_deleted": "comment",
+    "issuelink_created": "issuelink",
+    "issuelink_deleted": "issuelink",
+}
+# changelog fields after which an issue no longer belongs to its project rows
+_MOVE_FIELDS = {"project", "key"}
+
+
+class IssueEvent:
+    def __init__(
+        self,
+        cloud_id: str,
+        kind: str,
+        issues: Set[str],
+        projects: Set[str],
+        reporters: Set[str],
+        moved: bool = False,
+        payload: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        self.cloud_id = cloud_id
+        self.kind = kind
+        self.issues = issues  # keys and ids of the issues involved
+        self.projects = projects
+        self.reporters = reporters  # account ids
+        self.moved = moved
+        self.payload = payload or {}
+
+    @classmethod
+    def from_payload(
+        cls, cloud_id: str, payload: Dict[str, Any]
+    ) -> Optional["IssueEvent"]:
+        """The event of a webhook body, None for events we do not handle."""
+        kind = _KINDS.get(str(payload.get("webhookEvent") or ""))
+        if kind is None:
+            return None
+        issues: Set[str] = set()
+        projects: Set[str] = set()
+        reporters: Set[str] = set()
+
+        issue = payload.get("issue") or {}
+        issues.update(str(issue[k]) for k in ("id", "key") if issue.get(k))
+        fields = issue.get("fields") or {}
+        project = (fields.get("project") or {}).get("key")
+        if project:
+            projects.add(str(project).upper())
+        reporter = (fields.get("reporter") or {}).get("accountId")
+        if reporter:
+            reporters.add(str(reporter))
+
+        link = payload.get("issueLink") or {}
+        for k in ("sourceIssueId", "destinationIssueId"):
+            if link.get(k):
+                issues.add(str(link[k]))
+
+        moved = False
+        for item in (payload.get("changelog") or {}).get("items") or []:
+            name = str(item.get("field") or "").lower()
+            if name in _MOVE_FIELDS:
+                moved = True
+            if name == "key" and item.get("fromString"):
+                issues.add(str(item["fromString"]))  # reads cached under it
+            if name == "reporter" and item.get("from"):
+                reporters.add(str(item["from"]))  # loses the issue
+        return cls(cloud_id, kind, issues, projects, reporters, moved, payload)
+
+
+class JiraEventStats:
+    def __init__(self) -> None:
+        self.received: Dict[str, int] = {}  # kind -> events
+
+    def count(self, kind: str) -> None:
+        self.received[kind] = self.received.get(kind, 0) + 1
+
+
+stats = JiraEventStats()
+
+Listener = Callable[[IssueEvent], Awaitable[None]]
+_listeners: List[Listener] = []
+
+
+def subscribe(listener: Listener) -> Listener:
+    """Call `listener` on every event (usable as a decorator)."""
+    _listeners.append(listener)
+    return listener
+
+
+async def _update_index(event: IssueEvent) -> None:
+    if event.kind == "issue_deleted" or event.moved:
+        ids = sorted(i for i in event.issues if i.isdigit())
+        keys = sorted(i for i in event.issues if not i.isdigit())
+        await asyncio.to_thread(issue_index.forget, event.cloud_id, keys, ids)
+    if event.kind != "issue_deleted":
+        await asyncio.to_thread(
+            issue_index.mark_stale, event.cloud_id, sorted(event.projects)
+        )
+
+
+async def publish(event: IssueEvent) -> None:
+    stats.count(event.kind)
+    await jira_cache.invalidate_issue(event.cloud_id, event.issues)
+    if event.kind.startswith("issue_"):
+        if settings.jira_index_enabled:
+            try:
+                await _update_index(event)
+            except Exception:
+                logger.warning("issue index update failed", exc_info=True)
+        for account_id in event.reporters:
+            await asyncio.to_thread(po_project_store.mark_stale, account_id)
+    for listener in list(_listeners):
+        try:
+            await listener(event)
+        except Exception:
+            logger.warning("jira event listener failed", exc_info=True)
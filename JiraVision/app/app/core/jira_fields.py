@@ -0,0 +1,109 @@
+"""Field-projection profiles for Jira calls.
+
+Each call site asks Jira for exactly the fields (and expansions) it reads
+downstream instead of the full issue. Profiles count the responses fetched
+under them and their size; both are exported on /metrics.
+
+issue-card         /jira/issue and /jira/search (_map_issue, _map_search_result)
+issue-list         /ai/summarize-jql (_simplify_issues)
+analysis           /ai/analyze-issue[/stream]: ticket shown to the LLM, links
+linked-issue       dependencies of an analysed ticket (get_issues_bulk)
+project-discovery  PO project sync (project of each active issue)
+issue-index        pulls of the local issue index (core/issue_index.py); searches
+                   whose profile is a subset of it can be served by the index
+"""
+
+from __future__ import annotations
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Sequence
+
+
+class FieldProfile:
+    def __init__(
+        self, name: str, fields: Sequence[str], expand: Optional[str] = None
+    ) -> None:
+        self.name = name
+        self.fields = tuple(fields)
+        self.expand = expand
+        self.responses = 0
+        self.bytes = 0
+        _registry[name] = self
+
+    def params(self) -> Dict[str, str]:
+        """Query parameters of a GET /issue call."""
+        params = {"fields": ",".join(self.fields)}
+        if self.expand:
+            params["expand"] = self.expand
+        return params
+
+    def observe(self, size: int) -> None:
+        self.responses += 1
+        self.bytes += size
+
+
+# name -> profile, for the /metrics collector
+_registry: Dict[str, FieldProfile] = {}
+
+ISSUE_CARD = FieldProfile(
+    "issue-card",
+    ("summary", "status", "issuetype", "project", "assignee", "updated", "created"),
+)
+ISSUE_LIST = FieldProfile(
+    "issue-list",
+    ("summary", "status", "assignee", "priority", "updated", "created"),
+)
+ANALYSIS = FieldProfile(
+    "analysis",
+    (
+        "summary",
+        "status",
+        "issuetype",
+        "assignee",
+        "reporter",
+        "priority",
+        "labels",
+        "description",
+        "issuelinks",
+    ),
+)
+LINKED_ISSUE = FieldProfile("linked-issue", ("summary", "status", "issuetype"))
+PROJECT_DISCOVERY = FieldProfile("project-discovery", ("project",))
+ISSUE_INDEX = FieldProfile(
+    "issue-index",
+    (
+        "summary",
+        "status",
+        "issuetype",
+        "project",
+        "assignee",
+        "reporter",
+        "priority",
+        "labels",
+        "updated",
+        "created",
+    ),
+)
+
+# Profile of the Jira call in progress (read by JiraClient._send)
+_current: ContextVar[Optional[FieldProfile]] = ContextVar(
+    "jira_field_profile", default=None
+)
+
+
+@contextmanager
+def using(profile: Optional[FieldProfile]) -> Iterator[None]:
+    token = _current.set(profile)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+def current() -> Optional[FieldProfile]:
+    return _current.get()
+
+
+def profiles() -> List[FieldProfile]:
+    return list(_registry.values())
@@ -0,0 +1,193 @@
+"""Shared cache of LLM responses (app/clients/llm.py).
+
+A call with the same provider, model, prompts and generation options as an
+earlier one gets the stored response instead of asking the model again:
+re-analysing an unchanged ticket or re-running a JQL summary costs one Redis
+read instead of seconds of generation. The prompts embed the Jira data, so a
+changed ticket is a new key and nothing needs invalidating.
+
+key      llm_cache:{provider}:{model}:{kind}:{sha256 of the request payload}
+         (kind: "json" or "text"; the payload holds the prompts and options,
+         hashed as sorted compact JSON: the ai-service computes the same keys
+         and shares the entries)
+ttl      `llm_cache_ttl_seconds`
+budget   responses larger than `llm_cache_max_entry_bytes` are not stored;
+         past `llm_cache_max_entries` the oldest entries are evicted (sorted
+         set `llm_cache:index`, trimmed on every write)
+
+Identical concurrent calls within a worker share one model call; a streamed
+answer (`chat_stream`) is served from and stored under the entry of the same
+`chat_text` call. Errors are never cached, an unreadable entry is deleted and
+counted as a miss, and the cache is skipped while Redis is unavailable. Hits,
+misses and the model time saved are exported on /metrics.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, cast
+
+from app.core import codec
+from app.core.config import settings
+from app.core.redis import (
+    _count_commands,
+    _ensure_async_redis_available,
+    _mark_redis_unavailable,
+    async_redis_client,
+)
+
+logger = logging.getLogger(__name__)
+
+INDEX_KEY = "llm_cache:index"  # key -> time it was stored
+
+
+class LLMCacheStats:
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0  # lookups not served from Redis
+        self.coalesced = 0  # waited for an identical call already running
+        self.saved_seconds = 0.0  # model time of the responses served from Redis
+        self.evicted = 0  # entries dropped to stay within llm_cache_max_entries
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+stats = LLMCacheStats()
+
+# cache key -> model call in progress (shared by identical calls)
+_pending: Dict[str, "asyncio.Task[Any]"] = {}
+
+
+def cache_key(provider: str, kind: str, payload: Dict[str, Any]) -> str:
+    body = json.dumps(
+        payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False
+    )
+    digest = hashlib.sha256(body.encode("utf-8")).hexdigest()
+    return f"llm_cache:{provider}:{payload.get('model')}:{kind}:{digest}"
+
+
+async def _load(key: str) -> Optional[Dict[str, Any]]:
+    try:
+        _count_commands()
+        raw = cast(Optional[str], await async_redis_client.get(key))
+    except Exception:
+        _mark_redis_unavailable()
+        return None
+    if not raw:
+        return None
+    try:
+        entry = codec.decode(raw)
+    except ValueError:
+        entry = None
+    if isinstance(entry, dict) and "value" in entry:
+        return entry
+    logger.warning("Unreadable LLM cache entry dropped: %s", key)
+    await _drop(key)
+    return None
+
+
+async def _drop(key: str) -> None:
+    try:
+        _count_commands(2)
+        await async_redis_client.delete(key)
+        await async_redis_client.zrem(INDEX_KEY, key)
+    except Exception:
+        _mark_redis_unavailable()
+
+
+async def _save(key: str, entry: Dict[str, Any]) -> None:
+    raw = codec.encode(entry)
+    if len(raw) > settings.llm_cache_max_entry_bytes:
+        return
+    if not await _ensure_async_redis_available():
+        return
+    ttl = settings.llm_cache_ttl_seconds
+    now = time.time()
+    try:
+        _count_commands(5)
+        async with async_redis_client.pipeline(transaction=False) as pipe:
+            pipe.set(key, raw, ex=ttl)
+            pipe.zadd(INDEX_KEY, {key: now})
+            pipe.expire(INDEX_KEY, ttl)
+            pipe.zremrangebyscore(INDEX_KEY, "-inf", now - ttl)  # expired
+            pipe.zcard(INDEX_KEY)
+            size = (await pipe.execute())[-1]
+        excess = int(size) - settings.llm_cache_max_entries
+        if excess > 0:
+            _count_commands()
+            oldest = cast(
+                List[Tuple[str, float]],
+                await async_redis_client.zpopmin(INDEX_KEY, excess),
+            )
+            keys = [member for member, _ in oldest]
+            if keys:
+                _count_commands()
+                stats.evicted += int(await async_redis_client.delete(*keys))
+    except Exception:
+        _mark_redis_unavailable()
+
+
+async def lookup(provider: str, kind: str, payload: Dict[str, Any]) -> Any:
+    """Stored response for this request payload, None when the model must run."""
+    if not settings.llm_cache_enabled or not await _ensure_async_redis_available():
+        return None
+    entry = await _load(cache_key(provider, kind, payload))
+    if entry is None:
+        stats.misses += 1
+        return None
+    stats.hits += 1
+    stats.saved_seconds += float(entry.get("elapsed") or 0.0)
+    return entry["value"]
+
+
+async def store(
+    provider: str, kind: str, payload: Dict[str, Any], value: Any, elapsed: float
+) -> None:
+    """Keep `value`, produced by the model in `elapsed` seconds, for this payload."""
+    if settings.llm_cache_enabled and value is not None:
+        entry = {"value": value, "elapsed": round(elapsed, 3)}
+        await _save(cache_key(provider, kind, payload), entry)
+
+
+async def _call_and_store(
+    provider: str,
+    kind: str,
+    payload: Dict[str, Any],
+    call: Callable[[], Awaitable[Any]],
+) -> Any:
+    started = time.perf_counter()
+    value = await call()
+    await store(provider, kind, payload, value, time.perf_counter() - started)
+    return value
+
+
+async def cached(
+    provider: str,
+    kind: str,
+    payload: Dict[str, Any],
+    call: Callable[[], Awaitable[Any]],
+) -> Any:
+    """Response of `call()` for this request payload, reused when already seen."""
+    if not settings.llm_cache_enabled:
+        return await call()
+    value = await lookup(provider, kind, payload)
+    if value is not None:
+        return value
+
+    key = cache_key(provider, kind, payload)
+    task = _pending.get(key)
+    if task is not None:
+        stats.coalesced += 1
+    else:
+        task = asyncio.ensure_future(_call_and_store(provider, kind, payload, call))
+        _pending[key] = task
+        task.add_done_callback(lambda _: _pending.pop(key, None))
+    # a cancelled caller leaves the call running for the others (and the cache)
+    return await asyncio.shield(task)
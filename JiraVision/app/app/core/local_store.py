@@ -0,0 +1,174 @@
+"""Bounded in-process key/value store used as the Redis fallback.
+
+When Redis is unreachable the session and PO project stores keep their data
+in the worker's memory. A plain dict would grow without limit (no TTL, no
+size bound); `LocalStore` adds per-entry expiration and LRU eviction on both
+an entry count and a byte budget, and keeps hit/miss/eviction counters that
+are exported on /metrics.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+_MISSING = object()
+
+# name -> store, for the /metrics collector
+_registry: Dict[str, "LocalStore"] = {}
+
+
+def _sizeof(key: str, value: str) -> int:
+    return len(key) + len(value)
+
+
+class LocalStore:
+    """LRU + TTL bounded mapping of str -> str (dict-like API).
+
+    - `ttl_seconds` (optional) is the default lifetime of an entry; `get`
+      never returns an expired value.
+    - `max_entries` / `max_bytes` bound the store; least recently used entries
+      are evicted first. A value larger than `max_bytes` is not stored.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        max_entries: int,
+        max_bytes: int,
+        ttl_seconds: Optional[int] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.name = name
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        # key -> (value, expires_at or None, size)
+        self._data: "OrderedDict[str, Tuple[str, Optional[float], int]]" = OrderedDict()
+        self._bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+        _registry[name] = self
+
+    # -- internals (lock held) -------------------------------------------
+
+    def _drop(self, key: str) -> None:
+        _, _, size = self._data.pop(key)
+        self._bytes -= size
+
+    def _expired(self, expires_at: Optional[float]) -> bool:
+        return expires_at is not None and expires_at <= self._clock()
+
+    def _evict(self) -> None:
+        while self._data and (
+            len(self._data) > self.max_entries or self._bytes > self.max_bytes
+        ):
+            key = next(iter(self._data))
+            self._drop(key)
+            self.evictions += 1
+
+    # -- public API ------------------------------------------------------
+
+    def get(self, key: str, default: Optional[str] = None) -> Optional[str]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return default
+            value, expires_at, _ = item
+            if self._expired(expires_at):
+                self._drop(key)
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: str, ttl: Optional[int] = None) -> None:
+        ttl = self.ttl_seconds if ttl is None else ttl
+        expires_at = self._clock() + ttl if ttl else None
+        size = _sizeof(key, value)
+        with self._lock:
+            if key in self._data:
+                self._drop(key)
+            if size > self.max_bytes:
+                self.evictions += 1
+                return
+            self._data[key] = (value, expires_at, size)
+            self._bytes += size
+            self._evict()
+
+    def touch(self, key: str, ttl: Optional[int] = None) -> bool:
+        """Reset the TTL of a live entry (sliding expiration)."""
+        ttl = self.ttl_seconds if ttl is None else ttl
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or self._expired(item[1]):
+                return False
+            value, _, size = item
+            self._data[key] = (value, self._clock() + ttl if ttl else None, size)
+            self._data.move_to_end(key)
+            return True
+
+    def pop(self, key: str, default: object = _MISSING) -> Optional[str]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None:
+                self._drop(key)
+                if not self._expired(item[1]):
+                    return item[0]
+        if default is _MISSING:
+            raise KeyError(key)
+        return default  # type: ignore[return-value]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def keys(self) -> List[str]:
+        with self._lock:
+            return [
+                k for k, (_, exp, _) in self._data.items() if not self._expired(exp)
+            ]
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def __getitem__(self, key: str) -> str:
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: str, value: str) -> None:
+        self.set(key, value)
+
+    def __delitem__(self, key: str) -> None:
+        self.pop(key)
+
+    def __contains__(self, key: object) -> bool:
+        with self._lock:
+            item = self._data.get(key)  # type: ignore[call-overload]
+            return item is not None and not self._expired(item[1])
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.keys())
+
+
+def stores() -> List[LocalStore]:
+    return list(_registry.values())
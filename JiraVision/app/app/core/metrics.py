@@ -0,0 +1,410 @@
+"""Custom Prometheus collectors exported on /metrics.
+
+These read live counters from in-process objects at scrape time, so each app
+instance (and its per-app CollectorRegistry) sees the same values.
+"""
+
+from __future__ import annotations
+
+from typing import Iterator
+
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from prometheus_client.registry import Collector
+
+from app.auth import token_refresh
+from app.core import (
+    circuit_breaker,
+    http_pool,
+    issue_index,
+    jira_cache,
+    jira_events,
+    jira_fields,
+    llm_cache,
+    local_store,
+    po_project_store,
+    rate_limit,
+    redis_pool,
+    single_flight,
+)
+from app.core.config import settings
+from app.core.redis import resync_stats
+
+
+class LocalStoreCollector(Collector):
+    """Hit/miss/eviction counters and occupancy of the in-memory fallbacks."""
+
+    def collect(self) -> Iterator[CounterMetricFamily | GaugeMetricFamily]:
+        hits = CounterMetricFamily(
+            "local_store_hits", "Local fallback store hits", labels=["store"]
+        )
+        misses = CounterMetricFamily(
+            "local_store_misses", "Local fallback store misses", labels=["store"]
+        )
+        evictions = CounterMetricFamily(
+            "local_store_evictions",
+            "Entries evicted from the local fallback store (LRU / size bound)",
+            labels=["store"],
+        )
+        expirations = CounterMetricFamily(
+            "local_store_expirations",
+            "Entries dropped from the local fallback store after their TTL",
+            labels=["store"],
+        )
+        entries = GaugeMetricFamily(
+            "local_store_entries",
+            "Entries held by the local fallback store",
+            labels=["store"],
+        )
+        size = GaugeMetricFamily(
+            "local_store_bytes",
+            "Approximate bytes held by the local fallback store",
+            labels=["store"],
+        )
+        for store in local_store.stores():
+            hits.add_metric([store.name], store.hits)
+            misses.add_metric([store.name], store.misses)
+            evictions.add_metric([store.name], store.evictions)
+            expirations.add_metric([store.name], store.expirations)
+            entries.add_metric([store.name], len(store))
+            size.add_metric([store.name], store.size_bytes)
+        yield hits
+        yield misses
+        yield evictions
+        yield expirations
+        yield entries
+        yield size
+
+
+class RedisPoolCollector(Collector):
+    """Utilisation of the Redis connection pools and time spent waiting."""
+
+    def collect(self) -> Iterator[CounterMetricFamily | GaugeMetricFamily]:
+        in_use = GaugeMetricFamily(
+            "redis_pool_connections_in_use",
+            "Connections checked out of the Redis pool",
+            labels=["pool"],
+        )
+        max_conn = GaugeMetricFamily(
+            "redis_pool_max_connections",
+            "Size bound of the Redis pool",
+            labels=["pool"],
+        )
+        utilisation = GaugeMetricFamily(
+            "redis_pool_utilization_ratio",
+            "Connections in use / max connections",
+            labels=["pool"],
+        )
+        last_wait = GaugeMetricFamily(
+            "redis_pool_wait_seconds_last",
+            "Time the last caller waited for a pooled connection",
+            labels=["pool"],
+        )
+        wait_total = CounterMetricFamily(
+            "redis_pool_wait_seconds",
+            "Total time spent waiting for a pooled connection",
+            labels=["pool"],
+        )
+        acquisitions = CounterMetricFamily(
+            "redis_pool_acquisitions",
+            "Connections taken from the Redis pool",
+            labels=["pool"],
+        )
+        for pool in redis_pool.pools():
+            used = pool.in_use()
+            in_use.add_metric([pool.name], used)
+            max_conn.add_metric([pool.name], pool.max_connections)
+            utilisation.add_metric([pool.name], used / max(pool.max_connections, 1))
+            last_wait.add_metric([pool.name], pool.stats.last_wait_seconds)
+            wait_total.add_metric([pool.name], pool.stats.wait_seconds_total)
+            acquisitions.add_metric([pool.name], pool.stats.acquisitions)
+        yield in_use
+        yield max_conn
+        yield utilisation
+        yield last_wait
+        yield wait_total
+        yield acquisitions
+
+
+class CircuitBreakerCollector(Collector):
+    """Current state and state transitions of the circuit breakers."""
+
+    def collect(self) -> Iterator[CounterMetricFamily | GaugeMetricFamily]:
+        state = GaugeMetricFamily(
+            "circuit_breaker_state",
+            "1 for the current state of the breaker, 0 otherwise",
+            labels=["breaker", "state"],
+        )
+        transitions = CounterMetricFamily(
+            "circuit_breaker_transitions",
+            "Circuit breaker state changes",
+            labels=["breaker", "from_state", "to_state"],
+        )
+        for breaker in circuit_breaker.breakers():
+            for name in (
+                circuit_breaker.CLOSED,
+                circuit_breaker.OPEN,
+                circuit_breaker.HALF_OPEN,
+            ):
+                state.add_metric([breaker.name, name], float(breaker.state == name))
+            for (src, dst), count in sorted(breaker.transitions.items()):
+                transitions.add_metric([breaker.name, src, dst], count)
+        yield state
+        yield transitions
+
+        resynced = CounterMetricFamily(
+            "redis_resynced_sessions",
+            "Sessions written locally during an outage and pushed back to Redis",
+        )
+        resynced.add_metric([], resync_stats["sessions"])
+        yield resynced
+
+        dropped = CounterMetricFamily(
+            "redis_resync_dropped_writes",
+            "Writes made locally during an outage and dropped on resync because "
+            "Redis held newer data",
+            labels=["store"],
+        )
+        dropped.add_metric(["session"], resync_stats["dropped"])
+        dropped.add_metric(["po"], po_project_store.resync_stats["dropped"])
+        yield dropped
+
+
+class HttpPoolCollector(Collector):
+    """Connections and requests of the shared Atlassian HTTP client."""
+
+    def collect(self) -> Iterator[CounterMetricFamily | GaugeMetricFamily]:
+        counts = http_pool.connection_counts()
+        connections = GaugeMetricFamily(
+            "jira_http_pool_connections",
+            "Connections held by the shared Jira HTTP pool",
+            labels=["state"],
+        )
+        connections.add_metric(["active"], counts["open"] - counts["idle"])
+        connections.add_metric(["idle"], counts["idle"])
+        yield connections
+
+        limit = GaugeMetricFamily(
+            "jira_http_pool_max_connections",
+            "Size bound of the shared Jira HTTP pool",
+        )
+        limit.add_metric([], settings.jira_http_max_connections)
+        yield limit
+
+        requests = CounterMetricFamily(
+            "jira_http_requests", "Requests sent through the shared Jira HTTP pool"
+        )
+        requests.add_metric([], http_pool.stats.requests)
+        yield requests
+
+        opened = CounterMetricFamily(
+            "jira_http_connections_opened",
+            "New connections opened by the shared Jira HTTP pool (not reused)",
+        )
+        opened.add_metric([], http_pool.stats.connections_opened)
+        yield opened
+
+        handshakes = CounterMetricFamily(
+            "jira_http_tls_handshakes", "TLS handshakes done by the shared Jira pool"
+        )
+        handshakes.add_metric([], http_pool.stats.tls_handshakes)
+        yield handshakes
+
+
+class JiraCacheCollector(Collector):
+    """Effectiveness of the Jira issue / comment response cache."""
+
+    def collect(self) -> Iterator[CounterMetricFamily | GaugeMetricFamily]:
+        stats = jira_cache.stats
+        lookups = CounterMetricFamily(
+            "jira_cache_lookups",
+            "Jira cache lookups by outcome (hit: fresh, revalidated: 304, miss)",
+            labels=["outcome"],
+        )
+        lookups.add_metric(["hit"], stats.hits)
+        lookups.add_metric(["revalidated"], stats.revalidated)
+        lookups.add_metric(["miss"], stats.misses)
+        yield lookups
+
+        ratio = GaugeMetricFamily(
+            "jira_cache_hit_ratio", "(hits + revalidations) / lookups"
+        )
+        ratio.add_metric([], stats.hit_ratio)
+        yield ratio
+
+        saved = CounterMetricFamily(
+            "jira_cache_bytes_saved",
+            "Jira payload bytes served from the cache instead of downloaded",
+        )
+        saved.add_metric([], stats.bytes_saved)
+        yield saved
+
+        invalidated = CounterMetricFamily(
+            "jira_cache_invalidated_entries",
+            "Jira cache entries dropped on a webhook event",
+        )
+        invalidated.add_metric([], stats.invalidated)
+        yield invalidated
+
+
+class JiraRateLimitCollector(Collector):
+    """Throttling of the Atlassian API calls (shared budget and 429s)."""
+
+    def collect(self) -> Iterator[CounterMetricFamily | GaugeMetricFamily]:
+        stats = rate_limit.stats
+        waited = CounterMetricFamily(
+            "jira_rate_limit_wait_seconds",
+            "Time Jira calls waited for the per-cloud request budget",
+        )
+        waited.add_metric([], stats.wait_seconds)
+        yield waited
+
+        throttled = CounterMetricFamily(
+            "jira_throttled_responses", "429 / 503 responses received from Jira"
+        )
+        throttled.add_metric([], stats.throttled)
+        yield throttled
+
+        retries = CounterMetricFamily(
+            "jira_request_retries", "Jira calls retried after a 429 / 503"
+        )
+        retries.add_metric([], stats.retries)
+        yield retries
+
+
+class JiraFieldProfileCollector(Collector):
+    """Size of the Jira responses fetched under each field profile."""
+
+    def collect(self) -> Iterator[CounterMetricFamily | GaugeMetricFamily]:
+        responses = CounterMetricFamily(
+            "jira_profile_responses",
+            "Jira responses fetched with a field-projection profile",
+            labels=["profile"],
+        )
+        size = CounterMetricFamily(
+            "jira_profile_payload_bytes",
+            "Payload bytes of the Jira responses, by field-projection profile",
+            labels=["profile"],
+        )
+        for profile in jira_fields.profiles():
+            responses.add_metric([profile.name], profile.responses)
+            size.add_metric([profile.name], profile.bytes)
+        yield responses
+        yield size
+
+
+class SingleFlightCollector(Collector):
+    """Calls served by an identical request already in flight."""
+
+    def collect(self) -> Iterator[CounterMetricFamily | GaugeMetricFamily]:
+        calls = CounterMetricFamily(
+            "single_flight_calls",
+            "Coalesced calls by outcome (leader: sent upstream, collapsed_local /"
+            " collapsed_remote: served by a call of this / another worker)",
+            labels=["name", "outcome"],
+        )
+        for flight in single_flight.coalescers():
+            for outcome, count in (
+                ("leader", flight.leaders),
+                ("collapsed_local", flight.collapsed_local),
+                ("collapsed_remote", flight.collapsed_remote),
+            ):
+                calls.add_metric([flight.name, outcome], count)
+        yield calls
+
+
+class IssueIndexCollector(Collector):
+    """Searches answered by the local issue index and its pulls from Jira."""
+
+    def collect(self) -> Iterator[CounterMetricFamily | GaugeMetricFamily]:
+        stats = issue_index.stats
+        searches = CounterMetricFamily(
+            "jira_index_searches",
+            "Searches by outcome (local: served by the index, live: sent to Jira)",
+            labels=["outcome"],
+        )
+        searches.add_metric(["local"], stats.local)
+        searches.add_metric(["live"], stats.live)
+        yield searches
+
+        pulls = CounterMetricFamily(
+            "jira_index_pulls", "Index pulls from Jira by kind", labels=["kind"]
+        )
+        pulls.add_metric(["full"], stats.full_pulls)
+        pulls.add_metric(["incremental"], stats.incremental_pulls)
+        yield pulls
+
+        pulled = CounterMetricFamily(
+            "jira_index_pulled_issues", "Issues fetched by the index pulls"
+        )
+        pulled.add_metric([], stats.pulled_issues)
+        yield pulled
+
+
+class JiraEventCollector(Collector):
+    """Jira webhook events applied (cache / index / PO invalidations)."""
+
+    def collect(self) -> Iterator[CounterMetricFamily | GaugeMetricFamily]:
+        events = CounterMetricFamily(
+            "jira_webhook_events", "Jira webhook events applied, by kind",
+            labels=["kind"],
+        )
+        for kind, count in sorted(jira_events.stats.received.items()):
+            events.add_metric([kind], count)
+        yield events
+
+
+class TokenRefreshCollector(Collector):
+    """OAuth token refreshes (ahead of expiry, deduplicated per session)."""
+
+    def collect(self) -> Iterator[CounterMetricFamily | GaugeMetricFamily]:
+        stats = token_refresh.stats
+        refreshes = CounterMetricFamily(
+            "oauth_token_refreshes",
+            "OAuth refreshes by outcome (refreshed / failed: token endpoint"
+            " calls, background: started ahead of expiry, reused: result of an"
+            " earlier refresh applied)",
+            labels=["outcome"],
+        )
+        refreshes.add_metric(["refreshed"], stats.refreshed)
+        refreshes.add_metric(["failed"], stats.failed)
+        refreshes.add_metric(["background"], stats.background)
+        refreshes.add_metric(["reused"], stats.reused)
+        yield refreshes
+
+
+class LLMCacheCollector(Collector):
+    """Effectiveness of the shared LLM response cache."""
+
+    def collect(self) -> Iterator[CounterMetricFamily | GaugeMetricFamily]:
+        stats = llm_cache.stats
+        lookups = CounterMetricFamily(
+            "llm_cache_lookups", "LLM cache lookups by outcome", labels=["outcome"]
+        )
+        lookups.add_metric(["hit"], stats.hits)
+        lookups.add_metric(["miss"], stats.misses)
+        yield lookups
+
+        ratio = GaugeMetricFamily("llm_cache_hit_ratio", "hits / lookups")
+        ratio.add_metric([], stats.hit_ratio)
+        yield ratio
+
+        saved = CounterMetricFamily(
+            "llm_cache_saved_seconds",
+            "Model generation time of the responses served from the cache",
+        )
+        saved.add_metric([], stats.saved_seconds)
+        yield saved
+
+        coalesced = CounterMetricFamily(
+            "llm_cache_coalesced_calls",
+            "LLM calls that waited for an identical call already running",
+        )
+        coalesced.add_metric([], stats.coalesced)
+        yield coalesced
+
+        evicted = CounterMetricFamily(
+            "llm_cache_evicted_entries",
+            "LLM cache entries evicted to stay within llm_cache_max_entries",
+        )
+        evicted.add_metric([], stats.evicted)
+        yield evicted
@@ -1,16 +1,34 @@
-import json
 import logging
 import time
-from typing import Any, Dict, List, Optional
-
-from app.core.redis import redis_client, _ensure_redis_available, _mark_redis_unavailable, _local_store
+from typing import Any, Dict, List, Optional, Set, Tuple, cast
+
+from app.core import codec
+from app.core.config import settings
+from app.core.local_store import LocalStore
+from app.core.redis import (
+    redis_client,
+    _count_commands,
+    _ensure_redis_available,
+    _mark_redis_unavailable,
+)
 
 logger = logging.getLogger(__name__)
 
 _VALID_SOURCES = {"jira", "manual"}
 _VALID_MASK_TYPES = {"none", "temporaire", "definitif"}
 
-_local_store: Dict[str, str] = {}
+# Fallback when Redis is unreachable: bounded (LRU), no TTL (PO data is durable).
+_local_store = LocalStore(
+    "po",
+    max_entries=settings.local_store_max_entries,
+    max_bytes=settings.local_store_max_bytes,
+)
+# Keys written locally during a Redis outage, replayed once it is back.
+_local_writes: Set[str] = set()
+# Outage writes dropped on replay because Redis held newer data (/metrics)
+resync_stats: Dict[str, int] = {"dropped": 0}
+# User fields merged by keeping the latest timestamp of either copy
+_MAX_FIELDS = ("last_synced_at", "stale_since")
 
 
 def _now_ts() -> int:
@@ -29,10 +47,104 @@ def _project_id(project_key: str, cloud_id: Optional[str]) -> str:
     return f"{cloud_id or 'default'}:{project_key}"
 
 
-def _get_raw(key: str) -> Optional[str]:
+def _written_after(doc: Dict[str, Any], other: Dict[str, Any]) -> bool:
+    return bool((doc.get("updated_at") or 0) >= (other.get("updated_at") or 0))
+
+
+def _merge(
+    key: str, local: Dict[str, Any], stored: Dict[str, Any]
+) -> Tuple[Dict[str, Any], int]:
+    """Last-write-wins merge of a local copy into the one Redis holds.
+
+    Projects are merged one by one, a user doc as a whole (keeping the latest
+    sync / stale timestamps of both). Returns the merged doc and the number of
+    local changes dropped because Redis held a newer version.
+    """
+    dropped = 0
+    if key.startswith("po_projects:"):
+        merged = dict(stored)
+        for pid, project in local.items():
+            current = merged.get(pid)
+            if not isinstance(current, dict) or _written_after(project, current):
+                merged[pid] = project
+            elif project != current:
+                dropped += 1
+        return merged, dropped
+
+    if _written_after(local, stored):
+        merged = dict(local)
+    else:
+        merged = dict(stored)
+        dropped = int(local != stored)
+    for field in _MAX_FIELDS:
+        latest = max(local.get(field) or 0, stored.get(field) or 0)
+        if latest:
+            merged[field] = latest
+    return merged, dropped
+
+
+def _replayed(key: str, payload: str, raw: Optional[str]) -> Tuple[str, int]:
+    """Payload to write back for a local copy, and the local changes dropped."""
+    try:
+        local = codec.decode(payload)
+        stored = codec.decode(raw) if raw else None
+    except ValueError:  # unreadable copy in Redis: the local one replaces it
+        return payload, 0
+    if not isinstance(local, dict) or not isinstance(stored, dict):
+        return payload, 0
+    merged, dropped = _merge(key, local, stored)
+    return codec.encode(merged), dropped
+
+
+def _resync_local_writes() -> bool:
+    """Push PO data written locally during an outage; False if Redis failed again.
+
+    Writes are replayed last-write-wins against what Redis holds (by
+    `updated_at`, see `_merge`); local changes older than Redis's are dropped,
+    logged and counted.
+    """
+    while _local_writes:
+        key = _local_writes.pop()
+        payload = _local_store.get(key)
+        if payload is None:
+            continue
+        try:
+            _count_commands()
+            raw = cast(Optional[str], redis_client.get(key))
+            payload, dropped = _replayed(key, payload, raw)
+            if dropped:
+                resync_stats["dropped"] += dropped
+                logger.warning(
+                    "%d PO write(s) made during the Redis outage dropped: "
+                    "Redis holds newer data",
+                    dropped,
+                )
+            _count_commands()
+            redis_client.set(key, payload)
+        except Exception:
+            _local_writes.add(key)
+            _mark_redis_unavailable()
+            return False
+        _local_store.pop(key, None)
+    return True
+
+
+def _redis_usable() -> bool:
     if not _ensure_redis_available():
+        return False
+    return _resync_local_writes()
+
+
+def _set_local(key: str, payload: str) -> None:
+    _local_store[key] = payload
+    _local_writes.add(key)
+
+
+def _get_raw(key: str) -> Optional[str]:
+    if not _redis_usable():
         return _local_store.get(key)
     try:
+        _count_commands()
         return redis_client.get(key)
     except Exception:
         _mark_redis_unavailable()
@@ -40,14 +152,15 @@ def _get_raw(key: str) -> Optional[str]:
 
 
 def _set_raw(key: str, payload: str) -> None:
-    if not _ensure_redis_available():
-        _local_store[key] = payload
+    if not _redis_usable():
+        _set_local(key, payload)
         return
     try:
+        _count_commands()
         redis_client.set(key, payload)
     except Exception:
         _mark_redis_unavailable()
-        _local_store[key] = payload
+        _set_local(key, payload)
 
 
 def _load_json(key: str) -> Optional[Dict[str, Any]]:
@@ -55,7 +168,7 @@ def _load_json(key: str) -> Optional[Dict[str, Any]]:
     if not raw:
         return None
     try:
-        data = json.loads(raw)
+        data = codec.decode(raw)
     except Exception:
         return None
     if not isinstance(data, dict):
@@ -64,7 +177,7 @@ def _load_json(key: str) -> Optional[Dict[str, Any]]:
 
 
 def _save_json(key: str, data: Dict[str, Any]) -> None:
-    payload = json.dumps(data)
+    payload = codec.encode(data)
     _set_raw(key, payload)
 
 
@@ -111,6 +224,27 @@ def set_last_synced_at(
     return user
 
 
+def mark_stale(
+    jira_account_id: str,
+    *,
+    ts: Optional[int] = None,
+) -> Optional[Dict[str, Any]]:
+    """Flag a known user's projects for a resync (None: unknown user)."""
+    user = get_user(jira_account_id)
+    if user is None:
+        return None
+    user["stale_since"] = ts or _now_ts()
+    _save_json(_user_key(jira_account_id), user)
+    return user
+
+
+def is_stale(user: Optional[Dict[str, Any]]) -> bool:
+    """True when a change was reported after the user's last sync."""
+    if not user or not user.get("stale_since"):
+        return False
+    return bool(user["stale_since"] >= (user.get("last_synced_at") or 0))
+
+
 def _load_projects(jira_account_id: str) -> Dict[str, Dict[str, Any]]:
     return _load_json(_projects_key(jira_account_id)) or {}
 
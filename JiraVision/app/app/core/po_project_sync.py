@@ -5,8 +5,9 @@ from typing import Any, Dict, List
 
 import httpx
 
+from app.auth import token_refresh
 from app.clients.jira import JiraClient
-from app.core import po_project_store
+from app.core import jira_fields, po_project_store
 
 logger = logging.getLogger(__name__)
 if not logger.hasHandlers():
@@ -17,6 +18,11 @@ if not logger.hasHandlers():
 logger.setLevel(logging.INFO)
 
 
+# Bornes du parcours paginé des tickets actifs (par instance Jira)
+_MAX_REPORTER_ISSUES = 1000
+_SEARCH_DEADLINE_SECONDS = 20.0
+
+
 def _active_projects_jql(account_id: str) -> str:
     return (
         f'reporter = "{account_id}" '
@@ -32,11 +38,14 @@ async def _fetch_reporter_projects(
     # Nouvelle JQL pour tickets actifs
     jql = _active_projects_jql(account_id)
     logger.debug(f"JQL projets actifs: {jql}")
-    data = await client.search_jql(jql, max_results=100)
-    issues = data.get("issues", []) if isinstance(data, dict) else []
-    # Extraire les projets distincts à partir des tickets trouvés
+    # Extraire les projets distincts à partir des tickets trouvés (toutes pages)
     projects = {}
-    for issue in issues:
+    async for issue in client.iter_search(
+        jql,
+        limit=_MAX_REPORTER_ISSUES,
+        deadline=_SEARCH_DEADLINE_SECONDS,
+        profile=jira_fields.PROJECT_DISCOVERY,
+    ):
         fields = issue.get("fields", {}) or {}
         proj = fields.get("project", {}) or {}
         key = proj.get("key")
@@ -67,7 +76,7 @@ async def sync_projects_for_user(
     inactive_projects: List[Dict[str, Any]] = []
 
     for cloud_id in cloud_ids:
-        token_entry = tokens_by_cloud.get(cloud_id) or {}
+        token_entry = await token_refresh.token_entry(session, cloud_id) or {}
         access_token = token_entry.get("access_token")
         if not access_token:
             continue
@@ -0,0 +1,192 @@
+"""Per-cloud request budget for the Atlassian API, shared by every worker.
+
+Each Jira cloud gets a token bucket (`jira_rate_limit_per_second` refill,
+`jira_rate_limit_burst` capacity) kept in Redis and updated atomically by a
+Lua script using the Redis clock, so all workers draw from one budget. A
+429 / 503 from Atlassian pauses the whole cloud until its `Retry-After` (or
+`X-RateLimit-Reset`) has passed; without such a header the caller backs off
+exponentially with jitter.
+
+While Redis is unavailable each worker falls back to an in-process bucket
+with the same parameters.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import random
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, Mapping, Optional
+
+from app.core.config import settings
+from app.core.redis import (
+    _count_commands,
+    _ensure_async_redis_available,
+    _mark_redis_unavailable,
+    async_redis_client,
+)
+
+# KEYS: bucket hash, pause key. ARGV: rate (tokens/s), burst.
+# Returns 0 once a token is taken, else the milliseconds to wait.
+_TAKE_SCRIPT = """
+local pause = redis.call('PTTL', KEYS[2])
+if pause > 0 then return pause end
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local b = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(b[1]) or burst
+local ts = tonumber(b[2]) or now
+tokens = math.min(burst, tokens + math.max(now - ts, 0) * rate / 1000)
+local wait = 0
+if tokens >= 1 then
+  tokens = tokens - 1
+else
+  wait = math.ceil((1 - tokens) * 1000 / rate)
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst * 1000 / rate) + 1000)
+return wait
+"""
+
+
+class RateLimitStats:
+    def __init__(self) -> None:
+        self.wait_seconds = 0.0  # time spent waiting for a token / a pause
+        self.throttled = 0  # 429 / 503 answers from Atlassian
+        self.retries = 0
+
+
+stats = RateLimitStats()
+
+
+class TokenBucket:
+    """In-process token bucket (fallback while Redis is unavailable)."""
+
+    def __init__(
+        self, rate: float, burst: int, clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        self.rate = rate
+        self.burst = burst
+        self._clock = clock
+        self.tokens = float(burst)
+        self.updated = clock()
+        self.paused_until = 0.0
+
+    def take(self) -> float:
+        """Take a token: 0.0, or the seconds to wait before trying again."""
+        now = self._clock()
+        if now < self.paused_until:
+            return self.paused_until - now
+        elapsed = now - self.updated
+        self.tokens = min(self.burst, self.tokens + elapsed * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def pause(self, seconds: float) -> None:
+        self.paused_until = max(self.paused_until, self._clock() + seconds)
+
+
+_local_buckets: Dict[str, TokenBucket] = {}
+
+
+def _local_bucket(cloud_id: str) -> TokenBucket:
+    bucket = _local_buckets.get(cloud_id)
+    if bucket is None:
+        bucket = TokenBucket(
+            settings.jira_rate_limit_per_second, settings.jira_rate_limit_burst
+        )
+        _local_buckets[cloud_id] = bucket
+    return bucket
+
+
+def _keys(cloud_id: str) -> tuple[str, str]:
+    return f"ratelimit:jira:{cloud_id}", f"ratelimit:jira:{cloud_id}:pause"
+
+
+async def _take(cloud_id: str) -> float:
+    if await _ensure_async_redis_available():
+        try:
+            _count_commands()
+            wait_ms = await async_redis_client.eval(
+                _TAKE_SCRIPT,
+                2,
+                *_keys(cloud_id),
+                settings.jira_rate_limit_per_second,
+                settings.jira_rate_limit_burst,
+            )
+            return int(wait_ms) / 1000
+        except Exception:
+            _mark_redis_unavailable()
+    return _local_bucket(cloud_id).take()
+
+
+async def acquire(cloud_id: str) -> None:
+    """Wait until `cloud_id` has budget for one more request."""
+    while True:
+        wait = await _take(cloud_id)
+        if wait <= 0:
+            return
+        stats.wait_seconds += wait
+        await asyncio.sleep(wait)
+
+
+async def pause(cloud_id: str, seconds: float) -> None:
+    """Hold every worker's requests to `cloud_id` for `seconds`.
+
+    Capped at `jira_retry_max_seconds` so a very long Retry-After cannot
+    stall requests for that long (they will get a 429 again instead).
+    """
+    seconds = min(seconds, settings.jira_retry_max_seconds)
+    _local_bucket(cloud_id).pause(seconds)
+    if not await _ensure_async_redis_available():
+        return
+    try:
+        _count_commands()
+        await async_redis_client.set(
+            _keys(cloud_id)[1], "1", px=max(int(seconds * 1000), 1)
+        )
+    except Exception:
+        _mark_redis_unavailable()
+
+
+def _seconds_until(when: datetime) -> float:
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max((when - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+def retry_after(headers: Mapping[str, str]) -> Optional[float]:
+    """Delay requested by Atlassian (Retry-After / X-RateLimit-Reset), if any."""
+    value = headers.get("retry-after")
+    if value:
+        try:
+            return max(float(value), 0.0)
+        except ValueError:
+            pass
+        try:
+            return _seconds_until(parsedate_to_datetime(value))
+        except (TypeError, ValueError):
+            pass
+    reset = headers.get("x-ratelimit-reset")
+    if reset:
+        try:
+            return _seconds_until(datetime.fromisoformat(reset.replace("Z", "+00:00")))
+        except ValueError:
+            pass
+    return None
+
+
+def backoff(attempt: int) -> float:
+    """Exponential backoff with jitter for retry number `attempt` (0-based)."""
+    ceiling = min(
+        settings.jira_retry_max_seconds,
+        settings.jira_retry_base_seconds * (2**attempt),
+    )
+    return float(ceiling / 2 + random.uniform(0, ceiling / 2))
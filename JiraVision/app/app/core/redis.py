@@ -1,114 +1,639 @@
-import json
+import asyncio
 import logging
 import os
+import time
 import redis
-from typing import Any, Dict, Optional, cast
+import redis.asyncio as aioredis
+from contextvars import ContextVar
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple, cast
 
+from app.core import codec
+from app.core.circuit_breaker import CLOSED, CircuitBreaker
 from app.core.config import settings
+from app.core.local_store import LocalStore
+from app.core.redis_pool import (
+    AsyncTimedBlockingConnectionPool,
+    TimedBlockingConnectionPool,
+    pool_kwargs,
+)
+from app.core.session_cache import NearCache, run_invalidation_listener
 
 logger = logging.getLogger(__name__)
 
 REDIS_HOST = os.getenv("REDIS_HOST", "redis")
 REDIS_PORT = int(os.getenv("REDIS_PORT", "6379"))
 
+# Synchronous client, kept for the PO project store (sync call sites).
 redis_client = redis.Redis(
-    host=REDIS_HOST,
-    port=REDIS_PORT,
-    decode_responses=True,
+    connection_pool=TimedBlockingConnectionPool(
+        "sync", **pool_kwargs(REDIS_HOST, REDIS_PORT)
+    ),
+)
+
+# Asyncio client used for sessions so Redis I/O never blocks the event loop.
+async_redis_client = aioredis.Redis(
+    connection_pool=AsyncTimedBlockingConnectionPool(
+        "async", **pool_kwargs(REDIS_HOST, REDIS_PORT)
+    ),
+)
+
+# Fallback in-memory store used when Redis is not available (dev only).
+# Bounded (LRU) and TTL-aware so sessions cannot pile up in the worker.
+_local_store = LocalStore(
+    "session",
+    max_entries=settings.local_store_max_entries,
+    max_bytes=settings.local_store_max_bytes,
+    ttl_seconds=settings.session_max_age_seconds,
+)
+
+# Sessions read from Redis, served from memory while invalidations flow in
+# (settings.session_near_cache; disabled until the listener is connected).
+near_cache = NearCache(
+    "session_near_cache",
+    max_entries=settings.session_near_cache_max_entries,
+    max_bytes=settings.local_store_max_bytes,
+    ttl_seconds=settings.session_near_cache_ttl_seconds,
+)
+
+# Shared by both clients: one failure switches every store to its in-memory
+# fallback; after the cool-down one caller probes Redis (PING) and closes it.
+_breaker = CircuitBreaker(
+    "redis", cooldown_seconds=settings.redis_breaker_cooldown_seconds
 )
 
-# Fallback in-memory store used when Redis is not available (dev only)
-_local_store: Dict[str, str] = {}
-_redis_available: Optional[bool] = None
-_redis_warned: bool = False
+# Sessions written / deleted in the local store while Redis was unavailable,
+# replayed to Redis once it is back (see _resync_local_sessions).
+_local_writes: Set[str] = set()
+_local_deletes: Set[str] = set()
+# Sessions pushed back to Redis after an outage, and outage writes dropped
+# because Redis holds a newer copy (exported on /metrics)
+resync_stats: Dict[str, int] = {"sessions": 0, "dropped": 0}
+
+# Reserved session key: time of the last write, compared on resync so the
+# newest copy wins. Added on write, stripped on read.
+_STAMP = "_written_at"
+
+# Number of Redis commands issued while serving the current HTTP request
+# (set by the metrics middleware, None outside of a request).
+_command_counter: ContextVar[Optional[List[int]]] = ContextVar(
+    "redis_command_counter", default=None
+)
+
+
+def start_command_count() -> List[int]:
+    """Start counting Redis commands for the current request; returns the counter."""
+    counter = [0]
+    _command_counter.set(counter)
+    return counter
+
+
+def _count_commands(n: int = 1) -> None:
+    counter = _command_counter.get()
+    if counter is not None:
+        counter[0] += n
 
 
 def _mark_redis_unavailable() -> None:
-    global _redis_available, _redis_warned
-    _redis_available = False
-    if not _redis_warned:
-        logger.warning("Redis not available, falling back to in-memory sessions")
-        _redis_warned = True
+    """Open the breaker after a failed Redis command."""
+    _breaker.record_failure()
 
 
 def _ensure_redis_available() -> bool:
-    global _redis_available
-    if _redis_available is False:
+    """True if Redis may be used (closed breaker, or successful half-open probe)."""
+    if not _breaker.allow():
         return False
-    if _redis_available is True:
+    if not _breaker.probing:
         return True
     try:
+        _count_commands()
         redis_client.ping()
-        _redis_available = True
-        return True
     except Exception:
         _mark_redis_unavailable()
         return False
+    _breaker.record_success()
+    return True
+
+
+async def _ensure_async_redis_available() -> bool:
+    """Async counterpart of `_ensure_redis_available` (shares the same breaker).
+
+    Once Redis is usable again, sessions written locally during the outage
+    are pushed back first, so other workers see them.
+    """
+    if not _breaker.allow():
+        return False
+    if _breaker.probing:
+        try:
+            _count_commands()
+            await async_redis_client.ping()
+        except Exception:
+            _mark_redis_unavailable()
+            return False
+        except BaseException:
+            # cancelled probe: re-open, the next caller after the cool-down
+            # probes again
+            _mark_redis_unavailable()
+            raise
+        _breaker.record_success()
+    if _local_writes or _local_deletes:
+        await _resync_local_sessions()
+        return _breaker.state == CLOSED
+    return True
 
 
 def _key(sid: str) -> str:
     return f"session:{sid}"
 
 
-def get_session(sid: str) -> Optional[Dict[str, Any]]:
+def _stamped(session: Dict[str, Any]) -> Dict[str, Any]:
+    # a copy replayed from the local store keeps the time it was written at
+    return {_STAMP: time.time(), **session}
+
+
+def _unstamped(session: Dict[str, Any]) -> Dict[str, Any]:
+    session.pop(_STAMP, None)
+    return session
+
+
+def _local_get(key: str) -> Optional[str]:
+    """Read from the local fallback, sliding its TTL like Redis does."""
+    raw = _local_store.get(key)
+    if raw is not None:
+        _local_store.touch(key, ttl=settings.session_max_age_seconds)
+    return raw
+
+
+async def _get_with_ttl(key: str) -> Tuple[Optional[str], int]:
+    """GET + TTL in a single round trip (non-transactional pipeline)."""
+    _count_commands(2)
+    async with async_redis_client.pipeline(transaction=False) as pipe:
+        pipe.get(key)
+        pipe.ttl(key)
+        raw, ttl = await pipe.execute()
+    return raw, ttl
+
+
+def _needs_ttl_refresh(ttl: int) -> bool:
+    # ttl < 0: key without expiry (-1) or gone meanwhile (-2)
+    threshold = settings.session_max_age_seconds * settings.session_ttl_refresh_ratio
+    return ttl < 0 or ttl < threshold
+
+
+def start_near_cache() -> Optional["asyncio.Task[None]"]:
+    """Start the near-cache invalidation listener (app lifespan); None if off."""
+    if settings.session_near_cache == "off":
+        return None
+    return asyncio.create_task(
+        run_invalidation_listener(
+            near_cache, settings.session_near_cache, REDIS_HOST, REDIS_PORT
+        )
+    )
+
+
+async def get_session(sid: str) -> Optional[Dict[str, Any]]:
+    """Retrieve a stored session dict, from the near-cache when possible.
+
+    See `_read_session` for the Redis read; only sessions actually read from
+    Redis (not the local fallback) are put in the near-cache.
+    """
+    cached = near_cache.get(sid)
+    if cached is not None:
+        return cached
+    near_cache.begin(sid)
+    session: Optional[Dict[str, Any]] = None
+    try:
+        session = await _read_session(sid)
+    finally:
+        from_redis = _breaker.state == CLOSED
+        near_cache.end(sid, session if from_redis else None)
+    return session
+
+
+async def _read_session(sid: str) -> Optional[Dict[str, Any]]:
     """Retrieve a stored session dict from Redis by SID.
 
-    Returns None if the key is missing or contains invalid JSON. On success the
-    function refreshes the TTL (sliding session expiration).
+    Returns None if the key is missing or contains invalid JSON. The TTL is
+    slid forward (sliding session expiration), but only once the remaining TTL
+    drops below `session_ttl_refresh_ratio` of the max age: a read is then one
+    round trip (GET + TTL pipelined), plus an EXPIRE only when needed. With a
+    ratio >= 1 every read refreshes the TTL atomically with a single GETEX.
 
     This function is resilient to Redis being unavailable in local/dev
     environments: connection errors are treated as a "missing session" and
     return None rather than bubbling an exception to the caller.
     """
+    if settings.session_layout == "hash":
+        return await _read_hash(sid)
+
     key = _key(sid)
-    if not _ensure_redis_available():
-        raw = _local_store.get(key)
+    ttl: Optional[int] = None
+    if not await _ensure_async_redis_available():
+        raw = _local_get(key)
     else:
         try:
-            raw = redis_client.get(key)
+            if settings.session_ttl_refresh_ratio >= 1:
+                _count_commands()
+                raw = cast(
+                    Optional[str],
+                    await async_redis_client.getex(
+                        key, ex=settings.session_max_age_seconds
+                    ),
+                )
+            else:
+                raw, ttl = await _get_with_ttl(key)
         except Exception:
             # Redis unavailable -> fall back to local store
             _mark_redis_unavailable()
-            raw = _local_store.get(key)
+            raw = _local_get(key)
 
     if not raw:
         return None
     try:
-        session = cast(Dict[str, Any], json.loads(cast(str, raw)))
+        session = _unstamped(cast(Dict[str, Any], codec.decode(cast(str, raw))))
     except Exception:
         return None
 
-    # refresh TTL (best-effort; ignore errors)
-    if _ensure_redis_available():
+    # refresh TTL when it runs low (best-effort; ignore errors)
+    if ttl is not None and _needs_ttl_refresh(ttl):
         try:
-            redis_client.expire(key, settings.session_max_age_seconds)
+            _count_commands()
+            await async_redis_client.expire(key, settings.session_max_age_seconds)
         except Exception:
-            # if redis is down the in-memory store doesn't support TTLs
+            # redis went down: the local store handles its own TTL
             _mark_redis_unavailable()
             logger.debug("Redis expire failed (ignored)", exc_info=True)
     return session
 
 
-def set_session(sid: str, session: Dict[str, Any]) -> None:
+async def _write_session(sid: str, session: Dict[str, Any]) -> None:
+    """Write a whole session to Redis (raises on Redis errors)."""
+    if settings.session_layout == "hash":
+        await _replace_hash(sid, _stamped(session))
+        return
+    _count_commands()
+    await async_redis_client.set(
+        _key(sid),
+        codec.encode(_stamped(session)),
+        ex=settings.session_max_age_seconds,
+    )
+
+
+async def _delete_from_redis(sid: str) -> None:
+    _count_commands()
+    if settings.session_layout == "hash":
+        await async_redis_client.delete(_key(sid), _hkey(sid))
+    else:
+        await async_redis_client.delete(_key(sid))
+
+
+def _local_set(sid: str, session: Dict[str, Any]) -> None:
+    _local_store.set(
+        _key(sid),
+        codec.encode(_stamped(session)),
+        ttl=settings.session_max_age_seconds,
+    )
+    _local_deletes.discard(sid)
+    _local_writes.add(sid)
+
+
+def _local_delete(sid: str) -> None:
+    _local_store.pop(_key(sid), None)
+    _local_writes.discard(sid)
+    _local_deletes.add(sid)
+
+
+async def _stored_stamp(sid: str) -> Optional[float]:
+    """Write time of the copy Redis holds (0 if unknown), None if it has none."""
+    if settings.session_layout == "hash":
+        _count_commands(2)
+        async with async_redis_client.pipeline(transaction=False) as pipe:
+            pipe.exists(_hkey(sid))
+            pipe.hget(_hkey(sid), _STAMP)
+            exists, raw = await pipe.execute()
+        if not exists:
+            return None
+    else:
+        _count_commands()
+        raw = await async_redis_client.get(_key(sid))
+        if not raw:
+            return None
+    try:
+        value = codec.decode(raw) if raw else None
+    except ValueError:
+        return 0.0
+    if isinstance(value, dict):  # blob layout: the whole session
+        value = value.get(_STAMP)
+    return float(value) if isinstance(value, (int, float)) else 0.0
+
+
+async def _merge_hash(sid: str, data: Dict[str, Any]) -> None:
+    key = _hkey(sid)
+    _count_commands(2)
+    async with async_redis_client.pipeline(transaction=True) as pipe:
+        pipe.hset(key, mapping=cast(Dict[Any, Any], _to_fields(data)))
+        pipe.expire(key, settings.session_max_age_seconds)
+        await pipe.execute()
+
+
+async def _resync_local_sessions() -> None:
+    """Replay sessions written in the local store while Redis was down.
+
+    Logouts are always replayed. Writes are replayed last-write-wins: a
+    session is pushed unless Redis holds a copy written after the local one,
+    in which case the local write is dropped (logged and counted). With the
+    hash layout the local fields are merged into the stored hash, as the local
+    copy may have been rebuilt from a partial read. Replayed entries are
+    dropped from the local store; on a new failure the remaining ones stay
+    pending for the next recovery.
+    """
+    while _local_writes or _local_deletes:
+        if _local_deletes:
+            sid = _local_deletes.pop()
+            try:
+                await _delete_from_redis(sid)
+            except Exception:
+                _local_deletes.add(sid)
+                _mark_redis_unavailable()
+                return
+            continue
+
+        sid = _local_writes.pop()
+        raw = _local_store.get(_key(sid))
+        if raw is None:  # expired meanwhile
+            continue
+        try:
+            session = cast(Dict[str, Any], codec.decode(raw))
+            stored_at = await _stored_stamp(sid)
+            if stored_at is not None and stored_at > session.get(_STAMP, 0.0):
+                resync_stats["dropped"] += 1
+                logger.warning(
+                    "Session write made during the Redis outage dropped: "
+                    "Redis holds a newer copy"
+                )
+            elif stored_at is not None and settings.session_layout == "hash":
+                await _merge_hash(sid, session)
+                resync_stats["sessions"] += 1
+            else:
+                await _write_session(sid, session)
+                resync_stats["sessions"] += 1
+        except ValueError:
+            pass
+        except Exception:
+            _local_writes.add(sid)
+            _mark_redis_unavailable()
+            return
+        _local_store.pop(_key(sid), None)
+    logger.info("Local sessions re-synced to Redis")
+
+
+async def set_session(sid: str, session: Dict[str, Any]) -> None:
     """Store the session in Redis if available; fall back to in-memory store on errors."""
-    key = _key(sid)
-    payload = json.dumps(session)
-    if not _ensure_redis_available():
-        _local_store[key] = payload
+    near_cache.invalidate(sid)
+    if not await _ensure_async_redis_available():
+        _local_set(sid, session)
         return
     try:
-        redis_client.set(key, payload, ex=settings.session_max_age_seconds)
+        await _write_session(sid, session)
     except Exception:
         _mark_redis_unavailable()
-        _local_store[key] = payload
+        _local_set(sid, session)
 
 
-def delete_session(sid: str) -> None:
-    if not _ensure_redis_available():
-        _local_store.pop(_key(sid), None)
+async def delete_session(sid: str) -> None:
+    near_cache.invalidate(sid)
+    if not await _ensure_async_redis_available():
+        _local_delete(sid)
         return
     try:
-        redis_client.delete(_key(sid))
+        await _delete_from_redis(sid)
     except Exception:
         _mark_redis_unavailable()
-        _local_store.pop(_key(sid), None)
+        _local_delete(sid)
+
+
+# -------------------------------------------------------------------
+# Hash layout (settings.session_layout == "hash")
+# -------------------------------------------------------------------
+# session:h:{sid} is a Redis hash with one JSON-encoded field per top-level
+# session key. Maps listed in _FLATTENED_KEYS get one field per entry
+# ("tokens_by_cloud:<cloud_id>") so a request can read a single cloud's token.
+# The in-memory fallback keeps the blob format.
+
+_FLATTENED_KEYS = ("tokens_by_cloud",)
+
+
+def _hkey(sid: str) -> str:
+    return f"session:h:{sid}"
+
+
+def _split_field(field: str) -> Tuple[str, Optional[str]]:
+    """"tokens_by_cloud:abc" -> ("tokens_by_cloud", "abc"); "foo" -> ("foo", None)."""
+    key, sep, sub = field.partition(":")
+    if sep and key in _FLATTENED_KEYS:
+        return key, sub
+    return field, None
+
+
+def _to_fields(data: Dict[str, Any]) -> Dict[str, str]:
+    fields: Dict[str, str] = {}
+    for key, value in data.items():
+        if key in _FLATTENED_KEYS and isinstance(value, dict):
+            for sub, entry in value.items():
+                fields[f"{key}:{sub}"] = codec.encode(entry)
+        else:
+            fields[key] = codec.encode(value)
+    return fields
+
+
+def _from_fields(fields: Dict[str, Optional[str]]) -> Dict[str, Any]:
+    data: Dict[str, Any] = {}
+    for field, raw in fields.items():
+        if raw is None:
+            continue
+        if field == _STAMP:
+            continue
+        try:
+            value = codec.decode(raw)
+        except ValueError:
+            logger.warning("Invalid session field %s ignored", field)
+            continue
+        key, sub = _split_field(field)
+        if sub is None:
+            data[key] = value
+        else:
+            data.setdefault(key, {})[sub] = value
+    return data
+
+
+def _select_fields(data: Dict[str, Any], fields: Sequence[str]) -> Dict[str, Any]:
+    """Subset of a full session dict, using the hash field names."""
+    out: Dict[str, Any] = {}
+    for field in fields:
+        key, sub = _split_field(field)
+        if sub is None:
+            if key in data:
+                out[key] = data[key]
+        elif sub in (data.get(key) or {}):
+            out.setdefault(key, {})[sub] = data[key][sub]
+    return out
+
+
+def _local_read(sid: str, fields: Optional[Sequence[str]]) -> Optional[Dict[str, Any]]:
+    raw = _local_get(_key(sid))
+    if not raw:
+        return None
+    try:
+        data = _unstamped(cast(Dict[str, Any], codec.decode(raw)))
+    except ValueError:
+        return None
+    return data if fields is None else _select_fields(data, fields)
+
+
+async def _replace_hash(sid: str, data: Dict[str, Any]) -> None:
+    key = _hkey(sid)
+    fields = _to_fields(data)
+    _count_commands(3 if fields else 1)
+    async with async_redis_client.pipeline(transaction=True) as pipe:
+        pipe.delete(key)
+        if fields:
+            pipe.hset(key, mapping=cast(Dict[Any, Any], fields))
+            pipe.expire(key, settings.session_max_age_seconds)
+        await pipe.execute()
+
+
+async def _migrate_blob_session(sid: str) -> Optional[Dict[str, Any]]:
+    """Move a session still stored as a JSON blob to the hash layout."""
+    _count_commands()
+    raw = await async_redis_client.get(_key(sid))
+    if not raw:
+        return None
+    try:
+        data = cast(Dict[str, Any], codec.decode(cast(str, raw)))
+    except ValueError:
+        return None
+    await _replace_hash(sid, data)
+    _count_commands()
+    await async_redis_client.delete(_key(sid))
+    logger.debug("Session migrated from blob to hash layout")
+    return _unstamped(data)
+
+
+async def _read_hash(
+    sid: str, fields: Optional[Sequence[str]] = None
+) -> Optional[Dict[str, Any]]:
+    """HGETALL (or HMGET of `fields`) + TTL in one round trip.
+
+    Returns None when the session does not exist, the (possibly empty) subset
+    of fields otherwise. Sliding expiration follows the same rule as the blob
+    layout.
+    """
+    key = _hkey(sid)
+    if not await _ensure_async_redis_available():
+        return _local_read(sid, fields)
+    try:
+        _count_commands(2)
+        async with async_redis_client.pipeline(transaction=False) as pipe:
+            if fields is None:
+                pipe.hgetall(key)
+            else:
+                pipe.hmget(key, list(fields))
+            pipe.ttl(key)
+            raw, ttl = await pipe.execute()
+
+        if ttl == -2:
+            # no hash yet: session written before the switch to the hash layout?
+            data = await _migrate_blob_session(sid)
+            if data is None or fields is None:
+                return data
+            return _select_fields(data, fields)
+    except Exception:
+        _mark_redis_unavailable()
+        return _local_read(sid, fields)
+
+    values = raw if fields is None else dict(zip(fields, raw))
+    if _needs_ttl_refresh(ttl):
+        try:
+            _count_commands()
+            await async_redis_client.expire(key, settings.session_max_age_seconds)
+        except Exception:
+            _mark_redis_unavailable()
+            logger.debug("Redis expire failed (ignored)", exc_info=True)
+    return _from_fields(values)
+
+
+async def get_session_fields(
+    sid: str, fields: Sequence[str]
+) -> Optional[Dict[str, Any]]:
+    """Read only some fields of a session (HMGET with the hash layout).
+
+    Field names are top-level session keys, or "tokens_by_cloud:<cloud_id>" for
+    a single entry of a flattened map. Returns None if the session does not
+    exist. With the blob layout the whole session is read and then filtered.
+    """
+    if settings.session_layout == "hash":
+        return await _read_hash(sid, fields)
+    data = await get_session(sid)
+    return None if data is None else _select_fields(data, fields)
+
+
+async def update_session_fields(
+    sid: str,
+    changed: Dict[str, Any],
+    removed: Iterable[str] = (),
+    *,
+    partial: Iterable[str] = (),
+) -> None:
+    """Hash layout: HSET the changed top-level keys, HDEL the removed ones.
+
+    A changed flattened map replaces all its entries (stale ones are deleted),
+    unless the key is listed in `partial`: only some entries were loaded, so
+    only those are written.
+    """
+    near_cache.invalidate(sid)
+    removed = list(removed)
+    partial = set(partial)
+    if not await _ensure_async_redis_available():
+        _local_update(sid, changed, removed, partial)
+        return
+
+    key = _hkey(sid)
+    fields = _to_fields(changed)
+    try:
+        dels = [k for k in removed if k not in fields]
+        replaced = {
+            k for k in [*changed, *removed] if k in _FLATTENED_KEYS and k not in partial
+        }
+        if replaced:
+            _count_commands()
+            existing = cast(List[str], await async_redis_client.hkeys(key))
+            dels += [
+                f
+                for f in existing
+                if _split_field(f)[0] in replaced and f not in fields and f not in dels
+            ]
+
+        fields[_STAMP] = codec.encode(time.time())
+        _count_commands(int(bool(dels)) + 2)
+        async with async_redis_client.pipeline(transaction=True) as pipe:
+            if dels:
+                pipe.hdel(key, *dels)
+            pipe.hset(key, mapping=cast(Dict[Any, Any], fields))
+            pipe.expire(key, settings.session_max_age_seconds)
+            await pipe.execute()
+    except Exception:
+        _mark_redis_unavailable()
+        _local_update(sid, changed, removed, partial)
+
+
+def _local_update(
+    sid: str, changed: Dict[str, Any], removed: Sequence[str], partial: Iterable[str]
+) -> None:
+    data = _local_read(sid, None) or {}
+    for key, value in changed.items():
+        if key in partial and isinstance(data.get(key), dict):
+            data[key].update(value)
+        else:
+            data[key] = value
+    for key in removed:
+        data.pop(key, None)
+    _local_set(sid, data)
@@ -0,0 +1,135 @@
+"""Concurrent retrieval stages with bounded parallelism and deadlines.
+
+A plan is a set of named fetches. A fetch may depend on another one (`after`):
+it starts as soon as that result is in and receives it as argument; the
+others start right away. At most `concurrency` fetches run at once, and each
+stage must finish within its own `timeout` (queueing included).
+
+A stage that fails or times out does not stop the others: the plan yields
+partial results. Only a `required` stage aborts the plan, re-raising its
+error once the other fetches are cancelled. Dependents of a failed stage are
+not run. Results are yielded in completion order.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+
+class StageResult:
+    def __init__(
+        self,
+        name: str,
+        value: Any = None,
+        error: Optional[BaseException] = None,
+        elapsed: float = 0.0,
+    ) -> None:
+        self.name = name
+        self.value = value
+        self.error = error
+        self.elapsed = elapsed  # seconds, queueing included
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    @property
+    def timed_out(self) -> bool:
+        return isinstance(self.error, asyncio.TimeoutError)
+
+
+class _Stage:
+    def __init__(
+        self,
+        name: str,
+        fetch: Callable[..., Awaitable[Any]],
+        after: Optional[str],
+        timeout: float,
+        required: bool,
+    ) -> None:
+        self.name = name
+        self.fetch = fetch
+        self.after = after
+        self.timeout = timeout
+        self.required = required
+
+
+class RetrievalPlan:
+    def __init__(self, concurrency: int = 4) -> None:
+        self.concurrency = max(1, concurrency)
+        self.results: Dict[str, StageResult] = {}
+        self._stages: List[_Stage] = []
+
+    def add(
+        self,
+        name: str,
+        fetch: Callable[..., Awaitable[Any]],
+        *,
+        timeout: float,
+        after: Optional[str] = None,
+        required: bool = False,
+    ) -> None:
+        """Add a stage; with `after`, `fetch` receives that stage's value."""
+        if after is not None and after not in {s.name for s in self._stages}:
+            raise ValueError(f"Unknown stage: {after}")
+        self._stages.append(_Stage(name, fetch, after, timeout, required))
+
+    def value(self, name: str, default: Any = None) -> Any:
+        result = self.results.get(name)
+        return result.value if result is not None and result.ok else default
+
+    def missing(self) -> List[str]:
+        """Stages without a result (failed, timed out or not run)."""
+        return [
+            s.name
+            for s in self._stages
+            if s.name not in self.results or not self.results[s.name].ok
+        ]
+
+    async def run(self) -> AsyncIterator[StageResult]:
+        semaphore = asyncio.Semaphore(self.concurrency)
+        pending: Dict["asyncio.Future[StageResult]", _Stage] = {}
+
+        def start(stage: _Stage, *args: Any) -> None:
+            task = asyncio.ensure_future(self._run_stage(semaphore, stage, args))
+            pending[task] = stage
+
+        for stage in self._stages:
+            if stage.after is None:
+                start(stage)
+        try:
+            while pending:
+                done, _ = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    stage = pending.pop(task)
+                    result = task.result()
+                    self.results[stage.name] = result
+                    if result.error is not None and stage.required:
+                        raise result.error
+                    if result.ok:
+                        for child in self._stages:
+                            if child.after == stage.name:
+                                start(child, result.value)
+                    yield result
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _run_stage(
+        self, semaphore: asyncio.Semaphore, stage: _Stage, args: Any
+    ) -> StageResult:
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+
+        async def bounded() -> Any:
+            async with semaphore:
+                return await stage.fetch(*args)
+
+        try:
+            value = await asyncio.wait_for(bounded(), stage.timeout)
+        except Exception as e:
+            return StageResult(stage.name, error=e, elapsed=loop.time() - started)
+        return StageResult(stage.name, value=value, elapsed=loop.time() - started)
@@ -0,0 +1,207 @@
+"""In-process near-cache for sessions, kept coherent by Redis invalidations.
+
+Most requests read a session that did not change since the previous request.
+With `settings.session_near_cache` enabled, `get_session` serves those reads
+from worker memory. Every worker listens for changes made by the others:
+
+tracking   RESP3-style client-side caching in broadcast mode: a dedicated
+           connection runs `CLIENT TRACKING ON REDIRECT <id> BCAST PREFIX
+           session:` and the invalidated keys arrive on `__redis__:invalidate`.
+keyspace   keyspace notifications (`PSUBSCRIBE __keyspace@*__:session:*`);
+           the server needs `notify-keyspace-events` to include at least
+           `Kg$hxe`.
+
+The cache only serves reads while the listener is connected; on disconnect it
+is cleared and bypassed until the subscription is back. Entries also carry a
+short TTL as a safety net against a lost message.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from contextlib import suppress
+from typing import Any, Dict, List, Optional, Set, cast
+
+import redis.asyncio as aioredis
+from redis.asyncio.connection import Connection
+
+from app.core import codec
+from app.core.local_store import LocalStore
+
+logger = logging.getLogger(__name__)
+
+_KEY_PREFIXES = ("session:h:", "session:")
+_RECONNECT_DELAY_SECONDS = 5.0
+_TRACKING_PING_SECONDS = 30.0
+
+
+def sid_from_key(key: str) -> Optional[str]:
+    for prefix in _KEY_PREFIXES:
+        if key.startswith(prefix):
+            return key.replace(prefix, "", 1)
+    return None
+
+
+class NearCache:
+    """Encoded sessions by sid, served only while invalidations are received.
+
+    Values are stored encoded (codec) so each read returns a fresh dict that
+    the request may mutate freely. A read racing with an invalidation of the
+    same sid is not cached (``begin`` / ``end``).
+    """
+
+    def __init__(
+        self, name: str, *, max_entries: int, max_bytes: int, ttl_seconds: int
+    ) -> None:
+        self._store = LocalStore(
+            name, max_entries=max_entries, max_bytes=max_bytes, ttl_seconds=ttl_seconds
+        )
+        self.enabled = False
+        self.invalidations = 0
+        self._reads: Dict[str, int] = {}
+        self._stale: Set[str] = set()
+
+    def get(self, sid: str) -> Optional[Dict[str, Any]]:
+        if not self.enabled:
+            return None
+        raw = self._store.get(sid)
+        if raw is None:
+            return None
+        return cast(Dict[str, Any], codec.decode(raw))
+
+    def begin(self, sid: str) -> None:
+        """A read from Redis starts for `sid`."""
+        self._reads[sid] = self._reads.get(sid, 0) + 1
+
+    def end(self, sid: str, session: Optional[Dict[str, Any]]) -> None:
+        """The read finished; cache `session` unless `sid` changed meanwhile."""
+        pending = self._reads.pop(sid, 1) - 1
+        stale = sid in self._stale
+        if pending:
+            self._reads[sid] = pending
+        else:
+            self._stale.discard(sid)
+        if session is not None and self.enabled and not stale:
+            self._store.set(sid, codec.encode(session))
+
+    def invalidate(self, sid: str) -> None:
+        self.invalidations += 1
+        self._store.pop(sid, None)
+        if sid in self._reads:
+            self._stale.add(sid)
+
+    def invalidate_key(self, key: str) -> None:
+        sid = sid_from_key(key)
+        if sid is not None:
+            self.invalidate(sid)
+
+    def enable(self) -> None:
+        self._store.clear()
+        self.enabled = True
+
+    def disable(self) -> None:
+        self.enabled = False
+        self._store.clear()
+        self._stale.update(self._reads)
+
+
+# -------------------------------------------------------------------
+# Invalidation listeners
+# -------------------------------------------------------------------
+
+
+async def _listen_keyspace(cache: NearCache, host: str, port: int) -> None:
+    # dedicated client: no socket timeout on a connection that mostly waits
+    client = aioredis.Redis(
+        host=host, port=port, decode_responses=True, socket_timeout=None
+    )
+    pubsub = client.pubsub()
+    try:
+        await pubsub.psubscribe("__keyspace@*__:session:*")
+        async for message in pubsub.listen():
+            if message["type"] == "psubscribe":
+                cache.enable()
+            elif message["type"] == "pmessage":
+                # channel: __keyspace@<db>__:<key>
+                cache.invalidate_key(str(message["channel"]).split(":", 1)[1])
+    finally:
+        with suppress(Exception):
+            # PubSub.aclose is unannotated in redis-py
+            await pubsub.aclose()  # type: ignore[no-untyped-call]
+        with suppress(Exception):
+            await client.aclose()
+
+
+def _handle_invalidate(cache: NearCache, message: List[Any]) -> None:
+    # ["message", "__redis__:invalidate", [keys...] | None (FLUSHALL)]
+    if len(message) < 3 or message[0] != "message":
+        return
+    keys = message[2]
+    if keys is None:
+        cache.enable()  # everything is gone: start over empty
+        return
+    for key in keys:
+        cache.invalidate_key(str(key))
+
+
+async def _listen_tracking(cache: NearCache, host: str, port: int) -> None:
+    sub = Connection(host=host, port=port, decode_responses=True, socket_timeout=None)
+    tracker = Connection(host=host, port=port, decode_responses=True)
+    try:
+        # Connection.connect is unannotated in redis-py
+        await sub.connect()  # type: ignore[no-untyped-call]
+        await tracker.connect()  # type: ignore[no-untyped-call]
+        await sub.send_command("CLIENT", "ID")
+        client_id = await sub.read_response()
+        await sub.send_command("SUBSCRIBE", "__redis__:invalidate")
+        await sub.read_response()
+        # tracking is attached to `tracker`: keep it open for the whole session
+        await tracker.send_command(
+            "CLIENT", "TRACKING", "ON", "REDIRECT", client_id, "BCAST",
+            "PREFIX", "session:",
+        )
+        await tracker.read_response()
+        cache.enable()
+
+        async def keepalive() -> None:
+            while True:
+                await asyncio.sleep(_TRACKING_PING_SECONDS)
+                await tracker.send_command("PING")
+                await tracker.read_response()
+
+        async def receive() -> None:
+            while True:
+                _handle_invalidate(cache, cast(List[Any], await sub.read_response()))
+
+        tasks = [asyncio.ensure_future(keepalive()), asyncio.ensure_future(receive())]
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                task.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+    finally:
+        for conn in (sub, tracker):
+            with suppress(Exception):
+                await conn.disconnect()
+
+
+async def run_invalidation_listener(
+    cache: NearCache, mode: str, host: str, port: int
+) -> None:
+    """Keep the invalidation subscription alive (until cancelled)."""
+    while True:
+        try:
+            if mode == "keyspace":
+                await _listen_keyspace(cache, host, port)
+            else:
+                await _listen_tracking(cache, host, port)
+        except asyncio.CancelledError:
+            cache.disable()
+            raise
+        except Exception:
+            logger.warning("Session near-cache listener disconnected", exc_info=True)
+        cache.disable()
+        await asyncio.sleep(_RECONNECT_DELAY_SECONDS)
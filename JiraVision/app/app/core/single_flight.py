@@ -0,0 +1,290 @@
+"""Single-flight coalescing of identical concurrent Jira reads.
+
+Identical calls (same cloud, token, method, path, parameters, body and
+conditional headers) running at the same time share one upstream request:
+
+local   within a worker, the first call runs the request in a task; the others
+        await that task.
+redis   additionally across workers: the first worker takes a short lock
+        (`SET NX PX`), runs the request and publishes the response; workers
+        that find the lock taken wait for that message (at most
+        `jira_single_flight_wait_seconds`) and otherwise fetch on their own.
+        Waiting followers of a worker share one dedicated pub/sub connection.
+
+Errors are not shared across workers: a follower whose leader failed runs the
+request itself. Collapsed calls are counted and exported on /metrics.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import base64
+import hashlib
+from contextlib import suppress
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+import redis.asyncio as aioredis
+from redis.asyncio.client import PubSub
+
+from app.core import codec
+from app.core.config import settings
+from app.core.redis import (
+    REDIS_HOST,
+    REDIS_PORT,
+    _count_commands,
+    _ensure_async_redis_available,
+    _mark_redis_unavailable,
+    async_redis_client,
+)
+
+_RESULT_TTL_MS = 2000  # late followers read the published response from a key
+
+
+def request_key(
+    cloud_id: str,
+    access_token: str,
+    method: str,
+    path: str,
+    params: Optional[Dict[str, Any]],
+    json_body: Optional[Dict[str, Any]],
+    headers: Optional[Dict[str, str]],
+) -> str:
+    identity = codec.encode(
+        [
+            cloud_id,
+            hashlib.sha256(access_token.encode("utf-8")).hexdigest()[:16],
+            method,
+            path,
+            sorted((params or {}).items()),
+            json_body,
+            sorted((headers or {}).items()),
+        ]
+    )
+    return hashlib.sha256(identity.encode("utf-8")).hexdigest()
+
+
+def _dump(response: httpx.Response) -> str:
+    return codec.encode(
+        {
+            "status": response.status_code,
+            "headers": list(response.headers.multi_items()),
+            "content": base64.b64encode(response.content).decode("ascii"),
+            "method": response.request.method,
+            "url": str(response.request.url),
+        }
+    )
+
+
+def _load(raw: str) -> httpx.Response:
+    data = codec.decode(raw)
+    return httpx.Response(
+        data["status"],
+        headers=data["headers"],
+        content=base64.b64decode(data["content"]),
+        request=httpx.Request(data["method"], data["url"]),
+    )
+
+
+# name -> coalescer, for the /metrics collector
+_registry: Dict[str, "SingleFlight"] = {}
+
+
+class SingleFlight:
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.leaders = 0  # calls that went upstream
+        self.collapsed_local = 0  # calls served by another call of this worker
+        self.collapsed_remote = 0  # calls served by another worker
+        self._inflight: Dict[str, "asyncio.Task[httpx.Response]"] = {}
+        _registry[name] = self
+
+    async def do(
+        self, key: str, fetch: Callable[[], Awaitable[httpx.Response]]
+    ) -> httpx.Response:
+        """Run `fetch`, or join the identical call already in flight."""
+        task = self._inflight.get(key)
+        if task is not None:
+            self.collapsed_local += 1
+        else:
+            task = asyncio.ensure_future(self._run(key, fetch))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+        # the shared request survives the cancellation of any single caller
+        return await asyncio.shield(task)
+
+    def _done(self, key: str, task: "asyncio.Task[httpx.Response]") -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # retrieved here when every caller went away
+
+    async def _run(
+        self, key: str, fetch: Callable[[], Awaitable[httpx.Response]]
+    ) -> httpx.Response:
+        if settings.jira_single_flight == "redis":
+            shared = await self._remote(key, fetch)
+            if shared is not None:
+                return shared
+        self.leaders += 1
+        return await fetch()
+
+    async def _remote(
+        self, key: str, fetch: Callable[[], Awaitable[httpx.Response]]
+    ) -> Optional[httpx.Response]:
+        """Lead or follow across workers; None: fetch locally."""
+        if not await _ensure_async_redis_available():
+            return None
+        lock, channel = f"single_flight:{key}", f"single_flight:{key}:done"
+        wait = settings.jira_single_flight_wait_seconds
+        try:
+            _count_commands()
+            leader = await async_redis_client.set(
+                lock, "1", nx=True, px=int(wait * 1000)
+            )
+        except Exception:
+            _mark_redis_unavailable()
+            return None
+        if leader:
+            self.leaders += 1
+            try:
+                response = await fetch()
+            except BaseException:
+                await self._publish(lock, channel, None)
+                raise
+            await self._publish(lock, channel, response)
+            return response
+        shared = await self._follow(lock, channel, wait)
+        if shared is not None:
+            self.collapsed_remote += 1
+        return shared
+
+    async def _publish(
+        self, lock: str, channel: str, response: Optional[httpx.Response]
+    ) -> None:
+        # failures are not shared: followers then fetch on their own
+        ok = response is not None and response.status_code < 400
+        payload = _dump(response) if ok and response is not None else "error"
+        try:
+            _count_commands(2)
+            async with async_redis_client.pipeline(transaction=False) as pipe:
+                pipe.set(lock, payload, px=_RESULT_TTL_MS)
+                pipe.publish(channel, payload)
+                await pipe.execute()
+        except Exception:
+            _mark_redis_unavailable()
+
+    async def _follow(
+        self, lock: str, channel: str, wait: float
+    ) -> Optional[httpx.Response]:
+        try:
+            _count_commands(2)
+            message = await _subscriber.subscribe(channel)
+            try:
+                # published before we subscribed: the lock key holds the response
+                raw = await async_redis_client.get(lock)
+                if raw in (None, "1"):
+                    raw = await asyncio.wait_for(asyncio.shield(message), wait)
+            finally:
+                await _subscriber.unsubscribe(channel, message)
+        except asyncio.TimeoutError:
+            return None
+        except Exception:
+            _mark_redis_unavailable()
+            return None
+        if not raw or raw == "error":
+            return None
+        return _load(str(raw))
+
+
+class _Subscriber:
+    """One pub/sub connection per worker, shared by every waiting follower.
+
+    Followers register a future per channel and a reader task resolves them as
+    messages come in. The connection comes from `pubsub_client`, not from the
+    session pool: a burst of followers holds one socket, not one each.
+    """
+
+    def __init__(self) -> None:
+        self._pubsub: Optional[PubSub] = None
+        self._waiters: Dict[str, List["asyncio.Future[Optional[str]]"]] = {}
+        self._subscribed: Dict[str, "asyncio.Future[Any]"] = {}
+        self._reader: Optional["asyncio.Task[None]"] = None
+
+    async def subscribe(self, channel: str) -> "asyncio.Future[Optional[str]]":
+        """Future resolved with the next message of `channel` (None: lost)."""
+        if self._pubsub is None:
+            self._pubsub = pubsub_client.pubsub()
+        message = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(channel, []).append(message)
+        try:
+            ready = self._subscribed.get(channel)
+            if ready is None:
+                ready = asyncio.ensure_future(self._pubsub.subscribe(channel))
+                self._subscribed[channel] = ready
+            await asyncio.shield(ready)
+        except BaseException:
+            await self.unsubscribe(channel, message)
+            raise
+        if self._reader is None or self._reader.done():
+            self._reader = asyncio.ensure_future(self._read())
+        return message
+
+    async def unsubscribe(
+        self, channel: str, message: "asyncio.Future[Optional[str]]"
+    ) -> None:
+        waiters = self._waiters.get(channel, [])
+        if message in waiters:
+            waiters.remove(message)
+        if waiters:
+            return
+        self._waiters.pop(channel, None)
+        ready = self._subscribed.pop(channel, None)
+        if ready is not None and self._pubsub is not None:
+            with suppress(Exception):
+                await self._pubsub.unsubscribe(channel)
+
+    async def _read(self) -> None:
+        pubsub = self._pubsub
+        try:
+            while self._waiters and pubsub is not None:
+                msg = await pubsub.get_message(
+                    ignore_subscribe_messages=True, timeout=1.0
+                )
+                if msg is None:
+                    continue
+                for message in self._waiters.get(str(msg["channel"]), []):
+                    if not message.done():
+                        message.set_result(msg["data"])
+        except Exception:
+            # connection lost: waiting followers fetch on their own
+            self._reset()
+            if pubsub is not None:
+                with suppress(Exception):
+                    await pubsub.aclose()  # type: ignore[no-untyped-call]
+
+    def _reset(self) -> None:
+        for waiters in self._waiters.values():
+            for message in waiters:
+                if not message.done():
+                    message.set_result(None)
+        self._subscribed.clear()
+        self._pubsub = None
+
+
+# dedicated client: no socket timeout on a connection that mostly waits
+pubsub_client = aioredis.Redis(
+    host=REDIS_HOST,
+    port=REDIS_PORT,
+    decode_responses=True,
+    socket_timeout=None,
+    socket_connect_timeout=settings.redis_socket_connect_timeout,
+)
+_subscriber = _Subscriber()
+
+
+jira = SingleFlight("jira")
+
+
+def coalescers() -> List[SingleFlight]:
+    return list(_registry.values())
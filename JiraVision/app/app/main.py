@@ -1,10 +1,14 @@
 from __future__ import annotations
 
+import asyncio
 import os
+from contextlib import asynccontextmanager, suppress
 from pathlib import Path
 import time
+from typing import AsyncIterator
 
 from fastapi import FastAPI, Request, Response
+from starlette.middleware.base import RequestResponseEndpoint
 from fastapi.staticfiles import StaticFiles
 
 from app.routes.auth import router as auth_router
@@ -14,6 +18,7 @@ from app.routes.ai import router as ai_router
 from app.routes.ui import router as ui_router  # version "choix 2" => prefix="/ui"
 from app.routes.po import router as po_router
 from app.routes.debug import router as debug_router
+from app.routes.webhooks import router as webhooks_router
 from fastapi.responses import RedirectResponse
 from prometheus_client import (
     generate_latest,
@@ -23,6 +28,23 @@ from prometheus_client import (
     CollectorRegistry,
 )
 
+from app.auth.session_store import commit_after_body, commit_request_session
+from app.core import http_pool
+from app.core.metrics import (
+    CircuitBreakerCollector,
+    HttpPoolCollector,
+    IssueIndexCollector,
+    JiraCacheCollector,
+    JiraEventCollector,
+    JiraFieldProfileCollector,
+    JiraRateLimitCollector,
+    LLMCacheCollector,
+    LocalStoreCollector,
+    RedisPoolCollector,
+    SingleFlightCollector,
+    TokenRefreshCollector,
+)
+from app.core.redis import start_command_count, start_near_cache
 from app.core.telemetry import setup_telemetry
 
 
@@ -38,8 +60,26 @@ def _env_flag(name: str, default: bool = False) -> bool:
     return v.strip().lower() in {"1", "true", "yes", "y", "on"}
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    # Session near-cache invalidation listener (SESSION_NEAR_CACHE)
+    listener = start_near_cache()
+    # Pooled HTTP client shared by every JiraClient
+    await http_pool.open_shared_client()
+    try:
+        yield
+    finally:
+        await http_pool.close_shared_client()
+        if listener is not None:
+            listener.cancel()
+            with suppress(asyncio.CancelledError):
+                await listener
+
+
 def create_app() -> FastAPI:
-    app = FastAPI(title="CT - Delivery Assistant (POC)", version="0.1.0")
+    app = FastAPI(
+        title="CT - Delivery Assistant (POC)", version="0.1.0", lifespan=lifespan
+    )
 
     registry = CollectorRegistry()
 
@@ -55,14 +95,50 @@ def create_app() -> FastAPI:
         ["method", "path"],
         registry=registry,
     )
+    REDIS_COMMANDS = Histogram(
+        "redis_commands_per_request",
+        "Redis commands issued while serving one HTTP request",
+        ["method", "path"],
+        buckets=(0, 1, 2, 3, 4, 6, 8, 12, 20),
+        registry=registry,
+    )
+    registry.register(LocalStoreCollector())
+    registry.register(RedisPoolCollector())
+    registry.register(CircuitBreakerCollector())
+    registry.register(HttpPoolCollector())
+    registry.register(JiraCacheCollector())
+    registry.register(JiraRateLimitCollector())
+    registry.register(JiraFieldProfileCollector())
+    registry.register(SingleFlightCollector())
+    registry.register(IssueIndexCollector())
+    registry.register(JiraEventCollector())
+    registry.register(TokenRefreshCollector())
+    registry.register(LLMCacheCollector())
+
+    @app.middleware("http")
+    async def session_middleware(
+        request: Request, call_next: RequestResponseEndpoint
+    ) -> Response:
+        # Single write-back of the request-scoped session, only if it changed.
+        response = await call_next(request)
+        await commit_request_session(request, response)
+        # a streamed body runs later: its session changes are saved after it
+        body = getattr(response, "body_iterator", None)
+        if body is not None:
+            setattr(response, "body_iterator", commit_after_body(request, body))
+        return response
 
     @app.middleware("http")
     async def metrics_middleware(request: Request, call_next):
         start = time.perf_counter()
+        redis_commands = start_command_count()
         response = await call_next(request)
         elapsed = time.perf_counter() - start
         REQUEST_COUNT.labels(request.method, request.url.path, str(response.status_code)).inc()
         REQUEST_LATENCY.labels(request.method, request.url.path).observe(elapsed)
+        REDIS_COMMANDS.labels(request.method, request.url.path).observe(
+            redis_commands[0]
+        )
         return response
 
     @app.get("/metrics", include_in_schema=False)
@@ -103,6 +179,9 @@ def create_app() -> FastAPI:
     # PO projects endpoints
     app.include_router(po_router)
 
+    # Jira webhooks (invalidation ciblée, désactivés sans JIRA_WEBHOOK_SECRET)
+    app.include_router(webhooks_router)
+
     # UI POC (choix 2) : idéalement en dev seulement
     enable_poc = _env_flag("ENABLE_POC_UI", default=True)
     if enable_poc:
@@ -6,15 +6,17 @@ import json
 
 import httpx
 
-from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 
-from app.auth.session_store import ensure_session
-from app.core.redis import get_session
+from app.auth import token_refresh
+from app.auth.session_store import RequestSession, current_session
 from app.core.config import settings
 from app.core.ai_token import generate_ai_token
 from app.clients.jira import JiraClient, select_cloud_id
+from app.core import issue_index, jira_fields
+from app.core.retrieval import RetrievalPlan
 import os
 from app.clients.llm import LLMClient
 from app.clients.ai_service import post_json, stream_post
@@ -123,6 +125,99 @@ def _extract_links(fields: Dict[str, Any], limit: int) -> List[Dict[str, Any]]:
     return [link for link in out if link.get("key")]
 
 
+def _dependencies(
+    links: List[Dict[str, Any]], details: Dict[str, Dict[str, Any]]
+) -> List[Dict[str, Any]]:
+    out: List[Dict[str, Any]] = []
+    for link in links:
+        f = (details.get(link["key"]) or {}).get("fields") or {}
+        out.append(
+            {
+                "key": link["key"],
+                "relation": link.get("type"),
+                "direction": link.get("direction"),
+                "summary": f.get("summary"),
+                "status": (f.get("status") or {}).get("name"),
+            }
+        )
+    return out
+
+
+async def _enrich_links(
+    client: JiraClient, links: List[Dict[str, Any]]
+) -> List[Dict[str, Any]]:
+    """Dependencies with summary / status, fetched in one bulk search.
+
+    Best effort: if the search fails the dependencies keep key and relation.
+    """
+    links = [link for link in links if link.get("key")]
+    if not links:
+        return []
+    try:
+        details = await client.get_issues_bulk(link["key"] for link in links)
+    except Exception:
+        details = {}
+    return _dependencies(links, details)
+
+
+def _comments(comments_raw: Any, limit: int) -> List[Dict[str, Any]]:
+    comments = []
+    for c in ((comments_raw or {}).get("comments") or [])[:limit]:
+        body_text = _truncate(_adf_to_text(c.get("body"), fallback=""), 300)
+        if not body_text:
+            continue
+        comments.append(
+            {
+                "author": (c.get("author") or {}).get("displayName"),
+                "created": c.get("created"),
+                "body": body_text,
+            }
+        )
+    return comments
+
+
+def _retrieval_plan(client: JiraClient, body: AnalyzeIssueBody) -> RetrievalPlan:
+    """Issue and comments fetched concurrently, dependencies once the issue
+    (and its links) is in. Only the issue is required: past their deadline,
+    comments and dependency details are left out of the analysis.
+    """
+    plan = RetrievalPlan(settings.analysis_fetch_concurrency)
+    plan.add(
+        "issue",
+        lambda: client.get_issue(body.issue_key, profile=jira_fields.ANALYSIS),
+        timeout=settings.analysis_issue_timeout_seconds,
+        required=True,
+    )
+    plan.add(
+        "comments",
+        lambda: client.get_issue_comments(
+            body.issue_key, max_results=body.max_comments
+        ),
+        timeout=settings.analysis_comments_timeout_seconds,
+    )
+    plan.add(
+        "dependencies",
+        lambda issue: _enrich_links(
+            client, _extract_links(issue.get("fields") or {}, body.max_links)
+        ),
+        after="issue",
+        timeout=settings.analysis_links_timeout_seconds,
+    )
+    return plan
+
+
+def _issue_fetch_error(e: Exception) -> HTTPException:
+    if isinstance(e, PermissionError):
+        return HTTPException(401, "Token expiré — reconnecte-toi via /login")
+    if (
+        isinstance(e, httpx.HTTPStatusError)
+        and e.response is not None
+        and e.response.status_code == 404
+    ):
+        return HTTPException(404, "Ticket introuvable sur cette instance")
+    return HTTPException(502, "Erreur lors de l'appel Jira (issue)")
+
+
 def _sse(event: str, data: Dict[str, Any] | str) -> str:
     """Format a Server-Sent Events (SSE) line for an event.
 
@@ -150,11 +245,12 @@ async def _llm_step(
 
 
 @router.post("/token")
-async def ai_token(request: Request, response: Response, body: AiTokenBody) -> Dict[str, Any]:
+async def ai_token(
+    request: Request,
+    body: AiTokenBody,
+    session: RequestSession = Depends(current_session),
+) -> Dict[str, Any]:
     # Issue a short-lived token for ai-service (used by the proxy client).
-    sid = ensure_session(request, response)
-    session = get_session(sid) or {}
-
     chosen_cloud = body.cloud_id or select_cloud_id(session, request)
     entry = (session.get("tokens_by_cloud") or {}).get(chosen_cloud)
     if not entry:
@@ -170,13 +266,12 @@ async def ai_token(request: Request, response: Response, body: AiTokenBody) -> D
 
 @router.post("/summarize-jql")
 async def summarize_jql(
-    request: Request, response: Response, body: SummarizeJqlBody
+    request: Request,
+    body: SummarizeJqlBody,
+    session: RequestSession = Depends(current_session),
 ) -> Dict[str, Any]:
     ai_url = os.getenv("AI_SERVICE_URL")
 
-    sid = ensure_session(request, response)
-    session = get_session(sid) or {}
-
     chosen_cloud = body.cloud_id
 
     if ai_url:
@@ -205,7 +300,7 @@ async def summarize_jql(
 
     chosen_cloud = chosen_cloud or select_cloud_id(session, request)
 
-    entry = (session.get("tokens_by_cloud") or {}).get(chosen_cloud)
+    entry = await token_refresh.token_entry(session, chosen_cloud)
     if not entry:
         raise HTTPException(
             401,
@@ -215,7 +310,15 @@ async def summarize_jql(
     client = JiraClient(access_token=entry["access_token"], cloud_id=chosen_cloud)
 
     try:
-        data = await client.search_jql(jql=body.jql, max_results=body.max_results)
+        data = await issue_index.search(
+            client,
+            body.jql,
+            max_results=body.max_results,
+            profile=jira_fields.ISSUE_LIST,
+            account_id=session.get("jira_account_id"),
+        ) or await client.search_jql(
+            jql=body.jql, max_results=body.max_results, profile=jira_fields.ISSUE_LIST
+        )
     except PermissionError:
         raise HTTPException(401, "Token expiré — reconnecte-toi via /login")
     except Exception:
@@ -260,12 +363,9 @@ async def summarize_jql(
 @router.post("/analyze-issue")
 async def analyze_issue(
     request: Request,
-    response: Response,
     body: AnalyzeIssueBody,
+    session: RequestSession = Depends(current_session),
 ) -> Dict[str, Any]:
-    sid = ensure_session(request, response)
-    session = get_session(sid) or {}
-
     chosen_cloud = body.cloud_id or select_cloud_id(session, request)
 
     # If ai-service is available, forward minimal request and let it handle retrieval
@@ -281,53 +381,30 @@ async def analyze_issue(
             raise HTTPException(502, "Erreur ai-service (issue)")
         return {"cloud_id": chosen_cloud, "result": res.get("result") or res}
 
-    entry = (session.get("tokens_by_cloud") or {}).get(chosen_cloud)
+    entry = await token_refresh.token_entry(session, chosen_cloud)
     if not entry:
         raise HTTPException(401, "Instance non connectée.")
 
     client = JiraClient(access_token=entry["access_token"], cloud_id=chosen_cloud)
 
+    plan = _retrieval_plan(client, body)
     try:
-        issue = await client.get_issue(body.issue_key, expand="renderedFields")
-        comments_raw = await client.get_issue_comments(
-            body.issue_key, max_results=body.max_comments
-        )
-    except PermissionError:
-        raise HTTPException(401, "Token expiré — reconnecte-toi via /login")
-    except httpx.HTTPStatusError as e:
-        if e.response is not None and e.response.status_code == 404:
-            raise HTTPException(404, "Ticket introuvable sur cette instance")
-        raise HTTPException(502, "Erreur lors de l'appel Jira (issue)")
-    except Exception:
-        raise HTTPException(502, "Erreur lors de l'appel Jira (issue)")
+        async for _ in plan.run():
+            pass
+    except Exception as e:
+        raise _issue_fetch_error(e)
 
+    issue = plan.value("issue")
     fields = issue.get("fields", {}) or {}
     description = _adf_to_text(fields.get("description"), fallback="")
     description = _truncate(description, 600)
 
-    comments = []
-    for c in (comments_raw.get("comments") or [])[: body.max_comments]:
-        body_text = _truncate(_adf_to_text(c.get("body"), fallback=""), 300)
-        if not body_text:
-            continue
-        comments.append(
-            {
-                "author": (c.get("author") or {}).get("displayName"),
-                "created": c.get("created"),
-                "body": body_text,
-            }
-        )
-
+    comments = _comments(plan.value("comments"), body.max_comments)
     links = _extract_links(fields, body.max_links)
-    linked_issues: List[Dict[str, Any]] = []
-    for link in links:
-        linked_issues.append(
-            {
-                "key": link.get("key"),
-                "relation": link.get("type"),
-                "direction": link.get("direction"),
-            }
-        )
+    linked_issues = plan.value("dependencies")
+    if linked_issues is None:
+        linked_issues = _dependencies(links, {})
+    missing = plan.missing()
 
     payload = {
         "issue": {
@@ -344,6 +421,9 @@ async def analyze_issue(
         "comments": comments,
         "dependencies": linked_issues,
     }
+    if missing:
+        # tell the model what it does not see rather than let it guess
+        payload["missing"] = missing
 
     system = (
         "Tu es un assistant Delivery interne. "
@@ -372,23 +452,37 @@ async def analyze_issue(
     except Exception:
         raise HTTPException(502, "Erreur LLM")
 
-    return {
-        "cloud_id": chosen_cloud,
-        "result": result,
-    }
+    out: Dict[str, Any] = {"cloud_id": chosen_cloud, "result": result}
+    if missing:
+        out["partial"] = missing
+    return out
+
+
+async def _llm_stream_step(
+    llm_client: LLMClient,
+    *,
+    title: str,
+    system: str,
+    user: str,
+) -> AsyncIterator[str]:
+    """Same as `_llm_step`, yielding the text as the model generates it."""
+    try:
+        async for chunk in llm_client.chat_stream(system=system, user=user):
+            yield chunk
+    except HTTPException as e:
+        raise HTTPException(e.status_code, f"{title}: {e.detail}")
+    except Exception:
+        raise HTTPException(502, f"{title}: Erreur LLM")
 
 
 @router.post("/analyze-issue/stream")
 async def analyze_issue_stream(
     request: Request,
-    response: Response,
     body: AnalyzeIssueBody,
+    session: RequestSession = Depends(current_session),
 ) -> StreamingResponse:
-    sid = ensure_session(request, response)
-    session = get_session(sid) or {}
-
     chosen_cloud = body.cloud_id or select_cloud_id(session, request)
-    entry = (session.get("tokens_by_cloud") or {}).get(chosen_cloud)
+    entry = await token_refresh.token_entry(session, chosen_cloud)
     if not entry:
 
         async def err_stream() -> AsyncIterator[str]:
@@ -415,59 +509,49 @@ async def analyze_issue_stream(
         return StreamingResponse(remote_stream(), media_type="text/event-stream")
 
     async def event_stream() -> AsyncIterator[str]:
+        yield _sse(
+            "log",
+            f"Instance {chosen_cloud} : recuperation du ticket {body.issue_key}…",
+        )
+        plan = _retrieval_plan(client, body)
         try:
-            yield _sse(
-                "log",
-                f"Instance {chosen_cloud} : recuperation du ticket {body.issue_key}…",
-            )
-            issue = await client.get_issue(body.issue_key, expand="renderedFields")
-            yield _sse("log", "Ticket recupere. Lecture des commentaires…")
-            comments_raw = await client.get_issue_comments(
-                body.issue_key, max_results=body.max_comments
-            )
-        except PermissionError:
-            yield _sse(
-                "error",
-                {"code": 401, "message": "Token expiré — reconnecte-toi via /login"},
-            )
+            # one log line per fetch, in the order they complete
+            async for stage in plan.run():
+                if stage.name == "issue":
+                    fields = stage.value.get("fields", {}) or {}
+                    count = len(_extract_links(fields, body.max_links))
+                    yield _sse("log", "Ticket recupere.")
+                    if count:
+                        yield _sse(
+                            "log",
+                            f"{count} dependance(s) detectee(s). Analyse en cours…",
+                        )
+                    else:
+                        yield _sse("log", "Aucune dependance detectee.")
+                elif stage.name == "comments":
+                    if stage.ok:
+                        raw = (stage.value or {}).get("comments") or []
+                        count = len(raw[: body.max_comments])
+                        yield _sse("log", f"{count} commentaire(s) recupere(s).")
+                    else:
+                        yield _sse("log", "Commentaires indisponibles (partiel).")
+                elif not stage.ok:
+                    yield _sse("log", "Dependances non detaillees (partiel).")
+                elif stage.value:
+                    yield _sse("log", "Dependances recuperees.")
+        except Exception as e:
+            error = _issue_fetch_error(e)
+            yield _sse("error", {"code": error.status_code, "message": error.detail})
             return
-        except httpx.HTTPStatusError as e:
-            if e.response is not None and e.response.status_code == 404:
-                yield _sse(
-                    "error",
-                    {"code": 404, "message": "Ticket introuvable sur cette instance"},
-                )
-                return
-            yield _sse(
-                "error",
-                {"code": 502, "message": "Erreur lors de l'appel Jira (issue)"},
-            )
-            return
-        except Exception:  # pragma: no cover
-            yield _sse(  # pragma: no cover
-                "error",
-                {"code": 502, "message": "Erreur lors de l'appel Jira (issue)"},
-            )
-            return  # pragma: no cover
 
+        issue = plan.value("issue")
         fields = issue.get("fields", {}) or {}
         description = _adf_to_text(fields.get("description"), fallback="")
         description = _truncate(description, 600)
-
-        comments = []
-        raw_comments = (comments_raw.get("comments") or [])[: body.max_comments]
-        yield _sse("log", f"{len(raw_comments)} commentaire(s) recupere(s).")
-        for c in raw_comments:
-            body_text = _truncate(_adf_to_text(c.get("body"), fallback=""), 300)
-            if not body_text:
-                continue
-            comments.append(
-                {
-                    "author": (c.get("author") or {}).get("displayName"),
-                    "created": c.get("created"),
-                    "body": body_text,
-                }
-            )
+        comments = _comments(plan.value("comments"), body.max_comments)
+        dependencies = plan.value("dependencies")
+        if dependencies is None:
+            dependencies = _dependencies(_extract_links(fields, body.max_links), {})
 
         # build payload
         payload_local = {
@@ -483,30 +567,9 @@ async def analyze_issue_stream(
                 "description": description,
             },
             "comments": comments,
-            "dependencies": [],
+            "dependencies": dependencies,
         }
 
-        links = _extract_links(fields, body.max_links)
-        if links:
-            yield _sse(
-                "log",
-                f"{len(links)} dependance(s) detectee(s). Analyse en cours…",
-            )
-        else:
-            yield _sse("log", "Aucune dependance detectee.")
-
-        for link in links:
-            key = link.get("key")
-            if not key:
-                continue
-            payload_local["dependencies"].append(
-                {
-                    "key": key,
-                    "relation": link.get("type"),
-                    "direction": link.get("direction"),
-                }
-            )
-
         # Fallback: local processing using llm as before
         system = (
             "Tu es un assistant Delivery interne. "
@@ -580,12 +643,17 @@ async def analyze_issue_stream(
                 f"Commentaires (synthese): {comments_summary}\n"
                 f"Dependances (synthese): {deps_summary}"
             )
-            result = await _llm_step(
+            # tokens forwarded as they are generated, then the full text
+            parts: List[str] = []
+            async for chunk in _llm_stream_step(
                 llm,
                 title="Synthese",
                 system=final_system,
                 user=final_user,
-            )
+            ):
+                parts.append(chunk)
+                yield _sse("delta", {"text": chunk})
+            result = "".join(parts)
         except HTTPException as e:
             yield _sse("error", {"code": e.status_code, "message": str(e.detail)})
             return
@@ -11,15 +11,22 @@ from fastapi.responses import RedirectResponse
 from itsdangerous import BadSignature
 
 from app.core.config import settings
-from app.core.redis import get_session, set_session
-from app.auth.session_store import ensure_session, destroy_session, state_serializer
+from app.auth.token_refresh import expiry_fields
+from app.auth.session_store import (
+    current_session,
+    destroy_session,
+    ensure_session,
+    state_serializer,
+)
 
 router = APIRouter(tags=["auth"])
 
-AUTH_BASE = "https://auth.atlassian.com"
+AUTH_BASE = settings.atlassian_auth_base_url.rstrip("/")
 AUTHORIZE_URL = f"{AUTH_BASE}/authorize"
 TOKEN_URL = f"{AUTH_BASE}/oauth/token"
-ACCESSIBLE_RESOURCES_URL = "https://api.atlassian.com/oauth/token/accessible-resources"
+ACCESSIBLE_RESOURCES_URL = (
+    f"{settings.atlassian_api_base_url.rstrip('/')}/oauth/token/accessible-resources"
+)
 
 POST_LOGIN_REDIRECT = "/ui"
 POST_LOGOUT_REDIRECT = "/auth"
@@ -98,11 +105,8 @@ async def login(request: Request) -> RedirectResponse:
     url = f"{AUTHORIZE_URL}?{urlencode(params)}"
     resp = RedirectResponse(url)
 
-    sid = ensure_session(request, resp)
-
-    session = get_session(sid) or {}
+    session = await current_session(request, resp)
     session["state"] = state
-    set_session(sid, session)
 
     resp.set_cookie(
         key="oauth_state",
@@ -123,8 +127,7 @@ async def oauth_callback(
     code: Optional[str] = None,
     state: Optional[str] = None,
 ) -> RedirectResponse:
-    sid = ensure_session(request, response)
-    session: Dict[str, Any] = get_session(sid) or {}
+    session = await current_session(request, response)
 
     expected_state = session.get("state")
     if not expected_state:
@@ -179,7 +182,8 @@ async def oauth_callback(
     for res in jira_resources:
         cloud_id = res["id"]
         tokens_by_cloud[cloud_id] = {
-            "access_token": access_token,
+            # access_token, plus refresh_token / expires_at (scope offline_access)
+            **expiry_fields(tok),
             "site_url": (res.get("url") or "").rstrip("/"),
             "name": res.get("name"),
             "scopes": res.get("scopes", []) or [],
@@ -211,13 +215,16 @@ async def oauth_callback(
     session["scopes"] = active_entry.get("scopes", [])
 
     session.pop("state", None)
-    set_session(sid, session)
 
     import logging
-    logging.getLogger(__name__).info("Session after token exchange for sid=%s: %s", sid, session)
+    logging.getLogger(__name__).info(
+        "Session after token exchange for sid=%s (clouds: %s)",
+        session.sid,
+        session["cloud_ids"],
+    )
 
     resp = RedirectResponse(url=POST_LOGIN_REDIRECT)
-    ensure_session(request, resp)
+    await ensure_session(request, resp)
     # log cookies set on response
     logging.getLogger(__name__).info(
         "Response cookies after login: %s", resp.headers.get("set-cookie")
@@ -229,6 +236,6 @@ async def oauth_callback(
 @router.get("/logout")
 async def logout(request: Request) -> RedirectResponse:
     resp = RedirectResponse(POST_LOGOUT_REDIRECT)
-    destroy_session(request, resp)
+    await destroy_session(request, resp)
     resp.delete_cookie("oauth_state", path="/")
     return resp
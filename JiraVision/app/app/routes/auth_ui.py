@@ -2,12 +2,11 @@ from __future__ import annotations
 
 from pathlib import Path
 
-from fastapi import APIRouter, Request, Response
+from fastapi import APIRouter, Depends, Request
 from fastapi.responses import HTMLResponse
 from pydantic import BaseModel
 
-from app.auth.session_store import ensure_session
-from app.core.redis import get_session
+from app.auth.session_store import RequestSession, current_session, ensure_session
 
 router = APIRouter(prefix="/auth", tags=["ui-auth"])
 
@@ -27,12 +26,10 @@ class AuthState(BaseModel):
 @router.get("", response_class=HTMLResponse)
 async def auth_page(request: Request) -> HTMLResponse:
     resp = HTMLResponse(_HTML)
-    ensure_session(request, resp)
+    await ensure_session(request, resp)
     return resp
 
 
 @router.get("/state", response_model=AuthState)
-async def auth_state(request: Request, response: Response) -> AuthState:
-    sid = ensure_session(request, response)
-    session = get_session(sid) or {}
+async def auth_state(session: RequestSession = Depends(current_session)) -> AuthState:
     return AuthState(logged_in=bool(session.get("access_token")))
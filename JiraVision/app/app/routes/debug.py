@@ -47,7 +47,7 @@ async def debug_cookie(request: Request) -> Dict[str, Any]:
 
     raw = request.cookies.get("sid")
     sid = get_sid(request)
-    session = get_session(sid) if sid else None
+    session = await get_session(sid) if sid else None
 
     tbc = (session or {}).get("tokens_by_cloud") or {}
     has_token = bool((session or {}).get("access_token")) or bool(tbc)
@@ -69,7 +69,7 @@ async def debug_session(request: Request) -> Dict[str, Any]:
     if not sid:
         raise HTTPException(401, "Pas de cookie sid")
 
-    session = get_session(sid)
+    session = await get_session(sid)
     if not session:
         raise HTTPException(401, "Pas de session Redis")
 
@@ -108,6 +108,7 @@ async def debug_routes() -> Dict[str, str]:
     return {
         "jira_issue": "/jira/issue",
         "jira_search": "/jira/search",
+        "jira_search_stream": "/jira/search/stream",
         "jira_select": "/jira/select",
         "auth_login": "/login",
         "auth_callback": "/oauth/callback",
@@ -1,21 +1,22 @@
 from __future__ import annotations
 
+import json
+from contextlib import aclosing
 import httpx
-from typing import Any, Dict
+from typing import Any, AsyncIterator, Dict, Literal, Optional
 
-from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
 
-from app.auth.session_store import ensure_session
-from app.core.redis import get_session, set_session
+from app.auth import token_refresh
+from app.auth.session_store import RequestSession, session_fields
 from app.clients.jira import JiraClient, select_cloud_id
+from app.core import issue_index, jira_fields
+from app.core.config import settings
 
 router = APIRouter(prefix="/jira", tags=["jira"])
 
 
-def _ensure_sid(request: Request, response: Response) -> str:
-    return ensure_session(request, response)
-
-
 def _require_logged_in(session: Dict[str, Any]) -> None:
     tbc = session.get("tokens_by_cloud") or {}
     if not tbc and "access_token" not in session:
@@ -42,24 +43,23 @@ def _extract_search_items(data: Dict[str, Any]) -> list[Dict[str, Any]]:
     return items or []
 
 
+def _map_search_item(it: Dict[str, Any]) -> Dict[str, Any]:
+    f = it.get("fields", {}) or {}
+    return {
+        "key": it.get("key"),
+        "summary": f.get("summary"),
+        "status": (f.get("status") or {}).get("name"),
+        "type": (f.get("issuetype") or {}).get("name"),
+        "project": (f.get("project") or {}).get("key"),
+        "assignee": (f.get("assignee") or {}).get("displayName"),
+        "updated": f.get("updated"),
+        "created": f.get("created"),
+    }
+
+
 def _map_search_result(data: Dict[str, Any]) -> Dict[str, Any]:
     items = _extract_search_items(data)
-    issues: list[Dict[str, Any]] = []
-
-    for it in items:
-        f = it.get("fields", {}) or {}
-        issues.append(
-            {
-                "key": it.get("key"),
-                "summary": f.get("summary"),
-                "status": (f.get("status") or {}).get("name"),
-                "type": (f.get("issuetype") or {}).get("name"),
-                "project": (f.get("project") or {}).get("key"),
-                "assignee": (f.get("assignee") or {}).get("displayName"),
-                "updated": f.get("updated"),
-                "created": f.get("created"),
-            }
-        )
+    issues = [_map_search_item(it) for it in items]
 
     return {
         "total": data.get("total"),
@@ -91,21 +91,50 @@ def _jira_client_from_session(session: Dict[str, Any], request: Request) -> Jira
     return JiraClient(access_token=entry["access_token"], cloud_id=cloud_id)
 
 
+async def _jira_client_for_request(
+    session: RequestSession, request: Request
+) -> JiraClient:
+    """Same as `_jira_client_from_session`, loading only the selected cloud's token."""
+    _require_logged_in(session)
+    cloud_id = select_cloud_id(session, request)
+    await session.load_fields(f"tokens_by_cloud:{cloud_id}")
+    await token_refresh.token_entry(session, cloud_id)
+    return _jira_client_from_session(session, request)
+
+
+# Fields needed to pick the Jira instance of a request (token loaded afterwards)
+_CLOUD_FIELDS = ("access_token", "cloud_ids", "active_cloud_id")
+
+_STREAM_PAGE_SIZE = 50
+
+
+def _search_error(e: Exception) -> HTTPException:
+    if isinstance(e, PermissionError):
+        return HTTPException(401, "Token expiré — reconnecte-toi via /login")
+    if isinstance(e, httpx.HTTPStatusError):
+        # propager le status Jira (souvent 400) avec un petit snippet
+        snippet = (e.response.text or "")[:300].replace("\n", " ")
+        return HTTPException(e.response.status_code, f"Jira error: {snippet}")
+    return HTTPException(502, "Erreur lors de l'appel Jira (search_jql)")
+
+
+def _stream_record(fmt: str, kind: str, data: Dict[str, Any]) -> str:
+    if fmt == "sse":
+        payload = json.dumps(data, ensure_ascii=False)
+        return f"event: {kind}\ndata: {payload}\n\n"
+    return json.dumps({"kind": kind, **data}, ensure_ascii=False) + "\n"
+
+
 @router.post("/select")
 async def jira_select(
-    request: Request,
-    response: Response,
     cloud_id: str,
+    session: RequestSession = Depends(session_fields("cloud_ids")),
 ) -> Dict[str, Any]:
-    sid = _ensure_sid(request, response)
-    session = get_session(sid) or {}
-
     ids = session.get("cloud_ids") or []
     if cloud_id not in ids:
         raise HTTPException(400, "cloud_id inconnu/non connecté")
 
     session["active_cloud_id"] = cloud_id
-    set_session(sid, session)
     return {
         "ok": True,
         "active_cloud_id": cloud_id,
@@ -115,16 +144,13 @@ async def jira_select(
 @router.get("/issue")
 async def jira_issue(
     request: Request,
-    response: Response,
     issue_key: str,
+    session: RequestSession = Depends(session_fields(*_CLOUD_FIELDS)),
 ) -> Dict[str, Any]:
-    sid = _ensure_sid(request, response)
-    session = get_session(sid) or {}
-
-    client = _jira_client_from_session(session, request)
+    client = await _jira_client_for_request(session, request)
 
     try:
-        issue = await client.get_issue(issue_key)
+        issue = await client.get_issue(issue_key, profile=jira_fields.ISSUE_CARD)
     except PermissionError:
         raise HTTPException(401, "Token expiré — reconnecte-toi via /login")
     except httpx.HTTPStatusError as e:
@@ -143,45 +169,106 @@ async def jira_issue(
 @router.get("/search")
 async def jira_search(
     request: Request,
-    response: Response,
     jql: str,
     max_results: int = 20,
     next_page_token: str | None = None,
+    session: RequestSession = Depends(
+        session_fields(*_CLOUD_FIELDS, "jira_account_id")
+    ),
 ) -> Dict[str, Any]:
     if max_results < 1 or max_results > 100:
         raise HTTPException(400, "max_results doit être entre 1 et 100")
 
-    sid = _ensure_sid(request, response)
-    session = get_session(sid) or {}
+    client = await _jira_client_for_request(session, request)
 
-    client = _jira_client_from_session(session, request)
-
-    try:
-        data = await client.search_jql(
-            jql=jql,
+    data = None
+    if next_page_token is None:  # local answers are a single page
+        data = await issue_index.search(
+            client,
+            jql,
             max_results=max_results,
-            next_page_token=next_page_token,
-        )
-    except PermissionError:
-        raise HTTPException(401, "Token expiré — reconnecte-toi via /login")
-    except httpx.HTTPStatusError as e:
-        # propager le status Jira (souvent 400) avec un petit snippet
-        snippet = (e.response.text or "")[:300].replace("\n", " ")
-        raise HTTPException(
-            e.response.status_code,
-            f"Jira error: {snippet}",
+            profile=jira_fields.ISSUE_CARD,
+            account_id=session.get("jira_account_id"),
         )
-    except Exception:
-        raise HTTPException(502, "Erreur lors de l'appel Jira (search_jql)")
+    if data is None:
+        try:
+            data = await client.search_jql(
+                jql=jql,
+                max_results=max_results,
+                next_page_token=next_page_token,
+                profile=jira_fields.ISSUE_CARD,
+            )
+        except Exception as e:
+            raise _search_error(e)
 
     return _map_search_result(data)
 
 
-@router.get("/instances")
-async def jira_instances(request: Request, response: Response) -> Dict[str, Any]:
-    sid = _ensure_sid(request, response)
-    session = get_session(sid) or {}
+@router.get("/search/stream")
+async def jira_search_stream(
+    request: Request,
+    jql: str,
+    limit: Optional[int] = None,
+    format: Literal["ndjson", "sse"] = "ndjson",
+    session: RequestSession = Depends(session_fields(*_CLOUD_FIELDS)),
+) -> StreamingResponse:
+    """Every issue matching `jql` (up to `limit`), streamed as pages arrive.
+
+    One record per issue (same shape as /jira/search items), then an `end`
+    record; NDJSON lines carry their kind in `kind`, SSE uses event names.
+    Only the page being sent and the next one are held in memory, and the
+    walk stops when the client goes away.
+    """
+    cap = settings.jira_search_stream_max_issues
+    if limit is not None and (limit < 1 or limit > cap):
+        raise HTTPException(400, f"limit doit être entre 1 et {cap}")
+    limit = limit or cap
+
+    client = await _jira_client_for_request(session, request)
+    issues = client.iter_search(
+        jql,
+        page_size=_STREAM_PAGE_SIZE,
+        limit=limit,
+        profile=jira_fields.ISSUE_CARD,
+    )
+    try:
+        # a bad JQL / expired token still gets its HTTP status
+        first = await anext(issues, None)
+    except Exception as e:
+        await issues.aclose()
+        raise _search_error(e)
+
+    async def records() -> AsyncIterator[str]:
+        returned = 0
+        async with aclosing(issues):
+            item = first
+            try:
+                while item is not None:
+                    yield _stream_record(format, "issue", _map_search_item(item))
+                    returned += 1
+                    at_page_end = returned % _STREAM_PAGE_SIZE == 0
+                    if at_page_end and await request.is_disconnected():
+                        return
+                    item = await anext(issues, None)
+            except Exception as e:
+                error = _search_error(e)
+                detail = {"code": error.status_code, "message": error.detail}
+                yield _stream_record(format, "error", detail)
+                return
+        yield _stream_record(
+            format, "end", {"returned": returned, "limit_reached": returned >= limit}
+        )
+
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    return StreamingResponse(records(), media_type=media_type)
+
 
+@router.get("/instances")
+async def jira_instances(
+    session: RequestSession = Depends(
+        session_fields("jira_sites", "cloud_ids", "active_cloud_id")
+    ),
+) -> Dict[str, Any]:
     sites = session.get("jira_sites") or []
     safe_sites = []
     for s in sites:
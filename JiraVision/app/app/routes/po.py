@@ -1,19 +1,25 @@
 from __future__ import annotations
 
+import asyncio
 import logging
-from typing import Any, Dict, List
+import time
+from typing import Any, Dict, List, Optional, Tuple
 
-from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
 
-from app.auth.session_store import ensure_session
-from app.core.redis import get_session
+from app.auth.session_store import RequestSession, current_session
 from app.core import po_project_store, po_project_sync
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/po", tags=["po"])
 
+# Délai minimal entre deux resyncs de fond d'un même utilisateur (échecs compris)
+_RESYNC_RETRY_SECONDS = 300.0
+# jira_account_id -> (début de la dernière tentative, tâche)
+_resyncs: Dict[str, Tuple[float, Optional["asyncio.Task[None]"]]] = {}
+
 
 class ProjectsResponse(BaseModel):
     projects: List[Dict[str, Any]]
@@ -35,11 +41,8 @@ class MaskProjectRequest(BaseModel):
     mask_type: str
 
 
-def _get_jira_account_id(request: Request, response: Response) -> str:
+def _get_jira_account_id(session: Dict[str, Any]) -> str:
     """Get the current user's Jira account ID from session."""
-    sid = ensure_session(request, response)
-    session = get_session(sid) or {}
-    
     if not session.get("access_token"):
         raise HTTPException(401, "Non authentifié")
     
@@ -64,12 +67,36 @@ def _filter_and_format_projects(
     }
 
 
+async def _resync(jira_account_id: str, session: Dict[str, Any]) -> None:
+    try:
+        await po_project_sync.sync_projects_for_user(jira_account_id, session)
+    except Exception as exc:
+        logger.warning("Resync projets en échec: %s", exc)
+
+
+def _start_resync(jira_account_id: str, session: Dict[str, Any]) -> None:
+    """Resync en fond, au plus une par utilisateur et par `_RESYNC_RETRY_SECONDS`."""
+    started, task = _resyncs.get(jira_account_id, (0.0, None))
+    now = time.monotonic()
+    if (task is not None and not task.done()) or now - started < _RESYNC_RETRY_SECONDS:
+        return
+    # copie : la session de la requête n'est plus écrite après la réponse
+    task = asyncio.ensure_future(_resync(jira_account_id, dict(session)))
+    _resyncs[jira_account_id] = (now, task)
+
+
 @router.get("/projects", response_model=ProjectsResponse)
-async def get_projects(request: Request, response: Response) -> ProjectsResponse:
+async def get_projects(
+    session: RequestSession = Depends(current_session),
+) -> ProjectsResponse:
     """Get all projects for the current user."""
-    jira_account_id = _get_jira_account_id(request, response)
+    jira_account_id = _get_jira_account_id(session)
     
     user = po_project_store.get_user(jira_account_id)
+    if po_project_store.is_stale(user):
+        # Un webhook Jira a signalé un changement sur un ticket de l'utilisateur :
+        # la liste en cache est servie, la resync part en tâche de fond
+        _start_resync(jira_account_id, session)
     last_synced_at = user.get("last_synced_at") if user else None
     
     all_projects = po_project_store.list_projects_for_user(jira_account_id)
@@ -89,13 +116,10 @@ async def get_projects(request: Request, response: Response) -> ProjectsResponse
 @router.post("/projects/refresh", response_model=ProjectsResponse)
 async def refresh_projects(
     req: RefreshRequest,
-    request: Request,
-    response: Response
+    session: RequestSession = Depends(current_session),
 ) -> ProjectsResponse:
     """Refresh projects from Jira for the current user."""
-    jira_account_id = _get_jira_account_id(request, response)
-    sid = ensure_session(request, response)
-    session = get_session(sid) or {}
+    jira_account_id = _get_jira_account_id(session)
     
     if req.reset_definitif:
         # Reset all definitif masks to none before sync
@@ -104,7 +128,7 @@ async def refresh_projects(
             if proj.get("mask_type") == "definitif":
                 po_project_store.set_project_mask(
                     jira_account_id,
-                    proj["project_key"],
+                    project_key=proj["project_key"],
                     mask_type="none",
                     cloud_id=proj.get("cloud_id")
                 )
@@ -133,11 +157,10 @@ async def refresh_projects(
 @router.post("/projects", response_model=Dict[str, Any])
 async def add_project(
     req: AddProjectRequest,
-    request: Request,
-    response: Response
+    session: RequestSession = Depends(current_session),
 ) -> Dict[str, Any]:
     """Add a project manually."""
-    jira_account_id = _get_jira_account_id(request, response)
+    jira_account_id = _get_jira_account_id(session)
     
     project = po_project_store.upsert_project_for_user(
         jira_account_id,
@@ -156,11 +179,10 @@ async def add_project(
 async def mask_project(
     project_key: str,
     req: MaskProjectRequest,
-    request: Request,
-    response: Response
+    session: RequestSession = Depends(current_session),
 ) -> Dict[str, Any]:
     """Mask a project (temporaire or definitif)."""
-    jira_account_id = _get_jira_account_id(request, response)
+    jira_account_id = _get_jira_account_id(session)
     
     if req.mask_type not in ("temporaire", "definitif"):
         raise HTTPException(400, "mask_type invalide")
@@ -2,11 +2,10 @@ from __future__ import annotations
 
 from typing import Any, Dict, Optional
 
-from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel, Field
 
-from app.auth.session_store import ensure_session
-from app.core.redis import get_session
+from app.auth.session_store import RequestSession, current_session
 from app.core import po_project_store, po_project_sync
 
 router = APIRouter(prefix="/po/projects", tags=["po-projects"])
@@ -30,9 +29,9 @@ class RefreshPayload(BaseModel):
     reset_definitif: bool = False
 
 
-def _get_session(request: Request, response: Response) -> Dict[str, Any]:
-    sid = ensure_session(request, response)
-    session = get_session(sid) or {}
+async def _get_session(
+    session: RequestSession = Depends(current_session),
+) -> RequestSession:
     if not session.get("access_token") and not (session.get("tokens_by_cloud") or {}):
         raise HTTPException(401, "Connecte-toi d'abord via Login Atlassian")
     if not session.get("jira_account_id"):
@@ -52,8 +51,9 @@ def _split_projects(items: list[Dict[str, Any]]) -> Dict[str, list[Dict[str, Any
 
 
 @router.get("")
-async def list_projects(request: Request, response: Response) -> Dict[str, Any]:
-    session = _get_session(request, response)
+async def list_projects(
+    session: RequestSession = Depends(_get_session),
+) -> Dict[str, Any]:
     account_id = session.get("jira_account_id")
 
     items = po_project_store.list_projects_for_user(account_id)
@@ -69,11 +69,9 @@ async def list_projects(request: Request, response: Response) -> Dict[str, Any]:
 
 @router.post("")
 async def add_project(
-    request: Request,
-    response: Response,
     payload: ProjectPayload,
+    session: RequestSession = Depends(_get_session),
 ) -> Dict[str, Any]:
-    session = _get_session(request, response)
     account_id = session.get("jira_account_id")
 
     try:
@@ -94,12 +92,10 @@ async def add_project(
 
 @router.delete("/{project_key}")
 async def mask_project(
-    request: Request,
-    response: Response,
     project_key: str,
     payload: MaskPayload,
+    session: RequestSession = Depends(_get_session),
 ) -> Dict[str, Any]:
-    session = _get_session(request, response)
     account_id = session.get("jira_account_id")
 
     try:
@@ -119,11 +115,9 @@ async def mask_project(
 
 @router.post("/refresh")
 async def refresh_projects(
-    request: Request,
-    response: Response,
     payload: RefreshPayload,
+    session: RequestSession = Depends(_get_session),
 ) -> Dict[str, Any]:
-    session = _get_session(request, response)
     account_id = session.get("jira_account_id")
 
     if payload.reset_definitif:
@@ -2,12 +2,11 @@ from __future__ import annotations
 
 from pathlib import Path
 
-from fastapi import APIRouter, Request, Response
+from fastapi import APIRouter, Depends, Request, Response
 from fastapi.responses import HTMLResponse, RedirectResponse
 from pydantic import BaseModel
 
-from app.auth.session_store import ensure_session
-from app.core.redis import get_session
+from app.auth.session_store import RequestSession, current_session, ensure_session
 
 router = APIRouter(prefix="/ui", tags=["ui"])
 
@@ -26,19 +25,16 @@ class UiState(BaseModel):
 @router.get("", response_class=HTMLResponse)
 async def ui_page(request: Request) -> Response:
     resp = HTMLResponse(_HTML)
-    sid = ensure_session(request, resp)
-    session = get_session(sid) or {}
+    session = await current_session(request, resp)
     if not session.get("access_token"):
         redirect = RedirectResponse("/auth")
-        ensure_session(request, redirect)
+        await ensure_session(request, redirect)
         return redirect
     return resp
 
 
 @router.get("/state", response_model=UiState)
-async def ui_state(request: Request, response: Response) -> UiState:
-    sid = ensure_session(request, response)
-    session = get_session(sid) or {}
+async def ui_state(session: RequestSession = Depends(current_session)) -> UiState:
     logged_in = bool(session.get("access_token"))
 
     # TODO: remplacer par settings/env
@@ -0,0 +1,54 @@
+"""
+app/routes/webhooks.py
+
+Réception des webhooks Jira (tickets, commentaires, liens) : invalidation
+ciblée du cache, de l'index local et des projets PO (app/core/jira_events.py).
+
+À déclarer côté Jira (Paramètres système > WebHooks) avec l'URL
+`/webhooks/jira/{cloud_id}` et le secret `JIRA_WEBHOOK_SECRET` : chaque envoi
+est signé (en-tête `X-Hub-Signature: sha256=<HMAC du corps>`). Sans secret
+configuré, la route répond 404.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import hmac
+import json
+from typing import Any, Dict
+
+from fastapi import APIRouter, HTTPException, Request
+
+from app.core import jira_events
+from app.core.config import settings
+
+router = APIRouter(prefix="/webhooks", tags=["webhooks"])
+
+
+def _verify(secret: str, body: bytes, signature: str) -> bool:
+    expected = hmac.new(secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+    algo, _, received = signature.partition("=")
+    return algo == "sha256" and hmac.compare_digest(expected, received.strip())
+
+
+@router.post("/jira/{cloud_id}")
+async def jira_webhook(cloud_id: str, request: Request) -> Dict[str, Any]:
+    secret = settings.jira_webhook_secret
+    if not secret:
+        raise HTTPException(404, "Not found")
+
+    body = await request.body()
+    if not _verify(secret, body, request.headers.get("x-hub-signature", "")):
+        raise HTTPException(401, "Signature invalide")
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        raise HTTPException(400, "Corps JSON invalide")
+    if not isinstance(payload, dict):
+        raise HTTPException(400, "Corps JSON invalide")
+
+    event = jira_events.IssueEvent.from_payload(cloud_id, payload)
+    if event is None:
+        return {"ok": True, "event": "ignored"}
+    await jira_events.publish(event)
+    return {"ok": True, "event": event.kind}
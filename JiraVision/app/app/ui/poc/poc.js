@@ -624,6 +624,7 @@
 
       let done = false;
       let hasResult = false;
+      let streamed = false;
       let errorCode = null;
       let errorMsg = null;
 
@@ -642,6 +643,14 @@
         (event, data) => {
           if (event === "log") {
             log(data);
+          } else if (event === "delta") {
+            const payload = tryJson(data);
+            if (!streamed) {
+              if (status) status.textContent = logs.join("\n") + "\n\n---\nResultat:";
+              out.textContent = "";
+              streamed = true;
+            }
+            out.textContent += payload?.text || "";
           } else if (event === "result") {
             const payload = tryJson(data);
             const text = payload?.text || data;
@@ -691,38 +700,40 @@
     }
 
     const allIssues = [];
-    let total = 0;
     let lastError = null;
+    const render = () => {
+      out.textContent = JSON.stringify(
+        { returned: allIssues.length, issues: allIssues },
+        null,
+        2
+      );
+    };
 
+    // toutes les pages, affichees au fil de l'eau
     for (const cloudId of activeIds) {
-      const r = await fetchJson(
-        "/jira/search?jql=" + encodeURIComponent(jql) +
-        "&cloud_id=" + encodeURIComponent(cloudId)
+      await streamSse(
+        withCacheBuster(
+          "/jira/search/stream?format=sse&jql=" + encodeURIComponent(jql) +
+          "&cloud_id=" + encodeURIComponent(cloudId)
+        ),
+        { credentials: "same-origin", cache: "no-store" },
+        (event, data) => {
+          const payload = tryJson(data) || {};
+          if (event === "issue") {
+            allIssues.push(payload);
+            if (allIssues.length % 50 === 0) render();
+          } else if (event === "error") {
+            lastError = payload.message || `Erreur (${payload.code})`;
+          }
+        }
       );
-      if (!r.ok || !r.json) {
-        lastError = r.text || `Erreur (${r.status})`;
-        continue;
-      }
-
-      const issues = r.json.issues || [];
-      total += Number(r.json.total || issues.length);
-      allIssues.push(...issues);
     }
 
     if (!allIssues.length && lastError) {
       out.textContent = lastError;
       return;
     }
-
-    out.textContent = JSON.stringify(
-      {
-        total,
-        returned: allIssues.length,
-        issues: allIssues,
-      },
-      null,
-      2
-    );
+    render();
   }
 
   const aiSummary = async () => {
@@ -1,10 +1,11 @@
 import json
 import logging
-from typing import Any
+from typing import Any, Dict, List, Tuple
 
 import httpx
 from fastapi import HTTPException
 
+from ai_app.core import llm_cache
 from ai_app.core.config import settings
 
 logger = logging.getLogger(__name__)
@@ -61,15 +62,11 @@ class LLMClient:
     async def aclose(self) -> None:
         await self._client.aclose()
 
-    async def chat_json(self, *, system: str, user: str) -> Any:
-        messages = [
-            {"role": "system", "content": system},
-            {"role": "user", "content": user},
-        ]
-
+    def _json_request(
+        self, messages: List[Dict[str, str]]
+    ) -> Tuple[str, Dict[str, Any]]:
         if self._provider == "ollama":
-            url = f"{self.api_base}/api/chat"
-            payload = {
+            return f"{self.api_base}/api/chat", {
                 "model": self.model,
                 "stream": False,
                 "format": "json",
@@ -80,150 +77,79 @@ class LLMClient:
                     "num_ctx": 2048,
                 },
             }
+        return f"{self.base_url}/chat/completions", {
+            "model": self.model,
+            "messages": messages,
+            "temperature": 0.2,
+            "max_tokens": 2048,
+        }
+
+    def _text_request(
+        self, messages: List[Dict[str, str]]
+    ) -> Tuple[str, Dict[str, Any]]:
+        url, payload = self._json_request(messages)
+        payload.pop("format", None)
+        return url, payload
+
+    async def _complete(self, url: str, payload: Dict[str, Any]) -> str:
+        logger.debug("[LLM] POST %s", url)
+
+        try:
+            r = await self._client.post(url, json=payload)
+            r.raise_for_status()
+            data = r.json()
+        except httpx.HTTPStatusError as e:
+            _log_http_status(e)
+            raise HTTPException(status_code=502, detail="LLM error (HTTP)")
+        except httpx.RequestError as e:
+            logger.warning("[LLM] unreachable %s: %s", url, e)
+            raise HTTPException(status_code=502, detail="LLM unreachable")
 
-            logger.debug("[LLM] POST %s", url)
-
-            try:
-                r = await self._client.post(url, json=payload)
-                r.raise_for_status()
-                data = r.json()
-            except httpx.HTTPStatusError as e:
-                _log_http_status(e)
-                raise HTTPException(
-                    status_code=502,
-                    detail="LLM error (HTTP)",
-                )
-            except httpx.RequestError as e:
-                logger.warning("[LLM] unreachable %s: %s", url, e)
-                raise HTTPException(
-                    status_code=502,
-                    detail="LLM unreachable",
-                )
-
-            content = (data.get("message") or {}).get("content") or ""
-            try:
-                return json.loads(content)
-            except Exception:
-                logger.warning("[LLM] invalid JSON returned (len=%d)", len(content))
-                raise HTTPException(status_code=502, detail="LLM returned invalid JSON")
-
-        else:  # openai
-            url = f"{self.base_url}/chat/completions"
-            payload = {
-                "model": self.model,
-                "messages": messages,
-                "temperature": 0.2,
-                "max_tokens": 2048,
-            }
+        if self._provider == "ollama":
+            return str((data.get("message") or {}).get("content") or "")
+        # OpenAI returns choices -> message -> content
+        choices = data.get("choices") or []
+        if not choices:
+            raise HTTPException(
+                status_code=502,
+                detail="LLM returned empty response",
+            )
+        return str((choices[0].get("message") or {}).get("content") or "")
+
+    async def _chat_json(self, url: str, payload: Dict[str, Any]) -> Any:
+        content = await self._complete(url, payload)
+        try:
+            return json.loads(content)
+        except Exception:
+            logger.warning("[LLM] invalid JSON returned (len=%d)", len(content))
+            raise HTTPException(status_code=502, detail="LLM returned invalid JSON")
+
+    async def _chat_text(self, url: str, payload: Dict[str, Any]) -> str:
+        content = await self._complete(url, payload)
+        if not content:
+            raise HTTPException(
+                status_code=502,
+                detail="LLM returned empty response",
+            )
+        return content
 
-            logger.debug("[LLM] POST %s", url)
-
-            try:
-                r = await self._client.post(url, json=payload)
-                r.raise_for_status()
-                data = r.json()
-            except httpx.HTTPStatusError as e:
-                _log_http_status(e)
-                raise HTTPException(status_code=502, detail="LLM error (HTTP)")
-            except httpx.RequestError as e:
-                logger.warning("[LLM] unreachable %s: %s", url, e)
-                raise HTTPException(status_code=502, detail="LLM unreachable")
-
-            # OpenAI returns choices -> message -> content
-            choices = data.get("choices") or []
-            if not choices:
-                raise HTTPException(
-                    status_code=502,
-                    detail="LLM returned empty response",
-                )
-            content = (choices[0].get("message") or {}).get("content") or ""
-            try:
-                return json.loads(content)
-            except Exception:
-                logger.warning("[LLM] invalid JSON returned (len=%d)", len(content))
-                raise HTTPException(
-                    status_code=502,
-                    detail="LLM returned invalid JSON",
-                )
+    async def chat_json(self, *, system: str, user: str) -> Any:
+        messages = [
+            {"role": "system", "content": system},
+            {"role": "user", "content": user},
+        ]
+        url, payload = self._json_request(messages)
+        # same cache entries as the API (ai_app/core/llm_cache.py)
+        return await llm_cache.cached(
+            self._provider, "json", payload, lambda: self._chat_json(url, payload)
+        )
 
     async def chat_text(self, *, system: str, user: str) -> str:
         messages = [
             {"role": "system", "content": system},
             {"role": "user", "content": user},
         ]
-
-        if self._provider == "ollama":
-            url = f"{self.api_base}/api/chat"
-            payload = {
-                "model": self.model,
-                "stream": False,
-                "messages": messages,
-                "options": {
-                    "temperature": 0.2,
-                    "num_predict": 256,
-                    "num_ctx": 2048,
-                },
-            }
-
-            logger.debug("[LLM] POST %s", url)
-
-            try:
-                r = await self._client.post(url, json=payload)
-                r.raise_for_status()
-                data = r.json()
-            except httpx.HTTPStatusError as e:
-                _log_http_status(e)
-                raise HTTPException(
-                    status_code=502,
-                    detail="LLM error (HTTP)",
-                )
-            except httpx.RequestError as e:
-                logger.warning("[LLM] unreachable %s: %s", url, e)
-                raise HTTPException(
-                    status_code=502,
-                    detail="LLM unreachable",
-                )
-
-            content = (data.get("message") or {}).get("content") or ""
-            if not content:
-                raise HTTPException(
-                    status_code=502,
-                    detail="LLM returned empty response",
-                )
-            return content
-
-        else:  # openai
-            url = f"{self.base_url}/chat/completions"
-            payload = {
-                "model": self.model,
-                "messages": messages,
-                "temperature": 0.2,
-                "max_tokens": 2048,
-            }
-
-            logger.debug("[LLM] POST %s", url)
-
-            try:
-                r = await self._client.post(url, json=payload)
-                r.raise_for_status()
-                data = r.json()
-            except httpx.HTTPStatusError as e:
-                _log_http_status(e)
-                raise HTTPException(status_code=502, detail="LLM error (HTTP)")
-            except httpx.RequestError as e:
-                logger.warning("[LLM] unreachable %s: %s", url, e)
-                raise HTTPException(status_code=502, detail="LLM unreachable")
-
-            choices = data.get("choices") or []
-            if not choices:
-                raise HTTPException(
-                    status_code=502,
-                    detail="LLM returned empty response",
-                )
-            content = (choices[0].get("message") or {}).get("content") or ""
-            if not content:
-                raise HTTPException(
-                    status_code=502,
-                    detail="LLM returned empty response",
-                )
-            return content
+        url, payload = self._text_request(messages)
+        return await llm_cache.cached(
+            self._provider, "text", payload, lambda: self._chat_text(url, payload)
+        )
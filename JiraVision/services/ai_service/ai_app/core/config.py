@@ -12,6 +12,15 @@ class Settings(BaseSettings):
     llm_model: str = "qwen2.5:3b"
     llm_timeout: int = 600
 
+    # Redis cache of LLM responses shared with the API (ai_app/core/llm_cache.py);
+    # off while redis_host is unset.
+    redis_host: str | None = None
+    redis_port: int = 6379
+    llm_cache_enabled: bool = True
+    llm_cache_ttl_seconds: int = 7 * 24 * 3600
+    llm_cache_max_entries: int = 5000
+    llm_cache_max_entry_bytes: int = 256 * 1024
+
     ai_auth_enabled: bool = False
     ai_shared_secret: str = "dev-shared-secret"
     ai_token_ttl_seconds: int = 300
@@ -0,0 +1,167 @@
+"""Shared cache of LLM responses, the ai-service side of app/core/llm_cache.py.
+
+Same keys, entries and eviction index as the API, so both services answer an
+identical call (provider, model, prompts, options) from one stored response
+and report the model time it saved. Enabled when REDIS_HOST is set; after a
+Redis error the cache is skipped for `_RETRY_SECONDS` and calls go to the
+model. Errors are never cached; an unreadable entry is deleted (a miss).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+import time
+import zlib
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import redis.asyncio as aioredis
+
+from ai_app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+INDEX_KEY = "llm_cache:index"  # key -> time it was stored
+_RETRY_SECONDS = 30.0
+
+
+class LLMCacheStats:
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0  # lookups not served from Redis
+        self.coalesced = 0  # waited for an identical call already running
+        self.saved_seconds = 0.0  # model time of the responses served from Redis
+        self.evicted = 0  # entries dropped to stay within llm_cache_max_entries
+
+
+stats = LLMCacheStats()
+
+# cache key -> model call in progress (shared by identical calls)
+_pending: Dict[str, "asyncio.Task[Any]"] = {}
+_client: Optional[aioredis.Redis] = None
+_unavailable_until = 0.0
+
+
+def cache_key(provider: str, kind: str, payload: Dict[str, Any]) -> str:
+    body = json.dumps(
+        payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False
+    )
+    digest = hashlib.sha256(body.encode("utf-8")).hexdigest()
+    return f"llm_cache:{provider}:{payload.get('model')}:{kind}:{digest}"
+
+
+def _decode(raw: str) -> Any:
+    # formats written by the API (app/core/codec.py)
+    if raw.startswith("j1:"):
+        return json.loads(raw[3:])
+    if raw.startswith("z1:"):
+        return json.loads(zlib.decompress(base64.b64decode(raw[3:])))
+    return json.loads(raw)
+
+
+def _redis() -> Optional[aioredis.Redis]:
+    global _client
+    if not settings.llm_cache_enabled or not settings.redis_host:
+        return None
+    if time.monotonic() < _unavailable_until:
+        return None
+    if _client is None:
+        _client = aioredis.Redis(
+            host=settings.redis_host,
+            port=settings.redis_port,
+            decode_responses=True,
+            socket_timeout=1.0,
+            socket_connect_timeout=1.0,
+        )
+    return _client
+
+
+def _mark_unavailable(exc: Exception) -> None:
+    global _unavailable_until
+    logger.warning("[LLM cache] Redis unavailable: %s", exc)
+    _unavailable_until = time.monotonic() + _RETRY_SECONDS
+
+
+async def _save(client: aioredis.Redis, key: str, entry: Dict[str, Any]) -> None:
+    raw = json.dumps(entry, ensure_ascii=False)  # plain JSON: read by the API too
+    if len(raw) > settings.llm_cache_max_entry_bytes:
+        return
+    ttl = settings.llm_cache_ttl_seconds
+    now = time.time()
+    try:
+        async with client.pipeline(transaction=False) as pipe:
+            pipe.set(key, raw, ex=ttl)
+            pipe.zadd(INDEX_KEY, {key: now})
+            pipe.expire(INDEX_KEY, ttl)
+            pipe.zremrangebyscore(INDEX_KEY, "-inf", now - ttl)  # expired
+            pipe.zcard(INDEX_KEY)
+            size = (await pipe.execute())[-1]
+        excess = int(size) - settings.llm_cache_max_entries
+        if excess > 0:
+            oldest = await client.zpopmin(INDEX_KEY, excess)
+            keys = [member for member, _ in oldest]
+            if keys:
+                stats.evicted += int(await client.delete(*keys))
+    except Exception as exc:
+        _mark_unavailable(exc)
+
+
+async def _drop(client: aioredis.Redis, key: str) -> None:
+    try:
+        await client.delete(key)
+        await client.zrem(INDEX_KEY, key)
+    except Exception as exc:
+        _mark_unavailable(exc)
+
+
+async def _call_and_store(
+    client: aioredis.Redis, key: str, call: Callable[[], Awaitable[Any]]
+) -> Any:
+    started = time.perf_counter()
+    value = await call()
+    if value is not None:
+        elapsed = round(time.perf_counter() - started, 3)
+        await _save(client, key, {"value": value, "elapsed": elapsed})
+    return value
+
+
+async def cached(
+    provider: str,
+    kind: str,
+    payload: Dict[str, Any],
+    call: Callable[[], Awaitable[Any]],
+) -> Any:
+    """Response of `call()` for this request payload, reused when already seen."""
+    client = _redis()
+    if client is None:
+        return await call()
+    key = cache_key(provider, kind, payload)
+    try:
+        raw = await client.get(key)
+    except Exception as exc:
+        _mark_unavailable(exc)
+        return await call()
+    if raw:
+        try:
+            entry = _decode(raw)
+            value, elapsed = entry["value"], float(entry.get("elapsed") or 0.0)
+        except (ValueError, KeyError, TypeError, AttributeError, zlib.error):
+            logger.warning("[LLM cache] unreadable entry dropped: %s", key)
+            await _drop(client, key)
+        else:
+            stats.hits += 1
+            stats.saved_seconds += elapsed
+            return value
+    stats.misses += 1
+
+    task = _pending.get(key)
+    if task is not None:
+        stats.coalesced += 1
+    else:
+        task = asyncio.ensure_future(_call_and_store(client, key, call))
+        _pending[key] = task
+        task.add_done_callback(lambda _: _pending.pop(key, None))
+    return await asyncio.shield(task)
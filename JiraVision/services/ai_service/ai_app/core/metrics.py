@@ -0,0 +1,41 @@
+"""Custom Prometheus collectors exported on /metrics.
+
+They read live counters from in-process objects at scrape time.
+"""
+
+from prometheus_client.core import CounterMetricFamily
+
+from ai_app.core import llm_cache
+
+
+class LLMCacheCollector:
+    """Shared LLM response cache, same series as the API."""
+
+    def collect(self):
+        stats = llm_cache.stats
+        lookups = CounterMetricFamily(
+            "llm_cache_lookups", "LLM cache lookups by outcome", labels=["outcome"]
+        )
+        lookups.add_metric(["hit"], stats.hits)
+        lookups.add_metric(["miss"], stats.misses)
+        yield lookups
+        for name, doc, value in (
+            (
+                "llm_cache_saved_seconds",
+                "Model generation time of the responses served from the cache",
+                stats.saved_seconds,
+            ),
+            (
+                "llm_cache_coalesced_calls",
+                "LLM calls that waited for an identical call already running",
+                stats.coalesced,
+            ),
+            (
+                "llm_cache_evicted_entries",
+                "LLM cache entries evicted to stay within llm_cache_max_entries",
+                stats.evicted,
+            ),
+        ):
+            family = CounterMetricFamily(name, doc)
+            family.add_metric([], value)
+            yield family
@@ -15,6 +15,7 @@ from prometheus_client import (
     CollectorRegistry,
 )
 
+from ai_app.core.metrics import LLMCacheCollector
 from ai_app.routes.ai import router as ai_router
 from ai_app.core.telemetry import setup_telemetry
 
@@ -36,6 +37,9 @@ REQUEST_LATENCY = Histogram(
 )
 
 
+registry.register(LLMCacheCollector())
+
+
 @app.middleware("http")
 async def metrics_middleware(request: Request, call_next):
     start = time.perf_counter()
@@ -0,0 +1,7 @@
+import pathlib
+import sys
+
+# Make the local package 'ai_app' importable from the tests
+root = pathlib.Path(__file__).resolve().parents[1]
+if str(root) not in sys.path:
+    sys.path.insert(0, str(root))
@@ -160,3 +160,62 @@ def test_list_projects_sorted(monkeypatch):
 
     projects = store.list_projects_for_user("acct")
     assert [p["project_key"] for p in projects] == ["ALPHA", "BETA"]
+
+
+def test_local_writes_are_pushed_back_when_redis_recovers(monkeypatch):
+    from app.core import redis as core_redis
+
+    _force_local_store(monkeypatch)
+    store._local_writes.clear()
+    store.upsert_user("acct-resync", display_name="Bob", now=100)
+    assert store._local_writes
+
+    written = {}
+    monkeypatch.setattr(store.redis_client, "set", written.__setitem__)
+    monkeypatch.setattr(store.redis_client, "get", written.get)
+    monkeypatch.setattr(core_redis.redis_client, "ping", lambda: True)
+    monkeypatch.setattr(core_redis._breaker, "cooldown_seconds", 0)
+
+    assert store.get_user("acct-resync")["display_name"] == "Bob"
+    assert "Bob" in written[store._user_key("acct-resync")]
+    assert not store._local_writes
+    core_redis._breaker.reset()
+
+
+def test_outage_writes_are_replayed_last_write_wins(monkeypatch):
+    from app.core import codec
+    from app.core import redis as core_redis
+
+    _force_local_store(monkeypatch)
+    store._local_writes.clear()
+    for key, now in (("OLD", 100), ("NEW", 100)):
+        store.upsert_project_for_user(
+            "acct-lww", project_key=key, project_name="local", source="manual", now=now
+        )
+    store.set_last_synced_at("acct-lww", ts=100)
+
+    # meanwhile another worker wrote newer data for NEW and a stale flag
+    written = {
+        store._projects_key("acct-lww"): codec.encode(
+            {
+                "default:OLD": {"project_key": "OLD", "updated_at": 50},
+                "default:NEW": {"project_key": "NEW", "updated_at": 150},
+            }
+        ),
+        store._user_key("acct-lww"): codec.encode(
+            {"jira_account_id": "acct-lww", "updated_at": 20, "stale_since": 120}
+        ),
+    }
+    monkeypatch.setattr(store.redis_client, "set", written.__setitem__)
+    monkeypatch.setattr(store.redis_client, "get", written.get)
+    monkeypatch.setattr(core_redis.redis_client, "ping", lambda: True)
+    monkeypatch.setattr(core_redis._breaker, "cooldown_seconds", 0)
+    dropped = store.resync_stats["dropped"]
+
+    projects = {p["project_key"]: p for p in store.list_projects_for_user("acct-lww")}
+    assert projects["OLD"]["project_name"] == "local"
+    assert "project_name" not in projects["NEW"]  # Redis was newer
+    user = store.get_user("acct-lww")
+    assert (user["last_synced_at"], user["stale_since"]) == (100, 120)
+    assert store.resync_stats["dropped"] == dropped + 1
+    core_redis._breaker.reset()
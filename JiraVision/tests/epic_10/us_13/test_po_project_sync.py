@@ -3,8 +3,9 @@ from typing import Any, Dict, List
 import pytest
 from app.core import po_project_store
 from app.core import po_project_sync
+from app.clients.jira import JiraClient
 
-class FakeJiraClient:
+class FakeJiraClient(JiraClient):
     def __init__(self, access_token: str, cloud_id: str, timeout: int = 30):
         self.cloud_id = cloud_id
         self.calls: List[str] = []
@@ -12,7 +13,7 @@ class FakeJiraClient:
     async def aclose(self) -> None:
         return None
 
-    async def search_jql(self, jql: str, max_results: int = 20, next_page_token: str | None = None):
+    async def search_jql(self, jql: str, max_results: int = 20, next_page_token: str | None = None, profile=None):
         self.calls.append(jql)
         # New logic: reporter query with Story/Etude types returns projects directly
         if "reporter" in jql and "type in (Story, Etude)" in jql:
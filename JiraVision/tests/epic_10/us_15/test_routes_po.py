@@ -46,7 +46,7 @@ def _force_local_store(monkeypatch):
 
 def test_get_projects_unauthenticated(client):
     """Test GET /po/projects without authentication."""
-    with patch("app.routes.po.get_session") as mock_get_session:
+    with patch("app.auth.session_store.get_session") as mock_get_session:
         mock_get_session.return_value = {}
         
         response = client.get("/po/projects")
@@ -57,10 +57,10 @@ def test_get_projects_empty(client, mock_session, monkeypatch):
     """Test GET /po/projects with no projects."""
     _force_local_store(monkeypatch)
     
-    with patch("app.routes.po.get_session") as mock_get_session, \
-         patch("app.routes.po.ensure_session") as mock_ensure:
+    with patch("app.auth.session_store.get_session") as mock_get_session, \
+         patch("app.auth.session_store.get_sid") as mock_get_sid:
         mock_get_session.return_value = mock_session
-        mock_ensure.return_value = "test_sid"
+        mock_get_sid.return_value = "test_sid"
         
         response = client.get("/po/projects")
         assert response.status_code == 200
@@ -97,10 +97,10 @@ def test_get_projects_with_data(client, mock_session, monkeypatch):
         is_active=False
     )
     
-    with patch("app.routes.po.get_session") as mock_get_session, \
-         patch("app.routes.po.ensure_session") as mock_ensure:
+    with patch("app.auth.session_store.get_session") as mock_get_session, \
+         patch("app.auth.session_store.get_sid") as mock_get_sid:
         mock_get_session.return_value = mock_session
-        mock_ensure.return_value = "test_sid"
+        mock_get_sid.return_value = "test_sid"
         
         response = client.get("/po/projects")
         assert response.status_code == 200
@@ -137,10 +137,10 @@ def test_get_projects_filters_masked(client, mock_session, monkeypatch):
         is_active=True
     )
     
-    with patch("app.routes.po.get_session") as mock_get_session, \
-         patch("app.routes.po.ensure_session") as mock_ensure:
+    with patch("app.auth.session_store.get_session") as mock_get_session, \
+         patch("app.auth.session_store.get_sid") as mock_get_sid:
         mock_get_session.return_value = mock_session
-        mock_ensure.return_value = "test_sid"
+        mock_get_sid.return_value = "test_sid"
         
         response = client.get("/po/projects")
         assert response.status_code == 200
@@ -155,10 +155,10 @@ def test_add_project(client, mock_session, monkeypatch):
     """Test POST /po/projects to add a manual project."""
     _force_local_store(monkeypatch)
     
-    with patch("app.routes.po.get_session") as mock_get_session, \
-         patch("app.routes.po.ensure_session") as mock_ensure:
+    with patch("app.auth.session_store.get_session") as mock_get_session, \
+         patch("app.auth.session_store.get_sid") as mock_get_sid:
         mock_get_session.return_value = mock_session
-        mock_ensure.return_value = "test_sid"
+        mock_get_sid.return_value = "test_sid"
         
         response = client.post(
             "/po/projects",
@@ -190,10 +190,10 @@ def test_mask_project(client, mock_session, monkeypatch):
         is_active=True
     )
     
-    with patch("app.routes.po.get_session") as mock_get_session, \
-         patch("app.routes.po.ensure_session") as mock_ensure:
+    with patch("app.auth.session_store.get_session") as mock_get_session, \
+         patch("app.auth.session_store.get_sid") as mock_get_sid:
         mock_get_session.return_value = mock_session
-        mock_ensure.return_value = "test_sid"
+        mock_get_sid.return_value = "test_sid"
         
         response = client.request(
             "DELETE",
@@ -204,3 +204,39 @@ def test_mask_project(client, mock_session, monkeypatch):
         
         data = response.json()
         assert data["mask_type"] == "temporaire"
+
+
+def test_stale_projects_are_served_and_resynced_in_background(
+    app, mock_session, monkeypatch
+):
+    """A stale list is returned at once; one background resync per window."""
+    from app.routes import po as po_routes
+
+    _force_local_store(monkeypatch)
+    monkeypatch.setattr(po_routes, "_resyncs", {})
+    po_project_store.upsert_project_for_user(
+        "test_user_id", project_key="PROJ1", project_name="P", source="jira"
+    )
+    po_project_store.set_last_synced_at("test_user_id", ts=100)
+    po_project_store.mark_stale("test_user_id", ts=200)
+    calls = []
+
+    async def failing_sync(account_id, session):
+        calls.append(account_id)
+        raise RuntimeError("jira down")
+
+    monkeypatch.setattr(
+        po_routes.po_project_sync, "sync_projects_for_user", failing_sync
+    )
+    with patch("app.auth.session_store.get_session") as mock_get_session, \
+         patch("app.auth.session_store.get_sid") as mock_get_sid, \
+         TestClient(app) as client:
+        mock_get_session.return_value = mock_session
+        mock_get_sid.return_value = "test_sid"
+
+        for _ in range(2):
+            response = client.get("/po/projects")
+            assert response.status_code == 200
+            assert response.json()["projects"][0]["project_key"] == "PROJ1"
+
+    assert calls == ["test_user_id"]  # failed, not retried on the next GET
@@ -7,7 +7,9 @@ from fastapi.testclient import TestClient
 
 from app.main import create_app
 from app.core import po_project_store as store
+from app.auth import session_store
 from app.routes import po_projects as po_projects_routes
+from unittest.mock import AsyncMock
 
 
 def _force_local_store(monkeypatch):
@@ -20,8 +22,8 @@ def _force_local_store(monkeypatch):
 
 
 def _mock_session(monkeypatch, session: Dict[str, Any]):
-    monkeypatch.setattr(po_projects_routes, "ensure_session", lambda _req, _res: "sid")
-    monkeypatch.setattr(po_projects_routes, "get_session", lambda _sid: session)
+    monkeypatch.setattr(session_store, "get_sid", lambda request: "sid")
+    monkeypatch.setattr(session_store, "get_session", AsyncMock(return_value=session))
 
 
 @pytest.fixture(autouse=True)
@@ -188,7 +190,9 @@ def test_refresh_projects_calls_sync_and_resets_definitif(monkeypatch):
     async def _fake_sync(_acct, _session):
         return {"projects": [], "inactive_projects": []}
 
-    monkeypatch.setattr(po_projects_routes.po_project_sync, "sync_projects_for_user", _fake_sync)
+    monkeypatch.setattr(
+        po_projects_routes.po_project_sync, "sync_projects_for_user", _fake_sync
+    )
 
     client = TestClient(create_app())
     resp = client.post("/po/projects/refresh", json={"reset_definitif": True})
@@ -1,3 +1,4 @@
+import asyncio
 from fastapi.testclient import TestClient
 
 from app.main import app as main_app
@@ -26,7 +27,7 @@ def test_summarize_jql_proxy(monkeypatch):
     import secrets
 
     sid = secrets.token_urlsafe(24)
-    set_session(sid, {'tokens_by_cloud': {'demo': {'access_token': 'x'}}, 'cloud_ids': ['demo'], 'active_cloud_id': 'demo'})
+    asyncio.run(set_session(sid, {'tokens_by_cloud': {'demo': {'access_token': 'x'}}, 'cloud_ids': ['demo'], 'active_cloud_id': 'demo'}))
     client.cookies.set('sid', _sid_serializer.dumps(sid))
 
     r2 = client.post('/ai/summarize-jql', json={'jql': 'project=PROJ', 'max_results': 1})
@@ -51,7 +52,7 @@ def test_analyze_issue_proxy(monkeypatch):
     import secrets
 
     sid = secrets.token_urlsafe(24)
-    set_session(sid, {'tokens_by_cloud': {'demo': {'access_token': 'x'}}, 'cloud_ids': ['demo'], 'active_cloud_id': 'demo'})
+    asyncio.run(set_session(sid, {'tokens_by_cloud': {'demo': {'access_token': 'x'}}, 'cloud_ids': ['demo'], 'active_cloud_id': 'demo'}))
     client.cookies.set('sid', _sid_serializer.dumps(sid))
 
     r2 = client.post('/ai/analyze-issue', json={'issue_key': 'PROJ-1'})
@@ -65,7 +66,7 @@ def test_ai_token_endpoint():
     import secrets
 
     sid = secrets.token_urlsafe(24)
-    set_session(sid, {'tokens_by_cloud': {'demo': {'access_token': 'x'}}, 'cloud_ids': ['demo'], 'active_cloud_id': 'demo'})
+    asyncio.run(set_session(sid, {'tokens_by_cloud': {'demo': {'access_token': 'x'}}, 'cloud_ids': ['demo'], 'active_cloud_id': 'demo'}))
     client.cookies.set('sid', _sid_serializer.dumps(sid))
 
     r = client.post('/ai/token', json={'cloud_id': 'demo'})
@@ -94,7 +95,7 @@ def test_analyze_issue_stream_proxy(monkeypatch):
     client = TestClient(main_app)
     import secrets
     sid = secrets.token_urlsafe(24)
-    set_session(sid, {'tokens_by_cloud': {'demo': {'access_token': 'x'}}, 'cloud_ids': ['demo'], 'active_cloud_id': 'demo'})
+    asyncio.run(set_session(sid, {'tokens_by_cloud': {'demo': {'access_token': 'x'}}, 'cloud_ids': ['demo'], 'active_cloud_id': 'demo'}))
     client.cookies.set('sid', _sid_serializer.dumps(sid))
 
     r = client.post('/ai/analyze-issue/stream', json={'issue_key': 'PROJ-1'})
@@ -136,7 +137,7 @@ def test_analyze_issue_proxy_404(monkeypatch):
     client = TestClient(main_app)
     import secrets
     sid = secrets.token_urlsafe(24)
-    set_session(sid, {'tokens_by_cloud': {'demo': {'access_token': 'x'}}, 'cloud_ids': ['demo'], 'active_cloud_id': 'demo'})
+    asyncio.run(set_session(sid, {'tokens_by_cloud': {'demo': {'access_token': 'x'}}, 'cloud_ids': ['demo'], 'active_cloud_id': 'demo'}))
     client.cookies.set('sid', _sid_serializer.dumps(sid))
 
     r = client.post('/ai/analyze-issue', json={'issue_key': 'PROJ-1'})
@@ -158,7 +159,7 @@ def test_analyze_issue_proxy_502(monkeypatch):
     client = TestClient(main_app)
     import secrets
     sid = secrets.token_urlsafe(24)
-    set_session(sid, {'tokens_by_cloud': {'demo': {'access_token': 'x'}}, 'cloud_ids': ['demo'], 'active_cloud_id': 'demo'})
+    asyncio.run(set_session(sid, {'tokens_by_cloud': {'demo': {'access_token': 'x'}}, 'cloud_ids': ['demo'], 'active_cloud_id': 'demo'}))
     client.cookies.set('sid', _sid_serializer.dumps(sid))
 
     r = client.post('/ai/analyze-issue', json={'issue_key': 'PROJ-1'})
@@ -178,7 +179,7 @@ def test_analyze_issue_stream_proxy_error(monkeypatch):
     client = TestClient(main_app)
     import secrets
     sid = secrets.token_urlsafe(24)
-    set_session(sid, {'tokens_by_cloud': {'demo': {'access_token': 'x'}}, 'cloud_ids': ['demo'], 'active_cloud_id': 'demo'})
+    asyncio.run(set_session(sid, {'tokens_by_cloud': {'demo': {'access_token': 'x'}}, 'cloud_ids': ['demo'], 'active_cloud_id': 'demo'}))
     client.cookies.set('sid', _sid_serializer.dumps(sid))
 
     r = client.post('/ai/analyze-issue/stream', json={'issue_key': 'PROJ-1'})
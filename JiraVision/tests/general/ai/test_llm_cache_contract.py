@@ -0,0 +1,107 @@
+"""The API and the ai-service read and write the same LLM cache entries.
+
+Each service has its own copy of the key derivation and of the entry format;
+these tests write with one and read with the other.
+"""
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+from app.core import config, llm_cache
+from app.core import redis as core_redis
+
+AI_SERVICE = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "..", "..", "services", "ai_service")
+)
+sys.path.insert(0, AI_SERVICE)
+
+from ai_app.core import config as ai_config  # noqa: E402
+from ai_app.core import llm_cache as ai_cache  # noqa: E402
+
+PAYLOAD = {
+    "model": "m1",
+    "messages": [
+        {"role": "system", "content": "Résume le ticket"},
+        {"role": "user", "content": "PROJ-1 : écran blanc"},
+    ],
+    "options": {"temperature": 0.2, "num_ctx": 4096},
+    "format": "json",
+}
+
+
+@pytest.fixture
+def fake(fake_redis, monkeypatch):
+    monkeypatch.setattr(llm_cache, "async_redis_client", fake_redis)
+    monkeypatch.setattr(llm_cache, "stats", llm_cache.LLMCacheStats())
+    monkeypatch.setattr(ai_cache, "_client", fake_redis)
+    monkeypatch.setattr(ai_cache, "_unavailable_until", 0.0)
+    monkeypatch.setattr(ai_cache, "stats", ai_cache.LLMCacheStats())
+    monkeypatch.setattr(ai_config.settings, "redis_host", "redis")
+    core_redis._breaker.reset()
+    core_redis._local_writes.clear()  # no outage writes to replay first
+    core_redis._local_deletes.clear()
+    return fake_redis
+
+
+async def _model_not_called():
+    raise AssertionError("model called")
+
+
+def test_both_services_derive_the_same_key():
+    reordered = dict(reversed(list(PAYLOAD.items())))
+    for kind in ("text", "json"):
+        key = llm_cache.cache_key("ollama", kind, PAYLOAD)
+        assert ai_cache.cache_key("ollama", kind, reordered) == key
+
+
+@pytest.mark.parametrize(
+    "codec_version, compress_min_bytes",
+    [("v1", 1 << 20), ("v1", 0), ("legacy", 1 << 20)],
+    ids=["j1", "z1", "plain-json"],
+)
+def test_api_entries_are_read_by_the_ai_service(
+    fake, monkeypatch, codec_version, compress_min_bytes
+):
+    monkeypatch.setattr(config.settings, "codec_version", codec_version)
+    monkeypatch.setattr(config.settings, "codec_compress_min_bytes", compress_min_bytes)
+    value = {"summary": "écran blanc", "risks": ["PROJ-2"]}
+    asyncio.run(llm_cache.store("ollama", "json", PAYLOAD, value, 4.2))
+
+    out = asyncio.run(ai_cache.cached("ollama", "json", PAYLOAD, _model_not_called))
+    assert out == value
+    assert ai_cache.stats.saved_seconds == 4.2
+
+
+def test_ai_service_entries_are_read_by_the_api(fake):
+    async def model():
+        return "analyse"
+
+    asyncio.run(ai_cache.cached("ollama", "text", PAYLOAD, model))
+
+    assert asyncio.run(llm_cache.lookup("ollama", "text", PAYLOAD)) == "analyse"
+    assert llm_cache.stats.hits == 1
+    assert len(fake.zsets[llm_cache.INDEX_KEY]) == 1  # one eviction index
+
+
+def test_corrupt_entry_is_a_miss_for_the_ai_service(fake):
+    key = ai_cache.cache_key("ollama", "text", PAYLOAD)
+    fake.strings[key] = "z1:not-zlib"
+
+    async def model():
+        return None  # not stored
+
+    assert asyncio.run(ai_cache.cached("ollama", "text", PAYLOAD, model)) is None
+    assert (ai_cache.stats.hits, ai_cache.stats.misses) == (0, 1)
+    assert key not in fake.strings
+
+
+def test_without_redis_the_ai_service_calls_the_model(monkeypatch):
+    monkeypatch.setattr(ai_config.settings, "redis_host", None)
+
+    async def model():
+        return "text"
+
+    assert asyncio.run(ai_cache.cached("ollama", "text", {}, model)) == "text"
@@ -1,13 +1,18 @@
+import asyncio
+from types import SimpleNamespace
+
 from fastapi import Response
 import pytest
 
 from app.auth import session_store
+from unittest.mock import AsyncMock
 
 
 class DummyRequest:
     def __init__(self, cookies=None, query_params=None):
         self.cookies = cookies or {}
         self.query_params = query_params or {}
+        self.state = SimpleNamespace()
 
 
 def test_get_sid_absent():
@@ -38,15 +43,16 @@ def test_ensure_session_creates_when_missing(monkeypatch):
 
     called = {}
 
-    def fake_set_session(sid, sess):
+    async def fake_set_session(sid, sess):
         called["sid"] = sid
         called["sess"] = sess
 
     monkeypatch.setattr(session_store, "set_session", fake_set_session)
     monkeypatch.setattr(session_store, "_new_session_id", lambda: "fixed-sid")
 
-    out = session_store.ensure_session(req, resp)
+    out = asyncio.run(session_store.ensure_session(req, resp))
     assert out == "fixed-sid"
+    asyncio.run(session_store.commit_request_session(req))
     assert called["sid"] == "fixed-sid"
     assert "created_at" in called["sess"]
 
@@ -57,16 +63,17 @@ def test_ensure_session_refreshes_missing_redis(monkeypatch):
 
     # simulate cookie present but redis missing
     monkeypatch.setattr(session_store, "get_sid", lambda r: "sid-1")
-    monkeypatch.setattr(session_store, "get_session", lambda s: None)
+    monkeypatch.setattr(session_store, "get_session", AsyncMock(return_value=None))
 
     calls = {"set_session": False}
 
-    def fake_set_session(sid, sess):
+    async def fake_set_session(sid, sess):
         calls["set_session"] = True
 
     monkeypatch.setattr(session_store, "set_session", fake_set_session)
 
-    session_store.ensure_session(req, resp)
+    asyncio.run(session_store.ensure_session(req, resp))
+    asyncio.run(session_store.commit_request_session(req))
     # because get_session returns None by our stub, ensure set_session called
     assert calls["set_session"]
 
@@ -74,7 +81,7 @@ def test_ensure_session_refreshes_missing_redis(monkeypatch):
 def test_require_session_raises_when_no_cookie(monkeypatch):
     req = DummyRequest(cookies={})
     with pytest.raises(Exception):
-        session_store.require_session(req)
+        asyncio.run(session_store.require_session(req))
 
 
 def test_destroy_session_calls_delete(monkeypatch):
@@ -84,10 +91,10 @@ def test_destroy_session_calls_delete(monkeypatch):
     monkeypatch.setattr(session_store, "get_sid", lambda r: "sid-2")
     called = {}
 
-    def fake_delete_session(sid):
+    async def fake_delete_session(sid):
         called["deleted"] = sid
 
     monkeypatch.setattr(session_store, "delete_session", fake_delete_session)
 
-    session_store.destroy_session(req, resp)
+    asyncio.run(session_store.destroy_session(req, resp))
     assert called["deleted"] == "sid-2"
@@ -0,0 +1,152 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi import Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.auth import session_store
+from app.main import create_app
+
+
+def _install_store(monkeypatch, data):
+    calls = {"get": 0, "set": []}
+
+    async def fake_get(sid):
+        calls["get"] += 1
+        return dict(data) if data is not None else None
+
+    async def fake_set(sid, sess):
+        calls["set"].append((sid, sess))
+
+    monkeypatch.setattr(session_store, "get_sid", lambda request: "sid-1")
+    monkeypatch.setattr(session_store, "get_session", fake_get)
+    monkeypatch.setattr(session_store, "set_session", fake_set)
+    return calls
+
+
+def test_request_session_tracks_top_level_mutations():
+    s = session_store.RequestSession("sid", {"a": 1, "b": 2})
+    assert s.modified is False
+
+    s["a"] = 3
+    s.pop("b")
+    s.pop("missing", None)
+    assert s.dirty_keys == {"a", "b"}
+
+    s.mark_clean()
+    s.update({"c": 1})
+    s.setdefault("d", [])
+    s.setdefault("d", "ignored")
+    del s["c"]
+    assert s.dirty_keys == {"c", "d"}
+
+    s.mark_clean()
+    s.popitem()
+    assert s.modified
+    s.mark_clean()
+    s.clear()
+    assert s.dirty_keys == {"a"}
+
+    s.mark_clean()
+    s["x"] = {}
+    s.mark_clean()
+    s["x"]["nested"] = True  # not detected...
+    assert not s.modified
+    s.mark_dirty("x")  # ...unless flagged explicitly
+    assert s.dirty_keys == {"x"}
+    s.mark_dirty()
+    assert s.dirty_keys == {"x"}
+
+
+def test_load_request_session_is_cached_on_request_state(monkeypatch):
+    calls = _install_store(monkeypatch, {"active_cloud_id": "c1"})
+    req = SimpleNamespace(cookies={}, state=SimpleNamespace())
+
+    first = asyncio.run(session_store.load_request_session(req))
+    second = asyncio.run(session_store.load_request_session(req))
+
+    assert first is second
+    assert first.restored and not first.is_new
+    assert calls["get"] == 1
+    # untouched session => nothing to write back
+    assert asyncio.run(session_store.commit_request_session(req)) is False
+    assert calls["set"] == []
+
+
+def test_commit_request_session_without_session_is_noop():
+    req = SimpleNamespace(state=SimpleNamespace())
+    assert asyncio.run(session_store.commit_request_session(req)) is False
+
+
+def test_read_only_route_does_one_read_and_no_write(monkeypatch):
+    calls = _install_store(
+        monkeypatch, {"cloud_ids": ["c1"], "active_cloud_id": "c1", "jira_sites": []}
+    )
+    client = TestClient(create_app())
+
+    r = client.get("/jira/instances")
+    assert r.status_code == 200
+    assert r.json()["active_cloud_id"] == "c1"
+    assert calls["get"] == 1
+    assert calls["set"] == []
+
+
+def test_mutating_route_writes_back_once(monkeypatch):
+    calls = _install_store(
+        monkeypatch, {"cloud_ids": ["a", "b"], "active_cloud_id": "a"}
+    )
+    client = TestClient(create_app())
+
+    r = client.post("/jira/select", params={"cloud_id": "b"})
+    assert r.status_code == 200
+    assert calls["get"] == 1
+    assert len(calls["set"]) == 1
+    sid, written = calls["set"][0]
+    assert sid == "sid-1"
+    assert written["active_cloud_id"] == "b"
+
+
+def test_new_visitor_gets_cookie_and_single_write(monkeypatch):
+    calls = {"set": []}
+
+    async def fake_set(sid, sess):
+        calls["set"].append((sid, sess))
+
+    monkeypatch.setattr(session_store, "set_session", fake_set)
+    client = TestClient(create_app())
+
+    r = client.get("/auth/state")
+    assert r.status_code == 200
+    assert "sid=" in r.headers.get("set-cookie", "")
+    assert len(calls["set"]) == 1
+    assert "created_at" in calls["set"][0][1]
+
+
+def test_require_session_does_not_persist_empty_session(monkeypatch):
+    calls = _install_store(monkeypatch, None)
+    req = SimpleNamespace(cookies={}, state=SimpleNamespace())
+
+    with pytest.raises(HTTPException):
+        asyncio.run(session_store.require_session(req))
+    assert asyncio.run(session_store.commit_request_session(req)) is False
+    assert calls["set"] == []
+
+
+def test_changes_made_while_streaming_are_written_back(monkeypatch):
+    calls = _install_store(monkeypatch, {"active_cloud_id": "a"})
+    app = create_app()
+
+    @app.get("/t-stream")
+    async def stream(session=Depends(session_store.current_session)):
+        async def body():
+            yield b"first"
+            session["active_cloud_id"] = "b"  # after the headers went out
+            yield b"last"
+
+        return StreamingResponse(body())
+
+    r = TestClient(app).get("/t-stream")
+    assert r.content == b"firstlast"
+    assert [written["active_cloud_id"] for _, written in calls["set"]] == ["b"]
@@ -0,0 +1,135 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+from starlette.responses import Response
+
+from app.auth import session_store as ss
+from app.core import config
+
+
+@pytest.fixture
+def cookie_mode(monkeypatch):
+    monkeypatch.setattr(config.settings, "session_backend", "cookie")
+    monkeypatch.setattr(config.settings, "session_max_age_seconds", 100)
+    monkeypatch.setattr(config.settings, "session_ttl_refresh_ratio", 0.5)
+    calls = {"get": 0, "set": [], "delete": []}
+
+    async def fake_get(sid):
+        calls["get"] += 1
+        return calls.get("redis")
+
+    async def fake_set(sid, data):
+        calls["set"].append((sid, data))
+
+    async def fake_delete(sid):
+        calls["delete"].append(sid)
+
+    monkeypatch.setattr(ss, "get_session", fake_get)
+    monkeypatch.setattr(ss, "set_session", fake_set)
+    monkeypatch.setattr(ss, "delete_session", fake_delete)
+    return calls
+
+
+def _cookies(resp):
+    out = {}
+    for key, value in resp.raw_headers:
+        if key == b"set-cookie":
+            name, _, rest = value.decode().partition("=")
+            out[name] = rest.split(";", 1)[0]
+    return out
+
+
+def _request(**cookies):
+    return SimpleNamespace(cookies=cookies, state=SimpleNamespace())
+
+
+def _sid_cookie(sid):
+    resp = Response()
+    ss.set_sid_cookie(resp, sid)
+    return _cookies(resp)["sid"]
+
+
+def test_encrypt_round_trip_is_bound_to_sid():
+    token = ss.encrypt_session("s1", {"access_token": "tok-secret"})
+    assert "tok-secret" not in token
+    data, issued_at = ss.decrypt_session("s1", token)
+    assert data == {"access_token": "tok-secret"} and issued_at <= time.time()
+    assert ss.decrypt_session("s2", token) is None
+    assert ss.decrypt_session("s1", token[:-4] + "AAAA") is None
+
+
+def test_small_session_round_trips_without_redis(cookie_mode):
+    req = _request(sid=_sid_cookie("s1"))
+    session = asyncio.run(ss.load_request_session(req))
+    session["user"] = "u"
+    resp = Response()
+    assert asyncio.run(ss.commit_request_session(req, resp)) is True
+    token = _cookies(resp)[ss.DATA_COOKIE]
+    assert cookie_mode["set"] == []
+
+    cookie_mode["get"] = 0
+    req = _request(sid=_sid_cookie("s1"), **{ss.DATA_COOKIE: token})
+    session = asyncio.run(ss.load_request_session(req))
+    assert session["user"] == "u" and session.restored
+    assert cookie_mode["get"] == 0
+    assert asyncio.run(ss.commit_request_session(req, Response())) is False
+
+
+def test_redis_session_moves_into_the_cookie(cookie_mode):
+    cookie_mode["redis"] = {"user": "u", "created_at": 1.0}
+    req = _request(sid=_sid_cookie("s1"))
+    session = asyncio.run(ss.load_request_session(req))
+    session["active_cloud_id"] = "a"
+    resp = Response()
+    asyncio.run(ss.commit_request_session(req, resp))
+    assert ss.DATA_COOKIE in _cookies(resp)
+    assert cookie_mode["delete"] == ["s1"]
+
+
+def test_large_session_falls_back_to_redis(cookie_mode, monkeypatch):
+    monkeypatch.setattr(config.settings, "session_cookie_max_bytes", 200)
+    token = ss.encrypt_session("s1", {"user": "u"})
+    req = _request(sid=_sid_cookie("s1"), **{ss.DATA_COOKIE: token})
+    session = asyncio.run(ss.load_request_session(req))
+    session["blob"] = "x" * 500
+    resp = Response()
+    assert asyncio.run(ss.commit_request_session(req, resp)) is True
+    # the stale data cookie is dropped, the whole session goes to Redis
+    assert 'sdata=""' in resp.headers["set-cookie"]
+    assert cookie_mode["set"] == [("s1", {"user": "u", "blob": "x" * 500})]
+    assert not session.in_cookie
+
+
+def test_old_cookie_is_reissued(cookie_mode, monkeypatch):
+    token = ss.encrypt_session("s1", {"user": "u"})
+    now = time.time() + 60
+    monkeypatch.setattr(ss.time, "time", lambda: now)
+    req = _request(sid=_sid_cookie("s1"), **{ss.DATA_COOKIE: token})
+    session = asyncio.run(ss.load_request_session(req))
+    assert session.modified
+
+
+def test_destroy_session_deletes_data_cookie(cookie_mode):
+    req = _request(sid=_sid_cookie("s1"))
+    resp = Response()
+    asyncio.run(ss.destroy_session(req, resp))
+    assert set(_cookies(resp)) == {"sid", ss.DATA_COOKIE}
+
+
+def test_changes_after_the_cookie_was_sent_are_not_moved_to_redis(cookie_mode):
+    request = _request()
+    session = ss.RequestSession("s1", {"a": 1})
+    session.in_cookie = True
+    request.state.session = session
+
+    async def body():
+        yield b"x"
+        session["a"] = 2
+
+    async def stream():
+        return [chunk async for chunk in ss.commit_after_body(request, body())]
+
+    assert asyncio.run(stream()) == [b"x"]
+    assert cookie_mode["set"] == []  # the cookie still holds the session
@@ -1,3 +1,4 @@
+import asyncio
 from types import SimpleNamespace
 
 import pytest
@@ -5,6 +6,7 @@ from fastapi import HTTPException
 from starlette.responses import Response
 
 from app.auth import session_store as ss
+from unittest.mock import AsyncMock
 
 
 def _extract_cookie_value(set_cookie_header: str) -> str:
@@ -13,7 +15,7 @@ def _extract_cookie_value(set_cookie_header: str) -> str:
 
 
 def test_get_sid_no_cookie():
-    req = SimpleNamespace(cookies={})
+    req = SimpleNamespace(cookies={}, state=SimpleNamespace())
     assert ss.get_sid(req) is None
 
 
@@ -24,30 +26,33 @@ def test_set_and_get_sid_cookie_roundtrip():
     assert header is not None
     cookie_val = _extract_cookie_value(header)
 
-    req = SimpleNamespace(cookies={"sid": cookie_val})
+    req = SimpleNamespace(cookies={"sid": cookie_val}, state=SimpleNamespace())
     sid = ss.get_sid(req)
     assert sid == "mysid"
 
 
 def test_get_sid_bad_signature():
-    req = SimpleNamespace(cookies={"sid": "not-a-valid"})
+    req = SimpleNamespace(cookies={"sid": "not-a-valid"}, state=SimpleNamespace())
     assert ss.get_sid(req) is None
 
 
 def test_ensure_session_creates_when_missing(monkeypatch):
     called = {}
 
-    def fake_set_session(sid, sess):
+    async def fake_set_session(sid, sess):
         called["sid"] = sid
         called["sess"] = sess
 
     monkeypatch.setattr(ss, "set_session", fake_set_session)
 
-    req = SimpleNamespace(cookies={})
+    req = SimpleNamespace(cookies={}, state=SimpleNamespace())
     resp = Response()
 
-    sid = ss.ensure_session(req, resp)
+    sid = asyncio.run(ss.ensure_session(req, resp))
     assert sid
+    # written back once, at the end of the request
+    assert called == {}
+    assert asyncio.run(ss.commit_request_session(req)) is True
     assert called.get("sid") == sid
     assert isinstance(called.get("sess"), dict)
     # cookie set
@@ -63,47 +68,48 @@ def test_ensure_session_refreshes_when_session_missing(monkeypatch):
     # get_session returns None -> should call set_session
     called = {}
 
-    def fake_get_session(sid):
+    async def fake_get_session(sid):
         return None
 
-    def fake_set_session(sid, sess):
+    async def fake_set_session(sid, sess):
         called["sid"] = sid
 
     monkeypatch.setattr(ss, "get_session", fake_get_session)
     monkeypatch.setattr(ss, "set_session", fake_set_session)
 
-    req = SimpleNamespace(cookies={"sid": cookie_val})
+    req = SimpleNamespace(cookies={"sid": cookie_val}, state=SimpleNamespace())
     resp2 = Response()
 
-    sid = ss.ensure_session(req, resp2)
+    sid = asyncio.run(ss.ensure_session(req, resp2))
     assert sid == "existingsid"
+    asyncio.run(ss.commit_request_session(req))
     assert called.get("sid") == "existingsid"
 
 
 def test_require_session_errors(monkeypatch):
-    req = SimpleNamespace(cookies={})
+    req = SimpleNamespace(cookies={}, state=SimpleNamespace())
     with pytest.raises(HTTPException):
-        ss.require_session(req)
+        asyncio.run(ss.require_session(req))
 
     # present sid but no session
     resp = Response()
     ss.set_sid_cookie(resp, "s2")
     cookie_val = _extract_cookie_value(resp.headers.get("set-cookie"))
 
-    def fake_get_session_none(sid):
+    async def fake_get_session_none(sid):
         return None
 
     monkeypatch.setattr(ss, "get_session", fake_get_session_none)
 
-    req2 = SimpleNamespace(cookies={"sid": cookie_val})
+    req2 = SimpleNamespace(cookies={"sid": cookie_val}, state=SimpleNamespace())
     with pytest.raises(HTTPException):
-        ss.require_session(req2)
+        asyncio.run(ss.require_session(req2))
 
 
 def test_destroy_session_calls_delete_and_deletes_cookie(monkeypatch):
     called = {"deleted": False}
 
-    def fake_delete(sid):
+    async def fake_delete(sid):
         called["deleted"] = True
 
     monkeypatch.setattr(ss, "delete_session", fake_delete)
@@ -113,10 +119,10 @@ def test_destroy_session_calls_delete_and_deletes_cookie(monkeypatch):
     ss.set_sid_cookie(resp, "tosid")
     cookie_val = _extract_cookie_value(resp.headers.get("set-cookie"))
 
-    req = SimpleNamespace(cookies={"sid": cookie_val})
+    req = SimpleNamespace(cookies={"sid": cookie_val}, state=SimpleNamespace())
     resp2 = Response()
 
-    ss.destroy_session(req, resp2)
+    asyncio.run(ss.destroy_session(req, resp2))
     assert called["deleted"]
     # cookie must be set to deleted (set-cookie present)
     assert resp2.headers.get("set-cookie") is not None
@@ -128,8 +134,8 @@ def test_require_session_success(monkeypatch):
     cookie_val = _extract_cookie_value(resp.headers.get("set-cookie"))
 
     # get_session returns a dict -> should succeed
-    monkeypatch.setattr(ss, "get_session", lambda sid: {"created_at": 1})
+    monkeypatch.setattr(ss, "get_session", AsyncMock(return_value={"created_at": 1}))
 
-    req = SimpleNamespace(cookies={"sid": cookie_val})
-    sid = ss.require_session(req)
+    req = SimpleNamespace(cookies={"sid": cookie_val}, state=SimpleNamespace())
+    sid = asyncio.run(ss.require_session(req))
     assert sid == "ok-sid"
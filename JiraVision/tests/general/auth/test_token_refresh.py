@@ -0,0 +1,132 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from app.auth import token_refresh
+from app.auth.session_store import RequestSession
+
+
+@pytest.fixture
+def token_calls(monkeypatch):
+    calls = []
+
+    async def post_refresh(refresh_token):
+        calls.append(refresh_token)
+        await asyncio.sleep(0.01)
+        n = len(calls)
+        return httpx.Response(
+            200,
+            json={
+                "access_token": f"at-{n}",
+                "refresh_token": f"rt-{n}",
+                "expires_in": 3600,
+            },
+            request=httpx.Request("POST", token_refresh.TOKEN_URL),
+        )
+
+    async def no_redis():
+        return False
+
+    monkeypatch.setattr(token_refresh, "_post_refresh", post_refresh)
+    monkeypatch.setattr(token_refresh, "_ensure_async_redis_available", no_redis)
+    monkeypatch.setattr(token_refresh, "_local_results", {})
+    monkeypatch.setattr(token_refresh, "stats", token_refresh.TokenRefreshStats())
+    return calls
+
+
+def _session(expires_in, clouds=("c1", "c2")):
+    entry = {"access_token": "at-0", "refresh_token": "rt-0"}
+    return RequestSession(
+        "sid",
+        {
+            "access_token": "at-0",
+            "cloud_ids": list(clouds),
+            "tokens_by_cloud": {
+                c: {**entry, "expires_at": time.time() + expires_in} for c in clouds
+            },
+        },
+    )
+
+
+def test_valid_token_is_left_alone(token_calls):
+    session = _session(3600)
+    entry = asyncio.run(token_refresh.token_entry(session, "c1"))
+    assert entry["access_token"] == "at-0"
+    assert token_calls == []
+    assert not session.modified
+
+
+def test_expired_token_burst_makes_a_single_call(token_calls):
+    session = _session(-10)
+
+    async def burst():
+        return await asyncio.gather(
+            *(token_refresh.token_entry(session, "c1") for _ in range(10))
+        )
+
+    entries = asyncio.run(burst())
+    assert token_calls == ["rt-0"]
+    assert {e["access_token"] for e in entries} == {"at-1"}
+    # every cloud sharing the rotated refresh token is updated
+    assert session["tokens_by_cloud"]["c2"]["refresh_token"] == "rt-1"
+    assert session["access_token"] == "at-1"
+    assert "tokens_by_cloud" in session.dirty_keys
+
+
+def test_token_near_expiry_is_refreshed_in_background(token_calls):
+    async def run():
+        first = _session(120)
+        entry = await token_refresh.token_entry(first, "c1")
+        assert entry["access_token"] == "at-0"  # not waited for
+        await asyncio.gather(*token_refresh._pending.values())
+        # another request of the session picks the new token up
+        return await token_refresh.token_entry(_session(100), "c1")
+
+    entry = asyncio.run(run())
+    assert entry["access_token"] == "at-1"
+    assert token_calls == ["rt-0"]
+    assert token_refresh.stats.background == 1
+    assert token_refresh.stats.reused == 1
+
+
+def test_failed_refresh_keeps_the_entry(token_calls, monkeypatch):
+    async def rejected(refresh_token):
+        return httpx.Response(
+            400,
+            json={"error": "invalid_grant"},
+            request=httpx.Request("POST", token_refresh.TOKEN_URL),
+        )
+
+    monkeypatch.setattr(token_refresh, "_post_refresh", rejected)
+    session = _session(-10)
+    entry = asyncio.run(token_refresh.token_entry(session, "c1"))
+    assert entry["access_token"] == "at-0"
+    assert token_refresh.stats.failed == 1
+
+
+def test_entry_without_refresh_token_is_unchanged(token_calls):
+    session = RequestSession(
+        "sid", {"tokens_by_cloud": {"c1": {"access_token": "legacy"}}}
+    )
+    assert asyncio.run(token_refresh.token_entry(session, "c1")) == {
+        "access_token": "legacy"
+    }
+    assert token_calls == []
+
+
+def test_result_is_shared_encrypted(token_calls, fake_redis, monkeypatch):
+    async def redis_up():
+        return True
+
+    monkeypatch.setattr(token_refresh, "_ensure_async_redis_available", redis_up)
+    monkeypatch.setattr(token_refresh, "async_redis_client", fake_redis)
+    asyncio.run(token_refresh.token_entry(_session(-10), "c1"))
+
+    (raw,) = fake_redis.strings.values()
+    assert "at-1" not in raw and "rt-1" not in raw
+    # another worker applies the stored result without calling Atlassian
+    entry = asyncio.run(token_refresh.token_entry(_session(-10), "c1"))
+    assert entry["access_token"] == "at-1"
+    assert token_calls == ["rt-0"]
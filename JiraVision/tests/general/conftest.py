@@ -1,8 +1,12 @@
+import asyncio
+import functools
 import os
 import sys
 import types
 import importlib
 
+import pytest
+
 # Ensure the package 'app' (JiraVision/app) is importable during tests
 ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "app"))
 if ROOT not in sys.path:
@@ -103,3 +107,237 @@ try:
     importlib.import_module("itsdangerous")
 except Exception:
     sys.modules["itsdangerous"] = types.ModuleType("itsdangerous")
+
+
+def _command(fn):
+    """Log the command by name; raise ConnectionError while the fake is down."""
+
+    @functools.wraps(fn)
+    async def command(self, *args, **kwargs):
+        self.log.append(fn.__name__)
+        if self.down:
+            raise ConnectionError("redis down")
+        return fn(self, *args, **kwargs)
+
+    return command
+
+
+class FakeAsyncRedis:
+    """In-memory subset of redis.asyncio shared by the Redis-backed tests.
+
+    Expirations are recorded in `ttls` (seconds), never applied. `eval` stands
+    for the rate limiter script: it answers `eval_results` in turn, then 0.
+    """
+
+    def __init__(self):
+        self.strings = {}
+        self.hashes = {}
+        self.sets = {}
+        self.zsets = {}
+        self.ttls = {}
+        self.log = []  # command names, in call order
+        self.down = False
+        self.evals = []  # keys and arguments of each eval call
+        self.eval_results = []
+        self.channels = {}  # channel -> queues of the subscribed FakePubSub
+        self.pubsubs = 0
+
+    def _keyspaces(self):
+        return (self.strings, self.hashes, self.sets, self.zsets)
+
+    @_command
+    def ping(self):
+        return True
+
+    @_command
+    def get(self, k):
+        return self.strings.get(k)
+
+    @_command
+    def getex(self, k, ex=None):
+        if k in self.strings and ex is not None:
+            self.ttls[k] = ex
+        return self.strings.get(k)
+
+    @_command
+    def set(self, k, v, ex=None, px=None, nx=False):
+        if nx and k in self.strings:
+            return None
+        self.strings[k] = v
+        self.ttls.pop(k, None)
+        if ex is not None or px is not None:
+            self.ttls[k] = ex if ex is not None else px / 1000
+        return True
+
+    @_command
+    def delete(self, *keys):
+        found = 0
+        for k in keys:
+            found += any(space.pop(k, None) is not None for space in self._keyspaces())
+            self.ttls.pop(k, None)
+        return found
+
+    @_command
+    def exists(self, k):
+        return int(any(k in space for space in self._keyspaces()))
+
+    @_command
+    def ttl(self, k):
+        if not any(k in space for space in self._keyspaces()):
+            return -2
+        return self.ttls.get(k, -1)
+
+    @_command
+    def expire(self, k, seconds):
+        self.ttls[k] = seconds
+        return True
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    # hashes
+
+    @_command
+    def hget(self, k, field):
+        return self.hashes.get(k, {}).get(field)
+
+    @_command
+    def hgetall(self, k):
+        return dict(self.hashes.get(k, {}))
+
+    @_command
+    def hmget(self, k, fields):
+        h = self.hashes.get(k, {})
+        return [h.get(f) for f in fields]
+
+    @_command
+    def hkeys(self, k):
+        return list(self.hashes.get(k, {}))
+
+    @_command
+    def hset(self, k, mapping):
+        self.hashes.setdefault(k, {}).update(mapping)
+        return len(mapping)
+
+    @_command
+    def hdel(self, k, *fields):
+        h = self.hashes.get(k, {})
+        return sum(h.pop(f, None) is not None for f in fields)
+
+    # sets
+
+    @_command
+    def sadd(self, k, *members):
+        self.sets.setdefault(k, set()).update(members)
+        return len(members)
+
+    @_command
+    def smembers(self, k):
+        return set(self.sets.get(k, set()))
+
+    # sorted sets
+
+    @_command
+    def zadd(self, k, mapping):
+        self.zsets.setdefault(k, {}).update(mapping)
+        return len(mapping)
+
+    @_command
+    def zrem(self, k, *members):
+        zset = self.zsets.get(k, {})
+        return sum(zset.pop(m, None) is not None for m in members)
+
+    @_command
+    def zcard(self, k):
+        return len(self.zsets.get(k, {}))
+
+    @_command
+    def zremrangebyscore(self, k, low, high):
+        zset = self.zsets.get(k, {})
+        dropped = [m for m, score in zset.items() if score <= float(high)]
+        for member in dropped:
+            del zset[member]
+        return len(dropped)
+
+    @_command
+    def zpopmin(self, k, count=1):
+        zset = self.zsets.get(k, {})
+        popped = sorted(zset.items(), key=lambda kv: kv[1])[:count]
+        for member, _ in popped:
+            del zset[member]
+        return popped
+
+    # scripts
+
+    @_command
+    def eval(self, script, numkeys, *args):
+        self.evals.append(args)
+        return self.eval_results.pop(0) if self.eval_results else 0
+
+    # pub/sub
+
+    @_command
+    def publish(self, channel, message):
+        queues = self.channels.get(channel, [])
+        for queue in queues:
+            queue.put_nowait({"type": "message", "channel": channel, "data": message})
+        return len(queues)
+
+    def pubsub(self):
+        self.pubsubs += 1
+        return FakePubSub(self)
+
+
+class FakePipeline:
+    """Queues commands and runs them in order on `execute`."""
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.ops = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __getattr__(self, name):
+        command = getattr(self.redis, name)
+
+        def queue(*args, **kwargs):
+            self.ops.append((command, args, kwargs))
+            return self
+
+        return queue
+
+    async def execute(self):
+        return [await command(*a, **kw) for command, a, kw in self.ops]
+
+
+class FakePubSub:
+    def __init__(self, redis):
+        self.redis = redis
+        self.queue = asyncio.Queue()
+
+    async def subscribe(self, *channels):
+        for channel in channels:
+            self.redis.channels.setdefault(channel, []).append(self.queue)
+
+    async def unsubscribe(self, *channels):
+        for channel in channels:
+            self.redis.channels.get(channel, []).remove(self.queue)
+
+    async def get_message(self, ignore_subscribe_messages=False, timeout=None):
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def aclose(self):
+        pass
+
+
+@pytest.fixture
+def fake_redis():
+    """A fresh in-memory Redis; each test patches it into the modules it uses."""
+    return FakeAsyncRedis()
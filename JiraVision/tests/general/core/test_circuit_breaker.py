@@ -0,0 +1,69 @@
+from fastapi.testclient import TestClient
+
+from app.core.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from app.main import create_app
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_open_half_open_closed_cycle():
+    clock = FakeClock()
+    breaker = CircuitBreaker("t-cycle", cooldown_seconds=5, clock=clock)
+    assert breaker.allow() is True
+
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert breaker.allow() is False
+
+    clock.now += 5
+    assert breaker.allow() is True  # the probe
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow() is False  # only one probe at a time
+
+    breaker.record_failure()  # probe failed -> new cool-down
+    assert breaker.state == OPEN
+    clock.now += 4
+    assert breaker.allow() is False
+    clock.now += 1
+    assert breaker.allow() is True
+    breaker.record_success()
+    assert breaker.state == CLOSED
+
+    assert breaker.transitions == {
+        (CLOSED, OPEN): 1,
+        (OPEN, HALF_OPEN): 2,
+        (HALF_OPEN, OPEN): 1,
+        (HALF_OPEN, CLOSED): 1,
+    }
+
+
+def test_lost_probe_is_replaced_after_cooldown():
+    clock = FakeClock()
+    breaker = CircuitBreaker("t-lost-probe", cooldown_seconds=5, clock=clock)
+    breaker.record_failure()
+    clock.now += 5
+    assert breaker.allow() is True  # probe that never reports back
+    clock.now += 4
+    assert breaker.allow() is False
+    clock.now += 1
+    assert breaker.allow() is True  # new probe
+    assert breaker.state == HALF_OPEN
+
+
+def test_metrics_expose_breaker_state_and_transitions():
+    breaker = CircuitBreaker("t-metrics", cooldown_seconds=60)
+    breaker.record_failure()
+    body = TestClient(create_app()).get("/metrics").text
+    assert 'circuit_breaker_state{breaker="t-metrics",state="open"} 1.0' in body
+    assert (
+        'circuit_breaker_transitions_total{breaker="t-metrics",'
+        'from_state="closed",to_state="open"} 1.0'
+    ) in body
+    assert "redis_resynced_sessions_total" in body
+    assert 'redis_resync_dropped_writes_total{store="po"}' in body
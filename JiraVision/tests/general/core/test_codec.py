@@ -0,0 +1,45 @@
+import json
+
+import pytest
+
+from app.core import codec, config
+
+SESSION = {
+    "access_token": "tok",
+    "cloud_ids": ["a", "b"],
+    "tokens_by_cloud": {"a": {"access_token": "tok", "scopes": ["read:jira-work"]}},
+    "created_at": 1700000000.5,
+}
+
+
+def test_round_trip_small_value_is_plain_v1(monkeypatch):
+    monkeypatch.setattr(config.settings, "codec_version", "v1")
+    monkeypatch.setattr(config.settings, "codec_compress_min_bytes", 1024)
+    raw = codec.encode(SESSION)
+    assert raw.startswith(codec.JSON_PREFIX)
+    assert codec.decode(raw) == SESSION
+
+
+def test_large_value_is_compressed(monkeypatch):
+    monkeypatch.setattr(config.settings, "codec_version", "v1")
+    monkeypatch.setattr(config.settings, "codec_compress_min_bytes", 100)
+    value = {f"CLOUD:PROJ{i}": {"project_key": f"PROJ{i}", "mask": "none"} for i in range(50)}
+    raw = codec.encode(value)
+    assert raw.startswith(codec.ZLIB_PREFIX)
+    assert len(raw) < len(json.dumps(value))
+    assert codec.decode(raw) == value
+
+
+def test_legacy_values_are_still_read():
+    assert codec.decode(json.dumps(SESSION)) == SESSION
+
+
+def test_legacy_writer_mode(monkeypatch):
+    monkeypatch.setattr(config.settings, "codec_version", "legacy")
+    assert json.loads(codec.encode(SESSION)) == SESSION
+
+
+@pytest.mark.parametrize("raw", ["not-json", "j1:{", "z1:bm90LXpsaWI="])
+def test_invalid_values_raise_value_error(raw):
+    with pytest.raises(ValueError):
+        codec.decode(raw)
@@ -1,120 +1,206 @@
+import asyncio
 import json
-import types
 
+import pytest
 
 from app.core import redis as core_redis
-from app.core import config
+from app.core import codec, config
+from app.core.circuit_breaker import OPEN
 
 
-def test_key():
-    assert core_redis._key("abc") == "session:abc"
+@pytest.fixture(autouse=True)
+def redis_up():
+    core_redis._breaker.reset()
+    core_redis._local_writes.clear()
+    core_redis._local_deletes.clear()
+    yield
+    core_redis._breaker.reset()
 
 
-def test_get_session_none_when_missing(monkeypatch):
-    core_redis._redis_available = True
-    fake = types.SimpleNamespace(get=lambda k: None)
-    monkeypatch.setattr(core_redis, "redis_client", fake)
-    assert core_redis.get_session("sid") is None
+def test_key():
+    assert core_redis._key("abc") == "session:abc"
 
 
-def test_get_session_parses_and_refreshes_ttl(monkeypatch):
-    core_redis._redis_available = True
-    stored = {"user": "bob"}
+@pytest.fixture
+def fake(fake_redis, monkeypatch):
+    monkeypatch.setattr(core_redis, "async_redis_client", fake_redis)
+    return fake_redis
 
-    def fake_get(k):
-        return json.dumps(stored)
 
-    called = {}
+def test_get_session_none_when_missing(fake):
+    assert asyncio.run(core_redis.get_session("sid")) is None
 
-    def fake_expire(k, seconds):
-        called["expire"] = (k, seconds)
 
-    fake = types.SimpleNamespace(get=fake_get, expire=fake_expire)
-    monkeypatch.setattr(core_redis, "redis_client", fake)
+def test_get_session_parses_and_refreshes_ttl(fake, monkeypatch):
+    stored = {"user": "bob"}
+    # remaining TTL below half of the max age -> refreshed
+    fake.strings["session:sid"] = json.dumps(stored)
+    fake.ttls["session:sid"] = 100
     # override settings to known value
     monkeypatch.setattr(config.settings, "session_max_age_seconds", 12345)
+    monkeypatch.setattr(config.settings, "session_ttl_refresh_ratio", 0.5)
 
-    out = core_redis.get_session("sid")
+    out = asyncio.run(core_redis.get_session("sid"))
     assert out == stored
-    assert called["expire"] == ("session:sid", 12345)
+    assert fake.ttls["session:sid"] == 12345
+    assert fake.log == ["get", "ttl", "expire"]
+
+
+def test_get_session_skips_refresh_while_ttl_is_high(fake, monkeypatch):
+    fake.strings["session:sid"] = json.dumps({"a": 1})
+    fake.ttls["session:sid"] = 12000
+    monkeypatch.setattr(config.settings, "session_max_age_seconds", 12345)
+    monkeypatch.setattr(config.settings, "session_ttl_refresh_ratio", 0.5)
 
+    assert asyncio.run(core_redis.get_session("sid")) == {"a": 1}
+    assert "expire" not in fake.log
 
-def test_get_session_falls_back_to_local_store_when_redis_down(monkeypatch):
+
+def test_get_session_uses_getex_when_refreshing_every_read(fake, monkeypatch):
+    fake.strings["session:sid"] = json.dumps({"a": 1})
+    monkeypatch.setattr(config.settings, "session_max_age_seconds", 600)
+    monkeypatch.setattr(config.settings, "session_ttl_refresh_ratio", 1.0)
+
+    assert asyncio.run(core_redis.get_session("sid")) == {"a": 1}
+    assert fake.log == ["getex"]
+    assert fake.ttls["session:sid"] == 600
+
+
+def test_get_session_falls_back_to_local_store_when_redis_down(fake):
     core_redis._local_store.clear()
-    core_redis._redis_available = True
-    core_redis._redis_warned = False
     core_redis._local_store["session:sid"] = json.dumps({"x": 1})
+    fake.down = True
 
-    def raising_get(_k):
-        raise RuntimeError("redis down")
+    assert asyncio.run(core_redis.get_session("sid")) == {"x": 1}
+    assert core_redis._breaker.state == OPEN
 
-    # expire missing/raising should be ignored
-    fake = types.SimpleNamespace(get=raising_get, expire=lambda *_a, **_k: (_ for _ in ()).throw(RuntimeError("expire")))
-    monkeypatch.setattr(core_redis, "redis_client", fake)
 
-    assert core_redis.get_session("sid") == {"x": 1}
-    assert core_redis._redis_available is False
+def test_command_counter_tracks_current_context(fake, monkeypatch):
+    monkeypatch.setattr(config.settings, "session_ttl_refresh_ratio", 0.5)
+    fake.strings["session:sid"] = json.dumps({"a": 1})
+    fake.ttls["session:sid"] = 1
 
+    async def run():
+        counter = core_redis.start_command_count()
+        await core_redis.get_session("sid")  # GET + TTL + EXPIRE
+        await core_redis.set_session("sid", {"a": 2})  # SET
+        return counter[0]
 
-def test_set_session_calls_set(monkeypatch):
-    core_redis._redis_available = True
-    captured = {}
+    assert asyncio.run(run()) == 4
 
-    def fake_set(k, v, ex=None):
-        captured["k"] = k
-        captured["v"] = v
-        captured["ex"] = ex
 
-    fake = types.SimpleNamespace(set=fake_set)
-    monkeypatch.setattr(core_redis, "redis_client", fake)
+def test_set_session_calls_set(fake, monkeypatch):
     monkeypatch.setattr(config.settings, "session_max_age_seconds", 42)
 
-    core_redis.set_session("sid", {"hello": "world"})
-    assert captured["k"] == "session:sid"
-    assert json.loads(captured["v"]) == {"hello": "world"}
-    assert captured["ex"] == 42
+    asyncio.run(core_redis.set_session("sid", {"hello": "world"}))
+    stored = codec.decode(fake.strings["session:sid"])
+    assert core_redis._unstamped(stored) == {"hello": "world"}
+    assert fake.ttls["session:sid"] == 42
 
 
-def test_set_session_falls_back_to_local_store_on_error(monkeypatch):
+def test_set_session_falls_back_to_local_store_on_error(fake, monkeypatch):
     core_redis._local_store.clear()
-    core_redis._redis_available = True
-    core_redis._redis_warned = False
+    fake.down = True
+    monkeypatch.setattr(config.settings, "session_max_age_seconds", 42)
 
-    def raising_set(*_a, **_k):
-        raise RuntimeError("redis down")
+    asyncio.run(core_redis.set_session("sid", {"k": "v"}))
+    local = codec.decode(core_redis._local_store["session:sid"])
+    assert core_redis._unstamped(local) == {"k": "v"}
+    assert core_redis._breaker.state == OPEN
 
-    monkeypatch.setattr(core_redis, "redis_client", types.SimpleNamespace(set=raising_set))
-    monkeypatch.setattr(config.settings, "session_max_age_seconds", 42)
 
-    core_redis.set_session("sid", {"k": "v"})
-    assert json.loads(core_redis._local_store["session:sid"]) == {"k": "v"}
-    assert core_redis._redis_available is False
+def test_delete_session_calls_delete(fake):
+    fake.strings["session:sid"] = "{}"
 
+    asyncio.run(core_redis.delete_session("sid"))
+    assert "session:sid" not in fake.strings
+    assert fake.log == ["delete"]
 
-def test_delete_session_calls_delete(monkeypatch):
-    core_redis._redis_available = True
-    called = {}
 
-    def fake_delete(k):
-        called["k"] = k
+def test_delete_session_falls_back_to_local_store_on_error(fake):
+    core_redis._local_store.clear()
+    core_redis._local_store["session:sid"] = json.dumps({"a": 1})
+    fake.down = True
 
-    fake = types.SimpleNamespace(delete=fake_delete)
-    monkeypatch.setattr(core_redis, "redis_client", fake)
+    asyncio.run(core_redis.delete_session("sid"))
 
-    core_redis.delete_session("sid")
-    assert called["k"] == "session:sid"
+    assert "session:sid" not in core_redis._local_store
 
 
-def test_delete_session_falls_back_to_local_store_on_error(monkeypatch):
-    core_redis._local_store.clear()
-    core_redis._redis_available = True
-    core_redis._redis_warned = False
-    core_redis._local_store["session:sid"] = json.dumps({"a": 1})
+def test_breaker_probes_with_async_ping_after_cooldown(fake, monkeypatch):
+    monkeypatch.setattr(core_redis._breaker, "cooldown_seconds", 0)
+    core_redis._breaker.record_failure()
 
-    def raising_delete(_k):
-        raise RuntimeError("redis down")
+    fake.down = True
+    assert asyncio.run(core_redis._ensure_async_redis_available()) is False
+    assert core_redis._breaker.state == OPEN
 
-    monkeypatch.setattr(core_redis, "redis_client", types.SimpleNamespace(delete=raising_delete))
-    core_redis.delete_session("sid")
+    fake.down = False
+    assert asyncio.run(core_redis._ensure_async_redis_available()) is True
+    assert core_redis._breaker.state == "closed"
 
-    assert "session:sid" not in core_redis._local_store
+
+def test_cancelled_probe_reopens_the_breaker(fake, monkeypatch):
+    monkeypatch.setattr(core_redis._breaker, "cooldown_seconds", 0)
+    core_redis._breaker.record_failure()
+
+    async def hanging_ping():
+        await asyncio.sleep(3600)
+
+    monkeypatch.setattr(fake, "ping", hanging_ping)
+
+    async def cancelled_probe():
+        task = asyncio.ensure_future(core_redis._ensure_async_redis_available())
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancelled_probe())
+    assert core_redis._breaker.state == OPEN
+
+    monkeypatch.delattr(fake, "ping")
+    assert asyncio.run(core_redis._ensure_async_redis_available()) is True
+
+
+def test_breaker_stays_open_during_cooldown(fake, monkeypatch):
+    monkeypatch.setattr(core_redis._breaker, "cooldown_seconds", 3600)
+    core_redis._breaker.record_failure()
+
+    assert asyncio.run(core_redis._ensure_async_redis_available()) is False
+    assert fake.log == []  # no probe during the cool-down
+
+
+def test_local_writes_are_resynced_when_redis_is_back(fake, monkeypatch):
+    core_redis._local_store.clear()
+    monkeypatch.setattr(core_redis._breaker, "cooldown_seconds", 0)
+    core_redis._breaker.record_failure()
+    fake.down = True
+    asyncio.run(core_redis.set_session("new", {"a": 1}))
+    asyncio.run(core_redis.set_session("older", {"outage": True}))
+    asyncio.run(core_redis.set_session("newer", {"outage": True}))
+    asyncio.run(core_redis.delete_session("gone"))
+    assert core_redis._local_writes == {"new", "older", "newer"}
+
+    fake.down = False
+    fake.strings.update(
+        {
+            "session:older": json.dumps({"before": True}),  # written before stamps
+            "session:newer": json.dumps({"after": True, "_written_at": 4e9}),
+            "session:gone": "{}",
+        }
+    )
+    before = dict(core_redis.resync_stats)
+    assert asyncio.run(core_redis._ensure_async_redis_available()) is True
+
+    def session(sid):
+        return core_redis._unstamped(codec.decode(fake.strings[f"session:{sid}"]))
+
+    assert session("new") == {"a": 1}
+    assert session("older") == {"outage": True}  # last write wins
+    assert session("newer") == {"after": True}
+    assert "session:gone" not in fake.strings
+    assert core_redis.resync_stats["sessions"] == before["sessions"] + 2
+    assert core_redis.resync_stats["dropped"] == before["dropped"] + 1
+    assert not core_redis._local_writes and not core_redis._local_deletes
+    assert len(core_redis._local_store) == 0
@@ -0,0 +1,72 @@
+import asyncio
+
+import httpx
+from fastapi.testclient import TestClient
+
+from app.clients.jira import JiraClient
+from app.core import config, http_pool
+from app.main import create_app
+
+
+def test_client_limits_come_from_settings(monkeypatch):
+    monkeypatch.setattr(config.settings, "jira_http_max_connections", 7)
+    monkeypatch.setattr(config.settings, "jira_http_pool_timeout", 0.5)
+    monkeypatch.setattr(config.settings, "jira_http2", True)
+    client = http_pool._build_client()
+    pool = client._transport._pool
+    assert pool._max_connections == 7
+    assert client.timeout.pool == 0.5
+    # h2 is optional: without it the pool stays on HTTP/1.1
+    assert pool._http2 == http_pool._http2_enabled()
+
+
+def test_jira_clients_share_one_pool():
+    async def run():
+        a, b = JiraClient("t1", "c1"), JiraClient("t2", "c2")
+        assert a._client is b._client is http_pool.shared_client()
+        await a.aclose()
+        assert not a._client.is_closed
+        await http_pool.close_shared_client()
+        assert a._client.is_closed
+        assert http_pool.connection_counts() == {"open": 0, "idle": 0}
+
+    asyncio.run(run())
+
+
+def test_requests_are_counted_and_connections_reused(monkeypatch):
+    def handler(request):
+        return httpx.Response(200, json={"key": "K-1"})
+
+    def build():
+        return httpx.AsyncClient(
+            transport=httpx.MockTransport(handler),
+            event_hooks={"request": [http_pool._on_request]},
+        )
+
+    monkeypatch.setattr(http_pool, "_build_client", build)
+    before = http_pool.stats.requests
+
+    async def run():
+        client = JiraClient("t", "c")
+        await client.get_issue("K-1")
+        await client.get_issue("K-1")
+        await http_pool.close_shared_client()
+
+    asyncio.run(run())
+    assert http_pool.stats.requests - before == 2
+
+
+def test_trace_counts_new_connections():
+    stats = http_pool.HttpPoolStats()
+    asyncio.run(stats.trace("connection.connect_tcp.complete", {}))
+    asyncio.run(stats.trace("connection.start_tls.complete", {}))
+    asyncio.run(stats.trace("http11.send_request_headers.complete", {}))
+    assert (stats.connections_opened, stats.tls_handshakes) == (1, 1)
+
+
+def test_pool_metrics_exposed():
+    with TestClient(create_app()) as client:
+        body = client.get("/metrics").text
+    assert 'jira_http_pool_connections{state="idle"}' in body
+    assert "jira_http_requests_total" in body
+    assert "jira_http_pool_max_connections" in body
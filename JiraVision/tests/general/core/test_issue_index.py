@@ -0,0 +1,200 @@
+import asyncio
+
+import pytest
+
+from app.core import config, issue_index, jira_fields
+
+
+def _issue(n, project="P", status="Done", assignee=None, labels=(), updated="2"):
+    return {
+        "id": str(1000 + n),
+        "key": f"{project}-{n}",
+        "fields": {
+            "summary": f"issue {n}",
+            "status": {"name": status, "statusCategory": {"name": status}},
+            "issuetype": {"name": "Story"},
+            "project": {"key": project},
+            "assignee": {"accountId": assignee} if assignee else None,
+            "labels": list(labels),
+            "created": f"2024-01-{n:02d}",
+            "updated": updated,
+        },
+    }
+
+
+class FakeJira:
+    def __init__(self, issues, account_id="acc-1"):
+        self.cloud_id = "c1"
+        self.access_token = "tok"
+        self.issues = issues
+        self.changed = []  # returned by incremental pulls
+        self.jqls = []
+        self.account_id = account_id
+
+    async def get_current_user(self):
+        return {"accountId": self.account_id}
+
+    async def iter_search(self, jql, *, limit=None, profile=None, **kwargs):
+        self.jqls.append(jql)
+        source = self.changed if "updated >=" in jql else self.issues
+        for issue in source[:limit]:
+            yield issue
+
+
+@pytest.fixture(autouse=True)
+def _index(monkeypatch, tmp_path):
+    monkeypatch.setattr(config.settings, "jira_index_enabled", True)
+    monkeypatch.setattr(
+        config.settings, "jira_index_path", str(tmp_path / "index.sqlite3")
+    )
+    monkeypatch.setattr(issue_index, "_accounts", {})
+    monkeypatch.setattr(issue_index, "_not_keys", set())
+    monkeypatch.setattr(issue_index, "stats", issue_index.IssueIndexStats())
+
+
+async def _search(client, jql, profile=jira_fields.ISSUE_CARD, max_results=20):
+    return await issue_index.search(
+        client, jql, max_results=max_results, profile=profile
+    )
+
+
+async def _indexed(client, jql):
+    """Search once (schedules the full pull), let the pull finish, search again."""
+    assert await _search(client, jql) is None
+    await asyncio.gather(*issue_index._inflight.values())
+    return await _search(client, jql)
+
+
+def test_parse_supported_subset():
+    query = issue_index.parse(
+        'project in (P, "Q") AND status != Done AND assignee = currentUser() '
+        "AND labels in (a, b) ORDER BY updated DESC, key",
+        account_id="acc-1",
+    )
+    assert query is not None
+    assert query.projects == ["P", "Q"]
+    assert "acc-1" in query.args
+    assert query.order.startswith("updated DESC, project ASC, key_num ASC")
+
+
+@pytest.mark.parametrize(
+    "jql",
+    [
+        "status = Done",  # no project
+        "project = P OR status = Done",
+        'project = P AND text ~ "foo"',
+        "project = P AND sprint in openSprints()",
+        "project = P AND fixVersion = 1.0",
+        "project = P ORDER BY rank",
+        "project = P AND assignee = currentUser()",  # account unknown
+        "project != P",
+        'project = "My Project"',  # name
+        "project = 10001",  # id
+    ],
+)
+def test_parse_rejects_unsupported(jql):
+    assert issue_index.parse(jql) is None
+
+
+def test_first_search_goes_live_then_index_serves():
+    client = FakeJira(
+        [
+            _issue(1, status="Done"),
+            _issue(2, status="To Do", assignee="acc-1", labels=["x"]),
+            _issue(3, status="To Do"),
+        ]
+    )
+
+    async def run():
+        data = await _indexed(client, "project = P AND status = 'to do'")
+        mine = await _search(client, "project = P AND assignee = currentUser()")
+        labelled = await _search(client, "project = P AND labels = x")
+        ordered = await _search(client, "project = P ORDER BY key ASC")
+        return data, mine, labelled, ordered
+
+    data, mine, labelled, ordered = asyncio.run(run())
+    assert [i["key"] for i in data["issues"]] == ["P-3", "P-2"]  # newest first
+    assert data["total"] == 2 and data["isLast"]
+    assert [i["key"] for i in mine["issues"]] == ["P-2"]
+    assert [i["key"] for i in labelled["issues"]] == ["P-2"]
+    assert [i["key"] for i in ordered["issues"]] == ["P-1", "P-2", "P-3"]
+    assert client.jqls == ['project = "P" ORDER BY key ASC']
+    assert issue_index.stats.local == 4 and issue_index.stats.live == 1
+
+
+def test_stale_project_pulls_changes_before_answering(monkeypatch):
+    monkeypatch.setattr(config.settings, "jira_index_refresh_seconds", 0)
+    client = FakeJira([_issue(1, status="To Do")])
+
+    async def run():
+        await _indexed(client, "project = P")
+        client.changed = [_issue(1, status="Done"), _issue(2, status="To Do")]
+        return await _search(client, "project = P AND status = Done")
+
+    data = asyncio.run(run())
+    assert [i["key"] for i in data["issues"]] == ["P-1"]
+    assert 'updated >= "-' in client.jqls[-1]
+    assert issue_index.stats.incremental_pulls >= 1
+
+
+def test_profile_outside_index_stays_live():
+    client = FakeJira([_issue(1)])
+
+    async def run():
+        await _indexed(client, "project = P")
+        return await _search(client, "project = P", profile=jira_fields.ANALYSIS)
+
+    assert asyncio.run(run()) is None
+
+
+def test_oversized_project_is_never_served(monkeypatch):
+    monkeypatch.setattr(config.settings, "jira_index_max_issues_per_project", 2)
+    client = FakeJira([_issue(n) for n in range(1, 4)])
+
+    assert asyncio.run(_indexed(client, "project = P")) is None
+
+
+def test_index_is_scoped_per_account():
+    owner = FakeJira([_issue(1)], account_id="acc-1")
+    other = FakeJira([], account_id="acc-2")
+    other.access_token = "other"
+
+    async def run():
+        await _indexed(owner, "project = P")
+        return await _search(other, "project = P")
+
+    assert asyncio.run(run()) is None
+
+
+def test_forget_drops_issues():
+    client = FakeJira([_issue(1), _issue(2)])
+
+    async def run():
+        await _indexed(client, "project = P")
+        assert issue_index.forget("c1", keys=["P-1"]) == 1
+        return await _search(client, "project = P")
+
+    data = asyncio.run(run())
+    assert [i["key"] for i in data["issues"]] == ["P-2"]
+
+
+def test_disabled_index_is_a_no_op(monkeypatch):
+    monkeypatch.setattr(config.settings, "jira_index_enabled", False)
+    client = FakeJira([_issue(1)])
+
+    assert asyncio.run(_search(client, "project = P")) is None
+    assert client.jqls == []
+
+
+def test_project_name_is_indexed_under_its_key():
+    client = FakeJira([_issue(1, project="PLT"), _issue(2, project="PLT")])
+
+    async def run():
+        by_name = await _indexed(client, "project = Platform")
+        by_key = await _search(client, "project = PLT")
+        return by_name, by_key
+
+    by_name, by_key = asyncio.run(run())
+    assert by_name is None  # the name keeps going to Jira
+    assert [i["key"] for i in by_key["issues"]] == ["PLT-2", "PLT-1"]
+    assert issue_index._projects("c1", "account:acc-1", ["PLATFORM"]) == {}
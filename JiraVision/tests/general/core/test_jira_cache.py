@@ -0,0 +1,111 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.clients.jira import JiraClient
+from app.core import config, jira_cache, rate_limit
+from app.core import redis as core_redis
+
+
+@pytest.fixture
+def fake(fake_redis, monkeypatch):
+    monkeypatch.setattr(jira_cache, "async_redis_client", fake_redis)
+    monkeypatch.setattr(rate_limit, "async_redis_client", fake_redis)
+    monkeypatch.setattr(jira_cache, "stats", jira_cache.JiraCacheStats())
+    monkeypatch.setattr(config.settings, "jira_cache_ttl_seconds", 60)
+    core_redis._breaker.reset()
+    return fake_redis
+
+
+def _jira(handler, token="tok"):
+    transport = httpx.MockTransport(handler)
+    return JiraClient(token, "c1", client=httpx.AsyncClient(transport=transport))
+
+
+def test_fresh_entry_is_served_without_calling_jira(fake):
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(200, json={"key": "K-1"})
+
+    jc = _jira(handler)
+    assert asyncio.run(jc.get_issue("K-1", expand="renderedFields")) == {"key": "K-1"}
+    assert asyncio.run(jc.get_issue("K-1", expand="renderedFields")) == {"key": "K-1"}
+    assert len(calls) == 1
+    stats = jira_cache.stats
+    assert (stats.hits, stats.misses) == (1, 1)
+    assert stats.bytes_saved == len(b'{"key":"K-1"}')
+    assert set(fake.ttls.values()) == {config.settings.jira_cache_max_age_seconds}
+
+
+def test_stale_entry_is_revalidated_with_etag(fake, monkeypatch):
+    seen = []
+
+    def handler(request):
+        seen.append(request.headers.get("if-none-match"))
+        if request.headers.get("if-none-match") == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(200, json={"comments": []}, headers={"ETag": '"v1"'})
+
+    monkeypatch.setattr(config.settings, "jira_cache_ttl_seconds", 0)
+    jc = _jira(handler)
+    asyncio.run(jc.get_issue_comments("K-1"))
+    assert asyncio.run(jc.get_issue_comments("K-1")) == {"comments": []}
+    assert seen == [None, '"v1"']
+    assert jira_cache.stats.revalidated == 1
+    assert jira_cache.stats.hit_ratio == 0.5
+
+
+def test_stale_entry_without_validator_is_refetched(fake, monkeypatch):
+    bodies = iter([{"v": 1}, {"v": 2}])
+
+    def handler(request):
+        assert "if-modified-since" not in request.headers
+        return httpx.Response(200, json=next(bodies))
+
+    monkeypatch.setattr(config.settings, "jira_cache_ttl_seconds", 0)
+    jc = _jira(handler)
+    asyncio.run(jc.get_issue("K-1"))
+    assert asyncio.run(jc.get_issue("K-1")) == {"v": 2}
+    assert jira_cache.stats.misses == 2
+
+
+def test_entries_are_scoped_per_token(fake):
+    def handler(request):
+        return httpx.Response(200, json={"token": request.headers["authorization"]})
+
+    asyncio.run(_jira(handler, "a").get_issue("K-1"))
+    out = asyncio.run(_jira(handler, "b").get_issue("K-1"))
+    assert out == {"token": "Bearer b"}
+    assert len(fake.strings) == 2
+
+
+def test_redis_down_goes_straight_to_jira(fake):
+    fake.down = True
+
+    def handler(request):
+        return httpx.Response(200, json={"key": "K-1"})
+
+    assert asyncio.run(_jira(handler).get_issue("K-1")) == {"key": "K-1"}
+    assert core_redis._breaker.state == "open"
+    core_redis._breaker.reset()
+
+
+def test_invalidate_issue_drops_every_scope(fake):
+    def handler(request):
+        if request.url.path.endswith("/comment"):
+            return httpx.Response(200, json={"comments": []})
+        return httpx.Response(200, json={"id": "10001", "key": "K-1"})
+
+    asyncio.run(_jira(handler, "a").get_issue("K-1"))
+    asyncio.run(_jira(handler, "b").get_issue("k-1"))
+    asyncio.run(_jira(handler, "a").get_issue_comments("K-1"))
+    assert len(fake.strings) == 3
+
+    # issue-link events only carry ids
+    assert asyncio.run(jira_cache.invalidate_issue("c1", ["10001"])) == 2
+    assert asyncio.run(jira_cache.invalidate_issue("c1", ["K-1"])) == 1
+    assert fake.strings == {} and fake.sets == {}
+    assert jira_cache.stats.invalidated == 3
@@ -0,0 +1,66 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from app.clients.jira import JiraClient
+from app.core import config, jira_fields, rate_limit
+from app.core import redis as core_redis
+from app.main import create_app
+
+
+@pytest.fixture
+def jira(monkeypatch):
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, json={"issues": [], "key": "K-1"})
+
+    async def no_wait(cloud_id):
+        return None
+
+    monkeypatch.setattr(config.settings, "jira_cache_enabled", False)
+    monkeypatch.setattr(rate_limit, "acquire", no_wait)
+    transport = httpx.MockTransport(handler)
+    client = JiraClient("t", "c1", client=httpx.AsyncClient(transport=transport))
+    return client, requests
+
+
+def test_get_issue_requests_only_profile_fields(jira):
+    client, requests = jira
+    asyncio.run(client.get_issue("K-1", profile=jira_fields.ANALYSIS))
+    params = requests[0].url.params
+    assert params["fields"].split(",") == list(jira_fields.ANALYSIS.fields)
+    assert "expand" not in params
+
+
+def test_search_uses_profile_and_counts_payload(jira):
+    client, requests = jira
+    profile = jira_fields.ISSUE_LIST
+    before = (profile.responses, profile.bytes)
+    asyncio.run(client.search_jql("x", profile=profile))
+    body = requests[0].read()
+    assert b'"priority"' in body and b'"project"' not in body
+    assert profile.responses == before[0] + 1
+    assert profile.bytes - before[1] == len(b'{"issues":[],"key":"K-1"}')
+
+
+def test_search_defaults_to_issue_card(jira):
+    client, requests = jira
+    asyncio.run(client.search_jql("x"))
+    assert b'"project"' in requests[0].read()
+
+
+def test_profile_params_with_expand():
+    profile = jira_fields.FieldProfile("test-expand", ("summary",), expand="names")
+    assert profile.params() == {"fields": "summary", "expand": "names"}
+    jira_fields._registry.pop("test-expand")
+
+
+def test_profile_metrics_exposed():
+    core_redis._breaker.reset()
+    body = TestClient(create_app()).get("/metrics").text
+    assert 'jira_profile_payload_bytes_total{profile="analysis"}' in body
+    assert 'jira_profile_responses_total{profile="project-discovery"}' in body
@@ -0,0 +1,129 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from app.clients.llm import LLMClient
+from app.core import config, llm_cache
+from app.core import redis as core_redis
+
+
+@pytest.fixture
+def fake(fake_redis, monkeypatch):
+    monkeypatch.setattr(llm_cache, "async_redis_client", fake_redis)
+    monkeypatch.setattr(llm_cache, "stats", llm_cache.LLMCacheStats())
+    monkeypatch.setattr(config.settings, "llm_provider", "ollama")
+    monkeypatch.setattr(config.settings, "llm_base_url", "http://ollama")
+    monkeypatch.setattr(config.settings, "llm_model", "m1")
+    core_redis._breaker.reset()
+    return fake_redis
+
+
+def _llm(calls, content="analyse"):
+    async def handler(request):
+        calls.append(json.loads(request.content))
+        await asyncio.sleep(0.01)
+        return httpx.Response(200, json={"message": {"content": content}})
+
+    c = LLMClient()
+    c._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return c
+
+
+def test_identical_call_is_served_from_redis(fake):
+    calls = []
+    c = _llm(calls)
+
+    assert asyncio.run(c.chat_text(system="s", user="P-1")) == "analyse"
+    assert asyncio.run(c.chat_text(system="s", user="P-1")) == "analyse"
+    assert len(calls) == 1
+    assert (llm_cache.stats.hits, llm_cache.stats.misses) == (1, 1)
+    assert llm_cache.stats.saved_seconds > 0
+    assert any(k.startswith("llm_cache:ollama:m1:text:") for k in fake.strings)
+
+
+def test_corrupt_entry_is_dropped_and_recomputed(fake):
+    calls = []
+    c = _llm(calls)
+    asyncio.run(c.chat_text(system="s", user="u"))
+    (key,) = fake.strings
+    fake.strings[key] = "z1:not-zlib"
+
+    assert asyncio.run(c.chat_text(system="s", user="u")) == "analyse"
+    assert len(calls) == 2
+    assert (llm_cache.stats.hits, llm_cache.stats.misses) == (0, 2)
+    assert "analyse" in fake.strings[key]  # stored again
+
+
+def test_key_covers_prompts_model_and_options():
+    payload = {"model": "m1", "messages": [{"role": "user", "content": "a"}]}
+    key = llm_cache.cache_key("ollama", "text", payload)
+    reordered = dict(reversed(list(payload.items())))
+    assert llm_cache.cache_key("ollama", "text", reordered) == key
+    assert llm_cache.cache_key("ollama", "json", payload) != key
+    for change in (
+        {"model": "m2"},
+        {"messages": [{"role": "user", "content": "b"}]},
+        {"options": {"temperature": 0.7}},
+    ):
+        assert llm_cache.cache_key("ollama", "text", {**payload, **change}) != key
+
+
+def test_concurrent_identical_calls_share_one_model_call(fake):
+    calls = []
+    c = _llm(calls, content='{"summary": "ok"}')
+
+    async def burst():
+        return await asyncio.gather(
+            *(c.chat_json(system="s", user="u") for _ in range(5))
+        )
+
+    assert asyncio.run(burst()) == [{"summary": "ok"}] * 5
+    assert len(calls) == 1
+    assert llm_cache.stats.coalesced == 4
+
+
+def test_errors_are_not_cached(fake):
+    calls = []
+    c = _llm(calls, content="")
+
+    for _ in range(2):
+        with pytest.raises(HTTPException):
+            asyncio.run(c.chat_text(system="s", user="u"))
+    assert len(calls) == 2
+    assert fake.strings == {}
+
+
+def test_oldest_entries_are_evicted(fake, monkeypatch):
+    monkeypatch.setattr(config.settings, "llm_cache_max_entries", 2)
+    c = _llm([])
+
+    for n in range(3):
+        asyncio.run(c.chat_text(system="s", user=f"P-{n}"))
+    assert len(fake.strings) == 2
+    assert llm_cache.stats.evicted == 1
+
+
+def test_stream_shares_the_text_entry(fake):
+    calls = []
+    c = _llm(calls)
+
+    async def stream():
+        return [chunk async for chunk in c.chat_stream(system="s", user="u")]
+
+    asyncio.run(c.chat_text(system="s", user="u"))
+    assert asyncio.run(stream()) == ["analyse"]
+    assert len(calls) == 1
+
+
+def test_disabled_cache_always_calls_the_model(fake, monkeypatch):
+    monkeypatch.setattr(config.settings, "llm_cache_enabled", False)
+    calls = []
+    c = _llm(calls)
+
+    for _ in range(2):
+        asyncio.run(c.chat_text(system="s", user="u"))
+    assert len(calls) == 2
+    assert fake.strings == {}
@@ -0,0 +1,97 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+
+from app.core import redis as core_redis
+from app.core.local_store import LocalStore
+from app.main import create_app
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_get_set_and_counters():
+    store = LocalStore("t-basic", max_entries=10, max_bytes=1000)
+    assert store.get("a") is None
+    store["a"] = "1"
+    assert store.get("a") == "1"
+    assert "a" in store
+    assert len(store) == 1
+    assert store.hits == 1 and store.misses == 1
+
+
+def test_ttl_expiration_and_touch():
+    clock = FakeClock()
+    store = LocalStore("t-ttl", max_entries=10, max_bytes=1000, ttl_seconds=10, clock=clock)
+    store.set("a", "1")
+    clock.now += 5
+    assert store.touch("a") is True
+    clock.now += 8
+    assert store.get("a") == "1"
+    clock.now += 11
+    assert store.get("a") is None
+    assert store.expirations == 1
+    assert store.touch("a") is False
+
+
+def test_lru_eviction_on_entry_count():
+    store = LocalStore("t-lru", max_entries=2, max_bytes=1000)
+    store.set("a", "1")
+    store.set("b", "2")
+    store.get("a")  # a becomes most recently used
+    store.set("c", "3")
+    assert store.keys() == ["a", "c"]
+    assert store.evictions == 1
+
+
+def test_eviction_on_byte_budget():
+    store = LocalStore("t-bytes", max_entries=100, max_bytes=10)
+    store.set("a", "1234")  # 5 bytes
+    store.set("b", "1234")  # 10 bytes
+    store.set("c", "1234")  # 15 -> evict a
+    assert "a" not in store
+    assert store.size_bytes == 10
+    store.set("big", "x" * 50)  # never fits
+    assert "big" not in store
+
+
+def test_pop_and_delete():
+    store = LocalStore("t-pop", max_entries=10, max_bytes=1000)
+    store["a"] = "1"
+    assert store.pop("a") == "1"
+    assert store.pop("a", None) is None
+    store["b"] = "2"
+    del store["b"]
+    assert len(store) == 0 and store.size_bytes == 0
+
+
+def test_session_fallback_is_bounded(monkeypatch):
+    core_redis._local_store.clear()
+    monkeypatch.setattr(core_redis._breaker, "cooldown_seconds", 3600)
+    core_redis._breaker.record_failure()
+    monkeypatch.setattr(core_redis._local_store, "max_entries", 3)
+
+    async def run():
+        for i in range(5):
+            await core_redis.set_session(f"s{i}", {"i": i})
+        return await core_redis.get_session("s0"), await core_redis.get_session("s4")
+
+    first, last = asyncio.run(run())
+    assert first is None
+    assert last == {"i": 4}
+    assert len(core_redis._local_store) == 3
+    core_redis._local_store.clear()
+    core_redis._local_writes.clear()
+    core_redis._breaker.reset()
+
+
+def test_metrics_expose_local_store_counters():
+    client = TestClient(create_app())
+    body = client.get("/metrics").text
+    assert 'local_store_hits_total{store="session"}' in body
+    assert 'local_store_entries{store="po"}' in body
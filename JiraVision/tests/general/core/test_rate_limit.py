@@ -0,0 +1,100 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+
+from app.clients.jira import JiraClient
+from app.core import config, rate_limit
+from app.core import redis as core_redis
+
+
+@pytest.fixture
+def fake(fake_redis, monkeypatch):
+    monkeypatch.setattr(rate_limit, "async_redis_client", fake_redis)
+    monkeypatch.setattr(rate_limit, "stats", rate_limit.RateLimitStats())
+    monkeypatch.setattr(rate_limit, "_local_buckets", {})
+    monkeypatch.setattr(config.settings, "jira_cache_enabled", False)
+    core_redis._breaker.reset()
+    return fake_redis
+
+
+@pytest.fixture
+def no_sleep(monkeypatch):
+    slept = []
+
+    async def sleep(seconds):
+        slept.append(seconds)
+
+    monkeypatch.setattr(rate_limit.asyncio, "sleep", sleep)
+    monkeypatch.setattr("app.clients.jira.asyncio.sleep", sleep)
+    return slept
+
+
+def _jira(handler):
+    transport = httpx.MockTransport(handler)
+    return JiraClient("t", "c1", client=httpx.AsyncClient(transport=transport))
+
+
+def test_token_bucket_refills_and_pauses():
+    now = [0.0]
+    bucket = rate_limit.TokenBucket(2.0, 2, clock=lambda: now[0])
+    assert bucket.take() == 0 and bucket.take() == 0
+    assert bucket.take() == pytest.approx(0.5)
+    now[0] = 0.5
+    assert bucket.take() == 0
+    bucket.pause(3)
+    assert bucket.take() == pytest.approx(3)
+
+
+def test_acquire_waits_for_the_shared_bucket(fake, no_sleep):
+    fake.eval_results = [250, 0]
+    asyncio.run(rate_limit.acquire("c1"))
+    assert no_sleep == [0.25]
+    assert fake.evals[0][:2] == ("ratelimit:jira:c1", "ratelimit:jira:c1:pause")
+    assert rate_limit.stats.wait_seconds == 0.25
+
+
+def test_acquire_falls_back_to_local_bucket(fake, no_sleep):
+    fake.down = True
+    asyncio.run(rate_limit.acquire("c1"))
+    assert "c1" in rate_limit._local_buckets
+    core_redis._breaker.reset()
+
+
+def test_retry_after_headers():
+    assert rate_limit.retry_after({"retry-after": "2"}) == 2.0
+    reset = (datetime.now(timezone.utc) + timedelta(seconds=30)).isoformat()
+    assert 25 < rate_limit.retry_after({"x-ratelimit-reset": reset}) <= 30
+    assert rate_limit.retry_after({}) is None
+
+
+def test_429_is_retried_after_retry_after(fake, no_sleep):
+    answers = iter(
+        [httpx.Response(429, headers={"Retry-After": "3"}), httpx.Response(200, json={})]
+    )
+    assert asyncio.run(_jira(lambda r: next(answers)).get_issue("K-1")) == {}
+    assert no_sleep == [3.0]
+    assert fake.ttls == {"ratelimit:jira:c1:pause": 3.0}
+    assert (rate_limit.stats.throttled, rate_limit.stats.retries) == (1, 1)
+
+
+def test_503_backs_off_with_jitter_then_gives_up(fake, no_sleep, monkeypatch):
+    monkeypatch.setattr(config.settings, "jira_max_retries", 2)
+    monkeypatch.setattr(config.settings, "jira_retry_base_seconds", 1.0)
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(_jira(lambda r: httpx.Response(503)).get_issue("K-1"))
+    assert len(no_sleep) == 2
+    assert 0.5 <= no_sleep[0] <= 1 and 1 <= no_sleep[1] <= 2
+
+
+def test_non_idempotent_post_is_not_retried(fake, no_sleep):
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(429, headers={"Retry-After": "1"})
+
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(_jira(handler)._request("POST", "/issue", json_body={}))
+    assert len(calls) == 1 and no_sleep == []
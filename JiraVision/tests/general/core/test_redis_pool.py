@@ -0,0 +1,73 @@
+import asyncio
+import time
+
+import redis
+import redis.asyncio as aioredis
+from fastapi.testclient import TestClient
+
+from app.core import config
+from app.core import redis as core_redis
+from app.core.redis_pool import (
+    AsyncTimedBlockingConnectionPool,
+    TimedBlockingConnectionPool,
+    pool_kwargs,
+)
+from app.main import create_app
+
+
+def test_pool_kwargs_come_from_settings(monkeypatch):
+    monkeypatch.setattr(config.settings, "redis_max_connections", 7)
+    monkeypatch.setattr(config.settings, "redis_socket_timeout", 0.5)
+    monkeypatch.setattr(config.settings, "redis_retry_on_timeout", True)
+    kw = pool_kwargs("h", 1234)
+    assert kw["max_connections"] == 7
+    assert kw["socket_timeout"] == 0.5
+    assert kw["retry_on_timeout"] is True
+    assert kw["decode_responses"] is True
+
+
+def test_module_clients_use_bounded_pools():
+    pool = core_redis.async_redis_client.connection_pool
+    assert isinstance(pool, AsyncTimedBlockingConnectionPool)
+    assert pool.max_connections == config.settings.redis_max_connections
+    assert pool.connection_kwargs["socket_timeout"] == config.settings.redis_socket_timeout
+    assert isinstance(core_redis.redis_client.connection_pool, TimedBlockingConnectionPool)
+
+
+def test_sync_pool_records_wait_time(monkeypatch):
+    def slow_get(self, *a, **k):
+        time.sleep(0.01)
+        return "conn"
+
+    monkeypatch.setattr(redis.BlockingConnectionPool, "get_connection", slow_get)
+    pool = TimedBlockingConnectionPool("t-sync", max_connections=2)
+    assert pool.get_connection() == "conn"
+    assert pool.stats.acquisitions == 1
+    assert pool.stats.last_wait_seconds >= 0.01
+    assert pool.in_use() == 0
+
+
+def test_async_pool_records_wait_time_even_on_timeout(monkeypatch):
+    async def no_conn(self, *a, **k):
+        await asyncio.sleep(0.01)
+        raise redis.exceptions.ConnectionError("No connection available.")
+
+    monkeypatch.setattr(aioredis.BlockingConnectionPool, "get_connection", no_conn)
+    pool = AsyncTimedBlockingConnectionPool("t-async", max_connections=1, timeout=0.01)
+
+    async def run():
+        try:
+            await pool.get_connection()
+        except redis.exceptions.ConnectionError:
+            return True
+
+    assert asyncio.run(run()) is True
+    assert pool.stats.acquisitions == 1
+    assert pool.stats.wait_seconds_total >= 0.01
+
+
+def test_metrics_expose_pool_gauges():
+    body = TestClient(create_app()).get("/metrics").text
+    assert 'redis_pool_utilization_ratio{pool="async"}' in body
+    assert 'redis_pool_max_connections{pool="sync"}' in body
+    assert 'redis_pool_wait_seconds_total{pool="async"}' in body
@@ -0,0 +1,119 @@
+import asyncio
+
+import pytest
+
+from app.core.retrieval import RetrievalPlan
+
+
+async def _collect(plan):
+    return [result async for result in plan.run()]
+
+
+def _after(delay, value, log=None):
+    async def fetch(*args):
+        if log is not None:
+            log.append(("start", value))
+        await asyncio.sleep(delay)
+        if isinstance(value, Exception):
+            raise value
+        return value
+
+    return fetch
+
+
+def test_stages_run_concurrently_and_yield_in_completion_order():
+    plan = RetrievalPlan()
+    plan.add("slow", _after(0.05, "s"), timeout=1)
+    plan.add("fast", _after(0.01, "f"), timeout=1)
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        results = await _collect(plan)
+        return results, loop.time() - started
+
+    results, elapsed = asyncio.run(run())
+    assert [r.name for r in results] == ["fast", "slow"]
+    assert elapsed < 0.06
+    assert plan.value("slow") == "s"
+
+
+def test_dependent_stage_starts_with_its_parent_value():
+    seen = []
+
+    async def child(parent):
+        seen.append(parent)
+        return parent + 1
+
+    plan = RetrievalPlan()
+    plan.add("parent", _after(0, 1), timeout=1)
+    plan.add("child", child, after="parent", timeout=1)
+    asyncio.run(_collect(plan))
+    assert seen == [1]
+    assert plan.value("child") == 2
+
+
+def test_unknown_dependency_is_rejected():
+    with pytest.raises(ValueError):
+        RetrievalPlan().add("child", _after(0, 1), after="nope", timeout=1)
+
+
+def test_failures_and_timeouts_give_partial_results():
+    plan = RetrievalPlan()
+    plan.add("main", _after(0, "m"), timeout=1)
+    plan.add("broken", _after(0, RuntimeError("boom")), timeout=1)
+    plan.add("late", _after(1, "l"), timeout=0.02)
+    plan.add("skipped", _after(0, "x"), after="broken", timeout=1)
+
+    results = {r.name: r for r in asyncio.run(_collect(plan))}
+    assert results["main"].ok
+    assert isinstance(results["broken"].error, RuntimeError)
+    assert results["late"].timed_out
+    assert "skipped" not in results
+    assert plan.missing() == ["broken", "late", "skipped"]
+    assert plan.value("late", "default") == "default"
+
+
+def test_required_failure_aborts_and_cancels_the_rest():
+    cancelled = []
+
+    async def slow():
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    plan = RetrievalPlan()
+    plan.add("required", _after(0, PermissionError("401")), timeout=1, required=True)
+    plan.add("other", slow, timeout=1)
+
+    async def run():
+        with pytest.raises(PermissionError):
+            await _collect(plan)
+        await asyncio.sleep(0)
+
+    asyncio.run(run())
+    assert cancelled == [True]
+
+
+def test_concurrency_is_bounded():
+    running = []
+    peak = []
+
+    def fetch(name):
+        async def run():
+            running.append(name)
+            peak.append(len(running))
+            await asyncio.sleep(0.01)
+            running.remove(name)
+            return name
+
+        return run
+
+    plan = RetrievalPlan(concurrency=2)
+    for name in "abcde":
+        plan.add(name, fetch(name), timeout=1)
+    asyncio.run(_collect(plan))
+    assert max(peak) == 2
+    assert len(plan.results) == 5
@@ -0,0 +1,152 @@
+import asyncio
+import json
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core import codec, config
+from app.core import redis as core_redis
+from app.main import create_app
+
+
+SESSION = {
+    "created_at": 1.0,
+    "access_token": "tok-a",
+    "active_cloud_id": "a",
+    "cloud_ids": ["a", "b"],
+    "tokens_by_cloud": {
+        "a": {"access_token": "tok-a", "site_url": "https://a"},
+        "b": {"access_token": "tok-b", "site_url": "https://b"},
+    },
+}
+
+
+@pytest.fixture
+def fake(fake_redis, monkeypatch):
+    monkeypatch.setattr(core_redis, "async_redis_client", fake_redis)
+    core_redis._breaker.reset()
+    core_redis._local_writes.clear()
+    core_redis._local_deletes.clear()
+    monkeypatch.setattr(config.settings, "session_layout", "hash")
+    monkeypatch.setattr(config.settings, "session_max_age_seconds", 100)
+    monkeypatch.setattr(config.settings, "session_ttl_refresh_ratio", 0.5)
+    return fake_redis
+
+
+def test_hash_round_trip_flattens_tokens(fake):
+    asyncio.run(core_redis.set_session("sid", SESSION))
+    stored = fake.hashes["session:h:sid"]
+    assert "tokens_by_cloud:a" in stored and "tokens_by_cloud" not in stored
+    assert codec.decode(stored["active_cloud_id"]) == "a"
+    assert asyncio.run(core_redis.get_session("sid")) == SESSION
+
+
+def test_get_session_fields_reads_single_token(fake):
+    asyncio.run(core_redis.set_session("sid", SESSION))
+    fake.log.clear()
+    out = asyncio.run(
+        core_redis.get_session_fields("sid", ["active_cloud_id", "tokens_by_cloud:b"])
+    )
+    assert out == {
+        "active_cloud_id": "a",
+        "tokens_by_cloud": {"b": {"access_token": "tok-b", "site_url": "https://b"}},
+    }
+    assert fake.log == ["hmget", "ttl"]
+    assert asyncio.run(core_redis.get_session_fields("nope", ["active_cloud_id"])) is None
+
+
+def test_update_session_fields_partial_and_replace(fake):
+    asyncio.run(core_redis.set_session("sid", SESSION))
+    fake.log.clear()
+    asyncio.run(core_redis.update_session_fields("sid", {"active_cloud_id": "b"}))
+    assert fake.log == ["hset", "expire"]
+
+    # partially loaded map: other entries are left alone
+    asyncio.run(
+        core_redis.update_session_fields(
+            "sid", {"tokens_by_cloud": {"b": {"access_token": "new"}}}, partial=["tokens_by_cloud"]
+        )
+    )
+    data = asyncio.run(core_redis.get_session("sid"))
+    assert data["active_cloud_id"] == "b"
+    assert set(data["tokens_by_cloud"]) == {"a", "b"}
+
+    # full replacement drops stale entries, removed keys are deleted
+    asyncio.run(
+        core_redis.update_session_fields(
+            "sid", {"tokens_by_cloud": {"c": {"access_token": "c"}}}, ["access_token"]
+        )
+    )
+    data = asyncio.run(core_redis.get_session("sid"))
+    assert data["tokens_by_cloud"] == {"c": {"access_token": "c"}}
+    assert "access_token" not in data
+
+
+def test_blob_session_is_migrated_on_first_read(fake):
+    fake.strings["session:sid"] = json.dumps(SESSION)
+    assert asyncio.run(core_redis.get_session("sid")) == SESSION
+    assert "session:sid" not in fake.strings
+    assert fake.ttls["session:h:sid"] == 100
+    assert asyncio.run(core_redis.get_session("sid")) == SESSION
+
+
+def test_local_fallback_keeps_blob_format(fake, monkeypatch):
+    core_redis._local_store.clear()
+    monkeypatch.setattr(core_redis._breaker, "cooldown_seconds", 3600)
+    core_redis._breaker.record_failure()
+    asyncio.run(core_redis.set_session("sid", SESSION))
+    asyncio.run(core_redis.update_session_fields("sid", {"active_cloud_id": "b"}))
+    out = asyncio.run(core_redis.get_session_fields("sid", ["active_cloud_id"]))
+    assert out == {"active_cloud_id": "b"}
+    core_redis._local_store.clear()
+    core_redis._local_writes.clear()
+    core_redis._breaker.reset()
+
+
+def test_outage_fields_are_merged_into_the_stored_hash(fake, monkeypatch):
+    core_redis._local_store.clear()
+    asyncio.run(core_redis.set_session("sid", SESSION))
+    monkeypatch.setattr(core_redis._breaker, "cooldown_seconds", 0)
+    core_redis._breaker.record_failure()
+    # the local copy only holds what was written during the outage
+    asyncio.run(core_redis.update_session_fields("sid", {"active_cloud_id": "b"}))
+
+    assert asyncio.run(core_redis._ensure_async_redis_available()) is True
+    assert asyncio.run(core_redis.get_session("sid")) == {
+        **SESSION,
+        "active_cloud_id": "b",
+    }
+    assert not core_redis._local_writes and len(core_redis._local_store) == 0
+
+
+def test_select_route_writes_only_the_changed_field(fake):
+    asyncio.run(core_redis.set_session("sid", SESSION))
+    fake.log.clear()
+    client = TestClient(create_app())
+    with patch("app.auth.session_store.get_sid", lambda request: "sid"):
+        r = client.post("/jira/select", params={"cloud_id": "b"})
+    assert r.status_code == 200
+    assert fake.log == ["hmget", "ttl", "hset", "expire"]
+    assert codec.decode(fake.hashes["session:h:sid"]["active_cloud_id"]) == "b"
+
+
+def test_issue_route_loads_only_the_selected_token(fake):
+    asyncio.run(core_redis.set_session("sid", SESSION))
+    captured = {}
+
+    class FakeJira:
+        def __init__(self, access_token, cloud_id):
+            captured["token"] = access_token
+
+        async def get_issue(self, key, **kwargs):
+            return {"key": key, "fields": {}}
+
+    client = TestClient(create_app())
+    with patch("app.auth.session_store.get_sid", lambda request: "sid"), patch(
+        "app.routes.jira.JiraClient", FakeJira
+    ):
+        r = client.get("/jira/issue", params={"issue_key": "K-1", "cloud_id": "b"})
+    assert r.status_code == 200
+    assert captured["token"] == "tok-b"
+    assert fake.log.count("hmget") == 2 and "hgetall" not in fake.log
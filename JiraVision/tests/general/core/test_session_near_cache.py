@@ -0,0 +1,138 @@
+import asyncio
+import json
+import types
+
+import pytest
+
+from app.core import config
+from app.core import redis as core_redis
+from app.core import session_cache
+from app.core.session_cache import NearCache, sid_from_key
+
+
+def _cache():
+    return NearCache("t-near", max_entries=10, max_bytes=10_000, ttl_seconds=30)
+
+
+def test_serves_only_while_enabled():
+    cache = _cache()
+    cache.begin("s")
+    cache.end("s", {"a": 1})
+    assert cache.get("s") is None  # disabled: nothing stored
+
+    cache.enable()
+    cache.begin("s")
+    cache.end("s", {"a": 1})
+    first = cache.get("s")
+    assert first == {"a": 1}
+    first["a"] = 2  # callers get their own copy
+    assert cache.get("s") == {"a": 1}
+
+    cache.disable()
+    assert cache.get("s") is None
+
+
+def test_read_racing_with_invalidation_is_not_cached():
+    cache = _cache()
+    cache.enable()
+    cache.begin("s")
+    cache.invalidate("s")
+    cache.end("s", {"old": True})
+    assert cache.get("s") is None
+
+    cache.begin("s")
+    cache.end("s", {"new": True})
+    assert cache.get("s") == {"new": True}
+
+
+def test_invalidation_messages():
+    assert sid_from_key("session:abc") == "abc"
+    assert sid_from_key("session:h:abc") == "abc"
+    assert sid_from_key("po_user:x") is None
+
+    cache = _cache()
+    cache.enable()
+    for sid in ("a", "b"):
+        cache.begin(sid)
+        cache.end(sid, {"sid": sid})
+    session_cache._handle_invalidate(
+        cache, ["message", "__redis__:invalidate", ["session:a"]]
+    )
+    assert cache.get("a") is None and cache.get("b") == {"sid": "b"}
+    session_cache._handle_invalidate(cache, ["message", "__redis__:invalidate", None])
+    assert cache.get("b") is None and cache.enabled
+
+
+@pytest.fixture
+def redis_reads(monkeypatch):
+    reads = []
+
+    class Pipe:
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc):
+            return False
+
+        def get(self, k):
+            reads.append(k)
+
+        def ttl(self, k):
+            pass
+
+        async def execute(self):
+            return [json.dumps({"user": "bob"}), 28_000]
+
+    async def fake_set(k, v, ex=None):
+        return True
+
+    core_redis._breaker.reset()
+    core_redis._local_writes.clear()
+    core_redis._local_deletes.clear()
+    monkeypatch.setattr(config.settings, "session_layout", "blob")
+    monkeypatch.setattr(config.settings, "session_ttl_refresh_ratio", 0.5)
+    monkeypatch.setattr(config.settings, "session_max_age_seconds", 28_800)
+    monkeypatch.setattr(
+        core_redis,
+        "async_redis_client",
+        types.SimpleNamespace(pipeline=lambda transaction=True: Pipe(), set=fake_set),
+    )
+    core_redis.near_cache.enable()
+    yield reads
+    core_redis.near_cache.disable()
+
+
+def test_get_session_is_served_from_near_cache(redis_reads):
+    assert asyncio.run(core_redis.get_session("sid")) == {"user": "bob"}
+    assert asyncio.run(core_redis.get_session("sid")) == {"user": "bob"}
+    assert redis_reads == ["session:sid"]
+
+    # own writes invalidate immediately
+    asyncio.run(core_redis.set_session("sid", {"user": "alice"}))
+    asyncio.run(core_redis.get_session("sid"))
+    assert redis_reads == ["session:sid", "session:sid"]
+
+
+def test_listener_disables_cache_while_disconnected(monkeypatch):
+    cache = _cache()
+    cache.enable()
+    calls = []
+
+    async def broken(c, host, port):
+        calls.append(host)
+        raise ConnectionError("down")
+
+    async def stop(_delay):
+        raise asyncio.CancelledError
+
+    monkeypatch.setattr(session_cache, "_listen_tracking", broken)
+    monkeypatch.setattr(session_cache.asyncio, "sleep", stop)
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(session_cache.run_invalidation_listener(cache, "tracking", "h", 1))
+    assert calls == ["h"]
+    assert cache.enabled is False
+
+
+def test_near_cache_off_by_default():
+    assert config.settings.session_near_cache == "off"
+    assert core_redis.start_near_cache() is None
@@ -0,0 +1,235 @@
+import asyncio
+import copy
+
+import httpx
+import pytest
+
+from app.clients.jira import JiraClient
+from app.core import config, rate_limit, single_flight
+from app.core import redis as core_redis
+
+
+@pytest.fixture
+def fake(fake_redis, monkeypatch):
+    monkeypatch.setattr(rate_limit, "async_redis_client", fake_redis)
+    monkeypatch.setattr(single_flight, "async_redis_client", fake_redis)
+    monkeypatch.setattr(single_flight, "pubsub_client", fake_redis)
+    monkeypatch.setattr(single_flight, "_subscriber", single_flight._Subscriber())
+    monkeypatch.setattr(single_flight, "_registry", {})
+    monkeypatch.setattr(single_flight, "jira", single_flight.SingleFlight("jira"))
+    monkeypatch.setattr(config.settings, "jira_cache_enabled", False)
+    monkeypatch.setattr(config.settings, "jira_single_flight", "local")
+    core_redis._breaker.reset()
+    return fake_redis
+
+
+def _handler(calls, release=None, status=200):
+    async def handler(request):
+        calls.append(request)
+        if release is not None:
+            await release.wait()
+        return httpx.Response(status, json={"key": "K-1"})
+
+    return handler
+
+
+def _jira(handler, token="tok"):
+    transport = httpx.MockTransport(handler)
+    return JiraClient(token, "c1", client=httpx.AsyncClient(transport=transport))
+
+
+def test_identical_concurrent_reads_share_one_request(fake):
+    calls = []
+
+    async def run():
+        release = asyncio.Event()
+        jc = _jira(_handler(calls, release))
+        tasks = [asyncio.create_task(jc.get_issue("K-1")) for _ in range(5)]
+        await asyncio.sleep(0.01)
+        release.set()
+        return await asyncio.gather(*tasks)
+
+    results = asyncio.run(run())
+    assert len(calls) == 1
+    assert results == [{"key": "K-1"}] * 5
+    results[0]["key"] = "changed"  # every caller parses its own copy
+    assert results[1] == {"key": "K-1"}
+    assert (single_flight.jira.leaders, single_flight.jira.collapsed_local) == (1, 4)
+
+
+def test_different_tokens_or_params_are_not_collapsed(fake):
+    calls = []
+
+    async def run():
+        release = asyncio.Event()
+        handler = _handler(calls, release)
+        tasks = [
+            asyncio.create_task(_jira(handler, "a").get_issue("K-1")),
+            asyncio.create_task(_jira(handler, "b").get_issue("K-1")),
+            asyncio.create_task(_jira(handler, "a").get_issue("K-1", expand="x")),
+        ]
+        await asyncio.sleep(0.01)
+        release.set()
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+    assert len(calls) == 3
+    assert single_flight.jira.collapsed_local == 0
+
+
+def test_writes_and_off_mode_are_never_collapsed(fake, monkeypatch):
+    calls = []
+
+    async def run():
+        jc = _jira(_handler(calls))
+        await asyncio.gather(
+            jc._request("POST", "/issue", json_body={"a": 1}),
+            jc._request("POST", "/issue", json_body={"a": 1}),
+        )
+        monkeypatch.setattr(config.settings, "jira_single_flight", "off")
+        await asyncio.gather(jc.get_issue("K-1"), jc.get_issue("K-1"))
+
+    asyncio.run(run())
+    assert len(calls) == 4
+    assert single_flight.jira.leaders == 0
+
+
+def test_errors_reach_every_caller_and_are_not_kept(fake):
+    calls = []
+
+    async def run():
+        release = asyncio.Event()
+        jc = _jira(_handler(calls, release, status=500))
+        tasks = [asyncio.create_task(jc.get_issue("K-1")) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        release.set()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        assert all(isinstance(r, httpx.HTTPStatusError) for r in results)
+        with pytest.raises(httpx.HTTPStatusError):
+            await jc.get_issue("K-1")
+
+    asyncio.run(run())
+    assert len(calls) == 2
+
+
+def test_cancelled_caller_does_not_cancel_the_shared_request(fake):
+    calls = []
+
+    async def run():
+        release = asyncio.Event()
+        jc = _jira(_handler(calls, release))
+        first = asyncio.create_task(jc.get_issue("K-1"))
+        second = asyncio.create_task(jc.get_issue("K-1"))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        release.set()
+        return await second
+
+    assert asyncio.run(run()) == {"key": "K-1"}
+    assert len(calls) == 1
+
+
+def test_redis_follower_gets_the_response_of_another_worker(fake, monkeypatch):
+    monkeypatch.setattr(config.settings, "jira_single_flight", "redis")
+    calls = []
+    worker_b = single_flight.SingleFlight("worker-b")
+
+    async def run():
+        release = asyncio.Event()
+        jc = _jira(_handler(calls, release))
+        key = single_flight.request_key("c1", "tok", "GET", "/issue/K-1", {}, {}, {})
+
+        async def fetch():
+            return await jc._fetch("GET", "/issue/K-1")
+
+        leader = asyncio.create_task(single_flight.jira.do(key, fetch))
+        await asyncio.sleep(0.01)
+        follower = asyncio.create_task(worker_b.do(key, fetch))
+        await asyncio.sleep(0.01)
+        release.set()
+        return await leader, await follower
+
+    leader, follower = asyncio.run(run())
+    assert len(calls) == 1
+    assert follower.json() == leader.json() == {"key": "K-1"}
+    assert follower.status_code == 200
+    assert worker_b.collapsed_remote == 1
+
+
+def test_followers_share_one_pubsub_connection(fake, monkeypatch):
+    monkeypatch.setattr(config.settings, "jira_single_flight", "redis")
+
+    def exhausted():  # fewer free connections than followers
+        raise ConnectionError("pool exhausted")
+
+    session_pool = copy.copy(fake)  # same data, no pub/sub connection to spare
+    session_pool.pubsub = exhausted
+    monkeypatch.setattr(single_flight, "async_redis_client", session_pool)
+    workers = [single_flight.SingleFlight(f"worker-{n}") for n in range(20)]
+    ok = httpx.Response(200, json={}, request=httpx.Request("GET", "http://x"))
+
+    async def run():
+        release = asyncio.Event()
+
+        async def fetch():
+            await release.wait()
+            return ok
+
+        leaders = [
+            asyncio.create_task(single_flight.jira.do(f"k{n}", fetch))
+            for n in range(2)
+        ]
+        await asyncio.sleep(0.01)
+        followers = [
+            asyncio.create_task(w.do(f"k{n % 2}", fetch))
+            for n, w in enumerate(workers)
+        ]
+        await asyncio.sleep(0.01)
+        release.set()
+        await asyncio.gather(*leaders)
+        return await asyncio.gather(*followers)
+
+    assert all(r.status_code == 200 for r in asyncio.run(run()))
+    assert sum(w.collapsed_remote for w in workers) == 20
+    assert fake.pubsubs == 1
+    assert not fake.channels["single_flight:k0:done"]  # unsubscribed
+
+
+def test_redis_follower_fetches_itself_when_the_leader_fails(fake, monkeypatch):
+    monkeypatch.setattr(config.settings, "jira_single_flight", "redis")
+    worker_b = single_flight.SingleFlight("worker-b")
+    ok = httpx.Response(200, json={}, request=httpx.Request("GET", "http://x"))
+
+    async def run():
+        release = asyncio.Event()
+
+        async def failing():
+            await release.wait()
+            raise httpx.ConnectError("down")
+
+        async def fetch():
+            return ok
+
+        leader = asyncio.create_task(single_flight.jira.do("k", failing))
+        await asyncio.sleep(0.01)
+        follower = asyncio.create_task(worker_b.do("k", fetch))
+        await asyncio.sleep(0.01)
+        release.set()
+        with pytest.raises(httpx.ConnectError):
+            await leader
+        return await follower
+
+    assert asyncio.run(run()) is ok
+    assert (worker_b.leaders, worker_b.collapsed_remote) == (1, 0)
+
+
+def test_response_round_trips_through_redis_payload():
+    request = httpx.Request("GET", "https://example.test/issue/K-1")
+    response = httpx.Response(
+        200, headers={"etag": '"v1"'}, content=b'{"a": 1}', request=request
+    )
+    loaded = single_flight._load(single_flight._dump(response))
+    assert loaded.status_code == 200
+    assert loaded.headers["etag"] == '"v1"'
+    assert loaded.json() == {"a": 1}
+    assert str(loaded.request.url) == str(request.url)
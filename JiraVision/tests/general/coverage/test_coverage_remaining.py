@@ -6,9 +6,11 @@ import pytest
 
 from app.clients.llm import LLMClient
 from app.core.config import Settings
+from app.core import config
 from app.core import redis as core_redis
 from app.main import _env_flag
 from fastapi import HTTPException
+from unittest.mock import AsyncMock, MagicMock
 
 
 def test_llm_openai_chat_text_returns_content(monkeypatch):
@@ -59,34 +61,53 @@ def test_settings_validators_raise_on_invalid():
 
 
 def test_get_session_handles_invalid_json_and_refresh_ttl(monkeypatch):
-    core_redis._redis_available = True
-    core_redis._redis_warned = False
+    core_redis._breaker.reset()
+    core_redis._local_writes.clear()
+    monkeypatch.setattr(config.settings, "session_ttl_refresh_ratio", 0.5)
+
+    def _pipeline(results):
+        pipe = MagicMock()
+        pipe.__aenter__ = AsyncMock(return_value=pipe)
+        pipe.__aexit__ = AsyncMock(return_value=False)
+        pipe.execute = AsyncMock(return_value=results)
+        return lambda transaction=True: pipe
+
     # invalid json -> returns None
     monkeypatch.setattr(
         core_redis,
-        "redis_client",
-        types.SimpleNamespace(get=lambda k: "not-json", expire=lambda *a, **k: None),
+        "async_redis_client",
+        types.SimpleNamespace(
+            pipeline=_pipeline(["not-json", -1]), expire=AsyncMock(return_value=None)
+        ),
     )
-    assert core_redis.get_session("s") is None
+    assert asyncio.run(core_redis.get_session("s")) is None
 
-    # valid json -> returns dict and calls expire
+    # valid json, key without TTL -> returns dict and calls expire
     called = {}
 
-    def fake_get(k):
-        return json.dumps({"a": 1})
-
-    def fake_expire(k, ttl):
+    async def fake_expire(k, ttl):
         called["args"] = (k, ttl)
 
     monkeypatch.setattr(
         core_redis,
-        "redis_client",
-        types.SimpleNamespace(get=fake_get, expire=fake_expire),
+        "async_redis_client",
+        types.SimpleNamespace(pipeline=_pipeline([json.dumps({"a": 1}), -1]), expire=fake_expire),
     )
-    res = core_redis.get_session("s1")
+    res = asyncio.run(core_redis.get_session("s1"))
     assert res == {"a": 1}
     assert called["args"][0].endswith("s1")
 
+    # expire failing is ignored
+    monkeypatch.setattr(
+        core_redis,
+        "async_redis_client",
+        types.SimpleNamespace(
+            pipeline=_pipeline([json.dumps({"a": 1}), -1]),
+            expire=AsyncMock(side_effect=RuntimeError("down")),
+        ),
+    )
+    assert asyncio.run(core_redis.get_session("s2")) == {"a": 1}
+
 
 def test_env_flag_default_and_true(monkeypatch):
     # when env var absent -> default is returned
@@ -101,19 +122,9 @@ def test_env_flag_default_and_true(monkeypatch):
     assert _env_flag("SOME_TEST_VAR") is True
 
 
-def test_jira_helpers_ensure_sid_and_client_from_session(monkeypatch):
+def test_jira_helper_client_from_session(monkeypatch):
     from app.routes import jira as jira_mod
 
-    # ensure_sid simply forwards
-    class Req:
-        pass
-
-    class Resp:
-        pass
-
-    monkeypatch.setattr(jira_mod, "ensure_session", lambda req, resp: "sidv")
-    assert jira_mod._ensure_sid(Req(), Resp()) == "sidv"
-
     # _jira_client_from_session raises when no entry for cloud
     session = {
         "tokens_by_cloud": {},
@@ -0,0 +1,113 @@
+import asyncio
+
+import httpx
+
+from app.clients.jira import JiraClient
+from app.core import jira_fields
+
+
+def _issues(start, n):
+    return [{"key": f"K-{i}"} for i in range(start, start + n)]
+
+
+async def _collect(it):
+    return [issue["key"] async for issue in it]
+
+
+def test_iter_search_follows_next_page_token(monkeypatch):
+    jc = JiraClient("t", "cid")
+    pages = {
+        None: {"issues": _issues(0, 2), "nextPageToken": "p2"},
+        "p2": {"issues": _issues(2, 2), "nextPageToken": "p3"},
+        "p3": {"issues": _issues(4, 1), "isLast": True},
+    }
+    calls = []
+
+    async def fake_search(self, jql, max_results=20, next_page_token=None):
+        calls.append(next_page_token)
+        return pages[next_page_token]
+
+    monkeypatch.setattr(JiraClient, "search_jql", fake_search)
+    keys = asyncio.run(_collect(jc.iter_search("x", page_size=2)))
+    assert keys == [f"K-{i}" for i in range(5)]
+    assert calls == [None, "p2", "p3"]
+
+
+def test_iter_search_prefetches_next_page(monkeypatch):
+    jc = JiraClient("t", "cid")
+    calls = []
+
+    async def fake_search(self, jql, max_results=20, next_page_token=None):
+        calls.append(next_page_token)
+        if next_page_token is None:
+            return {"issues": _issues(0, 2), "nextPageToken": "p2"}
+        return {"issues": _issues(2, 1)}
+
+    monkeypatch.setattr(JiraClient, "search_jql", fake_search)
+
+    async def run():
+        it = jc.iter_search("x", page_size=2)
+        await it.__anext__()
+        await asyncio.sleep(0)
+        # page 2 requested while page 1 is still being consumed
+        assert calls == [None, "p2"]
+        return [issue["key"] async for issue in it]
+
+    assert asyncio.run(run()) == ["K-1", "K-2"]
+
+
+def test_iter_search_legacy_start_at_and_limit(monkeypatch):
+    jc = JiraClient("t", "cid")
+    bodies = []
+
+    async def fake_request(self, method, path, params=None, json_body=None):
+        if path == "/search/jql":
+            req = httpx.Request("POST", "http://test")
+            resp = httpx.Response(404, request=req)
+            raise httpx.HTTPStatusError("err", request=req, response=resp)
+        bodies.append(json_body)
+        start = json_body.get("startAt", 0)
+        n = json_body["maxResults"]
+        return {"issues": _issues(start, n), "startAt": start, "total": 100}
+
+    monkeypatch.setattr(JiraClient, "_request", fake_request)
+    keys = asyncio.run(_collect(jc.iter_search("x", page_size=3, limit=7)))
+    assert keys == [f"K-{i}" for i in range(7)]
+    assert [(b.get("startAt", 0), b["maxResults"]) for b in bodies] == [
+        (0, 3),
+        (3, 3),
+        (6, 1),
+    ]
+    assert all("nextPageToken" not in b for b in bodies)
+
+
+def test_iter_search_stops_at_deadline(monkeypatch):
+    jc = JiraClient("t", "cid")
+
+    async def fake_search(self, jql, max_results=20, next_page_token=None):
+        if next_page_token is None:
+            return {"issues": _issues(0, 1), "nextPageToken": "slow"}
+        await asyncio.sleep(1)
+        return {"issues": _issues(1, 1)}
+
+    monkeypatch.setattr(JiraClient, "search_jql", fake_search)
+    keys = asyncio.run(_collect(jc.iter_search("x", deadline=0.05)))
+    assert keys == ["K-0"]
+
+
+def test_get_issues_bulk_chunks_keys(monkeypatch):
+    jc = JiraClient("t", "cid")
+    calls = []
+
+    async def fake_search(self, jql, max_results=20, next_page_token=None, profile=None):
+        calls.append((jql, max_results, profile))
+        keys = jql[len("key in (") : -1].split(", ")
+        return {"issues": [{"key": k, "fields": {}} for k in keys if k != "P-7"]}
+
+    monkeypatch.setattr(JiraClient, "search_jql", fake_search)
+    keys = [f"P-{i}" for i in range(60)] + ["P-1", "bad key) OR 1=1"]
+    out = asyncio.run(jc.get_issues_bulk(keys))
+    assert len(out) == 59 and "P-7" not in out
+    assert [c[1] for c in calls] == [50, 10]
+    assert calls[0][2] is jira_fields.LINKED_ISSUE
+    assert all("OR" not in c[0] for c in calls)
@@ -0,0 +1,186 @@
+import asyncio
+import os
+import sys
+
+import httpx
+import pytest
+
+from app.clients.jira import JiraClient
+from app.core import config, rate_limit
+from app.core import redis as core_redis
+
+SCRIPTS = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "..", "..", "..", "scripts")
+)
+sys.path.insert(0, SCRIPTS)
+
+from fake_atlassian import FakeConfig, Latency, create_app, search  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def no_redis(fake_redis, monkeypatch):
+    # rate limiter: the shared budget is always available
+    monkeypatch.setattr(rate_limit, "async_redis_client", fake_redis)
+    monkeypatch.setattr(rate_limit, "stats", rate_limit.RateLimitStats())
+    monkeypatch.setattr(config.settings, "jira_cache_enabled", False)
+    monkeypatch.setattr(config.settings, "jira_single_flight", "off")
+    monkeypatch.setattr(config.settings, "jira_retry_base_seconds", 0.001)
+    core_redis._breaker.reset()
+
+
+def _fake(**kwargs):
+    kwargs.setdefault("projects", 2)
+    kwargs.setdefault("issues_per_project", 30)
+    return create_app(FakeConfig(**kwargs))
+
+
+def _http(fake):
+    transport = httpx.ASGITransport(app=fake)
+    return httpx.AsyncClient(transport=transport, base_url="http://fake")
+
+
+def _jira(fake):
+    return JiraClient("tok", fake.state.data.cloud_id, client=_http(fake))
+
+
+def test_data_is_seeded():
+    a, b = _fake(seed=3).state.data, _fake(seed=3).state.data
+    assert a.issues == b.issues
+    assert len(a.issues) == 60
+    assert _fake(seed=4).state.data.issues != a.issues
+
+
+def test_issue_comments_and_field_projection():
+    fake = _fake()
+
+    async def run():
+        jira = _jira(fake)
+        issue = await jira.get_issue("P0-1", profile=None)
+        card = await jira._request(
+            "GET", "/issue/P0-1", params={"fields": "summary,status"}
+        )
+        comments = await jira.get_issue_comments("P0-1")
+        with pytest.raises(httpx.HTTPStatusError):
+            await jira.get_issue("NOPE-1")
+        return issue, card, comments
+
+    issue, card, comments = asyncio.run(run())
+    assert "description" in issue["fields"]
+    assert set(card["fields"]) == {"summary", "status"}
+    assert comments["total"] == len(fake.state.data.comments["P0-1"])
+
+
+def test_issue_etag_revalidation():
+    fake = _fake()
+
+    async def run():
+        http = _http(fake)
+        url = f"/ex/jira/{fake.state.data.cloud_id}/rest/api/3/issue/P0-2"
+        auth = {"Authorization": "Bearer tok"}
+        first = await http.get(url, headers=auth)
+        again = await http.get(
+            url, headers={**auth, "If-None-Match": first.headers["etag"]}
+        )
+        return again.status_code
+
+    assert asyncio.run(run()) == 304
+
+
+def test_search_pages_match_jql_on_both_endpoints():
+    fake = _fake()
+    data = fake.state.data
+    jql = 'project = P1 AND status NOT IN ("Done") ORDER BY created DESC'
+    expected = [i["key"] for i in search(data, jql, "user-0")]
+    assert expected and all(k.startswith("P1-") for k in expected)
+
+    async def run():
+        jira = _jira(fake)
+        keys = [i["key"] async for i in jira.iter_search(jql, page_size=7)]
+        jira._legacy_search = True
+        legacy = [i["key"] async for i in jira.iter_search(jql, page_size=7)]
+        return keys, legacy
+
+    keys, legacy = asyncio.run(run())
+    assert keys == legacy == expected
+
+
+def test_current_user_clause():
+    data = _fake().state.data
+    mine = search(data, "reporter = currentUser()", "user-2")
+    assert mine
+    assert {i["fields"]["reporter"]["accountId"] for i in mine} == {"user-2"}
+
+
+def test_injected_429_is_retried_by_the_client():
+    fake = _fake(throttle=1.0, retry_after=0.001)
+
+    async def run():
+        jira = _jira(fake)
+        with pytest.raises(httpx.HTTPStatusError):
+            await jira.get_issue("P0-1")
+        stats = await _http(fake).get("/__stats")
+        return stats.json()
+
+    stats = asyncio.run(run())
+    assert stats["throttled"]["issue"] == config.settings.jira_max_retries + 1
+    assert rate_limit.stats.retries == config.settings.jira_max_retries
+
+
+def test_rate_limit_throttles_past_the_budget():
+    fake = _fake(rate_limit=2)
+
+    async def run():
+        http = _http(fake)
+        url = f"/ex/jira/{fake.state.data.cloud_id}/rest/api/3/myself"
+        auth = {"Authorization": "Bearer tok"}
+        return [(await http.get(url, headers=auth)).status_code for _ in range(4)]
+
+    codes = asyncio.run(run())
+    assert codes.count(429) >= 1
+    assert codes[0] == 200
+
+
+def test_oauth_flow_issues_usable_tokens():
+    fake = _fake()
+
+    async def run():
+        http = _http(fake)
+        redirect = await http.get(
+            "/authorize", params={"redirect_uri": "http://app/cb", "state": "s"}
+        )
+        code = httpx.URL(redirect.headers["location"]).params["code"]
+        token = (
+            await http.post(
+                "/oauth/token",
+                json={"grant_type": "authorization_code", "code": code},
+            )
+        ).json()
+        auth = {"Authorization": f"Bearer {token['access_token']}"}
+        resources = await http.get("/oauth/token/accessible-resources", headers=auth)
+        refresh = {
+            "grant_type": "refresh_token",
+            "refresh_token": token["refresh_token"],
+        }
+        refreshed = await http.post("/oauth/token", json=refresh)
+        reused = await http.post("/oauth/token", json=refresh)
+        unauthenticated = await http.get("/oauth/token/accessible-resources")
+        return resources, refreshed, reused, unauthenticated
+
+    resources, refreshed, reused, unauthenticated = asyncio.run(run())
+    assert resources.json()[0]["id"] == fake.state.data.cloud_id
+    assert refreshed.status_code == 200
+    assert reused.status_code == 403  # refresh tokens rotate
+    assert unauthenticated.status_code == 401
+
+
+def test_latency_specs():
+    import random
+
+    rng = random.Random(0)
+    assert Latency("fixed:20").sample(rng) == 0.02
+    assert 0.01 <= Latency("uniform:10,30").sample(rng) <= 0.03
+    assert Latency("lognormal:50,0.5").sample(rng) > 0
+    assert Latency().sample(rng) == 0
+    for bad in ("fixed", "gauss:1,2", "uniform:1"):
+        with pytest.raises(ValueError):
+            Latency(bad)
@@ -0,0 +1,90 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from fastapi import HTTPException
+
+from app.clients.llm import LLMClient
+from app.core.config import settings
+
+
+def _client(monkeypatch, provider, handler):
+    monkeypatch.setattr(settings, "llm_provider", provider)
+    monkeypatch.setattr(settings, "llm_base_url", "http://ollama")
+    monkeypatch.setattr(settings, "openai_api_key", "k")
+    monkeypatch.setattr(settings, "llm_timeout", 5)
+    c = LLMClient()
+    c._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return c
+
+
+async def _collect(c):
+    return [chunk async for chunk in c.chat_stream(system="s", user="u")]
+
+
+def test_ollama_stream_yields_message_chunks(monkeypatch):
+    sent = {}
+
+    def handler(request):
+        sent.update(json.loads(request.content))
+        lines = [
+            {"message": {"content": "Bon"}, "done": False},
+            {"message": {"content": "jour"}, "done": False},
+            {"message": {"content": ""}, "done": True},
+        ]
+        body = "\n".join(json.dumps(line) for line in lines)
+        return httpx.Response(200, content=body.encode())
+
+    c = _client(monkeypatch, "ollama", handler)
+    assert asyncio.run(_collect(c)) == ["Bon", "jour"]
+    assert sent["stream"] is True
+
+
+def test_openai_stream_reads_sse_until_done(monkeypatch):
+    sent = {}
+
+    def handler(request):
+        sent.update(json.loads(request.content))
+        events = [
+            {"choices": [{"delta": {"role": "assistant"}}]},
+            {"choices": [{"delta": {"content": "Hel"}}]},
+            {"choices": [{"delta": {"content": "lo"}}]},
+        ]
+        body = "".join(f"data: {json.dumps(e)}\n\n" for e in events)
+        body += "data: [DONE]\n\n"
+        return httpx.Response(200, content=body.encode())
+
+    c = _client(monkeypatch, "openai", handler)
+    assert asyncio.run(_collect(c)) == ["Hel", "lo"]
+    assert sent["stream"] is True
+
+
+@pytest.mark.parametrize(
+    "response, detail",
+    [
+        (httpx.Response(500, content=b"boom"), "LLM error (HTTP)"),
+        (httpx.Response(200, content=b'{"error": "oom"}\n'), "LLM error (stream)"),
+        (
+            httpx.Response(200, content=b'{"done": true}\n'),
+            "LLM returned empty response",
+        ),
+    ],
+)
+def test_ollama_stream_errors(monkeypatch, response, detail):
+    c = _client(monkeypatch, "ollama", lambda request: response)
+    with pytest.raises(HTTPException) as ei:
+        asyncio.run(_collect(c))
+    assert ei.value.status_code == 502
+    assert ei.value.detail == detail
+
+
+def test_stream_unreachable(monkeypatch):
+    def handler(request):
+        raise httpx.ConnectError("down", request=request)
+
+    c = _client(monkeypatch, "ollama", handler)
+    with pytest.raises(HTTPException) as ei:
+        asyncio.run(_collect(c))
+    assert ei.value.detail == "LLM unreachable"
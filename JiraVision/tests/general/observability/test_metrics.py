@@ -16,3 +16,11 @@ def test_root_redirect():
     client = TestClient(app)
     r = client.get("/", follow_redirects=False)
     assert r.status_code in (302, 307)
+
+
+def test_metrics_report_redis_commands_per_request():
+    app = create_app()
+    client = TestClient(app)
+    client.get("/", follow_redirects=False)
+    r = client.get("/metrics")
+    assert 'redis_commands_per_request_count{method="GET",path="/"} 1.0' in r.text
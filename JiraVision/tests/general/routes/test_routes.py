@@ -3,6 +3,7 @@ import types
 from fastapi.testclient import TestClient
 
 from app.main import create_app
+from unittest.mock import AsyncMock
 
 
 app = create_app()
@@ -29,7 +30,7 @@ class FakeJiraClient:
     async def aclose(self):
         return None
 
-    async def get_issue(self, issue_key: str, *, expand=None):
+    async def get_issue(self, issue_key: str, *, expand=None, profile=None):
         return {
             "key": issue_key,
             "fields": {
@@ -52,7 +53,11 @@ class FakeJiraClient:
         }
 
     async def search_jql(
-        self, jql: str, max_results: int = 20, next_page_token: str | None = None
+        self,
+        jql: str,
+        max_results: int = 20,
+        next_page_token: str | None = None,
+        profile=None,
     ):
         return {
             "issues": [
@@ -79,22 +84,26 @@ class FakeLLM:
     async def chat_text(self, system: str, user: str):
         return "analysis text"
 
+    async def chat_stream(self, system: str, user: str):
+        for chunk in ("analysis ", "text"):
+            yield chunk
+
 
 # ------------------------- Auth routes ---------------------------------
 
 
 def test_login_sets_state_and_cookie(monkeypatch):
     # stub session helpers
-    monkeypatch.setattr("app.routes.auth.ensure_session", lambda req, resp: "sid-login")
+    monkeypatch.setattr("app.auth.session_store.get_sid", lambda request: "sid-login")
 
     captured = {}
 
-    def fake_set_session(sid, sess):
+    async def fake_set_session(sid, sess):
         captured["sid"] = sid
         captured["sess"] = sess
 
-    monkeypatch.setattr("app.routes.auth.set_session", fake_set_session)
-    monkeypatch.setattr("app.routes.auth.get_session", lambda sid: {})
+    monkeypatch.setattr("app.auth.session_store.set_session", fake_set_session)
+    monkeypatch.setattr("app.auth.session_store.get_session", AsyncMock(return_value={}))
 
     r = client.get("/login", follow_redirects=False)
     assert r.status_code in (307, 302)
@@ -108,8 +117,8 @@ def test_login_sets_state_and_cookie(monkeypatch):
 def test_oauth_callback_success(monkeypatch):
     # prepare session with state
     session = {"state": "s123"}
-    monkeypatch.setattr("app.routes.auth.ensure_session", lambda req, resp: "sid-oauth")
-    monkeypatch.setattr("app.routes.auth.get_session", lambda sid: session)
+    monkeypatch.setattr("app.auth.session_store.get_sid", lambda request: "sid-oauth")
+    monkeypatch.setattr("app.auth.session_store.get_session", AsyncMock(return_value=session))
 
     # stub token exchange
     async def fake_post(*a, **k):
@@ -157,10 +166,10 @@ def test_oauth_callback_success(monkeypatch):
 
     captured = {}
 
-    def fake_set_session(sid, sess):
+    async def fake_set_session(sid, sess):
         captured["sess"] = sess
 
-    monkeypatch.setattr("app.routes.auth.set_session", fake_set_session)
+    monkeypatch.setattr("app.auth.session_store.set_session", fake_set_session)
 
     r = client.get("/oauth/callback?code=code&state=s123", follow_redirects=False)
     assert r.status_code in (307, 302)
@@ -174,8 +183,8 @@ def test_oauth_callback_success_without_user_info(monkeypatch):
     """Test OAuth callback succeeds even if user info fetch fails."""
     # prepare session with state
     session = {"state": "s123"}
-    monkeypatch.setattr("app.routes.auth.ensure_session", lambda req, resp: "sid-oauth")
-    monkeypatch.setattr("app.routes.auth.get_session", lambda sid: session)
+    monkeypatch.setattr("app.auth.session_store.get_sid", lambda request: "sid-oauth")
+    monkeypatch.setattr("app.auth.session_store.get_session", AsyncMock(return_value=session))
 
     # stub token exchange
     async def fake_post(*a, **k):
@@ -218,10 +227,10 @@ def test_oauth_callback_success_without_user_info(monkeypatch):
 
     captured = {}
 
-    def fake_set_session(sid, sess):
+    async def fake_set_session(sid, sess):
         captured["sess"] = sess
 
-    monkeypatch.setattr("app.routes.auth.set_session", fake_set_session)
+    monkeypatch.setattr("app.auth.session_store.set_session", fake_set_session)
 
     r = client.get("/oauth/callback?code=code&state=s123", follow_redirects=False)
     assert r.status_code in (307, 302)
@@ -232,8 +241,8 @@ def test_oauth_callback_success_without_user_info(monkeypatch):
 
 
 def test_oauth_callback_bad_state(monkeypatch):
-    monkeypatch.setattr("app.routes.auth.ensure_session", lambda req, resp: "sid")
-    monkeypatch.setattr("app.routes.auth.get_session", lambda sid: {})
+    monkeypatch.setattr("app.auth.session_store.get_sid", lambda request: "sid")
+    monkeypatch.setattr("app.auth.session_store.get_session", AsyncMock(return_value={}))
 
     r = client.get("/oauth/callback?code=code&state=wrong", follow_redirects=False)
     assert r.status_code == 400
@@ -242,8 +251,7 @@ def test_oauth_callback_bad_state(monkeypatch):
 def test_logout_calls_destroy(monkeypatch):
     called = {"ok": False}
     monkeypatch.setattr(
-        "app.routes.auth.destroy_session", lambda req, resp: called.update({"ok": True})
-    )
+        "app.routes.auth.destroy_session", AsyncMock(return_value=called.update({"ok": True})))
 
     r = client.get("/logout", follow_redirects=False)
     assert r.status_code in (307, 302)
@@ -255,20 +263,20 @@ def test_logout_calls_destroy(monkeypatch):
 
 def test_jira_select_and_instances(monkeypatch):
     # session with cloud ids
-    monkeypatch.setattr("app.routes.jira._ensure_sid", lambda req, resp: "sid-js")
+    monkeypatch.setattr("app.auth.session_store.get_sid", lambda request: "sid-js")
     ses = {
         "cloud_ids": ["a", "b"],
         "active_cloud_id": "a",
         "jira_sites": [{"id": "a", "name": "A", "url": "u"}],
     }
-    monkeypatch.setattr("app.routes.jira.get_session", lambda sid: ses)
+    monkeypatch.setattr("app.auth.session_store.get_session", AsyncMock(return_value=ses))
 
     cap = {}
 
-    def fake_set_session(sid, s):
+    async def fake_set_session(sid, s):
         cap["s"] = s
 
-    monkeypatch.setattr("app.routes.jira.set_session", fake_set_session)
+    monkeypatch.setattr("app.auth.session_store.set_session", fake_set_session)
 
     r = client.post("/jira/select", params={"cloud_id": "b"})
     assert r.status_code == 200
@@ -282,13 +290,13 @@ def test_jira_select_and_instances(monkeypatch):
 
 def test_jira_issue_and_search(monkeypatch):
     # session with valid token
-    monkeypatch.setattr("app.routes.jira._ensure_sid", lambda req, resp: "sid-j1")
+    monkeypatch.setattr("app.auth.session_store.get_sid", lambda request: "sid-j1")
     ses = {
         "tokens_by_cloud": {"c1": {"access_token": "t1", "site_url": "u"}},
         "cloud_ids": ["c1"],
         "active_cloud_id": "c1",
     }
-    monkeypatch.setattr("app.routes.jira.get_session", lambda sid: ses)
+    monkeypatch.setattr("app.auth.session_store.get_session", AsyncMock(return_value=ses))
 
     # patch JiraClient to fake
     monkeypatch.setattr("app.routes.jira.JiraClient", FakeJiraClient)
@@ -311,13 +319,13 @@ def test_jira_issue_and_search(monkeypatch):
 
 
 def test_summarize_jql_success(monkeypatch):
-    monkeypatch.setattr("app.routes.ai.ensure_session", lambda req, resp: "sid-ai")
+    monkeypatch.setattr("app.auth.session_store.get_sid", lambda request: "sid-ai")
     ses = {
         "tokens_by_cloud": {"c1": {"access_token": "t1"}},
         "cloud_ids": ["c1"],
         "active_cloud_id": "c1",
     }
-    monkeypatch.setattr("app.routes.ai.get_session", lambda sid: ses)
+    monkeypatch.setattr("app.auth.session_store.get_session", AsyncMock(return_value=ses))
 
     monkeypatch.setattr("app.routes.ai.JiraClient", FakeJiraClient)
     monkeypatch.setattr("app.routes.ai.llm", FakeLLM())
@@ -331,13 +339,13 @@ def test_summarize_jql_success(monkeypatch):
 
 
 def test_analyze_issue_and_stream(monkeypatch):
-    monkeypatch.setattr("app.routes.ai.ensure_session", lambda req, resp: "sid-ai2")
+    monkeypatch.setattr("app.auth.session_store.get_sid", lambda request: "sid-ai2")
     ses = {
         "tokens_by_cloud": {"c1": {"access_token": "t1"}},
         "cloud_ids": ["c1"],
         "active_cloud_id": "c1",
     }
-    monkeypatch.setattr("app.routes.ai.get_session", lambda sid: ses)
+    monkeypatch.setattr("app.auth.session_store.get_session", AsyncMock(return_value=ses))
 
     monkeypatch.setattr("app.routes.ai.JiraClient", FakeJiraClient)
     monkeypatch.setattr("app.routes.ai.llm", FakeLLM())
@@ -359,3 +367,6 @@ def test_analyze_issue_and_stream(monkeypatch):
         )
         assert "event: log" in text
         assert "event: result" in text
+        # the synthesis is streamed before the full result
+        assert text.index("event: delta") < text.index("event: result")
+        assert '"text": "analysis "' in text
@@ -7,6 +7,7 @@ from fastapi import HTTPException
 
 from app.main import create_app
 from app.routes import ai as ai_mod
+from unittest.mock import AsyncMock
 
 app = create_app()
 client = TestClient(app)
@@ -65,11 +66,11 @@ def test__llm_step_error_mapping(monkeypatch):
 
 
 def test_analyze_issue_stream_no_token(monkeypatch):
-    monkeypatch.setattr("app.routes.ai.ensure_session", lambda req, resp: "sid")
+    monkeypatch.setattr("app.auth.session_store.get_sid", lambda request: "sid")
     # provide active_cloud_id but no tokens_by_cloud so entry resolves to None
     monkeypatch.setattr(
-        "app.routes.ai.get_session",
-        lambda sid: {"cloud_ids": ["c1"], "active_cloud_id": "c1"},
+        "app.auth.session_store.get_session",
+        AsyncMock(return_value={"cloud_ids": ["c1"], "active_cloud_id": "c1"})
     )
 
     with client.stream(
@@ -86,14 +87,14 @@ def test_analyze_issue_stream_no_token(monkeypatch):
 
 
 def test_analyze_issue_stream_jira_404(monkeypatch):
-    monkeypatch.setattr("app.routes.ai.ensure_session", lambda req, resp: "sid")
+    monkeypatch.setattr("app.auth.session_store.get_sid", lambda request: "sid")
     monkeypatch.setattr(
-        "app.routes.ai.get_session",
-        lambda sid: {
+        "app.auth.session_store.get_session",
+        AsyncMock(return_value={
             "tokens_by_cloud": {"c1": {"access_token": "t1"}},
             "cloud_ids": ["c1"],
             "active_cloud_id": "c1",
-        },
+        }),
     )
 
     class FakeClient:
@@ -126,14 +127,14 @@ def test_analyze_issue_stream_jira_404(monkeypatch):
 
 
 def test_analyze_issue_stream_llm_error(monkeypatch):
-    monkeypatch.setattr("app.routes.ai.ensure_session", lambda req, resp: "sid")
+    monkeypatch.setattr("app.auth.session_store.get_sid", lambda request: "sid")
     monkeypatch.setattr(
-        "app.routes.ai.get_session",
-        lambda sid: {
+        "app.auth.session_store.get_session",
+        AsyncMock(return_value={
             "tokens_by_cloud": {"c1": {"access_token": "t1"}},
             "cloud_ids": ["c1"],
             "active_cloud_id": "c1",
-        },
+        }),
     )
 
     class FakeClient:
@@ -183,14 +184,14 @@ def test__llm_step_generic_exception(monkeypatch):
 
 
 def test_analyze_issue_client_exception_maps_502(monkeypatch):
-    monkeypatch.setattr("app.routes.ai.ensure_session", lambda req, resp: "sid")
+    monkeypatch.setattr("app.auth.session_store.get_sid", lambda request: "sid")
     monkeypatch.setattr(
-        "app.routes.ai.get_session",
-        lambda sid: {
+        "app.auth.session_store.get_session",
+        AsyncMock(return_value={
             "tokens_by_cloud": {"c1": {"access_token": "t1"}},
             "cloud_ids": ["c1"],
             "active_cloud_id": "c1",
-        },
+        }),
     )
 
     class FakeClient:
@@ -208,14 +209,14 @@ def test_analyze_issue_client_exception_maps_502(monkeypatch):
 
 
 def test_analyze_issue_skips_empty_comments_and_parses_links(monkeypatch):
-    monkeypatch.setattr("app.routes.ai.ensure_session", lambda req, resp: "sid")
+    monkeypatch.setattr("app.auth.session_store.get_sid", lambda request: "sid")
     monkeypatch.setattr(
-        "app.routes.ai.get_session",
-        lambda sid: {
+        "app.auth.session_store.get_session",
+        AsyncMock(return_value={
             "tokens_by_cloud": {"c1": {"access_token": "t1"}},
             "cloud_ids": ["c1"],
             "active_cloud_id": "c1",
-        },
+        }),
     )
 
     class FakeClient:
@@ -267,14 +268,14 @@ def test_analyze_issue_skips_empty_comments_and_parses_links(monkeypatch):
 
 
 def test_analyze_issue_stream_skips_links_without_key(monkeypatch):
-    monkeypatch.setattr("app.routes.ai.ensure_session", lambda req, resp: "sid")
+    monkeypatch.setattr("app.auth.session_store.get_sid", lambda request: "sid")
     monkeypatch.setattr(
-        "app.routes.ai.get_session",
-        lambda sid: {
+        "app.auth.session_store.get_session",
+        AsyncMock(return_value={
             "tokens_by_cloud": {"c1": {"access_token": "t1"}},
             "cloud_ids": ["c1"],
             "active_cloud_id": "c1",
-        },
+        }),
     )
 
     class FakeClient:
@@ -307,6 +308,11 @@ def test_analyze_issue_stream_skips_links_without_key(monkeypatch):
 
     monkeypatch.setattr(ai_mod, "_llm_step", fake_llm_step)
 
+    async def fake_llm_stream_step(client, **k):
+        yield await fake_llm_step(client, **k)
+
+    monkeypatch.setattr(ai_mod, "_llm_stream_step", fake_llm_stream_step)
+
     with client.stream(
         "POST", "/ai/analyze-issue/stream", json={"issue_key": "P-1"}
     ) as resp:
@@ -322,14 +328,14 @@ def test_analyze_issue_stream_skips_links_without_key(monkeypatch):
 
 
 def test_analyze_issue_stream_skips_keyless_links_via_monkeypatch(monkeypatch):
-    monkeypatch.setattr("app.routes.ai.ensure_session", lambda req, resp: "sid")
+    monkeypatch.setattr("app.auth.session_store.get_sid", lambda request: "sid")
     monkeypatch.setattr(
-        "app.routes.ai.get_session",
-        lambda sid: {
+        "app.auth.session_store.get_session",
+        AsyncMock(return_value={
             "tokens_by_cloud": {"c1": {"access_token": "t1"}},
             "cloud_ids": ["c1"],
             "active_cloud_id": "c1",
-        },
+        }),
     )
 
     class FakeClient:
@@ -363,6 +369,11 @@ def test_analyze_issue_stream_skips_keyless_links_via_monkeypatch(monkeypatch):
 
     monkeypatch.setattr(ai_mod, "_llm_step", fake_llm_step)
 
+    async def fake_llm_stream_step(client, **k):
+        yield await fake_llm_step(client, **k)
+
+    monkeypatch.setattr(ai_mod, "_llm_stream_step", fake_llm_stream_step)
+
     with client.stream(
         "POST", "/ai/analyze-issue/stream", json={"issue_key": "P-1"}
     ) as resp:
@@ -2,14 +2,15 @@ from fastapi.testclient import TestClient
 
 from app.main import create_app
 from app.routes import ai as ai_mod
+from unittest.mock import AsyncMock
 
 app = create_app()
 client = TestClient(app)
 
 
 def test_summarize_jql_no_entry(monkeypatch):
-    monkeypatch.setattr("app.routes.ai.ensure_session", lambda req, resp: "sid")
-    monkeypatch.setattr("app.routes.ai.get_session", lambda sid: {})
+    monkeypatch.setattr("app.auth.session_store.get_sid", lambda request: "sid")
+    monkeypatch.setattr("app.auth.session_store.get_session", AsyncMock(return_value={}))
 
     r = client.post("/ai/summarize-jql", json={"jql": "x"})
     # select_cloud_id raises 400 when no clouds are connected
@@ -18,14 +19,14 @@ def test_summarize_jql_no_entry(monkeypatch):
 
 def test_summarize_jql_search_permission(monkeypatch):
     # search_jql raising a generic Exception -> 502 path
-    monkeypatch.setattr("app.routes.ai.ensure_session", lambda req, resp: "sid")
+    monkeypatch.setattr("app.auth.session_store.get_sid", lambda request: "sid")
     monkeypatch.setattr(
-        "app.routes.ai.get_session",
-        lambda sid: {
+        "app.auth.session_store.get_session",
+        AsyncMock(return_value={
             "tokens_by_cloud": {"c1": {"access_token": "t1"}},
             "cloud_ids": ["c1"],
             "active_cloud_id": "c1",
-        },
+        }),
     )
 
     class FakeClientErr:
@@ -42,14 +43,14 @@ def test_summarize_jql_search_permission(monkeypatch):
 
 
 def test_analyze_issue_no_entry(monkeypatch):
-    monkeypatch.setattr("app.routes.ai.ensure_session", lambda req, resp: "sid")
+    monkeypatch.setattr("app.auth.session_store.get_sid", lambda request: "sid")
     monkeypatch.setattr(
-        "app.routes.ai.get_session",
-        lambda sid: {
+        "app.auth.session_store.get_session",
+        AsyncMock(return_value={
             "tokens_by_cloud": {"c1": {"access_token": "t1"}},
             "cloud_ids": ["c1"],
             "active_cloud_id": "c1",
-        },
+        }),
     )
 
     class FakeClient:
@@ -66,8 +67,8 @@ def test_analyze_issue_no_entry(monkeypatch):
 
 
 def test_analyze_issue_select_cloud_id_no_entry(monkeypatch):
-    monkeypatch.setattr("app.routes.ai.ensure_session", lambda req, resp: "sid")
-    monkeypatch.setattr("app.routes.ai.get_session", lambda sid: {})
+    monkeypatch.setattr("app.auth.session_store.get_sid", lambda request: "sid")
+    monkeypatch.setattr("app.auth.session_store.get_session", AsyncMock(return_value={}))
 
     r = client.post("/ai/analyze-issue", json={"issue_key": "P-1"})
     # select_cloud_id raises 400 when no clouds are connected
@@ -75,15 +76,15 @@ def test_analyze_issue_select_cloud_id_no_entry(monkeypatch):
 
 
 def test_analyze_issue_entry_missing_tokens(monkeypatch):
-    monkeypatch.setattr("app.routes.ai.ensure_session", lambda req, resp: "sid")
+    monkeypatch.setattr("app.auth.session_store.get_sid", lambda request: "sid")
     # active cloud present but tokens_by_cloud entry missing
     monkeypatch.setattr(
-        "app.routes.ai.get_session",
-        lambda sid: {
+        "app.auth.session_store.get_session",
+        AsyncMock(return_value={
             "cloud_ids": ["c1"],
             "active_cloud_id": "c1",
             "tokens_by_cloud": {},
-        },
+        }),
     )
 
     r = client.post("/ai/analyze-issue", json={"issue_key": "P-1"})
@@ -91,14 +92,14 @@ def test_analyze_issue_entry_missing_tokens(monkeypatch):
 
 
 def test_analyze_issue_llm_generic_exception(monkeypatch):
-    monkeypatch.setattr("app.routes.ai.ensure_session", lambda req, resp: "sid")
+    monkeypatch.setattr("app.auth.session_store.get_sid", lambda request: "sid")
     monkeypatch.setattr(
-        "app.routes.ai.get_session",
-        lambda sid: {
+        "app.auth.session_store.get_session",
+        AsyncMock(return_value={
             "tokens_by_cloud": {"c1": {"access_token": "t1"}},
             "cloud_ids": ["c1"],
             "active_cloud_id": "c1",
-        },
+        }),
     )
 
     class FakeClient:
@@ -123,14 +124,14 @@ def test_analyze_issue_llm_generic_exception(monkeypatch):
 
 
 def test_analyze_issue_success_returns_llm(monkeypatch):
-    monkeypatch.setattr("app.routes.ai.ensure_session", lambda req, resp: "sid")
+    monkeypatch.setattr("app.auth.session_store.get_sid", lambda request: "sid")
     monkeypatch.setattr(
-        "app.routes.ai.get_session",
-        lambda sid: {
+        "app.auth.session_store.get_session",
+        AsyncMock(return_value={
             "tokens_by_cloud": {"c1": {"access_token": "t1"}},
             "cloud_ids": ["c1"],
             "active_cloud_id": "c1",
-        },
+        }),
     )
 
     class FakeClient:
@@ -164,14 +165,14 @@ def test_analyze_issue_success_returns_llm(monkeypatch):
 
 
 def test_analyze_issue_stream_inspects_dependances_and_calls_llm(monkeypatch):
-    monkeypatch.setattr("app.routes.ai.ensure_session", lambda req, resp: "sid")
+    monkeypatch.setattr("app.auth.session_store.get_sid", lambda request: "sid")
     monkeypatch.setattr(
-        "app.routes.ai.get_session",
-        lambda sid: {
+        "app.auth.session_store.get_session",
+        AsyncMock(return_value={
             "tokens_by_cloud": {"c1": {"access_token": "t1"}},
             "cloud_ids": ["c1"],
             "active_cloud_id": "c1",
-        },
+        }),
     )
 
     class FakeClient:
@@ -220,6 +221,11 @@ def test_analyze_issue_stream_inspects_dependances_and_calls_llm(monkeypatch):
 
     monkeypatch.setattr(ai_mod, "_llm_step", fake_llm_step)
 
+    async def fake_llm_stream_step(client, **k):
+        yield await fake_llm_step(client, **k)
+
+    monkeypatch.setattr(ai_mod, "_llm_stream_step", fake_llm_stream_step)
+
     with client.stream(
         "POST", "/ai/analyze-issue/stream", json={"issue_key": "P-1"}
     ) as resp:
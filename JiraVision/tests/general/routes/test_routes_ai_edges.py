@@ -2,20 +2,21 @@ import types
 from fastapi.testclient import TestClient
 
 from app.main import create_app
+from unittest.mock import AsyncMock
 
 app = create_app()
 client = TestClient(app)
 
 
 def test_analyze_issue_skips_empty_comment_and_builds_deps(monkeypatch):
-    monkeypatch.setattr("app.routes.ai.ensure_session", lambda req, resp: "sid")
+    monkeypatch.setattr("app.auth.session_store.get_sid", lambda request: "sid")
     monkeypatch.setattr(
-        "app.routes.ai.get_session",
-        lambda sid: {
+        "app.auth.session_store.get_session",
+        AsyncMock(return_value={
             "tokens_by_cloud": {"c1": {"access_token": "t1"}},
             "cloud_ids": ["c1"],
             "active_cloud_id": "c1",
-        },
+        }),
     )
 
     class FakeClient:
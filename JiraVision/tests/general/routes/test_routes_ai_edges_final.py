@@ -5,20 +5,21 @@ from fastapi import HTTPException
 
 from app.main import create_app
 from app.routes import ai as ai_mod
+from unittest.mock import AsyncMock
 
 app = create_app()
 client = TestClient(app)
 
 
 def test_summarize_jql_permission_error(monkeypatch):
-    monkeypatch.setattr("app.routes.ai.ensure_session", lambda req, resp: "sid")
+    monkeypatch.setattr("app.auth.session_store.get_sid", lambda request: "sid")
     monkeypatch.setattr(
-        "app.routes.ai.get_session",
-        lambda sid: {
+        "app.auth.session_store.get_session",
+        AsyncMock(return_value={
             "tokens_by_cloud": {"c1": {"access_token": "t1"}},
             "cloud_ids": ["c1"],
             "active_cloud_id": "c1",
-        },
+        }),
     )
 
     class FakeClient:
@@ -36,14 +37,14 @@ def test_summarize_jql_permission_error(monkeypatch):
 
 
 def test_analyze_issue_http500_message(monkeypatch):
-    monkeypatch.setattr("app.routes.ai.ensure_session", lambda req, resp: "sid")
+    monkeypatch.setattr("app.auth.session_store.get_sid", lambda request: "sid")
     monkeypatch.setattr(
-        "app.routes.ai.get_session",
-        lambda sid: {
+        "app.auth.session_store.get_session",
+        AsyncMock(return_value={
             "tokens_by_cloud": {"c1": {"access_token": "t1"}},
             "cloud_ids": ["c1"],
             "active_cloud_id": "c1",
-        },
+        }),
     )
 
     class FakeClient:
@@ -66,14 +67,14 @@ def test_analyze_issue_http500_message(monkeypatch):
 
 
 def test_analyze_issue_stream_404_and_empty_comment(monkeypatch):
-    monkeypatch.setattr("app.routes.ai.ensure_session", lambda req, resp: "sid")
+    monkeypatch.setattr("app.auth.session_store.get_sid", lambda request: "sid")
     monkeypatch.setattr(
-        "app.routes.ai.get_session",
-        lambda sid: {
+        "app.auth.session_store.get_session",
+        AsyncMock(return_value={
             "tokens_by_cloud": {"c1": {"access_token": "t1"}},
             "cloud_ids": ["c1"],
             "active_cloud_id": "c1",
-        },
+        }),
     )
 
     # 404 case
@@ -125,6 +126,11 @@ def test_analyze_issue_stream_404_and_empty_comment(monkeypatch):
 
     monkeypatch.setattr(ai_mod, "_llm_step", fake_llm_step)
 
+    async def fake_llm_stream_step(client, **k):
+        yield await fake_llm_step(client, **k)
+
+    monkeypatch.setattr(ai_mod, "_llm_stream_step", fake_llm_stream_step)
+
     with client.stream(
         "POST", "/ai/analyze-issue/stream", json={"issue_key": "P-1"}
     ) as resp:
@@ -139,14 +145,14 @@ def test_analyze_issue_stream_404_and_empty_comment(monkeypatch):
 
 
 def test_stream_llm_http_exception_propagates(monkeypatch):
-    monkeypatch.setattr("app.routes.ai.ensure_session", lambda req, resp: "sid")
+    monkeypatch.setattr("app.auth.session_store.get_sid", lambda request: "sid")
     monkeypatch.setattr(
-        "app.routes.ai.get_session",
-        lambda sid: {
+        "app.auth.session_store.get_session",
+        AsyncMock(return_value={
             "tokens_by_cloud": {"c1": {"access_token": "t1"}},
             "cloud_ids": ["c1"],
             "active_cloud_id": "c1",
-        },
+        }),
     )
 
     class FakeClient:
@@ -5,6 +5,7 @@ from fastapi import HTTPException
 
 from app.main import create_app
 from app.routes import ai as ai_mod
+from unittest.mock import AsyncMock
 
 app = create_app()
 client = TestClient(app)
@@ -25,14 +26,14 @@ def test_extract_links_limit_and_missing_key():
 
 
 def test_analyze_issue_permission_error(monkeypatch):
-    monkeypatch.setattr("app.routes.ai.ensure_session", lambda req, resp: "sid")
+    monkeypatch.setattr("app.auth.session_store.get_sid", lambda request: "sid")
     monkeypatch.setattr(
-        "app.routes.ai.get_session",
-        lambda sid: {
+        "app.auth.session_store.get_session",
+        AsyncMock(return_value={
             "tokens_by_cloud": {"c1": {"access_token": "t1"}},
             "cloud_ids": ["c1"],
             "active_cloud_id": "c1",
-        },
+        }),
     )
 
     class FakeClient:
@@ -49,14 +50,14 @@ def test_analyze_issue_permission_error(monkeypatch):
 
 
 def test_analyze_issue_http_error_500(monkeypatch):
-    monkeypatch.setattr("app.routes.ai.ensure_session", lambda req, resp: "sid")
+    monkeypatch.setattr("app.auth.session_store.get_sid", lambda request: "sid")
     monkeypatch.setattr(
-        "app.routes.ai.get_session",
-        lambda sid: {
+        "app.auth.session_store.get_session",
+        AsyncMock(return_value={
             "tokens_by_cloud": {"c1": {"access_token": "t1"}},
             "cloud_ids": ["c1"],
             "active_cloud_id": "c1",
-        },
+        }),
     )
 
     class FakeClient:
@@ -78,14 +79,14 @@ def test_analyze_issue_http_error_500(monkeypatch):
 
 
 def test_analyze_issue_stream_final_synth_error(monkeypatch):
-    monkeypatch.setattr("app.routes.ai.ensure_session", lambda req, resp: "sid")
+    monkeypatch.setattr("app.auth.session_store.get_sid", lambda request: "sid")
     monkeypatch.setattr(
-        "app.routes.ai.get_session",
-        lambda sid: {
+        "app.auth.session_store.get_session",
+        AsyncMock(return_value={
             "tokens_by_cloud": {"c1": {"access_token": "t1"}},
             "cloud_ids": ["c1"],
             "active_cloud_id": "c1",
-        },
+        }),
     )
 
     class FakeClient:
@@ -114,6 +115,11 @@ def test_analyze_issue_stream_final_synth_error(monkeypatch):
 
     monkeypatch.setattr(ai_mod, "_llm_step", fake_llm_step)
 
+    async def fake_llm_stream_step(client, **k):
+        yield await fake_llm_step(client, **k)
+
+    monkeypatch.setattr(ai_mod, "_llm_stream_step", fake_llm_stream_step)
+
     with client.stream(
         "POST", "/ai/analyze-issue/stream", json={"issue_key": "P-1"}
     ) as resp:
@@ -125,3 +131,147 @@ def test_analyze_issue_stream_final_synth_error(monkeypatch):
         )
         assert "event: error" in text
         assert "Synth error" in text
+
+
+def test_analyze_issue_enriches_dependencies_in_one_search(monkeypatch):
+    monkeypatch.setattr("app.auth.session_store.get_sid", lambda request: "sid")
+    monkeypatch.setattr(
+        "app.auth.session_store.get_session",
+        AsyncMock(return_value={
+            "tokens_by_cloud": {"c1": {"access_token": "t1"}},
+            "cloud_ids": ["c1"],
+            "active_cloud_id": "c1",
+        }),
+    )
+    bulk_calls = []
+
+    class FakeClient:
+        def __init__(self, *a, **k):
+            pass
+
+        async def get_issue(self, *a, **k):
+            return {
+                "key": "P-1",
+                "fields": {
+                    "issuelinks": [
+                        {"type": {"name": "Blocks"}, "outwardIssue": {"key": "P-2"}},
+                        {"type": {"name": "Relates"}, "inwardIssue": {"key": "P-3"}},
+                    ]
+                },
+            }
+
+        async def get_issue_comments(self, *a, **k):
+            return {"comments": []}
+
+        async def get_issues_bulk(self, keys):
+            keys = list(keys)
+            bulk_calls.append(keys)
+            return {
+                "P-2": {"key": "P-2", "fields": {"summary": "API", "status": {"name": "Done"}}}
+            }
+
+    captured = {}
+
+    async def fake_chat(system, user):
+        captured["user"] = user
+        return "ok"
+
+    monkeypatch.setattr("app.routes.ai.JiraClient", FakeClient)
+    monkeypatch.setattr(ai_mod.llm, "chat_text", fake_chat)
+
+    r = client.post("/ai/analyze-issue", json={"issue_key": "P-1", "max_links": 5})
+    assert r.status_code == 200
+    assert bulk_calls == [["P-2", "P-3"]]
+    assert "'summary': 'API', 'status': 'Done'" in captured["user"]
+    assert "'key': 'P-3', 'relation': 'Relates', 'direction': 'inward', 'summary': None" in captured["user"]
+
+
+def _session_with_token(monkeypatch):
+    monkeypatch.setattr("app.auth.session_store.get_sid", lambda request: "sid")
+    monkeypatch.setattr(
+        "app.auth.session_store.get_session",
+        AsyncMock(return_value={
+            "tokens_by_cloud": {"c1": {"access_token": "t1"}},
+            "cloud_ids": ["c1"],
+            "active_cloud_id": "c1",
+        }),
+    )
+
+
+def test_analyze_issue_returns_partial_result_past_comment_deadline(monkeypatch):
+    import asyncio
+
+    _session_with_token(monkeypatch)
+    monkeypatch.setattr(ai_mod.settings, "analysis_comments_timeout_seconds", 0.05)
+
+    class FakeClient:
+        def __init__(self, *a, **k):
+            pass
+
+        async def get_issue(self, *a, **k):
+            return {
+                "key": "P-1",
+                "fields": {
+                    "issuelinks": [
+                        {"type": {"name": "Blocks"}, "outwardIssue": {"key": "P-2"}}
+                    ]
+                },
+            }
+
+        async def get_issue_comments(self, *a, **k):
+            await asyncio.sleep(1)
+
+        async def get_issues_bulk(self, keys):
+            return {"P-2": {"fields": {"summary": "API"}}}
+
+    captured = {}
+
+    async def fake_chat(system, user):
+        captured["user"] = user
+        return "ok"
+
+    monkeypatch.setattr("app.routes.ai.JiraClient", FakeClient)
+    monkeypatch.setattr(ai_mod.llm, "chat_text", fake_chat)
+
+    r = client.post("/ai/analyze-issue", json={"issue_key": "P-1"})
+    assert r.status_code == 200
+    assert r.json()["partial"] == ["comments"]
+    assert "'summary': 'API'" in captured["user"]
+    assert "'missing': ['comments']" in captured["user"]
+
+
+def test_analyze_issue_stream_logs_fetches_as_they_complete(monkeypatch):
+    import asyncio
+
+    _session_with_token(monkeypatch)
+
+    class FakeClient:
+        def __init__(self, *a, **k):
+            pass
+
+        async def get_issue(self, *a, **k):
+            await asyncio.sleep(0.05)
+            return {"key": "P-1", "fields": {}}
+
+        async def get_issue_comments(self, *a, **k):
+            return {"comments": []}
+
+    async def fake_chat(system, user):
+        return "ok"
+
+    async def fake_stream(system, user):
+        yield await fake_chat(system, user)
+
+    monkeypatch.setattr("app.routes.ai.JiraClient", FakeClient)
+    monkeypatch.setattr(ai_mod.llm, "chat_text", fake_chat)
+    monkeypatch.setattr(ai_mod.llm, "chat_stream", fake_stream)
+
+    with client.stream(
+        "POST", "/ai/analyze-issue/stream", json={"issue_key": "P-1"}
+    ) as resp:
+        text = "\n".join(
+            line.decode() if isinstance(line, bytes) else line
+            for line in resp.iter_lines()
+        )
+    assert text.index("0 commentaire(s) recupere(s)") < text.index("Ticket recupere")
+    assert "event: result" in text
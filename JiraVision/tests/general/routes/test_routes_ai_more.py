@@ -7,20 +7,21 @@ from starlette.responses import Response
 
 from app.main import create_app
 from app.routes import ai as ai_mod
+from unittest.mock import AsyncMock
 
 app = create_app()
 client = TestClient(app)
 
 
 def test_summarize_jql_llm_generic_exception(monkeypatch):
-    monkeypatch.setattr("app.routes.ai.ensure_session", lambda req, resp: "sid")
+    monkeypatch.setattr("app.auth.session_store.get_sid", lambda request: "sid")
     monkeypatch.setattr(
-        "app.routes.ai.get_session",
-        lambda sid: {
+        "app.auth.session_store.get_session",
+        AsyncMock(return_value={
             "tokens_by_cloud": {"c1": {"access_token": "t1"}},
             "cloud_ids": ["c1"],
             "active_cloud_id": "c1",
-        },
+        }),
     )
 
     class FakeClient:
@@ -42,14 +43,14 @@ def test_summarize_jql_llm_generic_exception(monkeypatch):
 
 
 def test_summarize_jql_llm_http_exception(monkeypatch):
-    monkeypatch.setattr("app.routes.ai.ensure_session", lambda req, resp: "sid")
+    monkeypatch.setattr("app.auth.session_store.get_sid", lambda request: "sid")
     monkeypatch.setattr(
-        "app.routes.ai.get_session",
-        lambda sid: {
+        "app.auth.session_store.get_session",
+        AsyncMock(return_value={
             "tokens_by_cloud": {"c1": {"access_token": "t1"}},
             "cloud_ids": ["c1"],
             "active_cloud_id": "c1",
-        },
+        }),
     )
 
     class FakeClient:
@@ -71,14 +72,14 @@ def test_summarize_jql_llm_http_exception(monkeypatch):
 
 
 def test_analyze_issue_404(monkeypatch):
-    monkeypatch.setattr("app.routes.ai.ensure_session", lambda req, resp: "sid")
+    monkeypatch.setattr("app.auth.session_store.get_sid", lambda request: "sid")
     monkeypatch.setattr(
-        "app.routes.ai.get_session",
-        lambda sid: {
+        "app.auth.session_store.get_session",
+        AsyncMock(return_value={
             "tokens_by_cloud": {"c1": {"access_token": "t1"}},
             "cloud_ids": ["c1"],
             "active_cloud_id": "c1",
-        },
+        }),
     )
 
     class FakeClient:
@@ -100,14 +101,14 @@ def test_analyze_issue_404(monkeypatch):
 
 
 def test_analyze_issue_stream_success_with_links(monkeypatch):
-    monkeypatch.setattr("app.routes.ai.ensure_session", lambda req, resp: "sid")
+    monkeypatch.setattr("app.auth.session_store.get_sid", lambda request: "sid")
     monkeypatch.setattr(
-        "app.routes.ai.get_session",
-        lambda sid: {
+        "app.auth.session_store.get_session",
+        AsyncMock(return_value={
             "tokens_by_cloud": {"c1": {"access_token": "t1"}},
             "cloud_ids": ["c1"],
             "active_cloud_id": "c1",
-        },
+        }),
     )
 
     class FakeClient:
@@ -147,6 +148,11 @@ def test_analyze_issue_stream_success_with_links(monkeypatch):
 
     monkeypatch.setattr(ai_mod, "_llm_step", fake_llm_step)
 
+    async def fake_llm_stream_step(client, **k):
+        yield await fake_llm_step(client, **k)
+
+    monkeypatch.setattr(ai_mod, "_llm_stream_step", fake_llm_stream_step)
+
     with client.stream(
         "POST", "/ai/analyze-issue/stream", json={"issue_key": "P-1"}
     ) as resp:
@@ -166,15 +172,15 @@ def test_analyze_issue_stream_success_with_links(monkeypatch):
 
 
     def test_analyze_issue_stream_logs_no_dependency_when_no_links(monkeypatch):
-        monkeypatch.setattr("app.routes.ai.ensure_session", lambda req, resp: "sid")
+        monkeypatch.setattr("app.auth.session_store.get_sid", lambda request: "sid")
         monkeypatch.setattr(
-            "app.routes.ai.get_session",
-            lambda sid: {
+            "app.auth.session_store.get_session",
+            AsyncMock(return_value={
                 "tokens_by_cloud": {"c1": {"access_token": "t1"}},
                 "cloud_ids": ["c1"],
                 "active_cloud_id": "c1",
-            },
-        )
+            }),
+    )
 
         class FakeClient:
             def __init__(self, *a, **k):
@@ -220,15 +226,15 @@ def test_analyze_issue_stream_success_with_links(monkeypatch):
 
 
     def test_analyze_issue_stream_generic_exception_yields_502_error(monkeypatch):
-        monkeypatch.setattr("app.routes.ai.ensure_session", lambda req, resp: "sid")
+        monkeypatch.setattr("app.auth.session_store.get_sid", lambda request: "sid")
         monkeypatch.setattr(
-            "app.routes.ai.get_session",
-            lambda sid: {
+            "app.auth.session_store.get_session",
+            AsyncMock(return_value={
                 "tokens_by_cloud": {"c1": {"access_token": "t1"}},
                 "cloud_ids": ["c1"],
                 "active_cloud_id": "c1",
-            },
-        )
+            }),
+    )
 
         class FakeClient:
             def __init__(self, *a, **k):
@@ -259,15 +265,15 @@ def test_analyze_issue_stream_success_with_links(monkeypatch):
     def test_analyze_issue_stream_generic_exception_is_traced_by_coverage(monkeypatch):
         # Same scenario as above, but call the async handler directly to avoid
         # any tracing gaps from TestClient/threaded streaming.
-        monkeypatch.setattr("app.routes.ai.ensure_session", lambda req, resp: "sid")
+        monkeypatch.setattr("app.auth.session_store.get_sid", lambda request: "sid")
         monkeypatch.setattr(
-            "app.routes.ai.get_session",
-            lambda sid: {
+            "app.auth.session_store.get_session",
+            AsyncMock(return_value={
                 "tokens_by_cloud": {"c1": {"access_token": "t1"}},
                 "cloud_ids": ["c1"],
                 "active_cloud_id": "c1",
-            },
-        )
+            }),
+    )
 
         class FakeClient:
             def __init__(self, *a, **k):
@@ -7,6 +7,7 @@ from fastapi.testclient import TestClient
 
 from app.main import create_app
 from app.routes import auth as auth_mod
+from unittest.mock import AsyncMock
 
 app = create_app()
 client = TestClient(app)
@@ -57,8 +58,8 @@ def test_pick_jira_resources_filters():
 
 def test_oauth_callback_token_errors(monkeypatch):
     # ensure session state exists
-    monkeypatch.setattr("app.routes.auth.ensure_session", lambda req, resp: "sid")
-    monkeypatch.setattr("app.routes.auth.get_session", lambda sid: {"state": "s123"})
+    monkeypatch.setattr("app.auth.session_store.get_sid", lambda request: "sid")
+    monkeypatch.setattr("app.auth.session_store.get_session", AsyncMock(return_value={"state": "s123"}))
 
     # token endpoint returns 500
     class FakeClientErr:
@@ -87,8 +88,8 @@ def test_oauth_callback_token_errors(monkeypatch):
 
 
 def test_oauth_callback_missing_access_token(monkeypatch):
-    monkeypatch.setattr("app.routes.auth.ensure_session", lambda req, resp: "sid")
-    monkeypatch.setattr("app.routes.auth.get_session", lambda sid: {"state": "s123"})
+    monkeypatch.setattr("app.auth.session_store.get_sid", lambda request: "sid")
+    monkeypatch.setattr("app.auth.session_store.get_session", AsyncMock(return_value={"state": "s123"}))
 
     class FakeClientOK:
         def __init__(self, *a, **k):
@@ -116,14 +117,14 @@ def test_oauth_callback_missing_access_token(monkeypatch):
 
 
 def test_oauth_callback_success(monkeypatch):
-    monkeypatch.setattr("app.routes.auth.ensure_session", lambda req, resp: "sid")
+    monkeypatch.setattr("app.auth.session_store.get_sid", lambda request: "sid")
     captured = {}
 
-    def fake_set_session(sid, sess):
+    async def fake_set_session(sid, sess):
         captured["sess"] = sess
 
-    monkeypatch.setattr("app.routes.auth.set_session", fake_set_session)
-    monkeypatch.setattr("app.routes.auth.get_session", lambda sid: {"state": "s123"})
+    monkeypatch.setattr("app.auth.session_store.set_session", fake_set_session)
+    monkeypatch.setattr("app.auth.session_store.get_session", AsyncMock(return_value={"state": "s123"}))
 
     class FakeClient:
         def __init__(self, *a, **k):
@@ -1,6 +1,7 @@
 from fastapi.testclient import TestClient
 
 from app.main import create_app
+from unittest.mock import AsyncMock
 
 app = create_app()
 client = TestClient(app)
@@ -8,7 +9,7 @@ client = TestClient(app)
 
 def test_auth_page_sets_cookie(monkeypatch):
     # when ensure_session is mocked we only verify HTML renders
-    monkeypatch.setattr("app.routes.auth_ui.ensure_session", lambda req, resp: "sid")
+    monkeypatch.setattr("app.auth.session_store.get_sid", lambda request: "sid")
 
     r = client.get("/auth")
     assert r.status_code == 200
@@ -19,7 +20,7 @@ def test_auth_page_cookie_is_set_when_real_ensure(monkeypatch):
     # allow ensure_session to run but stub out backend set_session in session_store
     called = {}
 
-    def fake_set_session(sid, sess):
+    async def fake_set_session(sid, sess):
         called["sid"] = sid
 
     import app.auth.session_store as ss
@@ -33,16 +34,15 @@ def test_auth_page_cookie_is_set_when_real_ensure(monkeypatch):
 
 def test_auth_state_logged_in_and_logged_out(monkeypatch):
     # logged out
-    monkeypatch.setattr("app.routes.auth_ui.ensure_session", lambda req, resp: "sid")
-    monkeypatch.setattr("app.routes.auth_ui.get_session", lambda sid: {})
+    monkeypatch.setattr("app.auth.session_store.get_sid", lambda request: "sid")
+    monkeypatch.setattr("app.auth.session_store.get_session", AsyncMock(return_value={}))
     r = client.get("/auth/state")
     assert r.status_code == 200
     assert r.json()["logged_in"] is False
 
     # logged in
     monkeypatch.setattr(
-        "app.routes.auth_ui.get_session", lambda sid: {"access_token": "t"}
-    )
+        "app.auth.session_store.get_session", AsyncMock(return_value={"access_token": "t"}))
     r2 = client.get("/auth/state")
     assert r2.status_code == 200
     assert r2.json()["logged_in"] is True
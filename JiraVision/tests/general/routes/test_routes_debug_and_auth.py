@@ -7,6 +7,7 @@ from fastapi.testclient import TestClient
 from fastapi import HTTPException
 
 from app.main import create_app
+from unittest.mock import AsyncMock
 
 app = create_app()
 client = TestClient(app)
@@ -22,7 +23,7 @@ def test_debug_cookie_and_session(monkeypatch):
 
     # no sid cookie/session
     monkeypatch.setattr("app.routes.debug.get_sid", lambda req: None)
-    monkeypatch.setattr("app.routes.debug.get_session", lambda sid: None)
+    monkeypatch.setattr("app.routes.debug.get_session", AsyncMock(return_value=None))
 
     r = local_client.get("/debug/cookie")
     assert r.status_code == 200
@@ -37,11 +38,11 @@ def test_debug_cookie_and_session(monkeypatch):
     monkeypatch.setattr("app.routes.debug.get_sid", lambda req: "sid")
     monkeypatch.setattr(
         "app.routes.debug.get_session",
-        lambda sid: {
+        AsyncMock(return_value={
             "access_token": "tok",
             "tokens_by_cloud": {"c": {}},
             "jira_sites": [{"id": "a", "name": "A", "url": "u"}, "bad"],
-        },
+        }),
     )
 
     r = local_client.get("/debug/cookie")
@@ -68,17 +69,17 @@ def test_debug_session_errors_and_sanitizes_sites(monkeypatch):
 
     # sid but no session -> 401
     monkeypatch.setattr("app.routes.debug.get_sid", lambda req: "sid")
-    monkeypatch.setattr("app.routes.debug.get_session", lambda sid: None)
+    monkeypatch.setattr("app.routes.debug.get_session", AsyncMock(return_value=None))
     r = local_client.get("/debug/session")
     assert r.status_code == 401
 
     # sid and session -> sanitized jira_sites
     monkeypatch.setattr(
         "app.routes.debug.get_session",
-        lambda sid: {
+        AsyncMock(return_value={
             "tokens_by_cloud": {},
             "jira_sites": [{"id": "x", "name": "X", "url": "u"}, "bad"],
-        },
+        }),
     )
     r = local_client.get("/debug/session")
     assert r.status_code == 200
@@ -134,8 +135,8 @@ def test_get_accessible_resources_success_and_error(monkeypatch):
 
 def test_oauth_callback_no_jira_resources(monkeypatch):
     # prepare session with matching state
-    monkeypatch.setattr("app.routes.auth.ensure_session", lambda req, resp: "sid")
-    monkeypatch.setattr("app.routes.auth.get_session", lambda sid: {"state": "s"})
+    monkeypatch.setattr("app.auth.session_store.get_sid", lambda request: "sid")
+    monkeypatch.setattr("app.auth.session_store.get_session", AsyncMock(return_value={"state": "s"}))
 
     # token endpoint returns access_token
     monkeypatch.setattr(
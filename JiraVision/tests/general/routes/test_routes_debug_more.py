@@ -2,6 +2,7 @@ from fastapi.testclient import TestClient
 
 from app.main import create_app
 from app.routes import debug as dbg
+from unittest.mock import AsyncMock
 
 app = create_app()
 client = TestClient(app)
@@ -45,10 +46,10 @@ def test_debug_cookie_and_session(monkeypatch):
     monkeypatch.setattr("app.routes.debug.get_sid", lambda req: "s1")
     monkeypatch.setattr(
         "app.routes.debug.get_session",
-        lambda sid: {
+        AsyncMock(return_value={
             "access_token": "t",
             "jira_sites": [{"id": "x", "name": "N", "url": "u"}],
-        },
+        }),
     )
 
     # set cookies on the client instance (avoid per-request cookies deprecation)
@@ -68,12 +69,12 @@ def test_debug_cookie_and_session(monkeypatch):
     monkeypatch.setattr("app.routes.debug.get_sid", lambda req: "s1")
     monkeypatch.setattr(
         "app.routes.debug.get_session",
-        lambda sid: {
+        AsyncMock(return_value={
             "tokens_by_cloud": {"c1": {}},
             "cloud_ids": ["c1"],
             "active_cloud_id": "c1",
             "jira_sites": [{"id": "x", "name": "N", "url": "u"}],
-        },
+        }),
     )
 
     r4 = c.get("/debug/session")
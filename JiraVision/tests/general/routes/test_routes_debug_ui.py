@@ -1,6 +1,7 @@
 from fastapi.testclient import TestClient
 
 from app.main import create_app
+from unittest.mock import AsyncMock
 
 app = create_app()
 client = TestClient(app)
@@ -39,7 +40,7 @@ def test_debug_cookie_and_session(monkeypatch):
         "active_cloud_id": "c1",
         "site_url": "u",
     }
-    monkeypatch.setattr("app.routes.debug.get_session", lambda sid: session)
+    monkeypatch.setattr("app.routes.debug.get_session", AsyncMock(return_value=session))
 
     r2 = local_client.get("/debug/cookie")
     assert r2.status_code == 200
@@ -57,14 +58,14 @@ def test_debug_cookie_and_session(monkeypatch):
 
 def test_ui_page_and_state(monkeypatch):
     # not logged in -> redirect to /auth
-    monkeypatch.setattr("app.routes.ui.ensure_session", lambda req, resp: "sid-ui")
-    monkeypatch.setattr("app.routes.ui.get_session", lambda sid: {})
+    monkeypatch.setattr("app.auth.session_store.get_sid", lambda request: "sid-ui")
+    monkeypatch.setattr("app.auth.session_store.get_session", AsyncMock(return_value={}))
 
     r = client.get("/ui", follow_redirects=False)
     assert r.status_code in (302, 307) or r.headers.get("location") == "/auth"
 
     # logged in -> return HTML
-    monkeypatch.setattr("app.routes.ui.get_session", lambda sid: {"access_token": "t"})
+    monkeypatch.setattr("app.auth.session_store.get_session", AsyncMock(return_value={"access_token": "t"}))
     r2 = client.get("/ui")
     assert r2.status_code == 200
     assert "html" in r2.headers.get("content-type")
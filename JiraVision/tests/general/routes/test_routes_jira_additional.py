@@ -3,13 +3,14 @@ import httpx
 from fastapi.testclient import TestClient
 
 from app.main import create_app
+from unittest.mock import AsyncMock
 
 app = create_app()
 client = TestClient(app)
 
 
 def test_jira_issue_http_status_error(monkeypatch):
-    monkeypatch.setattr("app.routes.jira._ensure_sid", lambda req, resp: "sid")
+    monkeypatch.setattr("app.auth.session_store.get_sid", lambda request: "sid")
 
     def fake_session():
         return {
@@ -21,8 +22,8 @@ def test_jira_issue_http_status_error(monkeypatch):
         }
 
     monkeypatch.setattr(
-        "app.routes.jira.get_session",
-        lambda sid: fake_session(),
+        "app.auth.session_store.get_session",
+        AsyncMock(return_value=fake_session())
     )
 
     class FakeClient:
@@ -43,7 +44,7 @@ def test_jira_issue_http_status_error(monkeypatch):
 
 
 def test_jira_search_permission_error(monkeypatch):
-    monkeypatch.setattr("app.routes.jira._ensure_sid", lambda req, resp: "sid")
+    monkeypatch.setattr("app.auth.session_store.get_sid", lambda request: "sid")
 
     def fake_session():
         return {
@@ -55,8 +56,8 @@ def test_jira_search_permission_error(monkeypatch):
         }
 
     monkeypatch.setattr(
-        "app.routes.jira.get_session",
-        lambda sid: fake_session(),
+        "app.auth.session_store.get_session",
+        AsyncMock(return_value=fake_session())
     )
 
     class FakeClient:
@@ -73,13 +74,13 @@ def test_jira_search_permission_error(monkeypatch):
 
 
 def test_jira_instances_filters_non_dict(monkeypatch):
-    monkeypatch.setattr("app.routes.jira._ensure_sid", lambda req, resp: "sid")
+    monkeypatch.setattr("app.auth.session_store.get_sid", lambda request: "sid")
     session = {
         "cloud_ids": ["a"],
         "active_cloud_id": "a",
         "jira_sites": [{"id": "a", "name": "A", "url": "u"}, "bad"],
     }
-    monkeypatch.setattr("app.routes.jira.get_session", lambda sid: session)
+    monkeypatch.setattr("app.auth.session_store.get_session", AsyncMock(return_value=session))
 
     r = client.get("/jira/instances")
     assert r.status_code == 200
@@ -88,11 +89,11 @@ def test_jira_instances_filters_non_dict(monkeypatch):
 
 
 def test_jira_instances_missing_and_bad_entries(monkeypatch):
-    monkeypatch.setattr("app.routes.jira._ensure_sid", lambda req, resp: "sid")
+    monkeypatch.setattr("app.auth.session_store.get_sid", lambda request: "sid")
     # session with no jira_sites and empty cloud_ids
     monkeypatch.setattr(
-        "app.routes.jira.get_session",
-        lambda sid: {"cloud_ids": [], "active_cloud_id": None},
+        "app.auth.session_store.get_session",
+        AsyncMock(return_value={"cloud_ids": [], "active_cloud_id": None})
     )
 
     r = client.get("/jira/instances")
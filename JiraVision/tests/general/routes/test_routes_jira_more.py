@@ -6,6 +6,7 @@ from fastapi.testclient import TestClient
 from fastapi import HTTPException
 
 from app.main import create_app
+from unittest.mock import AsyncMock
 
 app = create_app()
 client = TestClient(app)
@@ -20,22 +21,22 @@ def test_require_logged_in_raises():
 
 
 def test_jira_select_invalid_cloud(monkeypatch):
-    monkeypatch.setattr("app.routes.jira._ensure_sid", lambda req, resp: "sid")
-    monkeypatch.setattr("app.routes.jira.get_session", lambda sid: {"cloud_ids": ["a"]})
+    monkeypatch.setattr("app.auth.session_store.get_sid", lambda request: "sid")
+    monkeypatch.setattr("app.auth.session_store.get_session", AsyncMock(return_value={"cloud_ids": ["a"]}))
 
     r = client.post("/jira/select", params={"cloud_id": "b"})
     assert r.status_code == 400
 
 
 def test_jira_issue_permission_error(monkeypatch):
-    monkeypatch.setattr("app.routes.jira._ensure_sid", lambda req, resp: "sid")
+    monkeypatch.setattr("app.auth.session_store.get_sid", lambda request: "sid")
     monkeypatch.setattr(
-        "app.routes.jira.get_session",
-        lambda sid: {
+        "app.auth.session_store.get_session",
+        AsyncMock(return_value={
             "tokens_by_cloud": {"c1": {"access_token": "t"}},
             "cloud_ids": ["c1"],
             "active_cloud_id": "c1",
-        },
+        }),
     )
 
     class FakeClient:
@@ -52,14 +53,14 @@ def test_jira_issue_permission_error(monkeypatch):
 
 
 def test_jira_issue_generic_exception(monkeypatch):
-    monkeypatch.setattr("app.routes.jira._ensure_sid", lambda req, resp: "sid")
+    monkeypatch.setattr("app.auth.session_store.get_sid", lambda request: "sid")
     monkeypatch.setattr(
-        "app.routes.jira.get_session",
-        lambda sid: {
+        "app.auth.session_store.get_session",
+        AsyncMock(return_value={
             "tokens_by_cloud": {"c1": {"access_token": "t"}},
             "cloud_ids": ["c1"],
             "active_cloud_id": "c1",
-        },
+        }),
     )
 
     class FakeClient:
@@ -76,14 +77,14 @@ def test_jira_issue_generic_exception(monkeypatch):
 
 
 def test_jira_search_httpstatus_propagates(monkeypatch):
-    monkeypatch.setattr("app.routes.jira._ensure_sid", lambda req, resp: "sid")
+    monkeypatch.setattr("app.auth.session_store.get_sid", lambda request: "sid")
     monkeypatch.setattr(
-        "app.routes.jira.get_session",
-        lambda sid: {
+        "app.auth.session_store.get_session",
+        AsyncMock(return_value={
             "tokens_by_cloud": {"c1": {"access_token": "t"}},
             "cloud_ids": ["c1"],
             "active_cloud_id": "c1",
-        },
+        }),
     )
 
     class FakeClient:
@@ -102,14 +103,14 @@ def test_jira_search_httpstatus_propagates(monkeypatch):
 
 
 def test_jira_search_generic_exception(monkeypatch):
-    monkeypatch.setattr("app.routes.jira._ensure_sid", lambda req, resp: "sid")
+    monkeypatch.setattr("app.auth.session_store.get_sid", lambda request: "sid")
     monkeypatch.setattr(
-        "app.routes.jira.get_session",
-        lambda sid: {
+        "app.auth.session_store.get_session",
+        AsyncMock(return_value={
             "tokens_by_cloud": {"c1": {"access_token": "t"}},
             "cloud_ids": ["c1"],
             "active_cloud_id": "c1",
-        },
+        }),
     )
 
     class FakeClient:
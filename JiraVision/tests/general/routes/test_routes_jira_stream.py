@@ -0,0 +1,136 @@
+import json
+
+import httpx
+import pytest
+
+from fastapi.testclient import TestClient
+
+from app.clients.jira import JiraClient
+from app.main import create_app
+from unittest.mock import AsyncMock
+
+app = create_app()
+client = TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def logged_in(monkeypatch):
+    monkeypatch.setattr("app.auth.session_store.get_sid", lambda request: "sid")
+    monkeypatch.setattr(
+        "app.auth.session_store.get_session",
+        AsyncMock(return_value={
+            "tokens_by_cloud": {"c1": {"access_token": "t"}},
+            "cloud_ids": ["c1"],
+            "active_cloud_id": "c1",
+        }),
+    )
+
+
+def _fake_client(monkeypatch, total=120, error_at=None):
+    pages = []
+
+    class FakeClient(JiraClient):
+        def __init__(self, *a, **k):
+            super().__init__("t", "c1")
+
+        async def search_jql(self, jql, max_results=20, next_page_token=None, **k):
+            start = int(next_page_token or 0)
+            pages.append(start)
+            if error_at is not None and start >= error_at:
+                req = httpx.Request("POST", "http://x")
+                resp = httpx.Response(400, request=req, content=b"bad")
+                raise httpx.HTTPStatusError("err", request=req, response=resp)
+            end = min(start + max_results, total)
+            out = {
+                "issues": [
+                    {"key": f"P-{i}", "fields": {"summary": f"s{i}"}}
+                    for i in range(start, end)
+                ]
+            }
+            if end < total:
+                out["nextPageToken"] = str(end)
+            return out
+
+    monkeypatch.setattr("app.routes.jira.JiraClient", FakeClient)
+    return pages
+
+
+def _lines(resp):
+    return [json.loads(line) for line in resp.iter_lines() if line]
+
+
+def test_search_stream_walks_every_page(monkeypatch):
+    pages = _fake_client(monkeypatch, total=120)
+
+    with client.stream("GET", "/jira/search/stream", params={"jql": "x"}) as resp:
+        assert resp.status_code == 200
+        assert resp.headers["content-type"].startswith("application/x-ndjson")
+        records = _lines(resp)
+
+    issues = [r for r in records if r["kind"] == "issue"]
+    assert [r["key"] for r in issues] == [f"P-{i}" for i in range(120)]
+    assert issues[0]["summary"] == "s0"
+    assert records[-1] == {"kind": "end", "returned": 120, "limit_reached": False}
+    assert pages == [0, 50, 100]
+
+
+def test_search_stream_stops_at_the_limit(monkeypatch):
+    pages = _fake_client(monkeypatch, total=500)
+
+    with client.stream(
+        "GET", "/jira/search/stream", params={"jql": "x", "limit": 60}
+    ) as resp:
+        records = _lines(resp)
+
+    assert len([r for r in records if r["kind"] == "issue"]) == 60
+    assert records[-1]["limit_reached"] is True
+    assert pages == [0, 50]
+
+
+def test_search_stream_rejects_a_limit_above_the_cap(monkeypatch):
+    _fake_client(monkeypatch)
+    r = client.get("/jira/search/stream", params={"jql": "x", "limit": 10**6})
+    assert r.status_code == 400
+
+
+def test_search_stream_first_page_error_keeps_its_status(monkeypatch):
+    _fake_client(monkeypatch, error_at=0)
+    r = client.get("/jira/search/stream", params={"jql": "bad"})
+    assert r.status_code == 400
+
+
+def test_search_stream_error_mid_stream_is_a_record(monkeypatch):
+    _fake_client(monkeypatch, total=120, error_at=50)
+
+    with client.stream("GET", "/jira/search/stream", params={"jql": "x"}) as resp:
+        records = _lines(resp)
+
+    assert len([r for r in records if r["kind"] == "issue"]) == 50
+    assert records[-1]["kind"] == "error"
+    assert records[-1]["code"] == 400
+
+
+def test_search_stream_sse(monkeypatch):
+    _fake_client(monkeypatch, total=2)
+
+    with client.stream(
+        "GET", "/jira/search/stream", params={"jql": "x", "format": "sse"}
+    ) as resp:
+        assert resp.headers["content-type"].startswith("text/event-stream")
+        text = "\n".join(resp.iter_lines())
+
+    assert text.count("event: issue") == 2
+    assert 'event: end\ndata: {"returned": 2, "limit_reached": false}' in text
+
+
+def test_search_stream_stops_when_the_client_disconnects(monkeypatch):
+    pages = _fake_client(monkeypatch, total=10_000)
+    monkeypatch.setattr(
+        "starlette.requests.Request.is_disconnected", AsyncMock(return_value=True)
+    )
+
+    with client.stream("GET", "/jira/search/stream", params={"jql": "x"}) as resp:
+        records = _lines(resp)
+
+    assert len(records) == 50
+    assert len(pages) <= 2  # current page + the prefetched one
@@ -0,0 +1,118 @@
+import hashlib
+import hmac
+import json
+
+import pytest
+
+from fastapi.testclient import TestClient
+
+from app.core import config, issue_index, jira_events
+from app.main import create_app
+
+app = create_app()
+client = TestClient(app)
+
+SECRET = "s3cret"
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    seen = {"invalidated": [], "stale": []}
+
+    async def invalidate_issue(cloud_id, issues):
+        seen["invalidated"].append((cloud_id, sorted(issues)))
+        return 0
+
+    monkeypatch.setattr(config.settings, "jira_webhook_secret", SECRET)
+    monkeypatch.setattr(jira_events.jira_cache, "invalidate_issue", invalidate_issue)
+    monkeypatch.setattr(
+        jira_events.po_project_store,
+        "mark_stale",
+        lambda account_id: seen["stale"].append(account_id),
+    )
+    monkeypatch.setattr(jira_events, "stats", jira_events.JiraEventStats())
+    return seen
+
+
+def _post(payload, secret=SECRET, cloud_id="c1"):
+    body = json.dumps(payload).encode()
+    signature = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    return client.post(
+        f"/webhooks/jira/{cloud_id}",
+        content=body,
+        headers={
+            "content-type": "application/json",
+            "x-hub-signature": f"sha256={signature}",
+        },
+    )
+
+
+def _issue_event(event="jira:issue_updated", **extra):
+    payload = {
+        "webhookEvent": event,
+        "issue": {
+            "id": "10001",
+            "key": "P-1",
+            "fields": {"project": {"key": "P"}, "reporter": {"accountId": "acc"}},
+        },
+    }
+    payload.update(extra)
+    return payload
+
+
+def test_disabled_without_secret(monkeypatch):
+    monkeypatch.setattr(config.settings, "jira_webhook_secret", None)
+    assert _post(_issue_event()).status_code == 404
+
+
+def test_bad_signature_is_rejected(calls):
+    assert _post(_issue_event(), secret="other").status_code == 401
+    assert calls["invalidated"] == []
+
+
+def test_issue_update_invalidates_cache_and_po_projects(calls):
+    resp = _post(_issue_event())
+    assert resp.status_code == 200
+    assert resp.json() == {"ok": True, "event": "issue_updated"}
+    assert calls["invalidated"] == [("c1", ["10001", "P-1"])]
+    assert calls["stale"] == ["acc"]
+    assert jira_events.stats.received == {"issue_updated": 1}
+
+
+def test_issue_link_invalidates_both_ends(calls):
+    payload = {
+        "webhookEvent": "issuelink_created",
+        "issueLink": {"sourceIssueId": 1, "destinationIssueId": 2},
+    }
+    assert _post(payload).json()["event"] == "issuelink"
+    assert calls["invalidated"] == [("c1", ["1", "2"])]
+    assert calls["stale"] == []
+
+
+def test_unknown_event_is_ignored(calls):
+    assert _post({"webhookEvent": "sprint_started"}).json()["event"] == "ignored"
+    assert calls["invalidated"] == []
+
+
+def test_listeners_receive_events(calls, monkeypatch):
+    received = []
+    monkeypatch.setattr(jira_events, "_listeners", [])
+
+    @jira_events.subscribe
+    async def listener(event):
+        received.append((event.kind, sorted(event.issues)))
+
+    _post({"webhookEvent": "comment_created", "issue": {"id": "7", "key": "P-7"}})
+    assert received == [("comment", ["7", "P-7"])]
+
+
+def test_deleted_issue_leaves_the_index(calls, monkeypatch, tmp_path):
+    monkeypatch.setattr(config.settings, "jira_index_enabled", True)
+    monkeypatch.setattr(
+        config.settings, "jira_index_path", str(tmp_path / "index.sqlite3")
+    )
+    issue = _issue_event()["issue"]
+    issue_index._store("c1", "account:acc", [issue], replace=["P"], now=0)
+
+    _post(_issue_event("jira:issue_deleted"))
+    assert issue_index.forget("c1", keys=["P-1"]) == 0  # already gone
@@ -0,0 +1,110 @@
+"""Micro-benchmark of the Redis document codec (app/core/codec.py).
+
+Compares stdlib json (legacy format) with the v1 codec, with and without
+compression, on a typical session and a PO project map: encode / decode time
+per call and bytes stored.
+
+Usage (from the repository root):
+    python scripts/bench_codec.py [--iterations 20000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import base64
+import json
+import os
+import random
+import sys
+import timeit
+
+HERE = os.path.dirname(__file__)
+ROOT = os.path.abspath(os.path.join(HERE, "..", "JiraVision", "app"))
+sys.path.insert(0, ROOT)
+
+# Settings needs these to be importable outside of the app
+for _name in ("atlassian_client_id", "atlassian_client_secret", "atlassian_scopes"):
+    os.environ.setdefault(_name, "bench")
+os.environ.setdefault("app_secret_key", "bench")
+
+from app.core import codec  # noqa: E402
+from app.core.config import settings  # noqa: E402
+
+
+def _token(rng: random.Random) -> str:
+    # OAuth access tokens are ~1 KB of high-entropy base64 (barely compressible)
+    return base64.urlsafe_b64encode(rng.randbytes(675)).decode("ascii")
+
+
+def _session() -> dict:
+    rng = random.Random(0)
+    clouds = {
+        f"cloud-{i}": {
+            "access_token": _token(rng),
+            "site_url": f"https://site{i}.atlassian.net",
+            "site_name": f"site{i}",
+            "scopes": ["read:jira-work", "read:jira-user", "offline_access"],
+        }
+        for i in range(2)
+    }
+    return {
+        "created_at": 1700000000.123,
+        "tokens_by_cloud": clouds,
+        "cloud_ids": list(clouds),
+        "jira_sites": [
+            {"id": cid, "name": e["site_name"], "url": e["site_url"]}
+            for cid, e in clouds.items()
+        ],
+        "active_cloud_id": "cloud-0",
+        "access_token": clouds["cloud-0"]["access_token"],
+        "site_url": "https://site0.atlassian.net",
+        "scopes": ["read:jira-work", "read:jira-user", "offline_access"],
+        "jira_account_id": "5b10ac8d82e05b22cc7d4ef5",
+    }
+
+
+def _projects() -> dict:
+    return {
+        f"cloud-0:PROJ{i}": {
+            "project_key": f"PROJ{i}",
+            "project_name": f"Project number {i}",
+            "cloud_id": "cloud-0",
+            "source": "jira",
+            "mask_type": "none",
+            "mask_until": None,
+            "created_at": 1700000000,
+            "updated_at": 1700000000,
+        }
+        for i in range(60)
+    }
+
+
+def _bench(label: str, value: dict, n: int) -> None:
+    variants = [
+        ("json (legacy)", "legacy", 10**9),
+        ("v1", "v1", 10**9),
+        ("v1 + zlib", "v1", 0),
+    ]
+    print(f"\n{label}")
+    print(f"  {'codec':<14} {'encode µs':>10} {'decode µs':>10} {'bytes':>8}")
+    for name, version, min_bytes in variants:
+        settings.codec_version = version  # type: ignore[assignment]
+        settings.codec_compress_min_bytes = min_bytes
+        raw = codec.encode(value)
+        enc = timeit.timeit(lambda: codec.encode(value), number=n) / n * 1e6
+        dec = timeit.timeit(lambda: codec.decode(raw), number=n) / n * 1e6
+        print(f"  {name:<14} {enc:>10.2f} {dec:>10.2f} {len(raw):>8}")
+    assert json.loads(json.dumps(value)) == codec.decode(raw)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+    print(f"orjson: {'yes' if codec.orjson is not None else 'no (stdlib json)'}")
+    _bench("session", _session(), args.iterations)
+    _bench("PO project map (60 projects)", _projects(), max(args.iterations // 10, 1))
+
+
+if __name__ == "__main__":
+    main()
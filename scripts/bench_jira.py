@@ -0,0 +1,161 @@
+"""Load benchmark of the Jira client against the local fake Atlassian API.
+
+Runs the gateway's JiraClient (shared budget, retries, single-flight, field
+profiles) in-process against scripts/fake_atlassian.py through an ASGI
+transport: no network, no Atlassian account. Each virtual user repeats the
+retrieval of an issue analysis (issue, comments, dependencies) and a paged
+search; the report gives latency percentiles per operation and the calls the
+fake actually served / throttled.
+
+Usage (from the repository root):
+    python scripts/bench_jira.py [--users 50] [--rounds 20] \\
+        [--latency lognormal:80,0.5] [--throttle 0.02] [--rate-limit 100]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+from typing import Dict, List
+
+HERE = os.path.dirname(__file__)
+ROOT = os.path.abspath(os.path.join(HERE, "..", "JiraVision", "app"))
+sys.path.insert(0, ROOT)
+
+# Settings needs these to be importable outside of the app
+for _name in ("atlassian_client_id", "atlassian_client_secret", "atlassian_scopes"):
+    os.environ.setdefault(_name, "bench")
+os.environ.setdefault("app_secret_key", "bench")
+
+import httpx  # noqa: E402
+
+from app.clients.jira import JiraClient  # noqa: E402
+from app.core import jira_fields, rate_limit, single_flight  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from fake_atlassian import FakeConfig, create_app, parse_latency  # noqa: E402
+
+
+def _percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+async def _user(
+    jira: JiraClient,
+    keys: List[str],
+    rounds: int,
+    rng: random.Random,
+    timings: Dict[str, List[float]],
+) -> None:
+    async def timed(name: str, coro: object) -> object:
+        started = time.perf_counter()
+        try:
+            return await coro  # type: ignore[misc]
+        finally:
+            timings.setdefault(name, []).append(time.perf_counter() - started)
+
+    for _ in range(rounds):
+        # hot keys: a few issues are analysed by many users at once
+        key = keys[min(int(rng.paretovariate(1.2)) - 1, len(keys) - 1)]
+        issue, _ = await asyncio.gather(
+            timed("issue", jira.get_issue(key, profile=jira_fields.ANALYSIS)),
+            timed("comments", jira.get_issue_comments(key)),
+        )
+        fields = issue.get("fields", {})  # type: ignore[attr-defined]
+        links = fields.get("issuelinks") or []
+        linked = [
+            (link.get("outwardIssue") or link.get("inwardIssue") or {}).get("key")
+            for link in links
+        ]
+        await timed("dependencies", jira.get_issues_bulk(k for k in linked if k))
+
+        async def pages() -> None:
+            async for _ in jira.iter_search("project = P0", limit=100):
+                pass
+
+        await timed("search (100 issues)", pages())
+
+
+async def _run(args: argparse.Namespace) -> None:
+    fake = create_app(
+        FakeConfig(
+            seed=args.seed,
+            latency=parse_latency(args.latency),
+            throttle=args.throttle,
+            rate_limit=args.rate_limit,
+            retry_after=args.retry_after,
+        )
+    )
+    data = fake.state.data
+    http = httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=fake), base_url="http://fake"
+    )
+    jira = JiraClient("bench-token", data.cloud_id, client=http)
+    keys = list(data.issues)
+    timings: Dict[str, List[float]] = {}
+
+    started = time.perf_counter()
+    await asyncio.gather(
+        *(
+            _user(jira, keys, args.rounds, random.Random(i), timings)
+            for i in range(args.users)
+        )
+    )
+    elapsed = time.perf_counter() - started
+    stats = (await http.get("/__stats")).json()
+    await http.aclose()
+
+    print(f"{args.users} users x {args.rounds} rounds in {elapsed:.2f}s")
+    header = f"{'calls':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+    print(f"\n  {'operation':<20} {header}")
+    for name, values in timings.items():
+        p50 = statistics.median(values) * 1000
+        p95 = _percentile(values, 0.95) * 1000
+        p99 = _percentile(values, 0.99) * 1000
+        print(f"  {name:<20} {len(values):>6} {p50:>8.1f} {p95:>8.1f} {p99:>8.1f}")
+    print(f"\nfake served:    {stats['served']}")
+    print(f"fake throttled: {stats['throttled']}")
+    print(
+        f"client: {rate_limit.stats.retries} retries, "
+        f"{rate_limit.stats.wait_seconds:.2f}s waiting for budget, "
+        f"{single_flight.jira.collapsed_local} calls collapsed"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--latency",
+        action="append",
+        default=[],
+        help="SPEC or GROUP=SPEC, see scripts/fake_atlassian.py",
+    )
+    parser.add_argument("--throttle", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=0.2)
+    parser.add_argument(
+        "--client-rate",
+        type=float,
+        default=settings.jira_rate_limit_per_second,
+        help="client-side budget (requests / s), JIRA_RATE_LIMIT_PER_SECOND",
+    )
+    parser.add_argument(
+        "--cache", action="store_true", help="keep the Redis response cache on"
+    )
+    args = parser.parse_args()
+    settings.jira_cache_enabled = args.cache
+    settings.jira_rate_limit_per_second = args.client_rate
+    settings.jira_rate_limit_burst = max(int(args.client_rate * 2), 1)
+    asyncio.run(_run(args))
+
+
+if __name__ == "__main__":
+    main()
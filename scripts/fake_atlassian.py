@@ -0,0 +1,544 @@
+"""Local stand-in for the Atlassian APIs used by the gateway (load tests).
+
+Serves seeded synthetic data for the subset of Jira Cloud the app calls:
+
+    GET  /ex/jira/{cloud}/rest/api/3/myself
+    GET  /ex/jira/{cloud}/rest/api/3/issue/{key}            fields / expand
+    GET  /ex/jira/{cloud}/rest/api/3/issue/{key}/comment    startAt / maxResults
+    POST /ex/jira/{cloud}/rest/api/3/search/jql             nextPageToken
+    POST /ex/jira/{cloud}/rest/api/3/search                 legacy startAt / total
+    GET  /oauth/token/accessible-resources
+    GET  /authorize, POST /oauth/token                      OAuth 3LO
+
+Responses are delayed by a latency distribution (per endpoint group), and
+429s can be injected (at random, and / or past a request rate per cloud).
+Issues carry an ETag and honour If-None-Match. JQL: AND-ed clauses on
+project, key, reporter, assignee, status and type (=, !=, in, not in,
+currentUser()); other clauses and ORDER BY are ignored.
+
+Standalone server (point ATLASSIAN_API_BASE_URL and ATLASSIAN_AUTH_BASE_URL
+at it):
+    python scripts/fake_atlassian.py --port 9000 --latency lognormal:80,0.5 \\
+        --latency search=lognormal:250,0.6 --throttle 0.02
+
+In-process, without any network (benchmark harness):
+    fake = create_app(FakeConfig(seed=1, latency={"default": "fixed:20"}))
+    http = httpx.AsyncClient(transport=httpx.ASGITransport(app=fake))
+    JiraClient(token, fake.state.data.cloud_id, client=http)
+
+GET /__stats returns the requests served / throttled by endpoint group.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import random
+import re
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, RedirectResponse, Response
+
+_STATUSES = ("To Do", "In Progress", "In Review", "Done")
+_TYPES = ("Story", "Task", "Bug", "Etude")
+_PRIORITIES = ("Highest", "High", "Medium", "Low")
+_LINK_TYPES = (
+    ("Blocks", "blocks", "is blocked by"),
+    ("Relates", "relates to", "relates to"),
+)
+_WORDS = (
+    "api gateway cache login export report sync invoice search dashboard "
+    "timeout retry migration schema billing profile webhook token audit"
+).split()
+
+
+class Latency:
+    """Delay distribution: none, fixed:MS, uniform:MIN,MAX, lognormal:MEDIAN,SIGMA."""
+
+    def __init__(self, spec: str = "none") -> None:
+        kind, _, args = spec.partition(":")
+        self.spec = spec
+        self.kind = kind
+        self.args = [float(a) for a in args.split(",") if a]
+        expected = {"none": 0, "fixed": 1, "uniform": 2, "lognormal": 2}
+        if kind not in expected or len(self.args) != expected[kind]:
+            raise ValueError(f"Invalid latency spec: {spec!r}")
+
+    def sample(self, rng: random.Random) -> float:
+        """Delay in seconds."""
+        if self.kind == "fixed":
+            ms = self.args[0]
+        elif self.kind == "uniform":
+            ms = rng.uniform(*self.args)
+        elif self.kind == "lognormal":
+            median, sigma = self.args
+            ms = median * rng.lognormvariate(0, sigma)
+        else:
+            ms = 0.0
+        return ms / 1000
+
+
+class FakeConfig:
+    def __init__(
+        self,
+        *,
+        seed: int = 0,
+        cloud_id: str = "fake-cloud",
+        projects: int = 3,
+        issues_per_project: int = 200,
+        max_comments: int = 8,
+        latency: Optional[Dict[str, str]] = None,
+        throttle: float = 0.0,
+        rate_limit: float = 0.0,
+        retry_after: float = 1.0,
+    ) -> None:
+        self.seed = seed
+        self.cloud_id = cloud_id
+        self.projects = projects
+        self.issues_per_project = issues_per_project
+        self.max_comments = max_comments
+        # endpoint group (myself, issue, comment, search, oauth) -> spec
+        self.latency = {"default": "none", **(latency or {})}
+        self.throttle = throttle  # probability of a 429
+        self.rate_limit = rate_limit  # requests / s per cloud, 0: unlimited
+        self.retry_after = retry_after  # seconds, sent with every 429
+
+
+def _adf(text: str) -> Dict[str, Any]:
+    return {
+        "type": "doc",
+        "version": 1,
+        "content": [{"type": "paragraph", "content": [{"type": "text", "text": text}]}],
+    }
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(_WORDS) for _ in range(words)).capitalize()
+
+
+class FakeData:
+    """Seeded projects, users, issues, comments and links."""
+
+    def __init__(self, config: FakeConfig) -> None:
+        rng = random.Random(config.seed)
+        self.cloud_id = config.cloud_id
+        self.users = [
+            {"accountId": f"user-{i}", "displayName": f"User {i}", "active": True}
+            for i in range(10)
+        ]
+        self.issues: Dict[str, Dict[str, Any]] = {}
+        self.comments: Dict[str, List[Dict[str, Any]]] = {}
+        start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        for p in range(config.projects):
+            project = {"id": str(10000 + p), "key": f"P{p}", "name": f"Project {p}"}
+            for n in range(1, config.issues_per_project + 1):
+                key = f"{project['key']}-{n}"
+                created = start + timedelta(hours=rng.randrange(24 * 365))
+                updated = created + timedelta(hours=rng.randrange(24 * 30))
+                self.issues[key] = {
+                    "id": str(len(self.issues) + 1),
+                    "key": key,
+                    "fields": {
+                        "summary": _sentence(rng, 6),
+                        "description": _adf(_sentence(rng, 60)),
+                        "status": {"name": rng.choice(_STATUSES)},
+                        "issuetype": {"name": rng.choice(_TYPES)},
+                        "priority": {"name": rng.choice(_PRIORITIES)},
+                        "project": project,
+                        "assignee": rng.choice(self.users),
+                        "reporter": rng.choice(self.users),
+                        "labels": rng.sample(_WORDS, rng.randrange(3)),
+                        "created": created.isoformat(),
+                        "updated": updated.isoformat(),
+                        "issuelinks": [],
+                    },
+                }
+                self.comments[key] = [
+                    {
+                        "id": f"{key}-c{i}",
+                        "author": rng.choice(self.users),
+                        "body": _adf(_sentence(rng, 25)),
+                        "created": (updated + timedelta(minutes=i)).isoformat(),
+                    }
+                    for i in range(rng.randrange(config.max_comments + 1))
+                ]
+        keys = list(self.issues)
+        for key in keys:
+            for _ in range(rng.randrange(3)):
+                other = rng.choice(keys)
+                name, outward, inward = rng.choice(_LINK_TYPES)
+                link_type = {"name": name, "outward": outward, "inward": inward}
+                self.issues[key]["fields"]["issuelinks"].append(
+                    {"type": link_type, "outwardIssue": self._ref(other)}
+                )
+                self.issues[other]["fields"]["issuelinks"].append(
+                    {"type": link_type, "inwardIssue": self._ref(key)}
+                )
+
+    def _ref(self, key: str) -> Dict[str, Any]:
+        fields = self.issues[key]["fields"]
+        return {
+            "key": key,
+            "fields": {k: fields[k] for k in ("summary", "status", "issuetype")},
+        }
+
+    def project(self, issue: Dict[str, Any], fields: Optional[List[str]]) -> Any:
+        """Issue restricted to `fields` (all of them when absent or *all)."""
+        if not fields or "*all" in fields or "*navigable" in fields:
+            return issue
+        wanted = {f: issue["fields"][f] for f in fields if f in issue["fields"]}
+        return {"id": issue["id"], "key": issue["key"], "fields": wanted}
+
+
+_CLAUSE = re.compile(
+    r"^\s*(\w+)\s*(not\s+in|in|!=|=)\s*(\(.*\)|\"[^\"]*\"|'[^']*'|\S+)\s*$",
+    re.IGNORECASE,
+)
+_FIELDS = {
+    "project": lambda i: (i["fields"]["project"]["key"],),
+    "key": lambda i: (i["key"],),
+    "issuekey": lambda i: (i["key"],),
+    "reporter": lambda i: (i["fields"]["reporter"]["accountId"],),
+    "assignee": lambda i: (i["fields"]["assignee"]["accountId"],),
+    "status": lambda i: (i["fields"]["status"]["name"],),
+    "type": lambda i: (i["fields"]["issuetype"]["name"],),
+    "issuetype": lambda i: (i["fields"]["issuetype"]["name"],),
+}
+
+
+def _values(raw: str, account_id: str) -> List[str]:
+    raw = raw.strip()
+    items = raw[1:-1].split(",") if raw.startswith("(") else [raw]
+    out = []
+    for item in items:
+        value = item.strip().strip("\"'")
+        out.append(account_id if value.lower() == "currentuser()" else value)
+    return [v.lower() for v in out if v]
+
+
+def search(data: FakeData, jql: str, account_id: str) -> List[Dict[str, Any]]:
+    """Issues matching the supported subset of `jql`, in key order."""
+    where = re.split(r"\border\s+by\b", jql, flags=re.IGNORECASE)[0]
+    filters = []
+    for clause in re.split(r"\band\b", where, flags=re.IGNORECASE):
+        match = _CLAUSE.match(clause)
+        if not match or match.group(1).lower() not in _FIELDS:
+            continue  # unsupported clause: ignored
+        field, op, raw = match.groups()
+        negate = op == "!=" or op.lower().startswith("not")
+        filters.append((_FIELDS[field.lower()], _values(raw, account_id), negate))
+    out = []
+    for issue in data.issues.values():
+        if all(
+            any(v.lower() in wanted for v in get(issue)) != negate
+            for get, wanted, negate in filters
+        ):
+            out.append(issue)
+    return out
+
+
+def _etag(body: Any) -> str:
+    raw = json.dumps(body, sort_keys=True).encode("utf-8")
+    return '"' + hashlib.sha1(raw, usedforsecurity=False).hexdigest() + '"'
+
+
+def _page_token(offset: int) -> str:
+    return base64.urlsafe_b64encode(str(offset).encode()).decode()
+
+
+def _page_offset(token: Optional[str]) -> int:
+    if not token:
+        return 0
+    return int(base64.urlsafe_b64decode(token.encode()).decode())
+
+
+def _group(path: str) -> str:
+    if path.startswith("/oauth") or path.startswith("/authorize"):
+        return "oauth"
+    if path.endswith("/myself"):
+        return "myself"
+    if path.endswith("/comment"):
+        return "comment"
+    if "/search" in path:
+        return "search"
+    return "issue"
+
+
+def _error(status: int, message: str) -> JSONResponse:
+    return JSONResponse({"errorMessages": [message], "errors": {}}, status_code=status)
+
+
+def create_app(config: Optional[FakeConfig] = None) -> FastAPI:
+    config = config or FakeConfig()
+    data = FakeData(config)
+    rng = random.Random(config.seed)
+    latencies = {group: Latency(spec) for group, spec in config.latency.items()}
+    served: Counter[str] = Counter()
+    throttled: Counter[str] = Counter()
+    window: Dict[str, Tuple[float, int]] = {}  # cloud -> (second, count)
+    tokens: Dict[str, str] = {}  # access / refresh token -> accountId
+
+    app = FastAPI(title="Fake Atlassian API")
+    app.state.config = config
+    app.state.data = data
+
+    def _throttle(cloud: str) -> bool:
+        if config.throttle and rng.random() < config.throttle:
+            return True
+        if config.rate_limit:
+            second = int(time.monotonic())
+            start, count = window.get(cloud, (second, 0))
+            if start != second:
+                start, count = second, 0
+            window[cloud] = (start, count + 1)
+            return count + 1 > config.rate_limit
+        return False
+
+    @app.middleware("http")
+    async def simulate(request: Request, call_next: Any) -> Any:
+        path = request.url.path
+        if path == "/__stats":
+            return await call_next(request)
+        group = _group(path)
+        latency = latencies.get(group) or latencies["default"]
+        await asyncio.sleep(latency.sample(rng))
+        cloud = path.split("/")[3] if path.startswith("/ex/jira/") else "oauth"
+        if group != "oauth" and _throttle(cloud):
+            throttled[group] += 1
+            return JSONResponse(
+                {"errorMessages": ["Rate limit exceeded"]},
+                status_code=429,
+                headers={"Retry-After": f"{config.retry_after:g}"},
+            )
+        served[group] += 1
+        return await call_next(request)
+
+    def _account(request: Request) -> Optional[str]:
+        auth = request.headers.get("authorization", "")
+        if not auth.startswith("Bearer ") or not auth[7:]:
+            return None
+        # tokens not issued here (e.g. a hard-coded bench token) act as user-0
+        return tokens.get(auth[7:], data.users[0]["accountId"])
+
+    def _user(account_id: str) -> Dict[str, Any]:
+        return next(
+            (u for u in data.users if u["accountId"] == account_id), data.users[0]
+        )
+
+    base = "/ex/jira/{cloud}/rest/api/3"
+
+    @app.get("/__stats")
+    async def stats() -> Dict[str, Any]:
+        return {"served": dict(served), "throttled": dict(throttled)}
+
+    @app.get(base + "/myself")
+    async def myself(request: Request, cloud: str) -> Any:
+        account = _account(request)
+        if account is None:
+            return _error(401, "Unauthorized")
+        return {**_user(account), "emailAddress": f"{account}@example.test"}
+
+    @app.get(base + "/issue/{key}")
+    async def get_issue(
+        request: Request,
+        cloud: str,
+        key: str,
+        fields: Optional[str] = None,
+        expand: Optional[str] = None,
+    ) -> Any:
+        if _account(request) is None:
+            return _error(401, "Unauthorized")
+        issue = data.issues.get(key.upper())
+        if issue is None:
+            return _error(
+                404, "Issue does not exist or you do not have permission to see it."
+            )
+        body = data.project(issue, fields.split(",") if fields else None)
+        if expand and "renderedFields" in expand:
+            body = {**body, "renderedFields": {}}
+        etag = _etag(body)
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers={"ETag": etag})
+        return JSONResponse(body, headers={"ETag": etag})
+
+    @app.get(base + "/issue/{key}/comment")
+    async def get_comments(
+        request: Request,
+        cloud: str,
+        key: str,
+        startAt: int = 0,
+        maxResults: int = 50,
+    ) -> Any:
+        if _account(request) is None:
+            return _error(401, "Unauthorized")
+        comments = data.comments.get(key.upper())
+        if comments is None:
+            return _error(
+                404, "Issue does not exist or you do not have permission to see it."
+            )
+        maxResults = max(1, min(maxResults, 100))
+        end = startAt + maxResults
+        return {
+            "startAt": startAt,
+            "maxResults": maxResults,
+            "total": len(comments),
+            "comments": comments[startAt:end],
+        }
+
+    async def _search_body(request: Request) -> Tuple[Optional[str], Dict[str, Any]]:
+        account = _account(request)
+        try:
+            body = await request.json()
+        except ValueError:
+            body = {}
+        return account, body if isinstance(body, dict) else {}
+
+    def _issues(body: Dict[str, Any], matches: List[Dict[str, Any]]) -> List[Any]:
+        fields = body.get("fields")
+        if isinstance(fields, str):
+            fields = fields.split(",")
+        return [data.project(issue, fields or ["*navigable"]) for issue in matches]
+
+    @app.post(base + "/search/jql")
+    async def search_jql(request: Request, cloud: str) -> Any:
+        account, body = await _search_body(request)
+        if account is None:
+            return _error(401, "Unauthorized")
+        matches = search(data, str(body.get("jql") or ""), account)
+        size = max(1, min(int(body.get("maxResults") or 50), 100))
+        start = _page_offset(body.get("nextPageToken"))
+        end = start + size
+        out: Dict[str, Any] = {"issues": _issues(body, matches[start:end])}
+        if end < len(matches):
+            out["nextPageToken"] = _page_token(end)
+            out["isLast"] = False
+        else:
+            out["isLast"] = True
+        return out
+
+    @app.post(base + "/search")
+    async def search_legacy(request: Request, cloud: str) -> Any:
+        account, body = await _search_body(request)
+        if account is None:
+            return _error(401, "Unauthorized")
+        matches = search(data, str(body.get("jql") or ""), account)
+        size = max(1, min(int(body.get("maxResults") or 50), 100))
+        start = int(body.get("startAt") or 0)
+        end = start + size
+        return {
+            "startAt": start,
+            "maxResults": size,
+            "total": len(matches),
+            "issues": _issues(body, matches[start:end]),
+        }
+
+    @app.get("/oauth/token/accessible-resources")
+    async def accessible_resources(request: Request) -> Any:
+        if _account(request) is None:
+            return _error(401, "Unauthorized")
+        return [
+            {
+                "id": data.cloud_id,
+                "name": "fake",
+                "url": "https://fake.atlassian.net",
+                "scopes": ["read:jira-work", "read:jira-user"],
+                "avatarUrl": "",
+            }
+        ]
+
+    @app.get("/authorize")
+    async def authorize(redirect_uri: str, state: str = "") -> RedirectResponse:
+        # consent screen skipped: straight back to the app with a code
+        code = f"code-{rng.randrange(len(data.users))}"
+        return RedirectResponse(f"{redirect_uri}?code={code}&state={state}")
+
+    @app.post("/oauth/token")
+    async def oauth_token(request: Request) -> Any:
+        raw = (await request.body()).decode("utf-8")
+        try:
+            body = json.loads(raw)
+        except ValueError:
+            body = {k: v[0] for k, v in parse_qs(raw).items()}
+        grant = body.get("grant_type")
+        if grant == "authorization_code" and body.get("code"):
+            user = str(body["code"]).rsplit("-", 1)[-1]
+            account = f"user-{user}" if user.isdigit() else "user-0"
+        elif grant == "refresh_token" and body.get("refresh_token") in tokens:
+            account = tokens.pop(body["refresh_token"])
+        else:
+            return JSONResponse({"error": "invalid_grant"}, status_code=403)
+        access = f"access-{rng.getrandbits(64):x}"
+        refresh = f"refresh-{rng.getrandbits(64):x}"
+        tokens[access] = tokens[refresh] = account
+        return {
+            "access_token": access,
+            "refresh_token": refresh,
+            "expires_in": 3600,
+            "scope": "read:jira-work read:jira-user offline_access",
+            "token_type": "Bearer",
+        }
+
+    return app
+
+
+def parse_latency(values: List[str]) -> Dict[str, str]:
+    out: Dict[str, str] = {}
+    for value in values:
+        group, sep, spec = value.partition("=")
+        if sep:
+            out[group] = spec
+        else:
+            out["default"] = value
+    for spec in out.values():
+        Latency(spec)  # fail fast on a typo
+    return out
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--cloud-id", default="fake-cloud")
+    parser.add_argument("--projects", type=int, default=3)
+    parser.add_argument("--issues-per-project", type=int, default=200)
+    parser.add_argument(
+        "--latency",
+        action="append",
+        default=[],
+        help="SPEC or GROUP=SPEC (groups: myself, issue, comment, search, oauth)",
+    )
+    parser.add_argument(
+        "--throttle", type=float, default=0.0, help="probability of a 429"
+    )
+    parser.add_argument(
+        "--rate-limit", type=float, default=0.0, help="requests / s per cloud"
+    )
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    args = parser.parse_args()
+
+    import uvicorn
+
+    config = FakeConfig(
+        seed=args.seed,
+        cloud_id=args.cloud_id,
+        projects=args.projects,
+        issues_per_project=args.issues_per_project,
+        latency=parse_latency(args.latency),
+        throttle=args.throttle,
+        rate_limit=args.rate_limit,
+        retry_after=args.retry_after,
+    )
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()